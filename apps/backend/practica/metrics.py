@@ -0,0 +1,260 @@
+"""
+Prometheus metrics shared across gunicorn workers.
+
+Each process counts into memory and snapshots to
+METRICS_DIR/<host>-<pid>-<start>.json at most every METRICS_FLUSH_SECONDS (and
+at exit). The /metrics view merges every snapshot, first folding those of
+exited workers into archive.json so counters stay monotonic across
+--max-requests restarts. METRICS_DIR may be shared between containers (the
+media job worker reports into the web backend's); only snapshots from the
+collecting host are checked for exited processes, since a pid means nothing
+elsewhere. Without METRICS_DIR only the serving process's own numbers are
+reported.
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+AWS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+GAUGE = 'gauge'
+
+# name: (type, help, buckets)
+METRICS = {
+    'practica_http_requests_total': (COUNTER, 'HTTP requests by view and status.', None),
+    'practica_http_request_duration_seconds': (HISTOGRAM, 'HTTP request latency by view.', LATENCY_BUCKETS),
+    'practica_db_query_duration_seconds': (HISTOGRAM, 'Latency of single SQL statements run by requests.', QUERY_BUCKETS),
+    'practica_aws_call_duration_seconds': (HISTOGRAM, 'Latency of AWS API calls (S3, MediaConvert).', AWS_BUCKETS),
+    'practica_aws_call_errors_total': (COUNTER, 'AWS API calls that failed without a response (timeouts, connection errors).', None),
+    'practica_upload_bytes_total': (COUNTER, 'Media bytes accepted, by upload path.', None),
+    'practica_uploads_total': (COUNTER, 'Completed media uploads, by upload path.', None),
+}
+
+ARCHIVE = 'archive.json'
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _merge(into, samples):
+    for key, value in samples.items():
+        current = into.get(key)
+        if current is None:
+            into[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            into[key] = [a + b for a, b in zip(current, value)]
+        else:
+            into[key] = current + value
+    return into
+
+
+def _dump(samples):
+    return [[name, [list(pair) for pair in labels], value] for (name, labels), value in samples.items()]
+
+
+def _load(path):
+    try:
+        with open(path) as fh:
+            rows = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return {(name, tuple(tuple(pair) for pair in labels)): value for name, labels, value in rows}
+
+
+def _write_atomic(path, samples):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(_dump(samples), fh)
+    os.replace(tmp, path)
+
+
+def _snapshot_owner(name):
+    """(host, pid) from a snapshot file name, or None for names this module did not write."""
+    parts = name[:-len('.json')].rsplit('-', 2)
+    if len(parts) != 3 or not parts[1].isdigit():
+        return None
+    return parts[0], int(parts[1])
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+        atexit.register(self.flush)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._name = f'{socket.gethostname()}-{self._pid}-{int(time.time() * 1000)}.json'
+        self._samples = {}
+        self._flushed_at = 0.0
+
+    def _directory(self):
+        return getattr(settings, 'METRICS_DIR', '') or ''
+
+    def _own(self):
+        # A worker forked after the registry was used must not re-report its parent's counts.
+        if os.getpid() != self._pid:
+            self._reset()
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            self._own()
+            key = _key(name, labels)
+            self._samples[key] = self._samples.get(key, 0) + amount
+        self._maybe_flush()
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        with self._lock:
+            self._own()
+            key = _key(name, labels)
+            row = self._samples.get(key)
+            if row is None:
+                row = self._samples[key] = [0] * (len(buckets) + 2)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    row[index] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        interval = float(getattr(settings, 'METRICS_FLUSH_SECONDS', 1.0))
+        if time.monotonic() - self._flushed_at >= interval:
+            self.flush()
+
+    def flush(self):
+        directory = self._directory()
+        if not directory:
+            return
+        with self._lock:
+            self._own()
+            samples = dict(self._samples)
+            self._flushed_at = time.monotonic()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            _write_atomic(os.path.join(directory, self._name), samples)
+        except OSError:
+            pass  # metrics must never fail the request
+
+    def collect(self):
+        """Merged samples of every process that has reported into METRICS_DIR."""
+        directory = self._directory()
+        if not directory:
+            with self._lock:
+                return _merge({}, self._samples)
+        self.flush()
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            archive_path = os.path.join(directory, ARCHIVE)
+            archived = _load(archive_path)
+            merged = _merge({}, archived)
+            exited = []
+            host = socket.gethostname()
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith('.json') or name == ARCHIVE:
+                    continue
+                path = os.path.join(directory, name)
+                samples = _load(path)
+                _merge(merged, samples)
+                owner = _snapshot_owner(name)
+                if owner and owner[0] == host and owner[1] != os.getpid() and not _alive(owner[1]):
+                    _merge(archived, samples)
+                    exited.append(path)
+            if exited:
+                _write_atomic(archive_path, archived)
+                for path in exited:
+                    os.remove(path)
+        return merged
+
+
+registry = Registry()
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+
+def record_upload(path, size_bytes):
+    inc('practica_upload_bytes_total', int(size_bytes or 0), path=path)
+    inc('practica_uploads_total', path=path)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render(samples, gauges=()):
+    """
+    Prometheus text exposition of `samples` (from Registry.collect) plus
+    `gauges`, an iterable of (name, help, [(labels_dict, value), ...]).
+    """
+    by_name = {}
+    for (name, labels), value in samples.items():
+        by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        rows = sorted(by_name.get(name, []))
+        if not rows:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in rows:
+            if kind != HISTOGRAM:
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels + (("le", repr(bound)),))} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {value[-1]}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(value[-2])}')
+            lines.append(f'{name}_count{_labels(labels)} {value[-1]}')
+
+    for name, help_text, rows in gauges:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {GAUGE}')
+        for labels, value in rows:
+            lines.append(f'{name}{_labels(tuple(sorted(labels.items())))} {_number(value)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,183 @@
+"""
+Staff-only request profiling.
+
+A staff request carrying `X-Profile: 1` (or `?_profile=1`) runs under cProfile
+with every SQL statement logged. The result is written to REQUEST_PROFILE_DIR
+as <id>.prof (pstats format, for snakeviz or `python -m pstats`) and <id>.json
+(request, SQL log and the hottest functions), and the response names it in
+X-Profile-Id. The newest REQUEST_PROFILE_KEEP profiles are kept.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import tempfile
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PARAM = '_profile'
+PROFILE_ID = re.compile(r'^\d{8}T\d{12}-[0-9a-f]{8}$')
+TOP_FUNCTIONS = 40
+
+
+def profile_dir():
+    return getattr(settings, 'REQUEST_PROFILE_DIR', '') or os.path.join(tempfile.gettempdir(), 'practica-profiles')
+
+
+def profile_path(profile_id, extension):
+    """Path of a stored profile file, or None for an id that is not ours."""
+    if not PROFILE_ID.match(str(profile_id or '')):
+        return None
+    path = os.path.join(profile_dir(), f'{profile_id}.{extension}')
+    return path if os.path.exists(path) else None
+
+
+def _staff_user(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user if user.is_staff else None
+    # API clients send a DRF token, which only the view would otherwise resolve.
+    try:
+        result = TokenAuthentication().authenticate(request)
+    except APIException:
+        return None
+    if result and result[0].is_staff:
+        return result[0]
+    return None
+
+
+def profiling_requested(request):
+    if not getattr(settings, 'REQUEST_PROFILING_ENABLED', True):
+        return False
+    flag = request.headers.get('X-Profile') or request.GET.get(PROFILE_PARAM)
+    return str(flag or '').lower() in ('1', 'true', 'yes') and _staff_user(request) is not None
+
+
+class SqlLog:
+    def __init__(self, limit):
+        self.limit = limit
+        self.entries = []
+        self.total = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.total += 1
+            self.seconds += elapsed
+            if len(self.entries) < self.limit:
+                self.entries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'params': repr(params)[:500],
+                    'ms': round(elapsed * 1000, 2),
+                })
+
+
+def _top_functions(profiler):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+    return stream.getvalue()
+
+
+def save_profile(profiler, sql_log, request, response, seconds):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    profile_id = f'{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}'
+    profiler.dump_stats(os.path.join(directory, f'{profile_id}.prof'))
+    match = getattr(request, 'resolver_match', None)
+    user = getattr(request, 'user', None)  # DRF has stored the token user here by now
+    summary = {
+        'id': profile_id,
+        'created_at': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': match.view_name if match else '',
+        'status': response.status_code,
+        'user': getattr(user, 'username', ''),
+        'ms': round(seconds * 1000, 1),
+        'queries': sql_log.total,
+        'db_ms': round(sql_log.seconds * 1000, 1),
+    }
+    with open(os.path.join(directory, f'{profile_id}.json'), 'w') as fh:
+        json.dump({**summary, 'sql': sql_log.entries, 'top_functions': _top_functions(profiler)}, fh)
+    _prune(directory, int(getattr(settings, 'REQUEST_PROFILE_KEEP', 50)))
+    return profile_id
+
+
+def _prune(directory, keep):
+    ids = sorted(name[:-5] for name in os.listdir(directory) if name.endswith('.json') and PROFILE_ID.match(name[:-5]))
+    for profile_id in ids[:-keep] if keep > 0 else ids:
+        for extension in ('json', 'prof'):
+            try:
+                os.remove(os.path.join(directory, f'{profile_id}.{extension}'))
+            except FileNotFoundError:
+                pass
+
+
+def load_profile(profile_id):
+    path = profile_path(profile_id, 'json')
+    if path is None:
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def list_profiles():
+    """Stored profile summaries, newest first."""
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith('.json') and PROFILE_ID.match(name[:-5]):
+            profile = load_profile(name[:-5]) or {}
+            summaries.append({key: value for key, value in profile.items() if key not in ('sql', 'top_functions')})
+    return summaries
+
+
+class RequestProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling_requested(request):
+            return self.get_response(request)
+
+        sql_log = SqlLog(int(getattr(settings, 'REQUEST_PROFILE_MAX_QUERIES', 2000)))
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(sql_log))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        seconds = time.perf_counter() - started
+
+        try:
+            profile_id = save_profile(profiler, sql_log, request, response, seconds)
+        except OSError:
+            logger.exception('Could not store request profile for %s', request.path)
+            return response
+        response['X-Profile-Id'] = profile_id
+        logger.info('Stored profile %s for %s %s (%d queries)', profile_id, request.method, request.path, sql_log.total)
+        return response
@@ -0,0 +1,219 @@
+"""
+Per-request SQL and AWS instrumentation.
+
+Counts queries, DB time, repeated queries (the N+1 signature) and boto3 call
+time for each request, reports them as a Server-Timing header and one log
+line, and enforces optional per-view query budgets.
+"""
+
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+import boto3
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections
+
+from practica import metrics as prometheus
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+_BOTO_STARTED = 'practica_request_metrics_started'
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode (tests) when a view runs more queries than its budget."""
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()
+        self.exact = Counter()
+        self.aws_calls = 0
+        self.aws_seconds = 0.0
+
+    def record_query(self, sql, params, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.statements[sql] += 1
+        self.exact[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self):
+        """Queries that repeated an earlier statement with the same parameters."""
+        return sum(count - 1 for count in self.exact.values() if count > 1)
+
+    @property
+    def similar(self):
+        """Queries that repeated an earlier statement with any parameters (N+1 loops)."""
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def most_repeated(self):
+        if not self.statements:
+            return '', 0
+        sql, count = self.statements.most_common(1)[0]
+        return (sql, count) if count > 1 else ('', 0)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.record_query(sql, params, elapsed)
+        prometheus.observe('practica_db_query_duration_seconds', elapsed, alias=context['connection'].alias)
+
+
+def _before_aws_call(context=None, **kwargs):
+    if context is not None:
+        context[_BOTO_STARTED] = time.perf_counter()
+
+
+def _after_aws_call(context=None, event_name='', **kwargs):
+    started = (context or {}).pop(_BOTO_STARTED, None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    # event_name is 'after-call.<service>.<Operation>' (or after-call-error...)
+    parts = event_name.split('.')
+    service, operation = (parts[1], parts[2]) if len(parts) >= 3 else ('unknown', 'unknown')
+    prometheus.observe('practica_aws_call_duration_seconds', elapsed, service=service, operation=operation)
+    if event_name.startswith('after-call-error'):
+        prometheus.inc('practica_aws_call_errors_total', service=service, operation=operation)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.aws_calls += 1
+        metrics.aws_seconds += elapsed
+
+
+def install_boto_hooks(events=None):
+    """
+    Time every API call made through `events` (a session's or client's event
+    emitter); by default, every client later created from boto3's default session.
+    """
+    events = events or boto3._get_default_session().events
+    # before-parameter-build always reaches every handler; before-call stops at the first one that answers.
+    events.register('before-parameter-build', _before_aws_call, unique_id='practica-metrics-before')
+    events.register('after-call', _after_aws_call, unique_id='practica-metrics-after')
+    events.register('after-call-error', _after_aws_call, unique_id='practica-metrics-error')
+
+
+def _install_storage_hooks():
+    # django-storages builds its own boto3 session, so the default-session hooks miss it.
+    connection = getattr(default_storage, 'connection', None) if hasattr(default_storage, 'bucket_name') else None
+    if connection is not None:
+        install_boto_hooks(connection.meta.client.meta.events)
+
+
+def query_budget(request):
+    """
+    Budget for the view that handled `request`: REQUEST_QUERY_BUDGETS keyed by
+    'METHOD view-name' or plain 'view-name', else REQUEST_QUERY_BUDGET_DEFAULT.
+    """
+    match = getattr(request, 'resolver_match', None)
+    budgets = getattr(settings, 'REQUEST_QUERY_BUDGETS', {}) or {}
+    if match is not None:
+        for key in (f'{request.method} {match.view_name}', match.view_name):
+            if key in budgets:
+                return budgets[key]
+    return getattr(settings, 'REQUEST_QUERY_BUDGET_DEFAULT', None)
+
+
+def server_timing(metrics, total_seconds):
+    parts = [
+        f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.queries} queries, {metrics.similar} repeated"',
+        f'app;dur={total_seconds * 1000:.1f}',
+    ]
+    if metrics.aws_calls:
+        parts.insert(1, f'aws;dur={metrics.aws_seconds * 1000:.1f};desc="{metrics.aws_calls} calls"')
+    return ', '.join(parts)
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_boto_hooks()
+        _install_storage_hooks()
+
+    def __call__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_query_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = metrics.elapsed()
+        self._export(request, response, total)
+        user = getattr(request, 'user', None)
+        if getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', False) or getattr(user, 'is_staff', False):
+            response['Server-Timing'] = server_timing(metrics, total)
+        self._log(request, response, metrics, total)
+        self._check_budget(request, metrics)
+        return response
+
+    def _export(self, request, response, total):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else '') or 'unmatched'
+        prometheus.inc('practica_http_requests_total', method=request.method, view=view, status=str(response.status_code))
+        prometheus.observe('practica_http_request_duration_seconds', total, method=request.method, view=view)
+
+    def _log(self, request, response, metrics, total):
+        match = getattr(request, 'resolver_match', None)
+        sql, repeats = metrics.most_repeated()
+        data = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else '',
+            'status': response.status_code,
+            'ms': round(total * 1000, 1),
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_seconds * 1000, 1),
+            'repeated': metrics.similar,
+            'duplicates': metrics.duplicates,
+            'aws_calls': metrics.aws_calls,
+            'aws_ms': round(metrics.aws_seconds * 1000, 1),
+        }
+        logger.info(
+            'request method=%s path=%s view=%s status=%s ms=%.1f queries=%d db_ms=%.1f repeated=%d '
+            'duplicates=%d aws_calls=%d aws_ms=%.1f%s',
+            data['method'], data['path'], data['view'], data['status'], data['ms'], data['queries'],
+            data['db_ms'], data['repeated'], data['duplicates'], data['aws_calls'], data['aws_ms'],
+            f' top_repeat={repeats}x {sql[:200]!r}' if repeats else '',
+            extra={'request_metrics': data},
+        )
+
+    def _check_budget(self, request, metrics):
+        budget = query_budget(request)
+        if budget is None or metrics.queries <= budget:
+            return
+        match = request.resolver_match
+        view = f'{request.method} {match.view_name if match else request.path}'
+        sql, repeats = metrics.most_repeated()
+        message = (
+            f'{view} ran {metrics.queries} queries (budget {budget}); '
+            f'most repeated {repeats}x: {sql[:300]}'
+        )
+        if getattr(settings, 'REQUEST_QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning('Query budget exceeded: %s', message)
@@ -3,6 +3,7 @@ Django settings for practica project.
 """
 
 import os
+import sys
 from pathlib import Path
 import dj_database_url
 
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'practica.request_metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -49,6 +51,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'practica.profiling.RequestProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'practica.urls'
@@ -118,6 +121,15 @@ AWS_MEDIA_CONVERT_ENDPOINT_URL = os.environ.get('AWS_MEDIA_CONVERT_ENDPOINT_URL'
 AWS_MEDIA_CONVERT_QUEUE_ARN = os.environ.get('AWS_MEDIA_CONVERT_QUEUE_ARN', '')
 AWS_MEDIA_CONVERT_OUTPUT_PREFIX = os.environ.get('AWS_MEDIA_CONVERT_OUTPUT_PREFIX', '')
 MEDIA_PROCESSING_CALLBACK_TOKEN = os.environ.get('MEDIA_PROCESSING_CALLBACK_TOKEN', '')
+MEDIA_PROCESSING_MAX_BATCH = int(os.environ.get('MEDIA_PROCESSING_MAX_BATCH', 500))
+# MediaConvert submissions are queued (videos.MediaJob) and drained by a token
+# bucket; match these to the account's CreateJob TPS quota.
+MEDIACONVERT_SUBMIT_RATE = float(os.environ.get('MEDIACONVERT_SUBMIT_RATE', '1'))
+MEDIACONVERT_SUBMIT_BURST = int(os.environ.get('MEDIACONVERT_SUBMIT_BURST', 5))
+MEDIA_JOB_MAX_ATTEMPTS = int(os.environ.get('MEDIA_JOB_MAX_ATTEMPTS', 8))
+# A job still 'running' after this long belonged to a worker that died; it is claimed again.
+MEDIA_JOB_RUNNING_TIMEOUT_SECONDS = int(os.environ.get('MEDIA_JOB_RUNNING_TIMEOUT_SECONDS', 1800))
+MEDIA_JOB_SHORT_SESSION_SECONDS = int(os.environ.get('MEDIA_JOB_SHORT_SESSION_SECONDS', 300))
 
 if AWS_STORAGE_BUCKET_NAME:
     STORAGES = {
@@ -129,7 +141,7 @@ if AWS_STORAGE_BUCKET_NAME:
                 'file_overwrite': False,
                 'default_acl': None,
                 'querystring_auth': True,
-                'querystring_expire': 3600,
+                'querystring_expire': AWS_QUERYSTRING_EXPIRE,
             },
         },
         'staticfiles': {
@@ -148,6 +160,36 @@ else:
     }
     MEDIA_URL = '/media/'
 
+# Signed media URLs are reused within an expiry bucket (at most half of
+# AWS_QUERYSTRING_EXPIRE) so list pages skip re-signing and browsers can cache.
+SIGNED_URL_CACHE_WINDOW = int(os.environ.get('SIGNED_URL_CACHE_WINDOW', AWS_QUERYSTRING_EXPIRE // 2))
+HLS_PLAYLIST_CACHE_SECONDS = int(os.environ.get('HLS_PLAYLIST_CACHE_SECONDS', 3600))
+
+# Health probes (/health/, /health/ready/) reuse results for this long per worker.
+HEALTH_PROBE_CACHE_SECONDS = float(os.environ.get('HEALTH_PROBE_CACHE_SECONDS', '5'))
+# /health/ reports degraded once the oldest due media job has waited longer than this.
+HEALTH_BACKLOG_MAX_WAIT_SECONDS = int(os.environ.get('HEALTH_BACKLOG_MAX_WAIT_SECONDS', 1800))
+
+# Cache
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                'IGNORE_EXCEPTIONS': True,
+            },
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
 WHITENOISE_ROOT = str(FRONTEND_DIR) if FRONTEND_DIR.exists() else None
 
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -156,6 +198,17 @@ MEDIA_ROOT = BASE_DIR / 'media'
 UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 2147483648))
 DATA_UPLOAD_MAX_MEMORY_SIZE = UPLOAD_MAX_BYTES
 FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('FILE_UPLOAD_MAX_MEMORY_SIZE', 5242880))
+# Resumable chunked uploads (used when there is no S3 bucket). Partial files live
+# under MEDIA_ROOT by default so completing an upload is a rename.
+RESUMABLE_UPLOAD_DIR = os.environ.get('RESUMABLE_UPLOAD_DIR', '')
+RESUMABLE_UPLOAD_MAX_CHUNK_BYTES = int(os.environ.get('RESUMABLE_UPLOAD_MAX_CHUNK_BYTES', 64 * 1024 * 1024))
+
+# Local media (no S3 bucket) is authorised by /media/<key> and then handed to
+# the front proxy: 'x-accel-redirect' (nginx, with an `internal` location at
+# MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile' (Apache/lighttpd).
+# Empty serves byte ranges from the app with sendfile.
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '').strip().lower()
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -166,7 +219,9 @@ CORS_ALLOW_ALL_ORIGINS = DEBUG
 CORS_ALLOW_HEADERS = [
     'accept', 'accept-encoding', 'authorization', 'content-type',
     'dnt', 'origin', 'user-agent', 'x-csrftoken', 'x-requested-with',
+    'upload-offset',
 ]
+CORS_EXPOSE_HEADERS = ['upload-offset', 'upload-length', 'location']
 
 # CSRF
 CSRF_TRUSTED_ORIGINS = os.environ.get('CSRF_TRUSTED_ORIGINS', 'http://localhost:3000,http://localhost:5173').split(',')
@@ -203,5 +258,51 @@ if not DEBUG:
     SESSION_COOKIE_SECURE = True
     X_FRAME_OPTIONS = 'DENY'
 
+# Request instrumentation (practica.request_metrics). Server-Timing is always
+# sent to staff; set REQUEST_METRICS_SERVER_TIMING to send it to everyone.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', 'True').lower() in ['true', '1', 'yes']
+REQUEST_METRICS_SERVER_TIMING = os.environ.get('REQUEST_METRICS_SERVER_TIMING', str(DEBUG)).lower() in ['true', '1', 'yes']
+# Max queries per view name; exceeding one logs a warning, or fails the request
+# when strict (the test suite), so N+1 regressions break the build.
+REQUEST_QUERY_BUDGETS = {
+    'GET session-list': 12,
+    'GET session-detail': 12,
+    'GET space-list': 8,
+    'GET space-detail': 8,
+    'GET me': 8,
+    'GET tag_list': 3,
+    'GET media_file': 6,
+}
+REQUEST_QUERY_BUDGET_STRICT = os.environ.get('REQUEST_QUERY_BUDGET_STRICT', str(TESTING)).lower() in ['true', '1', 'yes']
+
+# Staff requests with X-Profile: 1 (or ?_profile=1) run under cProfile; the
+# profiles are listed and downloaded from /api/profiles/.
+REQUEST_PROFILING_ENABLED = os.environ.get('REQUEST_PROFILING_ENABLED', 'True').lower() in ['true', '1', 'yes']
+REQUEST_PROFILE_DIR = os.environ.get('REQUEST_PROFILE_DIR', '')
+REQUEST_PROFILE_KEEP = int(os.environ.get('REQUEST_PROFILE_KEEP', 50))
+
+# Prometheus metrics (practica.metrics) served at /metrics. Every gunicorn worker
+# snapshots into METRICS_DIR; leave it empty for a single process.
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', '1'))
+# Scrapers send 'Authorization: Bearer <token>'; staff sessions work without it.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'practica.request_metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_METRICS_LOG_LEVEL', 'WARNING' if TESTING else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Admin URL (obscured)
 ADMIN_URL = os.environ.get('ADMIN_URL', 'admin/')
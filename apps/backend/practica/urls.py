@@ -1,16 +1,16 @@
 from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.views.generic import TemplateView
 from rest_framework.routers import DefaultRouter
 from videos.views import (
-    SessionViewSet, ExerciseViewSet, SpaceViewSet, health_check,
+    SessionViewSet, ExerciseViewSet, SpaceViewSet, health_check, health_live, health_ready, metrics_view, media_file,
     register_view, login_view, me_view,
     client_error_view,
     create_invite, accept_invite, tag_list,
     join_space, space_info,
     coach_metrics_summary,
+    profile_list, profile_detail, profile_download,
 )
 
 router = DefaultRouter()
@@ -31,15 +31,19 @@ urlpatterns = [
     path('api/coach-metrics/summary/', coach_metrics_summary, name='coach_metrics_summary'),
     path('api/join/<slug:slug>/', join_space, name='join_space'),
     path('api/space-info/<slug:slug>/', space_info, name='space_info'),
+    path('api/profiles/', profile_list, name='profile_list'),
+    path('api/profiles/<str:profile_id>/', profile_detail, name='profile_detail'),
+    path('api/profiles/<str:profile_id>/download/', profile_download, name='profile_download'),
     path('health/', health_check, name='health_check'),
+    path('health/live/', health_live, name='health_live'),
+    path('health/ready/', health_ready, name='health_ready'),
+    path('metrics', metrics_view, name='metrics'),
+    path('media/<path:object_key>', media_file, name='media_file'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-
 if settings.FRONTEND_DIR.exists():
     urlpatterns += [
-        re_path(r'^(?!api/|admin/|health/|static/|media/|assets/).*$',
+        re_path(r'^(?!api/|admin/|health/|metrics$|static/|media/|assets/).*$',
                 TemplateView.as_view(template_name='index.html'),
                 name='spa'),
     ]
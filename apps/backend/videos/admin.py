@@ -1,7 +1,8 @@
 from django.contrib import admin
 from .models import (
     Profile, Exercise, Session, Chapter, Comment, InviteCode, Tag, Space,
-    SpaceMember, MultipartSessionUpload, ExerciseReferenceClip, SessionAsset,
+    SpaceMember, MultipartSessionUpload, MultipartCommentUpload, ExerciseReferenceClip, SessionAsset,
+    CommentAsset, ProcessingCallbackEvent, MediaJob, ChapterSuggestion, ResumableSessionUpload,
 )
 
 
@@ -66,6 +67,12 @@ class ChapterAdmin(admin.ModelAdmin):
     raw_id_fields = ['session', 'exercise']
 
 
+@admin.register(ChapterSuggestion)
+class ChapterSuggestionAdmin(admin.ModelAdmin):
+    list_display = ['session', 'start_seconds', 'end_seconds', 'tempo_bpm', 'onset_count']
+    raw_id_fields = ['session']
+
+
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ['__str__', 'session', 'user', 'timestamp_seconds', 'legacy_text_only', 'created_at']
@@ -81,6 +88,30 @@ class SessionAssetAdmin(admin.ModelAdmin):
     raw_id_fields = ['session']
 
 
+@admin.register(CommentAsset)
+class CommentAssetAdmin(admin.ModelAdmin):
+    list_display = ['id', 'comment', 'asset_type', 'object_key', 'created_at']
+    list_filter = ['asset_type']
+    search_fields = ['object_key', 'comment__session__title', 'comment__user__username']
+    raw_id_fields = ['comment']
+
+
+@admin.register(ProcessingCallbackEvent)
+class ProcessingCallbackEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'session', 'status', 'created_at']
+    list_filter = ['status']
+    search_fields = ['event_id']
+    raw_id_fields = ['session']
+
+
+@admin.register(MediaJob)
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'priority', 'attempts', 'available_at', 'external_id', 'created_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['external_id']
+    raw_id_fields = ['session', 'comment']
+
+
 @admin.register(InviteCode)
 class InviteCodeAdmin(admin.ModelAdmin):
     list_display = ['code', 'created_by', 'space', 'used_by', 'created_at']
@@ -99,3 +130,19 @@ class MultipartSessionUploadAdmin(admin.ModelAdmin):
     list_filter = ['status']
     search_fields = ['user__username', 'original_filename', 's3_key', 's3_upload_id']
     raw_id_fields = ['user', 'space', 'session']
+
+
+@admin.register(ResumableSessionUpload)
+class ResumableSessionUploadAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'status', 'offset', 'size_bytes', 'original_filename', 'created_at', 'expires_at']
+    list_filter = ['status']
+    search_fields = ['user__username', 'original_filename', 'storage_key']
+    raw_id_fields = ['user', 'space', 'session']
+
+
+@admin.register(MultipartCommentUpload)
+class MultipartCommentUploadAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'session', 'status', 'size_bytes', 'created_at', 'expires_at', 'completed_at']
+    list_filter = ['status']
+    search_fields = ['user__username', 'original_filename', 's3_key', 's3_upload_id']
+    raw_id_fields = ['user', 'session', 'comment']
@@ -0,0 +1,87 @@
+import json
+import logging
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from videos.models import Comment, Session, Space
+from videos.services.benchmark import (
+    SCENARIOS, Benchmark, Context, DatasetMissing, available_scenarios, compare, stub_settings,
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark the main API flows against a generate_dataset dataset and compare with a JSON baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='perf', help='Dataset prefix passed to generate_dataset.')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', action='append', default=[], help='Run scenarios whose name contains this (repeatable).')
+        parser.add_argument('--baseline', help='Fail on regressions against this results file.')
+        parser.add_argument('--output', help='Write results as JSON (usable as a later --baseline).')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 growth over the baseline.')
+
+    def handle(self, *args, **options):
+        if options['iterations'] <= 0 or options['warmup'] < 0:
+            raise CommandError('--iterations must be positive and --warmup non-negative')
+        available = available_scenarios()
+        for label, scenario in SCENARIOS:
+            if (label, scenario) not in available:
+                self.stdout.write(f'Skipping {label}: its tables are not in this database.')
+        scenarios = [
+            (label, scenario) for label, scenario in available
+            if not options['only'] or any(term in label for term in options['only'])
+        ]
+        if not scenarios:
+            raise CommandError('No scenario matches --only')
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text())['scenarios']
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        logger = logging.getLogger('practica.request_metrics')
+        previous_level = logger.level
+        logger.setLevel(logging.WARNING)
+        try:
+            # Everything runs in a transaction that is rolled back, so the
+            # upload scenarios leave no sessions behind in the dataset.
+            with override_settings(**stub_settings()), transaction.atomic():
+                try:
+                    context = Context(options['prefix'])
+                except DatasetMissing as exc:
+                    raise CommandError(f"{exc} (e.g. manage.py generate_dataset --scale large --prefix {options['prefix']})")
+                meta = {
+                    'prefix': options['prefix'],
+                    'iterations': options['iterations'],
+                    'spaces': Space.objects.filter(owner__username__startswith=f"{options['prefix']}-").count(),
+                    'sessions': Session.objects.filter(user__username__startswith=f"{options['prefix']}-").count(),
+                    'comments': Comment.objects.filter(user__username__startswith=f"{options['prefix']}-").count(),
+                }
+                results = Benchmark(options['iterations'], options['warmup']).run(scenarios, context)
+                transaction.set_rollback(True)
+        finally:
+            logger.setLevel(previous_level)
+
+        self.stdout.write(f"{'scenario':<30} {'p50 ms':>8} {'p95 ms':>8} {'queries':>9} {'alloc KB':>9}")
+        for name, result in results.items():
+            queries = str(result['queries'])
+            if result['query_budget'] is not None:
+                queries += f"/{result['query_budget']}"
+            alloc = '-' if result['alloc_peak_kb'] is None else f"{result['alloc_peak_kb']:.0f}"
+            self.stdout.write(f"{name:<30} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {queries:>9} {alloc:>9}")
+            if any(status >= 400 for status in result['statuses']):
+                self.stdout.write(self.style.WARNING(f"  {name} returned {result['statuses']}"))
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps({'meta': meta, 'scenarios': results}, indent=2) + '\n')
+            self.stdout.write(f"Wrote {options['output']}")
+
+        problems = compare(results, baseline, options['tolerance'])
+        if problems:
+            raise CommandError('Benchmark regressions:\n  ' + '\n  '.join(problems))
+        self.stdout.write(self.style.SUCCESS(f'{len(results)} scenarios within budget.'))
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.services.media_gc import mark, scan_prefixes, sweep
+
+
+def _format_bytes(size):
+    if size < 1024:
+        return f'{size} B'
+    for unit in ('KB', 'MB', 'GB', 'TB'):
+        size /= 1024
+        if size < 1024 or unit == 'TB':
+            return f'{size:.1f} {unit}'
+
+
+class Command(BaseCommand):
+    help = "Delete stored media no row references (failed uploads, replaced assets) older than a grace period."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24.0,
+                            help='Only delete objects last modified longer ago than this.')
+        parser.add_argument('--dry-run', action='store_true', help='Report orphans without deleting them.')
+
+    def handle(self, *args, **options):
+        grace_hours = float(options['grace_hours'])
+        if grace_hours < 1:
+            raise CommandError('--grace-hours must be at least 1; in-flight uploads have no row yet')
+        dry_run = options['dry_run']
+
+        refs = mark()
+        self.stdout.write(f'Marked {len(refs)} referenced keys/output prefixes; scanning {", ".join(scan_prefixes())}')
+
+        def progress(result):
+            self.stdout.write(f'  {result.orphans} orphan(s), {_format_bytes(result.bytes_reclaimed)} so far')
+
+        result = sweep(refs, grace=timedelta(hours=grace_hours), dry_run=dry_run, on_batch=progress)
+        for key in result.sample:
+            self.stdout.write(f'  {"would delete" if dry_run else "deleted"} {key}')
+        verb = 'Would reclaim' if dry_run else 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {result.scanned} object(s); {result.orphans} orphan(s). '
+            f'{verb} {_format_bytes(result.bytes_reclaimed)}.'
+        ))
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.models import Space
+from videos.services.space_export import SpaceExport, export_filename
+
+
+class Command(BaseCommand):
+    help = "Write a ZIP archive of a space (metadata JSON, original videos, reply clips) without staging it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('space_id', type=int)
+        parser.add_argument('--output', default='',
+                            help="Archive path (default: <space>-<id>.zip); '-' writes to stdout.")
+
+    def handle(self, *args, **options):
+        space = Space.objects.select_related('owner').filter(pk=options['space_id']).first()
+        if space is None:
+            raise CommandError(f"Space {options['space_id']} does not exist")
+
+        output = options['output'] or export_filename(space)
+        export = SpaceExport(space)
+        written = 0
+        fh = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for chunk in export:
+                fh.write(chunk)
+                written += len(chunk)
+        finally:
+            if fh is not sys.stdout.buffer:
+                fh.close()
+
+        for key in export.missing:
+            self.stderr.write(f'Missing media skipped: {key}')
+        if output != '-':
+            self.stdout.write(self.style.SUCCESS(f'Wrote {written} bytes to {output}'))
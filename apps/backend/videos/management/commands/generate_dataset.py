@@ -0,0 +1,84 @@
+import secrets
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.services.dataset import SCALES, DatasetExists, DatasetGenerator, row_estimate
+
+OVERRIDES = (
+    ('coaches', 'Space owners.'),
+    ('spaces_per_coach', 'Spaces each coach owns.'),
+    ('students', 'Size of the member pool.'),
+    ('members_per_space', 'Members sampled into each space.'),
+    ('sessions_per_space', 'Sessions posted in each space.'),
+    ('comments_per_session', 'Typical comments per session (the long tail goes higher).'),
+    ('max_comments', "Comments on each coach's busiest session."),
+    ('chapters_per_session', 'Typical chapters per session.'),
+    ('tags', 'Tag vocabulary size.'),
+    ('exercises', 'Exercise library size.'),
+    ('days', 'How far back sessions and comments are spread.'),
+    ('metric_days', 'Trailing days of coach metrics to compute.'),
+)
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic dataset at a configurable scale for performance testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--prefix', default='perf', help='Prefix of every generated username.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--replace', action='store_true', help='Delete an existing dataset with this prefix first.')
+        parser.add_argument('--dry-run', action='store_true', help='Print the approximate row counts and exit.')
+        parser.add_argument(
+            '--login', action='store_true',
+            help='Give every account one random password, printed once. By default they cannot log in.',
+        )
+        parser.add_argument(
+            '--allow-production', action='store_true', help='Run even though DEBUG is off (e.g. a staging copy).',
+        )
+        for name, help_text in OVERRIDES:
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=None, help=help_text)
+
+    def handle(self, *args, **options):
+        scale = dict(SCALES[options['scale']])
+        for name, _ in OVERRIDES:
+            if options[name] is not None:
+                if options[name] < 0:
+                    raise CommandError(f"--{name.replace('_', '-')} cannot be negative")
+                scale[name] = options[name]
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive')
+        if scale['coaches'] == 0 or scale['students'] == 0:
+            raise CommandError('A dataset needs at least one coach and one student')
+
+        estimate = ', '.join(f'{count} {label}' for label, count in row_estimate(scale).items())
+        self.stdout.write(f"Scale {options['scale']} (seed {options['seed']}): about {estimate}")
+        if options['dry_run']:
+            return
+        if not settings.DEBUG and not options['allow_production']:
+            raise CommandError(
+                'DEBUG is off, so this may be a production database; pass --allow-production if it is not'
+            )
+
+        password = secrets.token_urlsafe(12) if options['login'] else None
+        generator = DatasetGenerator(
+            scale, seed=options['seed'], prefix=options['prefix'], batch_size=options['batch_size'],
+            log=lambda message: self.stdout.write(f'  {message}'), password=password,
+        )
+        if options['replace']:
+            generator.delete_existing()
+        started = time.monotonic()
+        try:
+            counts = generator.run()
+        except DatasetExists as exc:
+            raise CommandError(f'{exc}; pass --replace or another --prefix')
+
+        summary = ', '.join(f'{count} {model}' for model, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Created {summary} in {time.monotonic() - started:.1f}s.'))
+        if generator.skipped:
+            self.stdout.write(f"Skipped {', '.join(generator.skipped)}: their tables are not in this database.")
+        if password:
+            self.stdout.write(f"Log in as {options['prefix']}-coach-0000 / {password} (not shown again).")
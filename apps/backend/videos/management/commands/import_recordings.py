@@ -0,0 +1,82 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.models import MediaJob, Session, Space
+from videos.services.bulk_import import ManifestError, TagCache, import_batch, iter_recordings, load_manifest
+from videos.services.jobs import pending_media_jobs
+
+
+class Command(BaseCommand):
+    help = "Create sessions for recordings already in storage and queue them for processing in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('prefix', help="Storage prefix to import from, e.g. 'archive/2019/'.")
+        parser.add_argument('--user', required=True, help='Username that will own the imported sessions.')
+        parser.add_argument('--space', type=int, default=None, help='Space for rows the manifest does not place.')
+        parser.add_argument('--manifest', default='', help='CSV with key,title,description,tags,space_id columns.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-queued', type=int, default=0,
+                            help='Pause while this many processing jobs are queued (0 = no limit).')
+        parser.add_argument('--poll', type=float, default=30.0, help='Seconds between queue checks when paused.')
+        parser.add_argument('--dry-run', action='store_true', help='List what would be imported.')
+
+    def handle(self, *args, **options):
+        batch_size = int(options['batch_size'])
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+        user = User.objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError(f"User {options['user']!r} does not exist")
+        space = None
+        if options['space'] is not None:
+            space = Space.objects.filter(pk=options['space']).first()
+            if space is None:
+                raise CommandError(f"Space {options['space']} does not exist")
+        try:
+            manifest = load_manifest(options['manifest']) if options['manifest'] else {}
+        except (OSError, ManifestError) as exc:
+            raise CommandError(str(exc))
+
+        self.tag_cache = TagCache()
+        self.created = 0
+        self.seen = 0
+        batch = []
+        for recording in iter_recordings(options['prefix']):
+            self.seen += 1
+            batch.append(recording)
+            if len(batch) >= batch_size:
+                self._flush(batch, user, space, manifest, options)
+                batch = []
+        if batch:
+            self._flush(batch, user, space, manifest, options)
+
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {self.created} of {self.seen} recording(s).'))
+
+    def _flush(self, batch, user, space, manifest, options):
+        if options['dry_run']:
+            existing = set(
+                Session.objects.filter(video_file__in=[rec.key for rec in batch]).values_list('video_file', flat=True)
+            )
+            for rec in batch:
+                if rec.key not in existing:
+                    self.stdout.write(f'  {rec.key} ({rec.size} bytes)')
+                    self.created += 1
+            return
+
+        self._wait_for_queue(options['max_queued'], options['poll'])
+        sessions = import_batch(batch, user, space=space, manifest=manifest, tag_cache=self.tag_cache)
+        self.created += len(sessions)
+        self.stdout.write(f'  {self.created} imported, {self.seen} scanned')
+
+    def _wait_for_queue(self, max_queued, poll):
+        if max_queued <= 0:
+            return
+        while True:
+            queued = pending_media_jobs().filter(kind=MediaJob.KIND_SESSION_PROCESSING).count()
+            if queued < max_queued:
+                return
+            self.stdout.write(f'  {queued} processing job(s) queued; waiting')
+            time.sleep(poll)
@@ -0,0 +1,133 @@
+import logging
+import time
+from contextlib import nullcontext
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.test.utils import override_settings
+
+from videos.services.aws_standin import StandIn
+from videos.services.benchmark import percentile
+from videos.services.jobs import RATE_LIMITED_KINDS, pending_media_jobs
+from videos.services.upload_load import PART_CONCURRENCY, RETRY_BASE_SECONDS, UploadDriver
+
+STEPS = ('initiate', 'sign-part', 'put-part', 'status', 'complete', 'upload', 'processing-update')
+
+
+def _per_operation(raw, option, scale=1.0):
+    """Parse 'op=value,op=value' ('default' applies to every operation)."""
+    parsed = {}
+    for item in filter(None, (raw or '').split(',')):
+        name, _, value = item.partition('=')
+        try:
+            parsed[name.strip() or 'default'] = float(value) * scale
+        except ValueError:
+            raise CommandError(f'{option} expects op=value pairs, got {item!r}')
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the frontend's multipart upload pattern at concurrency against the API, "
+        "with S3 and MediaConvert served by the in-process stand-in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='perf', help='generate_dataset prefix; its coaches do the uploading.')
+        parser.add_argument('--uploads', type=int, default=20)
+        parser.add_argument(
+            '--concurrency', type=int, default=5,
+            help='Uploads in flight at once. SQLite rejects concurrent writers (500s on complete); use Postgres.',
+        )
+        parser.add_argument('--part-concurrency', type=int, default=PART_CONCURRENCY, help='Part PUTs in flight per upload.')
+        parser.add_argument('--size-mb', type=float, default=12, help='Size of each upload.')
+        parser.add_argument('--latency', help='Added latency in ms per operation, e.g. default=20,upload_part=150.')
+        parser.add_argument('--fail', help='Injected failure rate per operation, e.g. upload_part=0.05,create_job=0.2.')
+        parser.add_argument('--job-seconds', type=float, default=2.0, help='How long each MediaConvert job takes.')
+        parser.add_argument('--job-failure-rate', type=float, default=0.0)
+        parser.add_argument('--retry-base', type=float, default=RETRY_BASE_SECONDS, help='First PUT retry delay (s).')
+        parser.add_argument('--http', action='store_true', help='PUT parts over HTTP to a local endpoint.')
+        parser.add_argument('--no-processing', action='store_true', help='Stop once uploads complete.')
+        parser.add_argument('--timeout', type=float, default=120, help='Seconds to wait for processing to settle.')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--keep', action='store_true', help='Keep the sessions this run creates.')
+
+    def handle(self, *args, **options):
+        if options['uploads'] <= 0 or options['concurrency'] <= 0 or options['size_mb'] <= 0:
+            raise CommandError('--uploads, --concurrency and --size-mb must be positive')
+        uploaders = list(
+            User.objects.filter(username__startswith=f"{options['prefix']}-coach-")
+            .annotate(space_id=Min('owned_spaces__id')).filter(space_id__isnull=False)
+            .order_by('username')
+        )
+        if not uploaders:
+            raise CommandError(
+                f"No dataset with prefix '{options['prefix']}'; run generate_dataset first "
+                f"(e.g. manage.py generate_dataset --prefix {options['prefix']})"
+            )
+        queued = pending_media_jobs().filter(kind__in=RATE_LIMITED_KINDS).count()
+        if queued:
+            # The driver dispatches the whole MediaConvert queue into the stand-in.
+            raise CommandError(f'{queued} media job(s) are already queued; run this against a disposable database')
+
+        standin = StandIn(
+            latency=_per_operation(options['latency'], '--latency', scale=0.001),
+            failures=_per_operation(options['fail'], '--fail'),
+            seed=options['seed'], job_seconds=options['job_seconds'], job_failure_rate=options['job_failure_rate'],
+        )
+        driver = UploadDriver(
+            standin, part_concurrency=options['part_concurrency'], retry_base=options['retry_base'],
+            http=options['http'], seed=options['seed'],
+        )
+        size = int(options['size_mb'] * 1024 * 1024)
+        logger = logging.getLogger('practica.request_metrics')
+        previous_level = logger.level
+        logger.setLevel(logging.WARNING)
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']), standin.activate():
+                try:
+                    with standin.serve() if options['http'] else nullcontext():
+                        started = time.monotonic()
+                        driver.run([(user, user.space_id) for user in uploaders], options['uploads'], size, options['concurrency'])
+                        elapsed = time.monotonic() - started
+                    settled = {} if options['no_processing'] else driver.finish_processing(timeout=options['timeout'])
+                finally:
+                    if not options['keep']:
+                        driver.cleanup()
+        finally:
+            logger.setLevel(previous_level)
+
+        self._report(driver.recorder, standin, elapsed, settled)
+
+    def _report(self, recorder, standin, elapsed, settled):
+        counts = recorder.counts
+        megabytes = counts['bytes'] / (1024 * 1024)
+        self.stdout.write(
+            f"{counts['uploads ok']} uploads ok, {counts['uploads failed']} failed in {elapsed:.1f}s "
+            f"({megabytes:.0f} MB, {megabytes / max(elapsed, 1e-9):.1f} MB/s); "
+            f"{counts['put-part retries']} part retries, {counts['resumes']} resumes"
+        )
+        self.stdout.write(f"{'step':<18} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8}")
+        for step in STEPS:
+            samples = recorder.samples.get(step)
+            if samples:
+                self.stdout.write(
+                    f"{step:<18} {len(samples):>6} {percentile(samples, 0.5) * 1000:>8.1f} "
+                    f"{percentile(samples, 0.95) * 1000:>8.1f}"
+                )
+        statuses = sorted(name for name in counts if name.split()[-1].isdigit() and not name.endswith(('200', '201')))
+        if statuses:
+            self.stdout.write('Non-success responses: ' + ', '.join(f'{name} x{counts[name]}' for name in statuses))
+        if standin.faults.injected:
+            injected = ', '.join(f'{operation} x{count}' for operation, count in sorted(standin.faults.injected.items()))
+            self.stdout.write(f'Injected failures: {injected}')
+        if settled:
+            seconds = list(settled.values())
+            self.stdout.write(
+                f"Processing: {counts['sessions ready']} ready, {counts['sessions failed']} failed, "
+                f"{counts['sessions unfinished']} unfinished; upload to final status "
+                f"p50 {percentile(seconds, 0.5):.1f}s, p95 {percentile(seconds, 0.95):.1f}s"
+            )
+        elif counts['sessions unfinished']:
+            self.stdout.write(self.style.WARNING(f"Processing: {counts['sessions unfinished']} sessions unfinished"))
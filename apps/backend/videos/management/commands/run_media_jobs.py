@@ -0,0 +1,42 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from practica.request_metrics import install_boto_hooks
+from videos.services.jobs import dispatch_media_jobs, pending_media_jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Drain the media job queue: MediaConvert submissions at the configured rate, "
+        "derived assets (keyframes, waveform, chapter suggestions) and storage cleanup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Dispatch whatever is due and exit.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when nothing is due.')
+
+    def handle(self, *args, **options):
+        interval = float(options['interval'])
+        if interval <= 0:
+            raise CommandError('--interval must be positive')
+        install_boto_hooks()  # MediaConvert latency shows up in /metrics alongside the web workers'
+
+        while True:
+            close_old_connections()
+            try:
+                submitted = dispatch_media_jobs()
+            except Exception:
+                # Usually the database going away; keep the worker alive and try again.
+                logger.exception('Media job dispatch failed')
+                submitted = 0
+            if submitted:
+                self.stdout.write(f'Ran {submitted} media job(s); {pending_media_jobs().count()} queued.')
+            if options['once']:
+                return
+            if not submitted:
+                time.sleep(interval)
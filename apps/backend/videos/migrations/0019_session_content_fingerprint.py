@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0018_merge_0014_and_0017'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='content_fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=128),
+        ),
+        migrations.AddField(
+            model_name='multipartsessionupload',
+            name='client_fingerprint',
+            field=models.CharField(blank=True, max_length=128),
+        ),
+        migrations.AddField(
+            model_name='multipartsessionupload',
+            name='content_fingerprint',
+            field=models.CharField(blank=True, max_length=128),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0019_session_content_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MultipartCommentUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('initiated', 'Initiated'), ('completed', 'Completed'), ('aborted', 'Aborted'), ('expired', 'Expired')], default='initiated', max_length=16)),
+                ('text', models.TextField(blank=True)),
+                ('timestamp_seconds', models.IntegerField(blank=True, null=True)),
+                ('original_filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size_bytes', models.BigIntegerField()),
+                ('s3_key', models.CharField(max_length=512)),
+                ('s3_upload_id', models.CharField(max_length=256)),
+                ('expires_at', models.DateTimeField()),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('comment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_records', to='videos.comment')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_uploads', to='videos.session')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [
+                    models.Index(fields=['user', 'status'], name='comment_upload_user_status_idx'),
+                    models.Index(fields=['expires_at'], name='comment_upload_expires_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(fields=('s3_key', 's3_upload_id'), name='comment_upload_s3_key_upload_id_uniq'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0020_multipartcommentupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='processing_status',
+            field=models.CharField(
+                choices=[
+                    ('uploaded', 'Uploaded'),
+                    ('processing', 'Processing'),
+                    ('ready', 'Ready'),
+                    ('failed', 'Failed'),
+                ],
+                default='uploaded',
+                max_length=16,
+            ),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='processing_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.CreateModel(
+            name='CommentAsset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asset_type', models.CharField(choices=[('proxy_mp4', 'Proxy MP4'), ('poster', 'Poster Frame')], max_length=32)),
+                ('object_key', models.CharField(max_length=512)),
+                ('content_type', models.CharField(blank=True, max_length=120)),
+                ('metadata_json', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('comment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assets', to='videos.comment')),
+            ],
+            options={
+                'ordering': ['asset_type', '-created_at'],
+                'constraints': [
+                    models.UniqueConstraint(fields=('comment', 'asset_type'), name='comment_asset_comment_type_uniq'),
+                ],
+            },
+        ),
+    ]
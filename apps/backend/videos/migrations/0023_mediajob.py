@@ -0,0 +1,70 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0022_processingcallbackevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                (
+                    'kind',
+                    models.CharField(
+                        choices=[
+                            ('session_processing', 'Session processing'),
+                            ('comment_processing', 'Comment processing'),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ('priority', models.PositiveSmallIntegerField(default=20)),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[('queued', 'Queued'), ('submitted', 'Submitted'), ('failed', 'Failed')],
+                        default='queued',
+                        max_length=16,
+                    ),
+                ),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('external_id', models.CharField(blank=True, max_length=128)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                (
+                    'comment',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='media_jobs',
+                        to='videos.comment',
+                    ),
+                ),
+                (
+                    'session',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='media_jobs',
+                        to='videos.session',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['priority', 'available_at', 'id'],
+                'indexes': [
+                    models.Index(fields=['status', 'priority', 'available_at'], name='media_job_queue_idx'),
+                ],
+            },
+        ),
+    ]
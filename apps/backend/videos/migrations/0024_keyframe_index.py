@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0023_mediajob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chapter',
+            name='keyframe_seconds',
+            field=models.FloatField(blank=True, help_text='Proxy keyframe at or before the start', null=True),
+        ),
+        migrations.AddField(
+            model_name='chapter',
+            name='keyframe_byte_offset',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='sessionasset',
+            name='asset_type',
+            field=models.CharField(
+                choices=[
+                    ('proxy_mp4', 'Proxy MP4'),
+                    ('hls_master', 'HLS Master'),
+                    ('thumb_sprite', 'Thumbnail Sprite'),
+                    ('thumb_vtt', 'Thumbnail VTT'),
+                    ('keyframe_index', 'Keyframe Index'),
+                ],
+                max_length=32,
+            ),
+        ),
+        migrations.AlterField(
+            model_name='mediajob',
+            name='kind',
+            field=models.CharField(
+                choices=[
+                    ('session_processing', 'Session processing'),
+                    ('comment_processing', 'Comment processing'),
+                    ('keyframe_index', 'Keyframe index'),
+                ],
+                max_length=32,
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0024_keyframe_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sessionasset',
+            name='asset_type',
+            field=models.CharField(
+                choices=[
+                    ('proxy_mp4', 'Proxy MP4'),
+                    ('hls_master', 'HLS Master'),
+                    ('thumb_sprite', 'Thumbnail Sprite'),
+                    ('thumb_vtt', 'Thumbnail VTT'),
+                    ('keyframe_index', 'Keyframe Index'),
+                    ('audio_analysis', 'Audio Analysis WAV'),
+                    ('waveform_peaks', 'Waveform Peaks'),
+                ],
+                max_length=32,
+            ),
+        ),
+        migrations.AlterField(
+            model_name='mediajob',
+            name='kind',
+            field=models.CharField(
+                choices=[
+                    ('session_processing', 'Session processing'),
+                    ('comment_processing', 'Comment processing'),
+                    ('keyframe_index', 'Keyframe index'),
+                    ('waveform_peaks', 'Waveform peaks'),
+                ],
+                max_length=32,
+            ),
+        ),
+    ]
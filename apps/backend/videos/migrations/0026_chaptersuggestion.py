@@ -0,0 +1,48 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0025_waveform_peaks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChapterSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_seconds', models.FloatField()),
+                ('end_seconds', models.FloatField()),
+                ('tempo_bpm', models.FloatField(blank=True, null=True)),
+                ('onset_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                (
+                    'session',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='chapter_suggestions',
+                        to='videos.session',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['start_seconds'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='mediajob',
+            name='kind',
+            field=models.CharField(
+                choices=[
+                    ('session_processing', 'Session processing'),
+                    ('comment_processing', 'Comment processing'),
+                    ('keyframe_index', 'Keyframe index'),
+                    ('waveform_peaks', 'Waveform peaks'),
+                    ('chapter_suggestions', 'Chapter suggestions'),
+                ],
+                max_length=32,
+            ),
+        ),
+    ]
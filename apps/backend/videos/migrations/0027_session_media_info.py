@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0026_chaptersuggestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='media_info',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('videos', '0027_session_media_info'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumableSessionUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('initiated', 'Initiated'),
+                            ('completed', 'Completed'),
+                            ('aborted', 'Aborted'),
+                            ('expired', 'Expired'),
+                        ],
+                        default='initiated',
+                        max_length=16,
+                    ),
+                ),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('tags_csv', models.TextField(blank=True)),
+                ('duration_seconds', models.IntegerField(blank=True, null=True)),
+                ('original_filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size_bytes', models.BigIntegerField()),
+                ('offset', models.BigIntegerField(default=0)),
+                ('storage_key', models.CharField(max_length=512)),
+                ('expires_at', models.DateTimeField()),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                (
+                    'session',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='resumable_upload_records',
+                        to='videos.session',
+                    ),
+                ),
+                (
+                    'space',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='resumable_uploads',
+                        to='videos.space',
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='resumable_uploads',
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [
+                    models.Index(fields=['user', 'status'], name='resumable_user_status_idx'),
+                    models.Index(fields=['expires_at'], name='resumable_expires_idx'),
+                ],
+            },
+        ),
+    ]
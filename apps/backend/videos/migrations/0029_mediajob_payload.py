@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0028_resumablesessionupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediajob',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='mediajob',
+            name='kind',
+            field=models.CharField(
+                choices=[
+                    ('session_processing', 'Session processing'),
+                    ('comment_processing', 'Comment processing'),
+                    ('keyframe_index', 'Keyframe index'),
+                    ('waveform_peaks', 'Waveform peaks'),
+                    ('chapter_suggestions', 'Chapter suggestions'),
+                    ('storage_cleanup', 'Storage cleanup'),
+                ],
+                max_length=32,
+            ),
+        ),
+    ]
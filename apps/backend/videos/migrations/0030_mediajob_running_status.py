@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0029_mediajob_payload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mediajob',
+            name='status',
+            field=models.CharField(
+                choices=[
+                    ('queued', 'Queued'),
+                    ('running', 'Running'),
+                    ('submitted', 'Submitted'),
+                    ('failed', 'Failed'),
+                ],
+                default='queued',
+                max_length=16,
+            ),
+        ),
+    ]
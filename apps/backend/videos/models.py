@@ -134,6 +134,8 @@ class Session(models.Model):
     processing_error = models.TextField(blank=True)
     tags = models.ManyToManyField(Tag, blank=True, related_name='sessions')
     duration_seconds = models.IntegerField(null=True, blank=True)
+    content_fingerprint = models.CharField(max_length=128, blank=True, db_index=True)
+    media_info = models.JSONField(default=dict, blank=True)  # server-side container probe
     recorded_at = models.DateTimeField(auto_now_add=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -152,11 +154,17 @@ class SessionAsset(models.Model):
     TYPE_HLS_MASTER = 'hls_master'
     TYPE_THUMB_SPRITE = 'thumb_sprite'
     TYPE_THUMB_VTT = 'thumb_vtt'
+    TYPE_KEYFRAME_INDEX = 'keyframe_index'
+    TYPE_AUDIO_ANALYSIS = 'audio_analysis'
+    TYPE_WAVEFORM_PEAKS = 'waveform_peaks'
     TYPE_CHOICES = [
         (TYPE_PROXY_MP4, 'Proxy MP4'),
         (TYPE_HLS_MASTER, 'HLS Master'),
         (TYPE_THUMB_SPRITE, 'Thumbnail Sprite'),
         (TYPE_THUMB_VTT, 'Thumbnail VTT'),
+        (TYPE_KEYFRAME_INDEX, 'Keyframe Index'),
+        (TYPE_AUDIO_ANALYSIS, 'Audio Analysis WAV'),
+        (TYPE_WAVEFORM_PEAKS, 'Waveform Peaks'),
     ]
 
     session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='assets')
@@ -204,6 +212,8 @@ class MultipartSessionUpload(models.Model):
     size_bytes = models.BigIntegerField()
     s3_key = models.CharField(max_length=512)
     s3_upload_id = models.CharField(max_length=256)
+    client_fingerprint = models.CharField(max_length=128, blank=True)
+    content_fingerprint = models.CharField(max_length=128, blank=True)
     expires_at = models.DateTimeField()
     completed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -223,6 +233,49 @@ class MultipartSessionUpload(models.Model):
         return f"MultipartUpload #{self.id} user={self.user_id} status={self.status}"
 
 
+class ResumableSessionUpload(models.Model):
+    """Offset-based chunked upload to local storage, for deployments without S3."""
+
+    STATUS_INITIATED = 'initiated'
+    STATUS_COMPLETED = 'completed'
+    STATUS_ABORTED = 'aborted'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (STATUS_INITIATED, 'Initiated'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_ABORTED, 'Aborted'),
+        (STATUS_EXPIRED, 'Expired'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='resumable_uploads')
+    space = models.ForeignKey(Space, on_delete=models.SET_NULL, null=True, blank=True, related_name='resumable_uploads')
+    session = models.ForeignKey(Session, on_delete=models.SET_NULL, null=True, blank=True, related_name='resumable_upload_records')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_INITIATED)
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    tags_csv = models.TextField(blank=True)
+    duration_seconds = models.IntegerField(null=True, blank=True)
+    original_filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size_bytes = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)  # bytes fsync'd to the partial file
+    storage_key = models.CharField(max_length=512)
+    expires_at = models.DateTimeField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status'], name='resumable_user_status_idx'),
+            models.Index(fields=['expires_at'], name='resumable_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"ResumableUpload #{self.id} user={self.user_id} {self.offset}/{self.size_bytes}"
+
+
 class Chapter(models.Model):
     """A timestamped marker within a session, linked to an exercise."""
     session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='chapters')
@@ -230,6 +283,8 @@ class Chapter(models.Model):
     title = models.CharField(max_length=200, blank=True)
     timestamp_seconds = models.IntegerField(help_text="Start time in the video (seconds)")
     end_seconds = models.IntegerField(null=True, blank=True, help_text="End time (seconds), optional")
+    keyframe_seconds = models.FloatField(null=True, blank=True, help_text="Proxy keyframe at or before the start")
+    keyframe_byte_offset = models.BigIntegerField(null=True, blank=True)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -242,6 +297,22 @@ class Chapter(models.Model):
         return f"{label} @ {mins}:{secs:02d}"
 
 
+class ChapterSuggestion(models.Model):
+    """A silence-separated practice segment found by audio analysis, offered as a chapter."""
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='chapter_suggestions')
+    start_seconds = models.FloatField()
+    end_seconds = models.FloatField()
+    tempo_bpm = models.FloatField(null=True, blank=True)
+    onset_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['start_seconds']
+
+    def __str__(self):
+        return f"ChapterSuggestion session={self.session_id} {self.start_seconds:.0f}-{self.end_seconds:.0f}s"
+
+
 class InviteCode(models.Model):
     """A code for inviting someone — used for initial signup gating."""
     code = models.CharField(max_length=8, unique=True)
@@ -277,6 +348,10 @@ class Comment(models.Model):
     text = models.TextField()
     video_reply = models.FileField(upload_to='comment_videos/', null=True, blank=True)
     legacy_text_only = models.BooleanField(default=False)
+    processing_status = models.CharField(
+        max_length=16, choices=Session.STATUS_CHOICES, default=Session.STATUS_UPLOADED,
+    )
+    processing_error = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -293,6 +368,142 @@ class Comment(models.Model):
         return f"{prefix}{self.user}: {self.text[:50]}"
 
 
+class CommentAsset(models.Model):
+    """Derived playback assets for a comment reply video."""
+
+    TYPE_PROXY_MP4 = 'proxy_mp4'
+    TYPE_POSTER = 'poster'
+    TYPE_CHOICES = [
+        (TYPE_PROXY_MP4, 'Proxy MP4'),
+        (TYPE_POSTER, 'Poster Frame'),
+    ]
+
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='assets')
+    asset_type = models.CharField(max_length=32, choices=TYPE_CHOICES)
+    object_key = models.CharField(max_length=512)
+    content_type = models.CharField(max_length=120, blank=True)
+    metadata_json = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['asset_type', '-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['comment', 'asset_type'], name='comment_asset_comment_type_uniq'),
+        ]
+
+    def __str__(self):
+        return f"CommentAsset comment={self.comment_id} type={self.asset_type}"
+
+
+class MultipartCommentUpload(models.Model):
+    """Tracks direct-to-S3 multipart uploads of comment reply videos before comment creation."""
+
+    STATUS_INITIATED = 'initiated'
+    STATUS_COMPLETED = 'completed'
+    STATUS_ABORTED = 'aborted'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (STATUS_INITIATED, 'Initiated'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_ABORTED, 'Aborted'),
+        (STATUS_EXPIRED, 'Expired'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comment_uploads')
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='comment_uploads')
+    comment = models.ForeignKey(Comment, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_records')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_INITIATED)
+    text = models.TextField(blank=True)
+    timestamp_seconds = models.IntegerField(null=True, blank=True)
+    original_filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size_bytes = models.BigIntegerField()
+    s3_key = models.CharField(max_length=512)
+    s3_upload_id = models.CharField(max_length=256)
+    expires_at = models.DateTimeField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status'], name='comment_upload_user_status_idx'),
+            models.Index(fields=['expires_at'], name='comment_upload_expires_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['s3_key', 's3_upload_id'], name='comment_upload_s3_key_upload_id_uniq'),
+        ]
+
+    def __str__(self):
+        return f"MultipartCommentUpload #{self.id} user={self.user_id} status={self.status}"
+
+
+class ProcessingCallbackEvent(models.Model):
+    """Callback event ids already applied, so retried processing updates are no-ops."""
+
+    event_id = models.CharField(max_length=128, unique=True)
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='processing_events')
+    status = models.CharField(max_length=16)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"ProcessingCallbackEvent {self.event_id} session={self.session_id}"
+
+
+class MediaJob(models.Model):
+    """Queued MediaConvert submission, drained by the rate-limited scheduler."""
+
+    KIND_SESSION_PROCESSING = 'session_processing'
+    KIND_COMMENT_PROCESSING = 'comment_processing'
+    KIND_KEYFRAME_INDEX = 'keyframe_index'
+    KIND_WAVEFORM_PEAKS = 'waveform_peaks'
+    KIND_CHAPTER_SUGGESTIONS = 'chapter_suggestions'
+    KIND_STORAGE_CLEANUP = 'storage_cleanup'
+    KIND_CHOICES = [
+        (KIND_SESSION_PROCESSING, 'Session processing'),
+        (KIND_COMMENT_PROCESSING, 'Comment processing'),
+        (KIND_KEYFRAME_INDEX, 'Keyframe index'),
+        (KIND_WAVEFORM_PEAKS, 'Waveform peaks'),
+        (KIND_CHAPTER_SUGGESTIONS, 'Chapter suggestions'),
+        (KIND_STORAGE_CLEANUP, 'Storage cleanup'),
+    ]
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUBMITTED = 'submitted'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUBMITTED, 'Submitted'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, null=True, blank=True, related_name='media_jobs')
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, null=True, blank=True, related_name='media_jobs')
+    payload = models.JSONField(default=dict, blank=True)  # storage cleanup: keys/prefixes of deleted rows
+    priority = models.PositiveSmallIntegerField(default=20)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    external_id = models.CharField(max_length=128, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['priority', 'available_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'available_at'], name='media_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"MediaJob #{self.id} {self.kind} status={self.status}"
+
+
 class CoachEvent(models.Model):
     """Internal telemetry events for coach ROI metrics."""
 
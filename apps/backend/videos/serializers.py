@@ -1,13 +1,68 @@
 from django.contrib.auth.models import User
+from django.db import models
 from django.utils import timezone
-from django.core.files.storage import default_storage
 from rest_framework import serializers
 from urllib.parse import parse_qs, urlencode, urlparse
 import re
 from .models import (
-    Profile, Exercise, Session, Chapter, Comment, InviteCode, SessionLastSeen,
-    Tag, Space, SpaceMember, ExerciseReferenceClip, SessionAsset,
+    Profile, Exercise, Session, Chapter, ChapterSuggestion, Comment, InviteCode,
+    Tag, Space, SpaceMember, ExerciseReferenceClip, SessionAsset, CommentAsset,
 )
+from .services.hls import hls_proxy_enabled, manifest_proxy_path, manifest_token
+from .services.signed_urls import signed_url, signed_urls
+
+
+def _object_key_url(object_key, context=None):
+    key = (object_key or '').strip()
+    if not key:
+        return ''
+    primed = (context or {}).get('signed_urls') or {}
+    if key in primed:
+        return primed[key]
+    return signed_url(key)
+
+
+class SignedFileField(serializers.FileField):
+    """FileField whose URL comes from the signed-URL cache instead of signing per render."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = _object_key_url(value.name, self.context)
+        request = self.context.get('request', None)
+        if request is not None and url:
+            return request.build_absolute_uri(url)
+        return url
+
+
+SIGNED_FIELD_MAPPING = {
+    **serializers.ModelSerializer.serializer_field_mapping,
+    models.FileField: SignedFileField,
+}
+
+
+class SignedUrlListSerializer(serializers.ListSerializer):
+    """Signs every media key on the page with one cache round trip before rendering."""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        items = list(iterable)
+        keys = []
+        for item in items:
+            keys.extend(self.child.media_keys(item))
+        self.context.setdefault('signed_urls', {}).update(signed_urls(keys))
+        return super().to_representation(items)
+
+
+def _session_media_keys(session, include_comments=False):
+    keys = [session.video_file.name] if session.video_file else []
+    keys.extend(asset.object_key for asset in session.assets.all())
+    if include_comments:
+        for comment in session.comments.all():
+            if comment.video_reply:
+                keys.append(comment.video_reply.name)
+            keys.extend(asset.object_key for asset in comment.assets.all())
+    return keys
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -17,6 +72,7 @@ class ProfileSerializer(serializers.ModelSerializer):
 
 
 class SpaceSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = SIGNED_FIELD_MAPPING
     session_count = serializers.SerializerMethodField()
     members = serializers.SerializerMethodField()
     is_owner = serializers.SerializerMethodField()
@@ -32,19 +88,28 @@ class SpaceSerializer(serializers.ModelSerializer):
             'session_count', 'members', 'is_owner', 'invite_link', 'created_at',
         ]
         read_only_fields = ['id', 'invite_slug', 'created_at']
+        list_serializer_class = SignedUrlListSerializer
+
+    def media_keys(self, obj):
+        session = getattr(obj, 'main_session', None)
+        return [session.video_file.name] if session and session.video_file else []
 
     def get_session_count(self, obj):
-        return obj.sessions.count()
+        count = getattr(obj, 'num_sessions', None)
+        return obj.sessions.count() if count is None else count
 
     def get_members(self, obj):
+        members = obj.members.all()
+        if 'members' not in getattr(obj, '_prefetched_objects_cache', {}):
+            members = members.select_related('user', 'user__profile')
         return [{
             'id': m.user.id,
             'display_name': m.user.profile.display_name if hasattr(m.user, 'profile') and m.user.profile.display_name else m.user.username,
-        } for m in obj.members.select_related('user', 'user__profile').all()]
+        } for m in members]
 
     def get_is_owner(self, obj):
         request = self.context.get('request')
-        return request and request.user == obj.owner
+        return request and request.user.id == obj.owner_id
 
     def get_invite_link(self, obj):
         return f"/join/{obj.invite_slug}"
@@ -56,7 +121,7 @@ class SpaceSerializer(serializers.ModelSerializer):
         return {
             'id': session.id,
             'title': session.title,
-            'video_file': session.video_file.url if session.video_file else None,
+            'video_file': _object_key_url(session.video_file.name, self.context) if session.video_file else None,
             'processing_status': session.processing_status,
         }
 
@@ -258,25 +323,38 @@ class SessionAssetSerializer(serializers.ModelSerializer):
         fields = ['asset_type', 'object_key', 'content_type', 'metadata_json', 'url']
 
     def get_url(self, obj):
-        key = (obj.object_key or '').strip()
-        if not key:
-            return ''
-        if key.startswith('http://') or key.startswith('https://') or key.startswith('/'):
-            return key
-        try:
-            return default_storage.url(key)
-        except Exception:
-            return key
+        if obj.asset_type == SessionAsset.TYPE_HLS_MASTER and hls_proxy_enabled():
+            # Child playlists and segments are only reachable signed, so play through the manifest proxy.
+            name = (obj.object_key or '').rsplit('/', 1)[-1]
+            url = f"{manifest_proxy_path(obj.session_id, name)}?token={manifest_token(obj.session_id)}"
+            request = self.context.get('request')
+            return request.build_absolute_uri(url) if request is not None else url
+        return _object_key_url(obj.object_key, self.context)
+
+
+class CommentAssetSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CommentAsset
+        fields = ['asset_type', 'content_type', 'metadata_json', 'url']
+
+    def get_url(self, obj):
+        return _object_key_url(obj.object_key, self.context)
 
 
 class CommentSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = SIGNED_FIELD_MAPPING
     username = serializers.CharField(source='user.username', read_only=True)
     display_name = serializers.SerializerMethodField()
+    processing_status = serializers.CharField(read_only=True)
+    assets = CommentAssetSerializer(many=True, read_only=True)
 
     class Meta:
         model = Comment
         fields = ['id', 'session', 'user', 'username', 'display_name',
-                  'timestamp_seconds', 'text', 'video_reply', 'created_at']
+                  'timestamp_seconds', 'text', 'video_reply',
+                  'processing_status', 'assets', 'created_at']
         read_only_fields = ['id', 'user', 'username', 'display_name', 'created_at']
 
     def get_display_name(self, obj):
@@ -291,8 +369,15 @@ class ChapterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Chapter
         fields = ['id', 'session', 'exercise', 'exercise_name',
-                  'title', 'timestamp_seconds', 'end_seconds', 'notes', 'created_at']
-        read_only_fields = ['id', 'created_at']
+                  'title', 'timestamp_seconds', 'end_seconds', 'keyframe_seconds', 'keyframe_byte_offset',
+                  'notes', 'created_at']
+        read_only_fields = ['id', 'keyframe_seconds', 'keyframe_byte_offset', 'created_at']
+
+
+class ChapterSuggestionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChapterSuggestion
+        fields = ['id', 'start_seconds', 'end_seconds', 'tempo_bpm', 'onset_count']
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -304,11 +389,14 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
     def get_session_count(self, obj):
-        return obj.sessions.count()
+        count = getattr(obj, 'num_sessions', None)
+        return obj.sessions.count() if count is None else count
 
 
 class SessionSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = SIGNED_FIELD_MAPPING
     chapters = ChapterSerializer(many=True, read_only=True)
+    chapter_suggestions = ChapterSuggestionSerializer(many=True, read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
     tag_names = serializers.SerializerMethodField()
     space_name = serializers.CharField(source='space.name', read_only=True, default=None)
@@ -326,12 +414,16 @@ class SessionSerializer(serializers.ModelSerializer):
         model = Session
         fields = ['id', 'title', 'description', 'video_file',
                   'duration_seconds', 'recorded_at', 'created_at', 'updated_at',
-                  'processing_status', 'processing_error',
+                  'processing_status', 'processing_error', 'media_info',
                   'space_id', 'space_name', 'tag_names',
                   'assets', 'is_space_main',
-                  'chapters', 'comments', 'chapter_count', 'comment_count', 'owner',
+                  'chapters', 'chapter_suggestions', 'comments', 'chapter_count', 'comment_count', 'owner',
                   'can_edit']
-        read_only_fields = ['id', 'recorded_at', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'media_info', 'recorded_at', 'created_at', 'updated_at']
+        list_serializer_class = SignedUrlListSerializer
+
+    def media_keys(self, obj):
+        return _session_media_keys(obj, include_comments=True)
 
     def get_tag_names(self, obj):
         return [t.name for t in obj.tags.all()]
@@ -365,6 +457,7 @@ class SessionSerializer(serializers.ModelSerializer):
 
 
 class SessionListSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = SIGNED_FIELD_MAPPING
     tag_names = serializers.SerializerMethodField()
     space_name = serializers.CharField(source='space.name', read_only=True, default=None)
     space_id = serializers.IntegerField(source='space.id', read_only=True, default=None)
@@ -388,6 +481,10 @@ class SessionListSerializer(serializers.ModelSerializer):
                   'chapter_count', 'comment_count', 'owner_name', 'owner_id', 'has_unread',
                   'can_edit']
         read_only_fields = ['id', 'recorded_at', 'created_at']
+        list_serializer_class = SignedUrlListSerializer
+
+    def media_keys(self, obj):
+        return _session_media_keys(obj)
 
     def get_tag_names(self, obj):
         return [t.name for t in obj.tags.all()]
@@ -411,11 +508,11 @@ class SessionListSerializer(serializers.ModelSerializer):
         if not comments:
             return False
         latest_comment = max(c.created_at for c in comments)
-        try:
-            last_seen = obj.last_seen_by.get(user=request.user)
-            return latest_comment > last_seen.seen_at
-        except SessionLastSeen.DoesNotExist:
+        # Iterate rather than .get() so the view's prefetch of last_seen_by is used.
+        last_seen = next((seen for seen in obj.last_seen_by.all() if seen.user_id == request.user.id), None)
+        if last_seen is None:
             return True
+        return latest_comment > last_seen.seen_at
 
     def _request_user(self):
         request = self.context.get('request')
@@ -436,10 +533,14 @@ class SessionListSerializer(serializers.ModelSerializer):
 class ProgressChapterSerializer(serializers.ModelSerializer):
     session_title = serializers.CharField(source='session.title', read_only=True)
     session_id = serializers.IntegerField(source='session.id', read_only=True)
-    session_video = serializers.FileField(source='session.video_file', read_only=True)
+    session_video = SignedFileField(source='session.video_file', read_only=True)
     session_date = serializers.DateTimeField(source='session.recorded_at', read_only=True)
 
     class Meta:
         model = Chapter
-        fields = ['id', 'timestamp_seconds', 'end_seconds', 'notes',
+        fields = ['id', 'timestamp_seconds', 'end_seconds', 'keyframe_seconds', 'notes',
                   'session_id', 'session_title', 'session_video', 'session_date', 'created_at']
+        list_serializer_class = SignedUrlListSerializer
+
+    def media_keys(self, obj):
+        return [obj.session.video_file.name] if obj.session.video_file else []
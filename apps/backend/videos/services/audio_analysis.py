@@ -0,0 +1,139 @@
+import numpy as np
+from django.db import transaction
+
+from videos.models import ChapterSuggestion, SessionAsset
+from videos.services.ranged_reads import RangeReader
+from videos.services.waveform import pcm_blocks
+
+FRAME_SIZE = 512
+HOP_SIZE = 256                # 32 ms at the 8 kHz analysis rate
+SILENCE_FLOOR_DB = -50.0      # anything quieter is silence regardless of the take's level
+SILENCE_BELOW_LOUD_DB = 30.0  # ...as is anything this far under the take's loud passages
+MIN_GAP_SECONDS = 2.0         # shorter pauses (count-ins, page turns) don't split a segment
+MIN_SEGMENT_SECONDS = 8.0
+MIN_BPM = 40
+MAX_BPM = 240
+
+
+def frame_features(reader):
+    """
+    Per-frame RMS level (dBFS) and spectral-flux onset strength, computed block
+    by block with a Hann-windowed FFT. Returns (sample_rate, db, flux).
+    """
+    sample_rate, blocks = pcm_blocks(reader)
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    carry = np.empty(0, dtype=np.float32)
+    prev_spectrum = None
+    db_parts, flux_parts = [], []
+    for samples in blocks:
+        samples = np.concatenate([carry, samples / 32768.0])
+        if len(samples) < FRAME_SIZE:
+            carry = samples
+            continue
+        frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        spectrum = np.log1p(100 * np.abs(np.fft.rfft(frames * window, axis=1)))
+        previous = np.vstack([spectrum[:1] if prev_spectrum is None else prev_spectrum[None, :], spectrum[:-1]])
+        flux = np.maximum(spectrum - previous, 0).sum(axis=1)
+
+        db_parts.append(20 * np.log10(rms + 1e-9))
+        flux_parts.append(flux)
+        prev_spectrum = spectrum[-1]
+        carry = samples[len(frames) * HOP_SIZE:]
+
+    if not db_parts:
+        return sample_rate, np.empty(0), np.empty(0)
+    return sample_rate, np.concatenate(db_parts), np.concatenate(flux_parts)
+
+
+def _runs(mask):
+    """(start, end) frame index pairs for each run of True values."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.column_stack([np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)])
+
+
+def detect_segments(db, frames_per_second):
+    """Practice segments separated by silence, as (start_frame, end_frame) pairs."""
+    if not len(db):
+        return np.empty((0, 2), dtype=int)
+    threshold = max(SILENCE_FLOOR_DB, float(np.percentile(db, 95)) - SILENCE_BELOW_LOUD_DB)
+    runs = _runs(db > threshold)
+    if not len(runs):
+        return runs
+    # Merge runs separated by short pauses, then drop fragments.
+    gaps = runs[1:, 0] - runs[:-1, 1]
+    breaks = np.flatnonzero(gaps >= MIN_GAP_SECONDS * frames_per_second)
+    starts = runs[np.concatenate([[0], breaks + 1]), 0]
+    ends = runs[np.concatenate([breaks, [len(runs) - 1]]), 1]
+    merged = np.column_stack([starts, ends])
+    return merged[(merged[:, 1] - merged[:, 0]) >= MIN_SEGMENT_SECONDS * frames_per_second]
+
+
+def detect_onsets(flux, frames_per_second):
+    """Frame indices of onsets: local flux maxima well above a ~1 s moving average."""
+    if len(flux) < 3:
+        return np.empty(0, dtype=int)
+    width = max(3, int(frames_per_second))
+    kernel = np.ones(width) / width
+    local_mean = np.convolve(flux, kernel, mode='same')
+    threshold = local_mean + 0.5 * float(np.std(flux))
+    is_peak = (flux[1:-1] >= flux[:-2]) & (flux[1:-1] > flux[2:]) & (flux[1:-1] > threshold[1:-1])
+    return np.flatnonzero(is_peak) + 1
+
+
+def estimate_tempo(flux, frames_per_second):
+    """BPM from the onset-strength autocorrelation, biased toward ~120 to avoid octave errors."""
+    min_lag = int(frames_per_second * 60 / MAX_BPM)
+    max_lag = int(np.ceil(frames_per_second * 60 / MIN_BPM))
+    if len(flux) < 2 * max_lag or min_lag < 1:
+        return None
+    envelope = flux - flux.mean()
+    size = 1 << int(np.ceil(np.log2(2 * len(envelope))))
+    spectrum = np.fft.rfft(envelope, n=size)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum), n=size)[:max_lag + 1]
+    if autocorr[0] <= 0:
+        return None
+    lags = np.arange(min_lag, max_lag + 1)
+    bpm = 60 * frames_per_second / lags
+    weighted = autocorr[lags] / autocorr[0] * np.exp(-0.5 * (np.log2(bpm / 120.0) / 1.0) ** 2)
+    best = int(np.argmax(weighted))
+    if weighted[best] <= 0.05:
+        return None
+    # Lags are whole frames (~32 ms); refine the peak with a parabola through its neighbours.
+    lag = float(lags[best])
+    if 0 < best < len(lags) - 1:
+        left, mid, right = autocorr[lags[best] - 1:lags[best] + 2]
+        curvature = left - 2 * mid + right
+        if curvature < 0:
+            lag += 0.5 * (left - right) / curvature
+    return round(float(60 * frames_per_second / lag), 1)
+
+
+def analyze(reader):
+    """Suggested chapters as dicts with start/end seconds, tempo and onset count."""
+    sample_rate, db, flux = frame_features(reader)
+    frames_per_second = sample_rate / HOP_SIZE
+    onsets = detect_onsets(flux, frames_per_second)
+    suggestions = []
+    for start, end in detect_segments(db, frames_per_second):
+        suggestions.append({
+            'start_seconds': round(float(start / frames_per_second), 2),
+            'end_seconds': round(float(end / frames_per_second), 2),
+            'tempo_bpm': estimate_tempo(flux[start:end], frames_per_second),
+            'onset_count': int(np.count_nonzero((onsets >= start) & (onsets < end))),
+        })
+    return suggestions
+
+
+def build_chapter_suggestions(session):
+    """Analyze the session's analysis WAV and replace its stored chapter suggestions."""
+    audio = session.assets.filter(asset_type=SessionAsset.TYPE_AUDIO_ANALYSIS).first()
+    if audio is None:
+        raise ValueError('Session has no analysis audio')
+
+    suggestions = analyze(RangeReader(audio.object_key))
+    with transaction.atomic():
+        ChapterSuggestion.objects.filter(session=session).delete()
+        return ChapterSuggestion.objects.bulk_create([
+            ChapterSuggestion(session=session, **suggestion) for suggestion in suggestions
+        ])
@@ -0,0 +1,424 @@
+"""
+In-process stand-in for the S3 and MediaConvert calls the upload pipeline
+makes, for load tests and end-to-end tests that should not reach AWS.
+
+S3 covers multipart uploads (create, upload_part, list_parts, complete,
+abort), presigned part URLs, head/get (with ranges) and deletes; MediaConvert
+covers create_job/get_job, with jobs moving SUBMITTED -> PROGRESSING ->
+COMPLETE on a timer. Every operation can be given a latency and a failure
+rate; injected failures raise the ClientError AWS would (SlowDown for S3,
+TooManyRequestsException for MediaConvert), so the callers' retry and
+throttling paths run for real.
+
+Objects keep their size, ETag and first RETAIN_BYTES; later bytes read back
+as zeros, which is enough for the header-only media probe.
+"""
+
+import hashlib
+import hmac
+import io
+import random
+import secrets
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlsplit
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+from django.test.utils import override_settings
+
+BUCKET = 'practica-standin'
+ROLE_ARN = 'arn:aws:iam::000000000000:role/practica-standin'
+MEDIACONVERT_ENDPOINT = 'https://mediaconvert.standin.local'
+MIN_PART_SIZE = 5 * 1024 * 1024
+RETAIN_BYTES = 256 * 1024
+
+# storage_cleanup._s3_client and every module that imports it.
+S3_FACTORIES = (
+    'videos.views._s3_client',
+    'videos.services.bulk_import._s3_client',
+    'videos.services.media_gc._s3_client',
+    'videos.services.ranged_reads._s3_client',
+    'videos.services.storage_cleanup._s3_client',
+    'videos.services.storage_writers._s3_client',
+)
+MEDIACONVERT_FACTORY = 'videos.services.media_pipeline._mediaconvert_client'
+
+
+def _client_error(code, message, status, operation):
+    return ClientError(
+        {'Error': {'Code': code, 'Message': message}, 'ResponseMetadata': {'HTTPStatusCode': status}},
+        operation,
+    )
+
+
+class Faults:
+    """Per-operation latency (seconds) and failure rate, with 'default' as the fallback for both."""
+
+    def __init__(self, latency=None, failures=None, seed=None):
+        self.latency = dict(latency or {})
+        self.failures = dict(failures or {})
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.injected = Counter()
+        self._lock = threading.Lock()
+
+    def apply(self, operation, code, status):
+        with self._lock:
+            self.calls[operation] += 1
+            fail = self.random.random() < self.failures.get(operation, self.failures.get('default', 0.0))
+            if fail:
+                self.injected[operation] += 1
+        delay = self.latency.get(operation, self.latency.get('default', 0.0))
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise _client_error(code, f'Injected failure for {operation}', status, operation)
+
+
+class StandInS3:
+    def __init__(self, faults, bucket=BUCKET, min_part_size=MIN_PART_SIZE):
+        self.faults = faults
+        self.bucket = bucket
+        self.min_part_size = min_part_size
+        self.base_url = f'https://{bucket}.s3.standin.local'
+        self.objects = {}
+        self.uploads = {}
+        self._secret = secrets.token_bytes(16)
+        self._lock = threading.Lock()
+
+    def _call(self, operation, Bucket=None):
+        self.faults.apply(operation, 'SlowDown', 503)
+        if Bucket is not None and Bucket != self.bucket:
+            raise _client_error('NoSuchBucket', 'The specified bucket does not exist', 404, operation)
+
+    def _upload(self, operation, Key, UploadId):
+        upload = self.uploads.get(UploadId)
+        if upload is None or upload['key'] != Key:
+            raise _client_error('NoSuchUpload', 'The specified upload does not exist', 404, operation)
+        return upload
+
+    # Multipart uploads
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._call('create_multipart_upload', Bucket)
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = {'key': Key, 'parts': {}, 'content_type': kwargs.get('ContentType', '')}
+        return {'Bucket': Bucket, 'Key': Key, 'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._call('upload_part', Bucket)
+        return {'ETag': self._store_part(Key, UploadId, PartNumber, Body)}
+
+    def _store_part(self, key, upload_id, part_number, body):
+        data = body.read() if hasattr(body, 'read') else bytes(body)
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self._lock:
+            upload = self._upload('upload_part', key, upload_id)
+            upload['parts'][int(part_number)] = {
+                'etag': etag, 'size': len(data), 'head': data[:RETAIN_BYTES] if int(part_number) == 1 else b'',
+                'modified': datetime.now(dt_timezone.utc),
+            }
+        return etag
+
+    def list_parts(self, Bucket, Key, UploadId, MaxParts=1000, PartNumberMarker=0):
+        self._call('list_parts', Bucket)
+        with self._lock:
+            parts = sorted(self._upload('list_parts', Key, UploadId)['parts'].items())
+        after = [(number, part) for number, part in parts if number > int(PartNumberMarker or 0)]
+        page = after[:MaxParts]
+        response = {
+            'Bucket': Bucket, 'Key': Key, 'UploadId': UploadId,
+            'Parts': [
+                {'PartNumber': number, 'ETag': part['etag'], 'Size': part['size'], 'LastModified': part['modified']}
+                for number, part in page
+            ],
+            'IsTruncated': len(after) > MaxParts,
+        }
+        if response['IsTruncated']:
+            response['NextPartNumberMarker'] = page[-1][0]
+        return response
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._call('complete_multipart_upload', Bucket)
+        requested = MultipartUpload.get('Parts') or []
+        with self._lock:
+            upload = self._upload('complete_multipart_upload', Key, UploadId)
+            numbers = [int(part['PartNumber']) for part in requested]
+            if not requested or numbers != sorted(set(numbers)):
+                raise _client_error('InvalidPartOrder', 'Parts must be listed in ascending order', 400, 'CompleteMultipartUpload')
+            digest = hashlib.md5()
+            size = 0
+            for index, part in enumerate(requested):
+                stored = upload['parts'].get(int(part['PartNumber']))
+                if stored is None or stored['etag'].strip('"') != str(part.get('ETag', '')).strip().strip('"'):
+                    raise _client_error('InvalidPart', 'One or more parts could not be found', 400, 'CompleteMultipartUpload')
+                if index < len(requested) - 1 and stored['size'] < self.min_part_size:
+                    raise _client_error('EntityTooSmall', 'Part is smaller than the minimum size', 400, 'CompleteMultipartUpload')
+                digest.update(bytes.fromhex(stored['etag'].strip('"')))
+                size += stored['size']
+            etag = f'"{digest.hexdigest()}-{len(requested)}"'
+            first = upload['parts'][numbers[0]]['head'] if numbers[0] == 1 else b''
+            self.objects[Key] = {'size': size, 'etag': etag, 'head': first, 'content_type': upload['content_type']}
+            del self.uploads[UploadId]
+        return {'Bucket': Bucket, 'Key': Key, 'ETag': etag, 'Location': f'{self.base_url}/{quote(Key)}'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._call('abort_multipart_upload', Bucket)
+        with self._lock:
+            self._upload('abort_multipart_upload', Key, UploadId)
+            del self.uploads[UploadId]
+        return {}
+
+    # Presigned part URLs
+
+    def _signature(self, key, upload_id, part_number, expires):
+        message = f'{key}\n{upload_id}\n{part_number}\n{expires}'.encode()
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600, HttpMethod=None):
+        if ClientMethod != 'upload_part':
+            raise NotImplementedError(f'The stand-in only presigns upload_part, not {ClientMethod}')
+        self._call('generate_presigned_url', Params.get('Bucket'))
+        expires = int(time.time()) + int(ExpiresIn)
+        query = {
+            'uploadId': Params['UploadId'],
+            'partNumber': Params['PartNumber'],
+            'Expires': expires,
+            'Signature': self._signature(Params['Key'], Params['UploadId'], Params['PartNumber'], expires),
+        }
+        return f"{self.base_url}/{quote(Params['Key'])}?{urlencode(query)}"
+
+    def put_presigned(self, url, body):
+        """PUT a part body to a presigned URL, as a browser would. Returns the part ETag."""
+        split = urlsplit(url)
+        key = unquote(split.path.lstrip('/'))
+        query = {name: values[0] for name, values in parse_qs(split.query).items()}
+        try:
+            upload_id, part_number, expires = query['uploadId'], int(query['partNumber']), int(query['Expires'])
+        except (KeyError, ValueError):
+            raise _client_error('AccessDenied', 'Malformed presigned URL', 403, 'UploadPart')
+        if not hmac.compare_digest(query.get('Signature', ''), self._signature(key, upload_id, part_number, expires)):
+            raise _client_error('SignatureDoesNotMatch', 'Signature does not match', 403, 'UploadPart')
+        if expires < time.time():
+            raise _client_error('AccessDenied', 'Request has expired', 403, 'UploadPart')
+        self._call('upload_part')
+        return self._store_part(key, upload_id, part_number, body)
+
+    # Objects
+
+    def _object(self, operation, Key, code='NoSuchKey'):
+        stored = self.objects.get(Key)
+        if stored is None:
+            raise _client_error(code, 'The specified key does not exist', 404, operation)
+        return stored
+
+    def put_object(self, Bucket, Key, Body=b'', ContentType='', **kwargs):
+        self._call('put_object', Bucket)
+        data = Body.read() if hasattr(Body, 'read') else bytes(Body)
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self._lock:
+            self.objects[Key] = {'size': len(data), 'etag': etag, 'head': data[:RETAIN_BYTES], 'content_type': ContentType}
+        return {'ETag': etag}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._call('head_object', Bucket)
+        stored = self._object('HeadObject', Key, code='404')
+        return {'ContentLength': stored['size'], 'ETag': stored['etag'], 'ContentType': stored['content_type']}
+
+    def get_object(self, Bucket, Key, Range=None, **kwargs):
+        self._call('get_object', Bucket)
+        stored = self._object('GetObject', Key)
+        start, end = 0, stored['size'] - 1
+        if Range:
+            first, _, last = Range.removeprefix('bytes=').partition('-')
+            start, end = int(first), min(end, int(last) if last else end)
+        data = stored['head'][start:end + 1]
+        data += bytes(max(0, end + 1 - start - len(data)))
+        return {
+            'Body': StreamingBody(io.BytesIO(data), len(data)), 'ContentLength': len(data),
+            'ETag': stored['etag'], 'ContentType': stored['content_type'],
+        }
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._call('delete_object', Bucket)
+        with self._lock:
+            self.objects.pop(Key, None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        self._call('delete_objects', Bucket)
+        keys = [item['Key'] for item in Delete.get('Objects', [])]
+        with self._lock:
+            for key in keys:
+                self.objects.pop(key, None)
+        return {'Deleted': [{'Key': key} for key in keys]}
+
+    def get_paginator(self, operation):
+        if operation != 'list_objects_v2':
+            raise NotImplementedError(f'The stand-in has no {operation} paginator')
+        return _ListObjectsPaginator(self)
+
+
+class _ListObjectsPaginator:
+    def __init__(self, s3):
+        self.s3 = s3
+
+    def paginate(self, Bucket, Prefix='', **kwargs):
+        self.s3._call('list_objects_v2', Bucket)
+        with self.s3._lock:
+            keys = sorted(key for key in self.s3.objects if key.startswith(Prefix))
+            contents = [{'Key': key, 'Size': self.s3.objects[key]['size']} for key in keys]
+        for start in range(0, max(1, len(contents)), 1000):
+            yield {'Contents': contents[start:start + 1000], 'KeyCount': len(contents[start:start + 1000])}
+
+
+class StandInMediaConvert:
+    """Jobs finish `job_seconds` after submission; `job_failure_rate` of them end in ERROR."""
+
+    def __init__(self, faults, s3, job_seconds=2.0, job_failure_rate=0.0):
+        self.faults = faults
+        self.s3 = s3
+        self.job_seconds = job_seconds
+        self.job_failure_rate = job_failure_rate
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def create_job(self, Role, Settings, UserMetadata=None, Queue=None, **kwargs):
+        self.faults.apply('create_job', 'TooManyRequestsException', 429)
+        job_id = f'{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}'
+        with self._lock:
+            self.jobs[job_id] = {
+                'Id': job_id, 'Role': Role, 'Settings': Settings, 'UserMetadata': dict(UserMetadata or {}),
+                'Queue': Queue or 'Default', 'CreatedAt': datetime.now(dt_timezone.utc),
+                'submitted': time.monotonic(), 'fails': self.faults.random.random() < self.job_failure_rate,
+                'finished': False,
+            }
+        return {'Job': self._describe(self.jobs[job_id])}
+
+    def get_job(self, Id):
+        self.faults.apply('get_job', 'TooManyRequestsException', 429)
+        with self._lock:
+            job = self.jobs.get(Id)
+            if job is None:
+                raise _client_error('NotFoundException', f'Job {Id} not found', 404, 'GetJob')
+            return {'Job': self._describe(job)}
+
+    def _describe(self, job):
+        elapsed = time.monotonic() - job['submitted']
+        described = {key: value for key, value in job.items() if key[0].isupper()}
+        if elapsed < self.job_seconds / 2 and self.job_seconds > 0:
+            described['Status'] = 'SUBMITTED'
+        elif elapsed < self.job_seconds:
+            described['Status'] = 'PROGRESSING'
+            described['JobPercentComplete'] = int(100 * elapsed / self.job_seconds)
+        elif job['fails']:
+            described.update(Status='ERROR', ErrorCode=1010, ErrorMessage='Injected transcode failure')
+        else:
+            described['Status'] = 'COMPLETE'
+            described['OutputGroupDetails'] = self._finish(job)
+        return described
+
+    def _finish(self, job):
+        """Output paths per group, in the shape of MediaConvert's completion event; outputs land in the S3 stand-in."""
+        settings_ = job['Settings']
+        source = settings_['Inputs'][0]['FileInput'].rsplit('/', 1)[-1]
+        stem = source.rsplit('.', 1)[0]
+        details = []
+        for group in settings_.get('OutputGroups', []):
+            group_settings = group['OutputGroupSettings']
+            destination = next(
+                value['Destination'] for name, value in group_settings.items()
+                if isinstance(value, dict) and 'Destination' in value
+            )
+            paths = []
+            for output in group['Outputs']:
+                if group_settings['Type'] == 'HLS_GROUP_SETTINGS':
+                    paths.append(f"{destination}{stem}.m3u8")
+                    break
+                container = output.get('ContainerSettings', {}).get('Container', 'MP4')
+                extension = {'MP4': 'mp4', 'RAW': 'jpg'}.get(container, container.lower())
+                paths.append(f"{destination}{stem}{output.get('NameModifier', '')}.{extension}")
+            details.append({'Name': group.get('Name', ''), 'OutputDetails': [{'OutputFilePaths': paths}]})
+        if not job['finished']:
+            job['finished'] = True
+            prefix = f's3://{self.s3.bucket}/'
+            for detail in details:
+                for path in detail['OutputDetails'][0]['OutputFilePaths']:
+                    with self.s3._lock:
+                        self.s3.objects.setdefault(path.removeprefix(prefix), {
+                            'size': 0, 'etag': '"d41d8cd98f00b204e9800998ecf8427e"', 'head': b'', 'content_type': '',
+                        })
+        return details
+
+
+class StandIn:
+    """The S3 and MediaConvert stand-ins sharing one fault profile."""
+
+    def __init__(self, latency=None, failures=None, seed=None, job_seconds=2.0, job_failure_rate=0.0,
+                 min_part_size=MIN_PART_SIZE):
+        self.faults = Faults(latency, failures, seed)
+        self.s3 = StandInS3(self.faults, min_part_size=min_part_size)
+        self.mediaconvert = StandInMediaConvert(self.faults, self.s3, job_seconds, job_failure_rate)
+        self.callback_token = secrets.token_urlsafe(16)
+
+    @contextmanager
+    def activate(self):
+        """Route the app's S3 and MediaConvert clients here and turn on direct uploads and the pipeline."""
+        with ExitStack() as stack:
+            stack.enter_context(override_settings(
+                AWS_STORAGE_BUCKET_NAME=self.s3.bucket,
+                AWS_MEDIA_CONVERT_ROLE_ARN=ROLE_ARN,
+                AWS_MEDIA_CONVERT_ENDPOINT_URL=MEDIACONVERT_ENDPOINT,
+                MEDIA_PROCESSING_CALLBACK_TOKEN=self.callback_token,
+            ))
+            for target in S3_FACTORIES:
+                stack.enter_context(patch(target, return_value=self.s3))
+            stack.enter_context(patch(MEDIACONVERT_FACTORY, return_value=self.mediaconvert))
+            yield self
+
+    @contextmanager
+    def serve(self, host='127.0.0.1', port=0):
+        """Accept presigned part PUTs over HTTP, for clients that need a real URL."""
+        server = ThreadingHTTPServer((host, port), _handler_for(self.s3))
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        previous = self.s3.base_url
+        self.s3.base_url = f'http://{host}:{server.server_address[1]}'
+        try:
+            yield self.s3.base_url
+        finally:
+            self.s3.base_url = previous
+            server.shutdown()
+            server.server_close()
+
+
+def _handler_for(s3):
+    class PresignedPutHandler(BaseHTTPRequestHandler):
+        def do_PUT(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            try:
+                etag = s3.put_presigned(self.path, body)
+            except ClientError as exc:
+                self.send_response(exc.response['ResponseMetadata']['HTTPStatusCode'])
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Access-Control-Expose-Headers', 'ETag')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return PresignedPutHandler
@@ -0,0 +1,235 @@
+"""
+Endpoint benchmarks against a dataset from `generate_dataset`.
+
+Each scenario drives the real URL stack through the test client as the
+dataset's first coach, recording latency and query count per call; a
+separate pass under tracemalloc records allocations, so tracing never
+skews the timings. Results compare against a JSON baseline: more queries
+than the baseline is always a regression, latency only when p95 grows past
+the tolerance (and a noise floor).
+"""
+
+import io
+import time
+import tracemalloc
+import uuid
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import boto3
+from botocore.stub import Stubber
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import Count
+from rest_framework.test import APIClient
+
+from videos.models import Chapter, Comment, Session, Space
+from videos.services.dataset import coach_metrics_tables_present
+from videos.services.media_pipeline import multipart_fingerprint
+
+NOISE_FLOOR_MS = 5.0
+STUB_BUCKET = 'benchmark-bucket'
+
+
+class DatasetMissing(LookupError):
+    pass
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Context:
+    """The dataset rows the scenarios run against."""
+
+    def __init__(self, prefix):
+        self.coach = User.objects.filter(username=f'{prefix}-coach-0000').first()
+        if self.coach is None:
+            raise DatasetMissing(f"No dataset with prefix '{prefix}'; run generate_dataset first")
+        self.space = Space.objects.filter(owner=self.coach).annotate(n=Count('sessions')).order_by('-n', 'id').first()
+        busiest = (
+            Comment.objects.filter(session__space__owner=self.coach)
+            .values('session').annotate(n=Count('id')).order_by('-n').first()
+        )
+        self.session = Session.objects.get(pk=busiest['session']) if busiest else self.space.sessions.first()
+        exercise = (
+            Chapter.objects.filter(session__space__owner=self.coach, exercise__isnull=False)
+            .values('exercise').annotate(n=Count('id')).order_by('-n').first()
+        )
+        self.exercise_id = exercise['exercise'] if exercise else None
+        self.client = APIClient()
+        self.client.force_authenticate(self.coach)
+
+
+class Benchmark:
+    def __init__(self, iterations=20, warmup=2):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.samples = {}
+        self.queries = {}
+        self.allocations = {}
+        self.statuses = {}
+        self._mode = 'warmup'
+
+    def measure(self, name, call):
+        if self._mode == 'trace':
+            tracemalloc.start()
+            try:
+                response = call()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.allocations[name] = round(peak / 1024, 1)
+            return response
+
+        counter = _QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            started = time.perf_counter()
+            response = call()
+            elapsed = (time.perf_counter() - started) * 1000
+        if self._mode == 'timed':
+            self.samples.setdefault(name, []).append(elapsed)
+            self.queries[name] = max(self.queries.get(name, 0), counter.count)
+            self.statuses.setdefault(name, set()).add(getattr(response, 'status_code', 0))
+        return response
+
+    def run(self, scenarios, context):
+        """Warm up, time `iterations` rounds, then one tracemalloc round. `scenarios` are (label, fn) pairs."""
+        self._mode = 'warmup'
+        for _ in range(self.warmup):
+            for _, scenario in scenarios:
+                scenario(self, context)
+        self._mode = 'timed'
+        for _ in range(self.iterations):
+            for _, scenario in scenarios:
+                scenario(self, context)
+        self._mode = 'trace'
+        for _, scenario in scenarios:
+            scenario(self, context)
+        return self.results()
+
+    def results(self):
+        budgets = getattr(settings, 'REQUEST_QUERY_BUDGETS', {}) or {}
+        results = {}
+        for name, samples in self.samples.items():
+            budget = SCENARIO_BUDGETS.get(name)
+            results[name] = {
+                'p50_ms': round(percentile(samples, 0.5), 2),
+                'p95_ms': round(percentile(samples, 0.95), 2),
+                'mean_ms': round(sum(samples) / len(samples), 2),
+                'queries': self.queries[name],
+                'query_budget': budgets.get(budget) if budget else None,
+                'alloc_peak_kb': self.allocations.get(name),
+                'statuses': sorted(self.statuses[name]),
+            }
+        return results
+
+
+# Scenario name -> REQUEST_QUERY_BUDGETS key it is held to.
+SCENARIO_BUDGETS = {
+    'session list': 'GET session-list',
+    'session list (space)': 'GET session-list',
+    'session detail (busiest)': 'GET session-detail',
+    'spaces': 'GET space-list',
+    'space detail': 'GET space-detail',
+    'tags': 'GET tag_list',
+    'me': 'GET me',
+}
+
+
+def _get(name, path):
+    def scenario(bench, ctx):
+        bench.measure(name, lambda: ctx.client.get(path(ctx)))
+    return name, scenario
+
+
+def _multipart_flow(bench, ctx):
+    """initiate -> sign one part -> complete, against a stubbed S3 client."""
+    size = 8 * 1024 * 1024
+    part_etag = f'"{uuid.uuid4().hex}"'  # unique content, so completion never takes the dedup path
+    assembled = multipart_fingerprint(size, [{'PartNumber': 1, 'ETag': part_etag}]).split(':', 1)[-1]
+    client = boto3.client('s3', region_name='us-east-1', aws_access_key_id='bench', aws_secret_access_key='bench')
+    with Stubber(client) as stub, patch('videos.views._s3_client', return_value=client), \
+            patch('videos.views.probe_media', return_value=({}, None)):
+        stub.add_response('create_multipart_upload', {'UploadId': 'bench-upload'})
+        response = bench.measure('multipart initiate', lambda: ctx.client.post('/api/sessions/multipart/initiate/', {
+            'title': 'Benchmark upload', 'size_bytes': size, 'content_type': 'video/mp4',
+            'filename': 'bench.mp4', 'space': ctx.space.id, 'duration_seconds': 60,
+        }, format='json'))
+        upload_id = response.json()['multipart_upload_id']
+        bench.measure('multipart sign part', lambda: ctx.client.post('/api/sessions/multipart/sign-part/', {
+            'multipart_upload_id': upload_id, 'part_number': 1,
+        }, format='json'))
+        stub.add_response('complete_multipart_upload', {'ETag': f'"{assembled}"'})
+        bench.measure('multipart complete', lambda: ctx.client.post('/api/sessions/multipart/complete/', {
+            'multipart_upload_id': upload_id, 'parts': [{'part_number': 1, 'etag': part_etag}],
+        }, format='json'))
+
+
+def _coach_metrics_build(bench, ctx):
+    # No query budget on purpose: the hourly cron computes every coach-day
+    # separately, an accepted N+1 off the request path. Only growth past the
+    # baseline fails.
+    bench.measure('coach metrics build (1 day)', lambda: call_command('build_coach_metrics', '--days', '1', stdout=io.StringIO()))
+
+
+SCENARIOS = [
+    _get('session list', lambda ctx: '/api/sessions/'),
+    _get('session list (space)', lambda ctx: f'/api/sessions/?space={ctx.space.id}'),
+    _get('session detail (busiest)', lambda ctx: f'/api/sessions/{ctx.session.id}/'),
+    _get('exercise progress', lambda ctx: f'/api/exercises/{ctx.exercise_id}/progress/'),
+    _get('spaces', lambda ctx: '/api/spaces/'),
+    _get('space detail', lambda ctx: f'/api/spaces/{ctx.space.id}/'),
+    _get('tags', lambda ctx: '/api/tags/'),
+    _get('me', lambda ctx: '/api/auth/me/'),
+    ('multipart initiate/sign/complete', _multipart_flow),
+    ('coach metrics build', _coach_metrics_build),
+]
+
+
+def available_scenarios():
+    """SCENARIOS without the coach metrics build where 0016_remove_coach_metrics dropped its tables."""
+    if coach_metrics_tables_present():
+        return SCENARIOS
+    return [(label, scenario) for label, scenario in SCENARIOS if scenario is not _coach_metrics_build]
+
+
+def stub_settings():
+    """Settings the scenarios need on a dev box: test client host and a bucket name for direct uploads."""
+    overrides = {'ALLOWED_HOSTS': ['testserver', *settings.ALLOWED_HOSTS]}
+    if not getattr(settings, 'AWS_STORAGE_BUCKET_NAME', ''):
+        overrides['AWS_STORAGE_BUCKET_NAME'] = STUB_BUCKET
+    return overrides
+
+
+def compare(results, baseline, tolerance):
+    """Regression messages for `results` against a baseline's scenarios."""
+    problems = []
+    for name, current in results.items():
+        if current['query_budget'] is not None and current['queries'] > current['query_budget']:
+            problems.append(f"{name}: {current['queries']} queries exceeds budget {current['query_budget']}")
+        previous = (baseline or {}).get(name)
+        if not previous:
+            continue
+        if current['queries'] > previous['queries']:
+            problems.append(f"{name}: {current['queries']} queries, baseline {previous['queries']}")
+        limit = previous['p95_ms'] * (1 + tolerance)
+        if current['p95_ms'] > limit and current['p95_ms'] - previous['p95_ms'] > NOISE_FLOOR_MS:
+            problems.append(f"{name}: p95 {current['p95_ms']}ms, baseline {previous['p95_ms']}ms (+{tolerance:.0%} allowed)")
+    return problems
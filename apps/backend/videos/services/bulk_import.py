@@ -0,0 +1,159 @@
+import csv
+import mimetypes
+import os
+import posixpath
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from videos.models import MediaJob, Session, SessionAsset, Space, Tag
+from videos.services.jobs import PRIORITY_BACKFILL, enqueue_keyframe_jobs
+from videos.services.media_pipeline import media_pipeline_enabled, multipart_fingerprint
+from videos.services.storage_cleanup import _s3_client, uses_s3
+
+MEDIA_EXTENSIONS = {'.mp4', '.mov', '.m4v', '.webm', '.mkv', '.m4a', '.mp3', '.wav'}
+MANIFEST_FIELDS = ('key', 'title', 'description', 'tags', 'space_id')
+
+
+class ManifestError(ValueError):
+    pass
+
+
+@dataclass
+class StoredRecording:
+    key: str
+    size: int
+    fingerprint: str = ''
+
+
+def _etag_fingerprint(size, etag):
+    """Same fingerprint the upload paths record, derived from the listing's ETag."""
+    etag = str(etag or '').strip('"')
+    if not etag:
+        return ''
+    if '-' in etag:
+        return f'{size}:{etag}'
+    return multipart_fingerprint(size, [{'PartNumber': 1, 'ETag': etag}])
+
+
+def iter_recordings(prefix):
+    """Media objects under a storage prefix, streamed page by page."""
+    if uses_s3():
+        bucket = getattr(default_storage, 'bucket_name', '') or settings.AWS_STORAGE_BUCKET_NAME
+        paginator = _s3_client().get_paginator('list_objects_v2')
+        listing = (
+            (item['Key'], int(item.get('Size') or 0), item.get('ETag', ''))
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+            for item in page.get('Contents') or []
+        )
+    else:
+        base = default_storage.path('')
+        listing = (
+            (os.path.relpath(os.path.join(dirpath, name), base).replace(os.sep, '/'),
+             os.path.getsize(os.path.join(dirpath, name)), '')
+            for dirpath, _, names in os.walk(default_storage.path(prefix))
+            for name in sorted(names)
+        )
+    for key, size, etag in listing:
+        if posixpath.splitext(key)[1].lower() in MEDIA_EXTENSIONS and size > 0:
+            yield StoredRecording(key, size, _etag_fingerprint(size, etag))
+
+
+def load_manifest(path):
+    """
+    CSV keyed by storage key with optional title, description, tags
+    (comma-separated) and space_id columns. Returns {key: row}.
+    """
+    with open(path, newline='', encoding='utf-8') as fh:
+        reader = csv.DictReader(fh)
+        if 'key' not in (reader.fieldnames or []):
+            raise ManifestError("Manifest needs a 'key' column")
+        rows = {}
+        for row in reader:
+            key = (row.get('key') or '').strip()
+            if key:
+                rows[key] = {field: (row.get(field) or '').strip() for field in MANIFEST_FIELDS}
+    space_ids = {int(row['space_id']) for row in rows.values() if row['space_id'].isdigit()}
+    missing = space_ids - set(Space.objects.filter(pk__in=space_ids).values_list('pk', flat=True))
+    if missing:
+        raise ManifestError(f"Manifest refers to unknown space(s): {sorted(missing)}")
+    return rows
+
+
+def _title_from_key(key):
+    stem = posixpath.splitext(posixpath.basename(key))[0]
+    return stem.replace('_', ' ').replace('-', ' ').strip()[:200] or 'Imported recording'
+
+
+class TagCache:
+    def __init__(self):
+        self._tags = {}
+
+    def get(self, name):
+        lowered = name.lower()
+        if lowered not in self._tags:
+            tag = Tag.objects.filter(name__iexact=name).first() or Tag.objects.create(name=name)
+            self._tags[lowered] = tag
+        return self._tags[lowered]
+
+
+@transaction.atomic
+def import_batch(recordings, user, space=None, manifest=None, tag_cache=None):
+    """
+    Create sessions for recordings not imported yet and queue their processing.
+    Returns the created sessions.
+    """
+    manifest = manifest or {}
+    tag_cache = tag_cache or TagCache()
+    existing = set(
+        Session.objects.filter(video_file__in=[rec.key for rec in recordings]).values_list('video_file', flat=True)
+    )
+    pipeline = media_pipeline_enabled()
+    pending = []
+    for rec in recordings:
+        if rec.key in existing:
+            continue
+        row = manifest.get(rec.key, {})
+        space_id = int(row['space_id']) if row.get('space_id', '').isdigit() else (space.id if space else None)
+        session = Session(
+            user=user,
+            space_id=space_id,
+            title=(row.get('title') or _title_from_key(rec.key))[:200],
+            description=row.get('description', ''),
+            video_file=rec.key,
+            content_fingerprint=rec.fingerprint,
+            processing_status=Session.STATUS_PROCESSING if pipeline else Session.STATUS_READY,
+        )
+        tags = [name.strip() for name in row.get('tags', '').split(',') if name.strip()]
+        pending.append((session, tags))
+    if not pending:
+        return []
+
+    sessions = Session.objects.bulk_create([session for session, _ in pending])
+    Session.tags.through.objects.bulk_create([
+        Session.tags.through(session_id=session.id, tag_id=tag_cache.get(name).id)
+        for session, tags in pending
+        for name in dict.fromkeys(tags)
+    ], ignore_conflicts=True)
+
+    if pipeline:
+        # Behind interactive uploads; run_media_jobs submits them at MEDIACONVERT_SUBMIT_RATE.
+        MediaJob.objects.bulk_create([
+            MediaJob(kind=MediaJob.KIND_SESSION_PROCESSING, session=session, priority=PRIORITY_BACKFILL)
+            for session in sessions
+        ])
+    else:
+        SessionAsset.objects.bulk_create([
+            SessionAsset(
+                session=session,
+                asset_type=SessionAsset.TYPE_PROXY_MP4,
+                object_key=session.video_file.name,
+                content_type=mimetypes.guess_type(session.video_file.name)[0] or 'video/mp4',
+                metadata_json={'source': 'original'},
+            )
+            for session in sessions
+        ])
+        enqueue_keyframe_jobs(sessions)
+    return sessions
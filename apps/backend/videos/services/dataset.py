@@ -0,0 +1,337 @@
+"""
+Deterministic synthetic dataset for measuring endpoints at production size.
+
+Everything is derived from one seeded RNG and written with bulk_create, so the
+same seed and scale always produce the same rows. Generated usernames are
+`<prefix>-coach-NNNN` and `<prefix>-student-NNNNN`, which is how a dataset is
+found again to be replaced. Accounts cannot log in unless a password is given.
+Coach events and daily metrics are skipped where 0016_remove_coach_metrics
+dropped their tables.
+"""
+
+import random
+import re
+import string
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+from videos.models import (
+    Chapter, CoachDailyMetric, CoachEvent, Comment, Exercise, Profile, Session, SessionAsset,
+    SessionLastSeen, Space, SpaceMember, Tag,
+)
+from videos.services.coach_metrics import compute_daily_metric_for_coach
+
+# Fan-out per scale. `max_comments` is the long tail: the first session of each
+# coach's first space gets exactly that many, the rest follow a Pareto curve.
+SCALES = {
+    'small': {
+        'coaches': 3, 'spaces_per_coach': 2, 'students': 60, 'members_per_space': 10,
+        'sessions_per_space': 5, 'comments_per_session': 4, 'max_comments': 50,
+        'chapters_per_session': 3, 'tags': 30, 'exercises': 20, 'days': 60, 'metric_days': 7,
+    },
+    'medium': {
+        'coaches': 10, 'spaces_per_coach': 5, 'students': 1000, 'members_per_space': 100,
+        'sessions_per_space': 20, 'comments_per_session': 8, 'max_comments': 300,
+        'chapters_per_session': 4, 'tags': 150, 'exercises': 60, 'days': 90, 'metric_days': 14,
+    },
+    'large': {
+        'coaches': 20, 'spaces_per_coach': 50, 'students': 5000, 'members_per_space': 500,
+        'sessions_per_space': 10, 'comments_per_session': 10, 'max_comments': 1000,
+        'chapters_per_session': 5, 'tags': 400, 'exercises': 120, 'days': 180, 'metric_days': 35,
+    },
+}
+
+INSTRUMENTS = ['guitar', 'piano', 'violin', 'drums', 'voice', 'cello', 'bass', 'flute', 'trumpet', 'sax']
+TOPICS = [
+    'scales', 'arpeggios', 'sight reading', 'tone', 'timing', 'technique', 'repertoire', 'improv',
+    'ear training', 'dynamics', 'phrasing', 'warmup', 'etude', 'recital prep', 'chords', 'rhythm',
+]
+COMMENT_TEXT = [
+    'Watch the tempo here.', 'Nice tone on this passage.', 'Relax the wrist.', 'Try this slower.',
+    'Much cleaner than last week!', 'Breathe before the phrase.', 'Check your posture.',
+    'The dynamics are flat here.', 'Great recovery after the slip.', 'Count this bar out loud.',
+]
+
+
+class DatasetExists(ValueError):
+    pass
+
+
+def coach_metrics_tables_present():
+    """The CoachEvent/CoachDailyMetric models outlive their tables in migrated databases."""
+    tables = set(connection.introspection.table_names())
+    return {CoachEvent._meta.db_table, CoachDailyMetric._meta.db_table} <= tables
+
+
+def _backdate(model, fields, stamps, batch_size):
+    """Set auto_now_add columns, which bulk_create always stamps with now(), from {pk: datetime}."""
+    items = list(stamps.items())
+    for start in range(0, len(items), batch_size):
+        chunk = items[start:start + batch_size]
+        case = Case(*[When(pk=pk, then=Value(stamp)) for pk, stamp in chunk], output_field=DateTimeField())
+        model.objects.filter(pk__in=[pk for pk, _ in chunk]).update(**{field: case for field in fields})
+
+
+class DatasetGenerator:
+    def __init__(self, scale, seed=1, prefix='perf', batch_size=2000, log=None, password=None):
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.password = password
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.now = timezone.now().replace(microsecond=0)
+        self.counts = {}
+        self.skipped = []
+        self.coach_metrics = True
+
+    def _bulk(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(created)
+        return created
+
+    def _ago(self, max_days):
+        return self.now - timedelta(seconds=self.rng.randint(0, int(max_days * 86400)))
+
+    def existing_users(self):
+        # Only names this generator produces, so --replace never reaches real accounts sharing the prefix.
+        pattern = rf'^{re.escape(self.prefix)}-(coach-[0-9]{{4,}}|student-[0-9]{{5,}})$'
+        return User.objects.filter(username__regex=pattern)
+
+    def delete_existing(self):
+        users = self.existing_users()
+        Space.objects.filter(owner__in=users).update(main_session=None)
+        users.delete()
+        Tag.objects.filter(name__startswith=f'{self.prefix}:').delete()
+        Exercise.objects.filter(name__endswith=f' ({self.prefix})').delete()
+
+    @transaction.atomic
+    def run(self):
+        if self.existing_users().exists():
+            raise DatasetExists(f"A dataset with prefix '{self.prefix}' already exists")
+        s = self.scale
+        self.coach_metrics = coach_metrics_tables_present()
+        if not self.coach_metrics:
+            self.skipped = ['CoachEvent', 'CoachDailyMetric']
+        coaches, students = self._users(s['coaches'], s['students'])
+        exercises = self._exercises(s['exercises'])
+        tags = self._tags(s['tags'])
+        spaces = self._spaces(coaches, s['spaces_per_coach'])
+        members = self._memberships(spaces, students, s['members_per_space'])
+        sessions = self._sessions(spaces, members, s['sessions_per_space'], s['days'])
+        self._tag_sessions(sessions, tags)
+        self._chapters(sessions, exercises, s['chapters_per_session'])
+        self._comments(sessions, members, s['comments_per_session'], s['max_comments'])
+        self._last_seen(sessions, members)
+        if self.coach_metrics:
+            self._coach_metrics(coaches, s['metric_days'])
+        return self.counts
+
+    def _users(self, coach_count, student_count):
+        password = make_password(self.password)  # None gives an unusable password
+        names = [f'{self.prefix}-coach-{i:04d}' for i in range(coach_count)]
+        names += [f'{self.prefix}-student-{i:05d}' for i in range(student_count)]
+        users = self._bulk(User, [User(username=name, password=password) for name in names])
+        self._bulk(Profile, [
+            Profile(user=user, display_name=user.username.split('-', 1)[1].replace('-', ' ').title())
+            for user in users
+        ])
+        self.log(f'{len(users)} users')
+        return users[:coach_count], users[coach_count:]
+
+    def _exercises(self, count):
+        names = [f'{TOPICS[i % len(TOPICS)].title()} {i // len(TOPICS) + 1} ({self.prefix})' for i in range(count)]
+        return self._bulk(Exercise, [
+            Exercise(name=name, category=self.rng.choice(INSTRUMENTS)) for name in names
+        ])
+
+    def _tags(self, count):
+        names = [f'{self.prefix}:{INSTRUMENTS[i % len(INSTRUMENTS)]} {TOPICS[i % len(TOPICS)]} {i}' for i in range(count)]
+        return self._bulk(Tag, [Tag(name=name) for name in names])
+
+    def _spaces(self, coaches, per_coach):
+        alphabet = string.ascii_letters + string.digits
+        spaces = []
+        for coach in coaches:
+            for index in range(per_coach):
+                slug = ''.join(self.rng.choice(alphabet) for _ in range(14))
+                spaces.append(Space(
+                    name=f'{self.rng.choice(INSTRUMENTS).title()} studio {index + 1}',
+                    owner=coach,
+                    invite_slug=f'{self.prefix[:5]}{slug}'[:20],
+                ))
+        spaces = self._bulk(Space, spaces)
+        self.log(f'{len(spaces)} spaces')
+        return spaces
+
+    def _memberships(self, spaces, students, per_space):
+        members = {}
+        rows = []
+        for space in spaces:
+            chosen = self.rng.sample(students, min(per_space, len(students)))
+            members[space.id] = chosen
+            rows.extend(SpaceMember(space=space, user=user) for user in chosen)
+        self._bulk(SpaceMember, rows)
+        self.log(f'{len(rows)} memberships')
+        return members
+
+    def _sessions(self, spaces, members, per_space, days):
+        sessions = []
+        for space in spaces:
+            posters = [space.owner] + members[space.id][:max(1, len(members[space.id]) // 5)]
+            for _ in range(per_space):
+                user = self.rng.choice(posters)
+                sessions.append(Session(
+                    user=user,
+                    space=space,
+                    title=f'{self.rng.choice(TOPICS).title()} practice',
+                    description=self.rng.choice(['', 'Working on consistency.', 'First full run-through.']),
+                    video_file=f'sessions/{self.prefix}/{space.id}-{len(sessions)}.mp4',
+                    processing_status=Session.STATUS_READY,
+                    duration_seconds=self.rng.randint(120, 5400),
+                ))
+        sessions = self._bulk(Session, sessions)
+        stamps = {session.id: self._ago(days) for session in sessions}
+        _backdate(Session, ['created_at', 'recorded_at'], stamps, 500)
+        for session in sessions:
+            session.created_at = stamps[session.id]
+
+        self._bulk(SessionAsset, [
+            SessionAsset(
+                session=session,
+                asset_type=SessionAsset.TYPE_PROXY_MP4,
+                object_key=session.video_file.name,
+                content_type='video/mp4',
+                metadata_json={'source': 'original'},
+            )
+            for session in sessions
+        ])
+        first_by_space = {}
+        for session in sessions:
+            first_by_space.setdefault(session.space_id, session)
+        for space in spaces:
+            space.main_session = first_by_space.get(space.id)
+        Space.objects.bulk_update(spaces, ['main_session'], batch_size=self.batch_size)
+
+        if self.coach_metrics:
+            self._bulk(CoachEvent, [
+                CoachEvent(user=session.user, event_type=CoachEvent.EVENT_SESSION_UPLOADED,
+                           occurred_at=session.created_at, session=session, space_id=session.space_id)
+                for session in sessions
+            ])
+        self.log(f'{len(sessions)} sessions')
+        return sessions
+
+    def _tag_sessions(self, sessions, tags):
+        through = Session.tags.through
+        rows = []
+        for session in sessions:
+            for tag in self.rng.sample(tags, min(len(tags), self.rng.randint(0, 4))):
+                rows.append(through(session_id=session.id, tag_id=tag.id))
+        self._bulk(through, rows)
+
+    def _chapters(self, sessions, exercises, per_session):
+        rows = []
+        for session in sessions:
+            count = self.rng.randint(0, per_session * 2)
+            duration = session.duration_seconds
+            starts = sorted(self.rng.sample(range(duration), min(count, duration)))
+            for start, end in zip(starts, starts[1:] + [duration]):
+                exercise = self.rng.choice(exercises) if exercises and self.rng.random() < 0.8 else None
+                rows.append(Chapter(
+                    session=session, exercise=exercise, timestamp_seconds=start, end_seconds=end,
+                    title='' if exercise else 'Free play',
+                ))
+        self._bulk(Chapter, rows)
+
+    def _comment_count(self, session, mean, max_comments, heavy):
+        if session.id in heavy:
+            return max_comments
+        # Pareto(1.5) has mean 3; most sessions get a few comments, a handful get many.
+        return min(max_comments, int(mean * self.rng.paretovariate(1.5) / 3))
+
+    def _comments(self, sessions, members, mean, max_comments):
+        heavy = set()
+        seen_owners = set()
+        for session in sessions:
+            owner = session.space.owner_id
+            if owner not in seen_owners:
+                seen_owners.add(owner)
+                heavy.add(session.id)
+
+        rows, stamps, coach_comments = [], [], []
+        for session in sessions:
+            commenters = [session.space.owner] + members[session.space_id][:20]
+            for _ in range(self._comment_count(session, mean, max_comments, heavy)):
+                user = self.rng.choice(commenters)
+                with_video = self.rng.random() < 0.7
+                rows.append(Comment(
+                    session=session,
+                    user=user,
+                    timestamp_seconds=self.rng.randint(0, session.duration_seconds),
+                    text=self.rng.choice(COMMENT_TEXT),
+                    video_reply=f'comment_videos/{self.prefix}/{session.id}-{len(rows)}.mp4' if with_video else None,
+                    legacy_text_only=not with_video,
+                    processing_status=Session.STATUS_READY,
+                ))
+                delay = timedelta(hours=self.rng.expovariate(1 / 18))
+                stamps.append(min(self.now, session.created_at + delay))
+                coach_comments.append(user.id == session.space.owner_id)
+
+            if len(rows) >= self.batch_size:
+                self._flush_comments(rows, stamps, coach_comments)
+                rows, stamps, coach_comments = [], [], []
+        self._flush_comments(rows, stamps, coach_comments)
+        self.log(f"{self.counts.get('Comment', 0)} comments")
+
+    def _flush_comments(self, rows, stamps, coach_comments):
+        if not rows:
+            return
+        created = self._bulk(Comment, rows)
+        _backdate(Comment, ['created_at'], {comment.id: stamp for comment, stamp in zip(created, stamps)}, 500)
+        if not self.coach_metrics:
+            return
+        self._bulk(CoachEvent, [
+            CoachEvent(user_id=comment.user_id, event_type=CoachEvent.EVENT_VIDEO_FEEDBACK_COMPLETED
+                       if comment.video_reply else CoachEvent.EVENT_FEEDBACK_COMPLETED,
+                       occurred_at=stamp, session_id=comment.session_id, space_id=comment.session.space_id)
+            for comment, stamp, by_coach in zip(created, stamps, coach_comments) if by_coach
+        ])
+
+    def _last_seen(self, sessions, members):
+        rows = []
+        for session in sessions:
+            viewers = members[session.space_id][:20]
+            for user in self.rng.sample(viewers, min(len(viewers), self.rng.randint(0, 3))):
+                rows.append(SessionLastSeen(session=session, user=user))
+        self._bulk(SessionLastSeen, rows)
+
+    def _coach_metrics(self, coaches, days):
+        today = self.now.date()
+        rows = []
+        for coach in coaches:
+            for offset in range(days):
+                values = compute_daily_metric_for_coach(
+                    coach_id=coach.id, as_of_date=today - timedelta(days=offset), minutes_saved_per_comment=20,
+                )
+                values.pop('coach_id')
+                rows.append(CoachDailyMetric(coach=coach, **values))
+        self._bulk(CoachDailyMetric, rows)
+
+
+def row_estimate(scale):
+    """Approximate row counts for a scale, printed before generating."""
+    spaces = scale['coaches'] * scale['spaces_per_coach']
+    sessions = spaces * scale['sessions_per_space']
+    return {
+        'users': scale['coaches'] + scale['students'],
+        'spaces': spaces,
+        'memberships': spaces * min(scale['members_per_space'], scale['students']),
+        'sessions': sessions,
+        'comments': sessions * scale['comments_per_session'] + scale['coaches'] * scale['max_comments'],
+    }
@@ -0,0 +1,84 @@
+from django.db import transaction
+
+from videos.models import (
+    Chapter, ChapterSuggestion, CoachEvent, Comment, CommentAsset, InviteCode, MediaJob,
+    MultipartCommentUpload, MultipartSessionUpload, ProcessingCallbackEvent, ResumableSessionUpload,
+    Session, SessionAsset, SessionLastSeen, Space, SpaceMember,
+)
+from videos.services.jobs import enqueue_storage_cleanup
+from videos.services.storage_cleanup import comment_output_prefix, session_output_prefix
+
+
+def _delete_rows(queryset):
+    """
+    One DELETE statement, without the collector loading rows to look for
+    cascades. Callers delete dependants first; every reverse relation of the
+    models removed here is handled below (see test_deletion).
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def _comment_storage(comment_ids):
+    keys = [key for key in Comment.objects.filter(pk__in=comment_ids).values_list('video_reply', flat=True) if key]
+    keys += CommentAsset.objects.filter(comment_id__in=comment_ids).values_list('object_key', flat=True)
+    return keys, [comment_output_prefix(comment_id) for comment_id in comment_ids]
+
+
+def _delete_comment_rows(comment_ids):
+    MultipartCommentUpload.objects.filter(comment_id__in=comment_ids).update(comment=None)
+    _delete_rows(MediaJob.objects.filter(comment_id__in=comment_ids))
+    _delete_rows(CommentAsset.objects.filter(comment_id__in=comment_ids))
+    return _delete_rows(Comment.objects.filter(pk__in=comment_ids))
+
+
+def delete_comments(comment_ids):
+    """Delete comments with set-based deletes and queue their reply videos for removal."""
+    comment_ids = list(comment_ids)
+    if not comment_ids:
+        return 0
+    keys, prefixes = _comment_storage(comment_ids)
+    with transaction.atomic():
+        deleted = _delete_comment_rows(comment_ids)
+        enqueue_storage_cleanup(keys, prefixes)
+    return deleted
+
+
+def delete_sessions(session_ids):
+    """
+    Delete sessions and everything hanging off them in a fixed number of
+    statements, then queue the originals, processed outputs and reply videos
+    for background removal. Returns the number of sessions deleted.
+    """
+    session_ids = list(session_ids)
+    if not session_ids:
+        return 0
+    comment_ids = list(Comment.objects.filter(session_id__in=session_ids).values_list('pk', flat=True))
+    keys, prefixes = _comment_storage(comment_ids)
+    keys += [key for key in Session.objects.filter(pk__in=session_ids).values_list('video_file', flat=True) if key]
+    keys += SessionAsset.objects.filter(session_id__in=session_ids).values_list('object_key', flat=True)
+    prefixes += [session_output_prefix(session_id) for session_id in session_ids]
+
+    with transaction.atomic():
+        Space.objects.filter(main_session_id__in=session_ids).update(main_session=None)
+        for model in (MultipartSessionUpload, ResumableSessionUpload, CoachEvent):
+            model.objects.filter(session_id__in=session_ids).update(session=None)
+        _delete_comment_rows(comment_ids)
+        for model in (
+            MultipartCommentUpload, SessionAsset, Chapter, ChapterSuggestion,
+            SessionLastSeen, ProcessingCallbackEvent, MediaJob,
+        ):
+            _delete_rows(model.objects.filter(session_id__in=session_ids))
+        _delete_rows(Session.tags.through.objects.filter(session_id__in=session_ids))
+        deleted = _delete_rows(Session.objects.filter(pk__in=session_ids))
+        enqueue_storage_cleanup(keys, prefixes)
+    return deleted
+
+
+@transaction.atomic
+def delete_space(space):
+    """Delete a space; its sessions stay with their owners, detached from the space."""
+    for model in (Session, MultipartSessionUpload, ResumableSessionUpload, CoachEvent):
+        model.objects.filter(space=space).update(space=None)
+    _delete_rows(SpaceMember.objects.filter(space=space))
+    _delete_rows(InviteCode.objects.filter(space=space))
+    return _delete_rows(Space.objects.filter(pk=space.pk))
@@ -0,0 +1,131 @@
+"""
+Dependency probes behind the health endpoints.
+
+Each probe is timed and its result kept in process memory for
+HEALTH_PROBE_CACHE_SECONDS, so a load balancer polling every second costs
+each worker one round of probes per window instead of one per request.
+Results live in memory rather than the cache because the cache is probed too.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+
+from videos.models import MediaJob
+from videos.services.storage_cleanup import uses_s3
+
+OK = 'ok'
+DEGRADED = 'degraded'
+FAILED = 'failed'
+
+# Readiness fails only on these; the rest report degraded.
+CRITICAL = ('database', 'storage')
+CACHE_KEY = 'health:probe'
+
+logger = logging.getLogger(__name__)
+
+_results = {}
+_lock = threading.Lock()
+
+
+def _probe_database():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return {'status': OK}
+
+
+def _probe_cache():
+    # django-redis runs with IGNORE_EXCEPTIONS, so an outage shows up as a miss, not an error.
+    token = f'{os.getpid()}:{time.monotonic()}'
+    cache.set(CACHE_KEY, token, 30)
+    if cache.get(CACHE_KEY) != token:
+        return {'status': FAILED, 'detail': 'cache did not return the value just written'}
+    return {'status': OK}
+
+
+def _probe_storage():
+    if uses_s3():
+        bucket = getattr(default_storage, 'bucket_name', '') or settings.AWS_STORAGE_BUCKET_NAME
+        client = boto3.client(
+            's3',
+            region_name=getattr(settings, 'AWS_S3_REGION_NAME', None),
+            config=Config(connect_timeout=2, read_timeout=2, retries={'max_attempts': 1}),
+        )
+        client.head_bucket(Bucket=bucket)
+        return {'status': OK}
+    root = default_storage.path('')
+    if not os.path.isdir(root) or not os.access(root, os.W_OK):
+        return {'status': FAILED, 'detail': 'media directory is missing or not writable'}
+    return {'status': OK}
+
+
+def _probe_backlog():
+    now = timezone.now()
+    queued = MediaJob.objects.filter(status=MediaJob.STATUS_QUEUED)
+    oldest = queued.filter(available_at__lte=now).order_by('available_at').values_list('available_at', flat=True).first()
+    waiting = int((now - oldest).total_seconds()) if oldest else 0
+    limit = int(getattr(settings, 'HEALTH_BACKLOG_MAX_WAIT_SECONDS', 1800))
+    return {
+        'status': DEGRADED if waiting > limit else OK,
+        'queued': queued.count(),
+        'oldest_wait_seconds': waiting,
+    }
+
+
+PROBES = {
+    'database': _probe_database,
+    'cache': _probe_cache,
+    'storage': _probe_storage,
+    'backlog': _probe_backlog,
+}
+
+
+def probe(name):
+    """Run one probe, or return its result from the last HEALTH_PROBE_CACHE_SECONDS."""
+    max_age = float(getattr(settings, 'HEALTH_PROBE_CACHE_SECONDS', 5))
+    with _lock:
+        cached = _results.get(name)
+    if cached and time.monotonic() - cached[0] < max_age:
+        return cached[1]
+
+    started = time.perf_counter()
+    try:
+        result = PROBES[name]()
+    except Exception as exc:  # a probe reports failures, it never raises
+        logger.warning('Health probe %s failed', name, exc_info=True)
+        result = {'status': FAILED, 'detail': f'{type(exc).__name__}: {exc}'[:300]}
+    result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    result['checked_at'] = timezone.now().isoformat()
+    with _lock:
+        _results[name] = (time.monotonic(), result)
+    return result
+
+
+def check(names=None):
+    """Return (overall status, {probe: result}) for `names` (all probes by default)."""
+    names = list(names or PROBES)
+    results = {name: probe(name) for name in names}
+    if any(results[name]['status'] == FAILED for name in names if name in CRITICAL):
+        return FAILED, results
+    if any(result['status'] != OK for result in results.values()):
+        return DEGRADED, results
+    return OK, results
+
+
+def redacted(results):
+    """Results without failure details (bucket names, connection strings) for anonymous callers."""
+    return {name: {key: value for key, value in result.items() if key != 'detail'} for name, result in results.items()}
+
+
+def clear():
+    with _lock:
+        _results.clear()
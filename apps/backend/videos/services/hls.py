@@ -0,0 +1,132 @@
+import logging
+import posixpath
+import re
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+from videos.services.signed_urls import signed_urls, signing_window_seconds
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'practica.hls-manifest'
+URI_ATTR_RE = re.compile(r'URI="([^"]+)"')
+PLAYLIST_CONTENT_TYPE = 'application/vnd.apple.mpegurl'
+
+
+def hls_proxy_enabled():
+    return bool(getattr(settings, 'AWS_STORAGE_BUCKET_NAME', '') and getattr(settings, 'AWS_QUERYSTRING_AUTH', True))
+
+
+def _bucket(now=None):
+    now = time.time() if now is None else now
+    return int(now // signing_window_seconds())
+
+
+def manifest_token(session_id, now=None):
+    """Playlist access token, stable within one signing window so rewritten playlists stay cacheable."""
+    return signing.Signer(salt=TOKEN_SALT).sign(f"{session_id}.{_bucket(now)}")
+
+
+def manifest_token_valid(token, session_id, now=None):
+    try:
+        value = signing.Signer(salt=TOKEN_SALT).unsign(token or '')
+        token_session, token_bucket = value.split('.', 1)
+        token_bucket = int(token_bucket)
+    except (signing.BadSignature, ValueError):
+        return False
+    return token_session == str(session_id) and 0 <= _bucket(now) - token_bucket <= 1
+
+
+def manifest_proxy_path(session_id, manifest_name):
+    return f"/api/sessions/{session_id}/hls/{quote(manifest_name)}/"
+
+
+def resolve_manifest_key(master_key, manifest_path):
+    """Object key for a playlist path relative to the master's directory, or '' if it escapes it."""
+    base_dir = posixpath.dirname(master_key)
+    key = posixpath.normpath(posixpath.join(base_dir, manifest_path))
+    if not key.startswith(f"{base_dir}/") or not key.endswith('.m3u8'):
+        return ''
+    return key
+
+
+def fetch_playlist(object_key):
+    """Raw playlist text, cached; VOD playlists never change once MediaConvert writes them."""
+    cache_key = f"hls-playlist:v1:{object_key}"
+    text = cache.get(cache_key)
+    if text is not None:
+        return text
+    with default_storage.open(object_key, 'rb') as fh:
+        text = fh.read().decode('utf-8')
+    cache.set(cache_key, text, timeout=int(getattr(settings, 'HLS_PLAYLIST_CACHE_SECONDS', 3600)))
+    return text
+
+
+def _resolve(base_dir, uri):
+    if '://' in uri or uri.startswith('/'):
+        return None
+    return posixpath.normpath(posixpath.join(base_dir, uri.split('?', 1)[0]))
+
+
+def rewrite_playlist(text, object_key, session_id, master_key, token, now=None):
+    """
+    Point child playlists back at the proxy and every segment/init/key URI at a
+    signed storage URL. All segment keys are signed with a single bulk lookup.
+    """
+    base_dir = posixpath.dirname(object_key)
+    master_dir = posixpath.dirname(master_key)
+    lines = text.splitlines()
+
+    segment_keys = []
+    for line in lines:
+        stripped = line.strip()
+        uris = URI_ATTR_RE.findall(stripped) if stripped.startswith('#') else ([stripped] if stripped else [])
+        for uri in uris:
+            key = _resolve(base_dir, uri)
+            if key and not key.endswith('.m3u8'):
+                segment_keys.append(key)
+    segment_urls = signed_urls(segment_keys, now=now)
+
+    def rewrite_uri(uri):
+        key = _resolve(base_dir, uri)
+        if not key:
+            return uri
+        if key.endswith('.m3u8'):
+            relative = posixpath.relpath(key, master_dir)
+            return f"{manifest_proxy_path(session_id, relative)}?token={quote(token)}"
+        return segment_urls.get(key) or uri
+
+    out = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            out.append(line)
+        elif stripped.startswith('#'):
+            out.append(URI_ATTR_RE.sub(lambda m: f'URI="{rewrite_uri(m.group(1))}"', line))
+        else:
+            out.append(rewrite_uri(stripped))
+    return '\n'.join(out) + '\n'
+
+
+def signed_playlist(object_key, session_id, master_key, now=None):
+    """
+    Rewritten playlist plus its remaining cache lifetime in seconds.
+    Output is cached per signing window; URLs inside stay valid well past that.
+    """
+    now = time.time() if now is None else now
+    window = signing_window_seconds()
+    bucket = int(now // window)
+    remaining = max(1, int((bucket + 1) * window - now))
+
+    cache_key = f"hls-signed:v1:{bucket}:{object_key}"
+    body = cache.get(cache_key)
+    if body is None:
+        token = manifest_token(session_id, now=now)
+        body = rewrite_playlist(fetch_playlist(object_key), object_key, session_id, master_key, token, now=now)
+        cache.set(cache_key, body, timeout=remaining)
+    return body, remaining
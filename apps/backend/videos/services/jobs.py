@@ -0,0 +1,314 @@
+import logging
+import random
+import time
+from datetime import timedelta
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from videos.models import MediaJob, Session
+from videos.services.audio_analysis import build_chapter_suggestions
+from videos.services.keyframes import build_keyframe_index
+from videos.services.media_pipeline import (
+    SubmissionThrottled, enqueue_comment_processing, enqueue_session_processing,
+)
+from videos.services.mp4 import Mp4Error
+from videos.services.storage_cleanup import DELETE_BATCH, StorageCleanupError, delete_storage_objects
+from videos.services.waveform import build_waveform_peaks
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first.
+PRIORITY_MAIN_SESSION = 0
+PRIORITY_SHORT = 10
+PRIORITY_DEFAULT = 20
+PRIORITY_BACKFILL = 30  # bulk imports wait behind everything users are waiting on
+
+BUCKET_KEY = 'mediaconvert-submit:bucket'
+BUCKET_LOCK_KEY = 'mediaconvert-submit:lock'
+
+
+def session_priority(session):
+    """Space main sessions first, then short takes, then everything else."""
+    if session.space_id and session.space.main_session_id == session.id:
+        return PRIORITY_MAIN_SESSION
+    short_seconds = int(getattr(settings, 'MEDIA_JOB_SHORT_SESSION_SECONDS', 300))
+    if session.duration_seconds is not None and session.duration_seconds <= short_seconds:
+        return PRIORITY_SHORT
+    return PRIORITY_DEFAULT
+
+
+def _enqueue(kind, priority, **target):
+    job = MediaJob.objects.filter(kind=kind, status=MediaJob.STATUS_QUEUED, **target).first()
+    if job is not None:
+        return job
+    return MediaJob.objects.create(kind=kind, priority=priority, **target)
+
+
+def enqueue_session_job(session):
+    return _enqueue(MediaJob.KIND_SESSION_PROCESSING, session_priority(session), session=session)
+
+
+def enqueue_comment_job(comment):
+    # Reply clips are short by nature.
+    return _enqueue(MediaJob.KIND_COMMENT_PROCESSING, PRIORITY_SHORT, comment=comment)
+
+
+def enqueue_analysis_jobs(kind, sessions):
+    """Queue derived-asset jobs (keyframes, waveform) for sessions whose media just became available."""
+    sessions = list(sessions)
+    queued = set(
+        MediaJob.objects.filter(kind=kind, status=MediaJob.STATUS_QUEUED, session__in=sessions)
+        .values_list('session_id', flat=True)
+    )
+    return MediaJob.objects.bulk_create([
+        MediaJob(kind=kind, session=session, priority=PRIORITY_DEFAULT)
+        for session in sessions
+        if session.id not in queued
+    ])
+
+
+def enqueue_keyframe_jobs(sessions):
+    return enqueue_analysis_jobs(MediaJob.KIND_KEYFRAME_INDEX, sessions)
+
+
+def enqueue_waveform_jobs(sessions):
+    return enqueue_analysis_jobs(MediaJob.KIND_WAVEFORM_PEAKS, sessions)
+
+
+def enqueue_chapter_suggestion_jobs(sessions):
+    return enqueue_analysis_jobs(MediaJob.KIND_CHAPTER_SUGGESTIONS, sessions)
+
+
+def enqueue_storage_cleanup(keys=(), prefixes=()):
+    """Queue deletion of stored objects, one job per DeleteObjects batch of keys."""
+    keys = sorted(set(keys))
+    prefixes = sorted(set(prefixes))
+    if not keys and not prefixes:
+        return []
+    batches = [keys[start:start + DELETE_BATCH] for start in range(0, len(keys), DELETE_BATCH)] or [[]]
+    return MediaJob.objects.bulk_create([
+        MediaJob(
+            kind=MediaJob.KIND_STORAGE_CLEANUP,
+            priority=PRIORITY_DEFAULT,
+            payload={'keys': batch, 'prefixes': prefixes if index == 0 else []},
+        )
+        for index, batch in enumerate(batches)
+    ])
+
+
+def _bucket_settings():
+    rate = float(getattr(settings, 'MEDIACONVERT_SUBMIT_RATE', 1.0))
+    burst = max(1, int(getattr(settings, 'MEDIACONVERT_SUBMIT_BURST', 5)))
+    return rate, burst
+
+
+def take_submission_token(now=None):
+    """
+    Token bucket shared through the cache so every web/worker process respects
+    the account's CreateJob rate. Returns False when the bucket is empty.
+    """
+    rate, burst = _bucket_settings()
+    if rate <= 0:
+        return True
+    now = time.time() if now is None else now
+    if not cache.add(BUCKET_LOCK_KEY, 1, timeout=5):
+        return False
+    try:
+        tokens, stamp = cache.get(BUCKET_KEY) or (float(burst), now)
+        tokens = min(float(burst), tokens + max(0.0, now - stamp) * rate)
+        allowed = tokens >= 1
+        cache.set(BUCKET_KEY, (tokens - 1 if allowed else tokens, now), timeout=None)
+        return allowed
+    finally:
+        cache.delete(BUCKET_LOCK_KEY)
+
+
+def drain_submission_tokens(now=None):
+    """Empty the bucket after a throttle response so other processes back off too."""
+    cache.set(BUCKET_KEY, (0.0, time.time() if now is None else now), timeout=None)
+
+
+class RetryLater(Exception):
+    """Raised by a handler whose failure is transient; the job is requeued with backoff."""
+
+
+def _retry_delay(attempts):
+    base = float(getattr(settings, 'MEDIA_JOB_RETRY_BASE_SECONDS', 5))
+    cap = float(getattr(settings, 'MEDIA_JOB_RETRY_MAX_SECONDS', 300))
+    delay = min(cap, base * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _submit_session(job):
+    return enqueue_session_processing(job.session)
+
+
+def _submit_comment(job):
+    return enqueue_comment_processing(job.comment)
+
+
+def _index_keyframes(job):
+    try:
+        build_keyframe_index(job.session)
+    except (Mp4Error, ValueError, OSError, BotoCoreError, ClientError) as exc:
+        logger.warning('Keyframe index failed for session_id=%s: %s', job.session_id, exc)
+        return False, str(exc), ''
+    return True, '', ''
+
+
+def _waveform_peaks(job):
+    try:
+        build_waveform_peaks(job.session)
+    except (ValueError, OSError, BotoCoreError, ClientError) as exc:
+        logger.warning('Waveform peaks failed for session_id=%s: %s', job.session_id, exc)
+        return False, str(exc), ''
+    return True, '', ''
+
+
+def _chapter_suggestions(job):
+    try:
+        build_chapter_suggestions(job.session)
+    except (ValueError, OSError, BotoCoreError, ClientError) as exc:
+        logger.warning('Chapter suggestions failed for session_id=%s: %s', job.session_id, exc)
+        return False, str(exc), ''
+    return True, '', ''
+
+
+def _storage_cleanup(job):
+    payload = job.payload or {}
+    try:
+        deleted = delete_storage_objects(payload.get('keys') or [], payload.get('prefixes') or [])
+    except (StorageCleanupError, OSError, BotoCoreError, ClientError) as exc:
+        # The rows are already gone, so giving up would leak the objects; deletes are safe to repeat.
+        logger.warning('Storage cleanup job_id=%s failed (attempt %s): %s', job.id, job.attempts, exc)
+        raise RetryLater(str(exc)) from exc
+    logger.info('Storage cleanup job_id=%s deleted %s object(s)', job.id, deleted)
+    return True, '', ''
+
+
+HANDLERS = {
+    MediaJob.KIND_SESSION_PROCESSING: _submit_session,
+    MediaJob.KIND_COMMENT_PROCESSING: _submit_comment,
+    MediaJob.KIND_KEYFRAME_INDEX: _index_keyframes,
+    MediaJob.KIND_WAVEFORM_PEAKS: _waveform_peaks,
+    MediaJob.KIND_CHAPTER_SUGGESTIONS: _chapter_suggestions,
+    MediaJob.KIND_STORAGE_CLEANUP: _storage_cleanup,
+}
+# Kinds that call CreateJob and therefore draw from the token bucket.
+RATE_LIMITED_KINDS = {MediaJob.KIND_SESSION_PROCESSING, MediaJob.KIND_COMMENT_PROCESSING}
+
+
+def _mark_target_failed(job, error):
+    if job.kind not in RATE_LIMITED_KINDS:
+        # Derived assets are optional; playback works without them.
+        return
+    target = job.session if job.session_id else job.comment
+    if target is None:
+        return
+    target.processing_status = Session.STATUS_FAILED
+    target.processing_error = error[:2000]
+    update_fields = ['processing_status', 'processing_error']
+    if isinstance(target, Session):
+        update_fields.append('updated_at')
+    target.save(update_fields=update_fields)
+
+
+def _back_off(job, now, error, failure=None):
+    """Requeue a job with exponential backoff, or fail it once it is out of attempts."""
+    max_attempts = int(getattr(settings, 'MEDIA_JOB_MAX_ATTEMPTS', 8))
+    job.last_error = error[:2000]
+    if job.attempts >= max_attempts:
+        job.status = MediaJob.STATUS_FAILED
+        _mark_target_failed(job, failure or job.last_error)
+    else:
+        job.status = MediaJob.STATUS_QUEUED
+        job.available_at = now + timedelta(seconds=_retry_delay(job.attempts))
+    job.save(update_fields=['status', 'available_at', 'last_error', 'updated_at'])
+    return False
+
+
+def _run(job, now):
+    """Run a claimed job outside any transaction and record its outcome."""
+    try:
+        queued, error, external_id = HANDLERS[job.kind](job)
+    except SubmissionThrottled as exc:
+        drain_submission_tokens()
+        return _back_off(job, now, str(exc), f'MediaConvert throttled {job.attempts} submissions: {exc}')
+    except RetryLater as exc:
+        return _back_off(job, now, str(exc))
+    except Exception as exc:
+        # Malformed media, integrity errors, NumPy... must not wedge the queue or kill the worker.
+        logger.error('Media job_id=%s kind=%s failed unexpectedly', job.id, job.kind, exc_info=True)
+        return _back_off(job, now, f'{type(exc).__name__}: {exc}')
+
+    if queued:
+        job.status = MediaJob.STATUS_SUBMITTED
+        job.external_id = external_id
+        job.last_error = ''
+    else:
+        job.status = MediaJob.STATUS_FAILED
+        job.last_error = (error or 'Failed to enqueue media processing')[:2000]
+        _mark_target_failed(job, job.last_error)
+    job.save(update_fields=['status', 'external_id', 'last_error', 'updated_at'])
+    return queued
+
+
+def _claim(now, kinds=None, exclude_rate_limited=False):
+    """
+    Mark the next due job running and bump its attempts, in a transaction that
+    only lasts as long as the claim. Returns (job, out_of_tokens).
+    """
+    stale = now - timedelta(seconds=int(getattr(settings, 'MEDIA_JOB_RUNNING_TIMEOUT_SECONDS', 1800)))
+    with transaction.atomic():
+        due = MediaJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status=MediaJob.STATUS_QUEUED, available_at__lte=now)
+            | Q(status=MediaJob.STATUS_RUNNING, updated_at__lte=stale)
+        )
+        if kinds:
+            due = due.filter(kind__in=kinds)
+        if exclude_rate_limited:
+            due = due.exclude(kind__in=RATE_LIMITED_KINDS)
+        job = due.order_by('priority', 'available_at', 'id').first()
+        if job is None:
+            return None, False
+        if job.kind in RATE_LIMITED_KINDS and not take_submission_token():
+            return None, True
+        job.status = MediaJob.STATUS_RUNNING
+        job.attempts += 1
+        job.save(update_fields=['status', 'attempts', 'updated_at'])
+    return job, False
+
+
+def dispatch_media_jobs(limit=None, now=None, kinds=None):
+    """
+    Run due jobs in priority order while the token bucket allows it.
+    Throttled submissions, transient failures and unexpected errors are
+    rescheduled with backoff until MEDIA_JOB_MAX_ATTEMPTS. Returns the number of jobs that
+    ran successfully.
+    """
+    submitted = 0
+    attempted = 0
+    throttled = False
+    while limit is None or attempted < limit:
+        current = now or timezone.now()
+        job, out_of_tokens = _claim(current, kinds, exclude_rate_limited=throttled)
+        if out_of_tokens:
+            # Out of tokens; keep draining work that doesn't call MediaConvert.
+            throttled = True
+            continue
+        if job is None:
+            break
+        attempted += 1
+        if _run(job, current):
+            submitted += 1
+    return submitted
+
+
+def pending_media_jobs():
+    return MediaJob.objects.filter(status=MediaJob.STATUS_QUEUED)
+
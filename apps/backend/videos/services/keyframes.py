@@ -0,0 +1,167 @@
+import bisect
+import logging
+import posixpath
+import struct
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from videos.models import Chapter, SessionAsset
+from videos.services.hls import fetch_playlist
+from videos.services.mp4 import keyframe_index
+from videos.services.ranged_reads import RangeReader
+from videos.services.storage_cleanup import session_output_prefix
+
+logger = logging.getLogger(__name__)
+
+# Layout: magic, version, track count; per track: name length + name, unit,
+# entry count, then (milliseconds u32, offset u64) pairs, all little-endian.
+MAGIC = b'PKFI'
+VERSION = 1
+UNIT_BYTE = 0
+UNIT_SEGMENT = 1
+PROXY_TRACK = 'proxy'
+CONTENT_TYPE = 'application/vnd.practica.keyframes'
+CACHE_SECONDS = 24 * 3600
+
+
+def pack_index(tracks):
+    """tracks: [(name, unit, [(seconds, offset), ...]), ...] -> bytes."""
+    out = [struct.pack('<4sBB', MAGIC, VERSION, len(tracks))]
+    for name, unit, entries in tracks:
+        encoded = name.encode('utf-8')[:255]
+        out.append(struct.pack('<B', len(encoded)) + encoded + struct.pack('<BI', unit, len(entries)))
+        out.append(b''.join(struct.pack('<IQ', int(round(seconds * 1000)), offset) for seconds, offset in entries))
+    return b''.join(out)
+
+
+def unpack_index(blob):
+    """bytes -> {name: {'unit': int, 'entries': [(seconds, offset), ...]}}."""
+    magic, version, track_count = struct.unpack_from('<4sBB', blob, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Unsupported keyframe index')
+    offset = 6
+    tracks = {}
+    for _ in range(track_count):
+        name_len = blob[offset]
+        name = blob[offset + 1:offset + 1 + name_len].decode('utf-8')
+        offset += 1 + name_len
+        unit, count = struct.unpack_from('<BI', blob, offset)
+        offset += 5
+        entries = [
+            (millis / 1000, position)
+            for millis, position in struct.iter_unpack('<IQ', blob[offset:offset + count * 12])
+        ]
+        offset += count * 12
+        tracks[name] = {'unit': unit, 'entries': entries}
+    return tracks
+
+
+def snap(entries, seconds):
+    """Latest keyframe at or before `seconds`, as (seconds, offset); None without entries."""
+    if not entries:
+        return None
+    pos = bisect.bisect_right([entry[0] for entry in entries], seconds + 1e-6) - 1
+    return entries[max(pos, 0)]
+
+
+def _segment_tracks(master_key):
+    """Segment start times per HLS rendition; MediaConvert starts every segment on a keyframe."""
+    base_dir = posixpath.dirname(master_key)
+    tracks = []
+    for line in fetch_playlist(master_key).splitlines():
+        line = line.strip()
+        if not line or line.startswith('#') or '://' in line or not line.endswith('.m3u8'):
+            continue
+        rendition_key = posixpath.normpath(posixpath.join(base_dir, line))
+        entries = []
+        elapsed = 0.0
+        sequence = 0
+        duration = None
+        for row in fetch_playlist(rendition_key).splitlines():
+            row = row.strip()
+            if row.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+                sequence = int(row.split(':', 1)[1] or 0)
+            elif row.startswith('#EXTINF:'):
+                duration = float(row.split(':', 1)[1].split(',', 1)[0] or 0)
+            elif row and not row.startswith('#') and duration is not None:
+                entries.append((elapsed, sequence))
+                elapsed += duration
+                sequence += 1
+                duration = None
+        tracks.append((line, UNIT_SEGMENT, entries))
+    return tracks
+
+
+def _index_key(session):
+    """Keyed by session so originals served as the proxy never share an index."""
+    return f"{session_output_prefix(session.id)}keyframes/index.bin"
+
+
+def build_keyframe_index(session):
+    """Index the proxy (and HLS renditions when present), store it, and snap the session's chapters."""
+    proxy = session.assets.filter(asset_type=SessionAsset.TYPE_PROXY_MP4).first()
+    if proxy is None:
+        raise ValueError('Session has no proxy to index')
+
+    tracks = [(PROXY_TRACK, UNIT_BYTE, keyframe_index(RangeReader(proxy.object_key)))]
+    master = session.assets.filter(asset_type=SessionAsset.TYPE_HLS_MASTER).first()
+    if master is not None:
+        try:
+            tracks.extend(_segment_tracks(master.object_key))
+        except (OSError, UnicodeDecodeError, ValueError, BotoCoreError, ClientError):
+            logger.warning('Skipping HLS keyframes for session_id=%s', session.id, exc_info=True)
+
+    blob = pack_index(tracks)
+    key = _index_key(session)
+    if default_storage.exists(key):
+        default_storage.delete(key)
+    key = default_storage.save(key, ContentFile(blob))
+    cache.set(f"keyframe-index:v1:{key}", blob, timeout=CACHE_SECONDS)
+
+    asset, _ = SessionAsset.objects.update_or_create(
+        session=session,
+        asset_type=SessionAsset.TYPE_KEYFRAME_INDEX,
+        defaults={
+            'object_key': key,
+            'content_type': CONTENT_TYPE,
+            'metadata_json': {
+                'format': f'pkfi{VERSION}',
+                'tracks': [{'name': name, 'unit': unit, 'count': len(entries)} for name, unit, entries in tracks],
+            },
+        },
+    )
+    snap_chapters(session, index=unpack_index(blob))
+    return asset
+
+
+def load_keyframe_index(session):
+    asset = session.assets.filter(asset_type=SessionAsset.TYPE_KEYFRAME_INDEX).first()
+    if asset is None:
+        return None
+    cache_key = f"keyframe-index:v1:{asset.object_key}"
+    blob = cache.get(cache_key)
+    if blob is None:
+        try:
+            with default_storage.open(asset.object_key, 'rb') as fh:
+                blob = fh.read()
+        except (OSError, BotoCoreError, ClientError):
+            logger.warning('Could not read keyframe index key=%s', asset.object_key)
+            return None
+        cache.set(cache_key, blob, timeout=CACHE_SECONDS)
+    return unpack_index(blob)
+
+
+def snap_chapters(session, chapters=None, index=None):
+    """Store the proxy keyframe at or before each chapter start so playback needs one range request."""
+    index = index if index is not None else load_keyframe_index(session)
+    entries = (index or {}).get(PROXY_TRACK, {}).get('entries')
+    if not entries:
+        return 0
+    chapters = list(chapters) if chapters is not None else list(session.chapters.all())
+    for chapter in chapters:
+        chapter.keyframe_seconds, chapter.keyframe_byte_offset = snap(entries, chapter.timestamp_seconds)
+    Chapter.objects.bulk_update(chapters, ['keyframe_seconds', 'keyframe_byte_offset'])
+    return len(chapters)
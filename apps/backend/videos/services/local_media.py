@@ -0,0 +1,135 @@
+import posixpath
+import re
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+
+from videos.models import Comment, CommentAsset, Session, SessionAsset
+from videos.services.signed_urls import signing_window_seconds
+
+TOKEN_SALT = 'practica.local-media'
+PROCESSED_RE = re.compile(r'^processed/(sessions|comments)/(\d+)/')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def local_media_enabled():
+    """True when default_storage is a filesystem the app (or its front proxy) can read."""
+    try:
+        default_storage.path('')
+    except NotImplementedError:
+        return False
+    return True
+
+
+def _bucket(now=None):
+    now = time.time() if now is None else now
+    return int(now // signing_window_seconds())
+
+
+def media_token(object_key, now=None):
+    """Signature over key and expiry bucket; accepted for the rest of this bucket and all of the next."""
+    return signing.Signer(salt=TOKEN_SALT).sign(f"{object_key}|{_bucket(now)}").rsplit(':', 1)[1]
+
+
+def media_token_valid(token, object_key, now=None):
+    if not token:
+        return False
+    signer = signing.Signer(salt=TOKEN_SALT)
+    current = _bucket(now)
+    for bucket in (current, current - 1):
+        try:
+            signer.unsign(f"{object_key}|{bucket}:{token}")
+            return True
+        except signing.BadSignature:
+            continue
+    return False
+
+
+def local_media_url(object_key, now=None):
+    """MEDIA_URL path for a stored key with an access token valid for one to two signing windows."""
+    return f"{settings.MEDIA_URL}{quote(object_key)}?token={media_token(object_key, now=now)}"
+
+
+def clean_key(raw_key):
+    """Normalised object key, or '' when it is absolute or climbs out of MEDIA_ROOT."""
+    key = posixpath.normpath(str(raw_key or '').lstrip('/'))
+    if key in ('', '.') or key.startswith('..') or '\x00' in key:
+        return ''
+    return key
+
+
+def session_for_key(object_key):
+    """The session whose visibility governs access to a stored object, or None."""
+    match = PROCESSED_RE.match(object_key)
+    if match:
+        kind, object_id = match.groups()
+        if kind == 'sessions':
+            return Session.objects.filter(pk=object_id).first()
+        comment = Comment.objects.select_related('session').filter(pk=object_id).first()
+        return comment.session if comment else None
+
+    session = Session.objects.filter(video_file=object_key).first()
+    if session:
+        return session
+    asset = SessionAsset.objects.select_related('session').filter(object_key=object_key).first()
+    if asset:
+        return asset.session
+    comment = Comment.objects.select_related('session').filter(video_reply=object_key).first()
+    if comment:
+        return comment.session
+    comment_asset = CommentAsset.objects.select_related('comment__session').filter(object_key=object_key).first()
+    return comment_asset.comment.session if comment_asset else None
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single `bytes=` range, None to serve the whole
+    file (no header, or several ranges), or raise ValueError when unsatisfiable.
+    """
+    header = (header or '').strip()
+    if not header or ',' in header:
+        return None
+    match = RANGE_RE.match(header)
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+class RangeFile:
+    """
+    A read-limited view of an open file positioned at the range start.
+    fileno() is exposed so gunicorn's wsgi.file_wrapper can os.sendfile()
+    exactly Content-Length bytes from the current offset.
+    """
+
+    def __init__(self, fh, start, length):
+        self._fh = fh
+        self._remaining = length
+        fh.seek(start)
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        size = self._remaining if size is None or size < 0 else min(size, self._remaining)
+        data = self._fh.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._fh.close()
@@ -0,0 +1,172 @@
+import hashlib
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from videos.models import (
+    Comment, CommentAsset, MultipartCommentUpload, MultipartSessionUpload, Session, SessionAsset,
+)
+from videos.services.storage_cleanup import (
+    DELETE_BATCH, _s3_client, comment_output_prefix, delete_s3_batches, referenced_keys, session_output_prefix, uses_s3,
+)
+
+ITERATOR_CHUNK = 5000
+
+
+def _digest(key):
+    # 8 bytes per key instead of a full str; a collision can only keep an orphan.
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+
+
+def output_roots():
+    return [session_output_prefix('').rstrip('/') + '/', comment_output_prefix('').rstrip('/') + '/']
+
+
+def scan_prefixes():
+    """Storage prefixes uploads and pipeline outputs are written under."""
+    roots = ['sessions/', 'comment_videos/', 'processed/', *output_roots()]
+    # Drop prefixes nested inside another one so nothing is listed twice.
+    return [
+        root for root in sorted(set(roots))
+        if not any(root != other and root.startswith(other) for other in roots)
+    ]
+
+
+def output_dir(key, roots=None):
+    """processed/sessions/<id>/ for any object written under it, else ''."""
+    for root in roots or output_roots():
+        if key.startswith(root):
+            head, sep, _ = key[len(root):].partition('/')
+            return f'{root}{head}/' if sep else ''
+    return ''
+
+
+class ReferenceSet:
+    """Digests of every key a row points at, plus every live output directory."""
+
+    def __init__(self):
+        self._digests = set()
+        self.roots = output_roots()
+
+    def add(self, key):
+        if key:
+            self._digests.add(_digest(key))
+            directory = output_dir(key, self.roots)
+            if directory:
+                self._digests.add(_digest(directory))
+
+    def __contains__(self, key):
+        if _digest(key) in self._digests:
+            return True
+        directory = output_dir(key, self.roots)
+        return bool(directory) and _digest(directory) in self._digests
+
+    def __len__(self):
+        return len(self._digests)
+
+
+def mark():
+    refs = ReferenceSet()
+    sources = [
+        Session.objects.values_list('video_file', flat=True),
+        SessionAsset.objects.values_list('object_key', flat=True),
+        Comment.objects.values_list('video_reply', flat=True),
+        CommentAsset.objects.values_list('object_key', flat=True),
+        MultipartSessionUpload.objects.filter(
+            status=MultipartSessionUpload.STATUS_INITIATED,
+        ).values_list('s3_key', flat=True),
+        MultipartCommentUpload.objects.filter(
+            status=MultipartCommentUpload.STATUS_INITIATED,
+        ).values_list('s3_key', flat=True),
+    ]
+    for queryset in sources:
+        for key in queryset.iterator(chunk_size=ITERATOR_CHUNK):
+            refs.add(key)
+    # Jobs still running write outputs before any asset row exists.
+    for session_id in Session.objects.values_list('pk', flat=True).iterator(chunk_size=ITERATOR_CHUNK):
+        refs.add(session_output_prefix(session_id))
+    for comment_id in Comment.objects.values_list('pk', flat=True).iterator(chunk_size=ITERATOR_CHUNK):
+        refs.add(comment_output_prefix(comment_id))
+    return refs
+
+
+def _iter_s3(client, bucket, prefix):
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for item in page.get('Contents') or []:
+            yield item['Key'], int(item.get('Size') or 0), item['LastModified']
+
+
+def _iter_local(prefix):
+    base = default_storage.path('')
+    for dirpath, _, filenames in os.walk(default_storage.path(prefix)):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            stat = os.stat(path)
+            key = os.path.relpath(path, base).replace(os.sep, '/')
+            yield key, stat.st_size, datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+
+
+@dataclass
+class SweepResult:
+    scanned: int = 0
+    orphans: int = 0
+    deleted: int = 0
+    bytes_reclaimed: int = 0
+    referenced: int = 0
+    sample: list = field(default_factory=list)
+
+
+def sweep(refs, grace=timedelta(hours=24), dry_run=False, now=None, on_batch=None):
+    """
+    Stream storage listings under scan_prefixes() and delete unreferenced
+    objects older than `grace`, DELETE_BATCH at a time. Each batch is checked
+    against the database again, so rows created during the sweep win.
+    """
+    now = now or datetime.now(tz=dt_timezone.utc)
+    cutoff = now - grace
+    result = SweepResult(referenced=len(refs))
+    s3 = uses_s3()
+    if s3:
+        client = _s3_client()
+        bucket = getattr(default_storage, 'bucket_name', '') or settings.AWS_STORAGE_BUCKET_NAME
+
+    batch = {}
+
+    def flush():
+        keep = referenced_keys(list(batch))
+        doomed = {key: size for key, size in batch.items() if key not in keep}
+        batch.clear()
+        if not doomed:
+            return
+        if not dry_run:
+            if s3:
+                delete_s3_batches(client, bucket, sorted(doomed))
+            else:
+                for key in doomed:
+                    default_storage.delete(key)
+            result.deleted += len(doomed)
+        result.orphans += len(doomed)
+        result.bytes_reclaimed += sum(doomed.values())
+        result.sample.extend(sorted(doomed)[:max(0, 20 - len(result.sample))])
+        if on_batch:
+            on_batch(result)
+
+    for prefix in scan_prefixes():
+        if s3:
+            listing = _iter_s3(client, bucket, prefix)
+        else:
+            listing = _iter_local(prefix)
+        for key, size, modified in listing:
+            result.scanned += 1
+            if modified > cutoff or key in refs:
+                continue
+            batch[key] = size
+            if len(batch) >= DELETE_BATCH:
+                flush()
+    if batch:
+        flush()
+    return result
@@ -1,3 +1,4 @@
+import hashlib
 import logging
 from typing import Iterable
 
@@ -5,8 +6,9 @@ import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 
-from videos.models import Session, SessionAsset
+from videos.models import CommentAsset, ProcessingCallbackEvent, Session, SessionAsset
 
 logger = logging.getLogger(__name__)
 
@@ -27,13 +29,17 @@ def _mediaconvert_client():
     )
 
 
-def _session_input_uri(session):
-    name = (session.video_file.name or '').strip()
+def _input_uri(name):
+    name = (name or '').strip()
     if name.startswith('s3://'):
         return name
     return f"s3://{settings.AWS_STORAGE_BUCKET_NAME}/{name}"
 
 
+def _session_input_uri(session):
+    return _input_uri(session.video_file.name)
+
+
 def _base_output_prefix(session):
     custom_prefix = (getattr(settings, 'AWS_MEDIA_CONVERT_OUTPUT_PREFIX', '') or '').strip('/')
     if custom_prefix:
@@ -41,15 +47,39 @@ def _base_output_prefix(session):
     return f"s3://{settings.AWS_STORAGE_BUCKET_NAME}/processed/sessions/{session.id}/"
 
 
+def _even(value):
+    return max(2, int(value) // 2 * 2)
+
+
+def _output_size(media_info, width, height):
+    """
+    Frame size for a landscape preset, turned for portrait sources and never
+    larger than the source, so phone takes are neither squashed nor upscaled.
+    """
+    src_width, src_height = media_info.get('width'), media_info.get('height')
+    if not src_width or not src_height:
+        return width, height
+    if media_info.get('rotation') in (90, 270):
+        src_width, src_height = src_height, src_width
+    if src_height > src_width:
+        width, height = height, width
+    scale = min(1.0, src_width / width, src_height / height)
+    return _even(width * scale), _even(height * scale)
+
+
 def _create_job_settings(session):
     input_uri = _session_input_uri(session)
     base = _base_output_prefix(session)
-    return {
+    media_info = session.media_info or {}
+    proxy_width, proxy_height = _output_size(media_info, 960, 540)
+    hls_width, hls_height = _output_size(media_info, 1280, 720)
+    thumb_width, thumb_height = _output_size(media_info, 320, 180)
+    settings_ = {
         'TimecodeConfig': {'Source': 'ZEROBASED'},
         'Inputs': [{
             'FileInput': input_uri,
             'AudioSelectors': {'Audio Selector 1': {'DefaultSelection': 'DEFAULT'}},
-            'VideoSelector': {},
+            'VideoSelector': {'Rotate': 'AUTO'} if media_info.get('rotation') else {},
         }],
         'OutputGroups': [
             {
@@ -71,8 +101,8 @@ def _create_job_settings(session):
                                 'GopSizeUnits': 'FRAMES',
                             },
                         },
-                        'Width': 960,
-                        'Height': 540,
+                        'Width': proxy_width,
+                        'Height': proxy_height,
                     },
                     'AudioDescriptions': [{
                         'CodecSettings': {
@@ -106,8 +136,8 @@ def _create_job_settings(session):
                                 'GopSizeUnits': 'FRAMES',
                             },
                         },
-                        'Width': 1280,
-                        'Height': 720,
+                        'Width': hls_width,
+                        'Height': hls_height,
                     },
                     'AudioDescriptions': [{
                         'CodecSettings': {
@@ -117,6 +147,24 @@ def _create_job_settings(session):
                     }],
                 }],
             },
+            {
+                # Low-rate mono PCM for server-side analysis (waveform peaks); never played back.
+                'Name': 'audio-analysis',
+                'OutputGroupSettings': {
+                    'Type': 'FILE_GROUP_SETTINGS',
+                    'FileGroupSettings': {'Destination': f'{base}audio/'},
+                },
+                'Outputs': [{
+                    'NameModifier': '_analysis',
+                    'ContainerSettings': {'Container': 'RAW'},
+                    'AudioDescriptions': [{
+                        'CodecSettings': {
+                            'Codec': 'WAV',
+                            'WavSettings': {'BitDepth': 16, 'Channels': 1, 'SampleRate': 8000},
+                        },
+                    }],
+                }],
+            },
             {
                 'Name': 'thumb-capture',
                 'OutputGroupSettings': {
@@ -136,19 +184,45 @@ def _create_job_settings(session):
                                 'Quality': 80,
                             },
                         },
-                        'Width': 320,
-                        'Height': 180,
+                        'Width': thumb_width,
+                        'Height': thumb_height,
                     },
                 }],
             },
         ],
     }
+    if media_info.get('has_audio') is False:
+        # MediaConvert fails jobs whose audio outputs have no input audio to read.
+        del settings_['Inputs'][0]['AudioSelectors']
+        settings_['OutputGroups'] = [
+            group for group in settings_['OutputGroups'] if group['Name'] != 'audio-analysis'
+        ]
+        for group in settings_['OutputGroups']:
+            for output in group['Outputs']:
+                output.pop('AudioDescriptions', None)
+    return settings_
 
 
-def enqueue_session_processing(session):
+THROTTLING_ERROR_CODES = {'TooManyRequestsException', 'ThrottlingException', 'Throttling', 'SlowDown'}
+
+
+class SubmissionThrottled(Exception):
+    """MediaConvert rejected a submission because of API rate limits; safe to retry later."""
+
+
+def is_throttling_error(exc):
+    if not isinstance(exc, ClientError):
+        return False
+    error = exc.response.get('Error', {})
+    status_code = exc.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return error.get('Code') in THROTTLING_ERROR_CODES or status_code == 429
+
+
+def _submit_job(job_settings, user_metadata):
     """
-    Submit MediaConvert job for this session.
-    Returns (queued: bool, error: str, job_id: str)
+    Submit one MediaConvert job.
+    Returns (queued: bool, error: str, job_id: str); raises SubmissionThrottled
+    when the API rate limit was hit.
     """
     if not media_pipeline_enabled():
         return False, 'Media pipeline is not configured', ''
@@ -156,11 +230,8 @@ def enqueue_session_processing(session):
     queue_arn = (getattr(settings, 'AWS_MEDIA_CONVERT_QUEUE_ARN', '') or '').strip()
     request = {
         'Role': settings.AWS_MEDIA_CONVERT_ROLE_ARN,
-        'Settings': _create_job_settings(session),
-        'UserMetadata': {
-            'session_id': str(session.id),
-            'source': 'practica',
-        },
+        'Settings': job_settings,
+        'UserMetadata': {**user_metadata, 'source': 'practica'},
     }
     if queue_arn:
         request['Queue'] = queue_arn
@@ -168,13 +239,184 @@ def enqueue_session_processing(session):
     try:
         resp = _mediaconvert_client().create_job(**request)
     except (BotoCoreError, ClientError) as exc:
-        logger.exception('MediaConvert enqueue failed for session_id=%s', session.id)
+        if is_throttling_error(exc):
+            logger.warning('MediaConvert throttled submission for %s', user_metadata)
+            raise SubmissionThrottled(str(exc)) from exc
+        logger.exception('MediaConvert enqueue failed for %s', user_metadata)
         return False, str(exc), ''
 
     job_id = str(resp.get('Job', {}).get('Id', '')).strip()
     return True, '', job_id
 
 
+def enqueue_session_processing(session):
+    """
+    Submit MediaConvert job for this session.
+    Returns (queued: bool, error: str, job_id: str)
+    """
+    if not media_pipeline_enabled():
+        return False, 'Media pipeline is not configured', ''
+    return _submit_job(_create_job_settings(session), {'session_id': str(session.id)})
+
+
+def _comment_output_prefix(comment):
+    return f"s3://{settings.AWS_STORAGE_BUCKET_NAME}/processed/comments/{comment.id}/"
+
+
+def _create_comment_job_settings(comment):
+    """Small fast-start MP4 proxy plus a single poster frame for a reply video."""
+    base = _comment_output_prefix(comment)
+    return {
+        'TimecodeConfig': {'Source': 'ZEROBASED'},
+        'Inputs': [{
+            'FileInput': _input_uri(comment.video_reply.name),
+            'AudioSelectors': {'Audio Selector 1': {'DefaultSelection': 'DEFAULT'}},
+            'VideoSelector': {},
+        }],
+        'OutputGroups': [
+            {
+                'Name': 'proxy-mp4',
+                'OutputGroupSettings': {
+                    'Type': 'FILE_GROUP_SETTINGS',
+                    'FileGroupSettings': {'Destination': f'{base}proxy/'},
+                },
+                'Outputs': [{
+                    'NameModifier': '_proxy',
+                    'ContainerSettings': {
+                        'Container': 'MP4',
+                        # moov atom up front so playback and seeking start before the download ends.
+                        'Mp4Settings': {'MoovPlacement': 'PROGRESSIVE_DOWNLOAD'},
+                    },
+                    'VideoDescription': {
+                        'CodecSettings': {
+                            'Codec': 'H_264',
+                            'H264Settings': {
+                                'RateControlMode': 'QVBR',
+                                'QvbrSettings': {'QvbrQualityLevel': 6},
+                                'MaxBitrate': 1500000,
+                                'GopSize': 1,
+                                'GopSizeUnits': 'SECONDS',
+                            },
+                        },
+                        'Width': 640,
+                        'Height': 360,
+                    },
+                    'AudioDescriptions': [{
+                        'CodecSettings': {
+                            'Codec': 'AAC',
+                            'AacSettings': {'Bitrate': 64000, 'CodingMode': 'CODING_MODE_2_0', 'SampleRate': 48000},
+                        },
+                    }],
+                }],
+            },
+            {
+                'Name': 'poster-capture',
+                'OutputGroupSettings': {
+                    'Type': 'FILE_GROUP_SETTINGS',
+                    'FileGroupSettings': {'Destination': f'{base}poster/'},
+                },
+                'Outputs': [{
+                    'NameModifier': '_poster',
+                    'ContainerSettings': {'Container': 'RAW'},
+                    'VideoDescription': {
+                        'CodecSettings': {
+                            'Codec': 'FRAME_CAPTURE',
+                            'FrameCaptureSettings': {
+                                'FramerateNumerator': 1,
+                                'FramerateDenominator': 1,
+                                'MaxCaptures': 1,
+                                'Quality': 80,
+                            },
+                        },
+                        'Width': 640,
+                        'Height': 360,
+                    },
+                }],
+            },
+        ],
+    }
+
+
+def enqueue_comment_processing(comment):
+    """
+    Submit MediaConvert job for a comment reply video.
+    Returns (queued: bool, error: str, job_id: str)
+    """
+    if not media_pipeline_enabled():
+        return False, 'Media pipeline is not configured', ''
+    return _submit_job(_create_comment_job_settings(comment), {'comment_id': str(comment.id)})
+
+
+def multipart_fingerprint(size_bytes, parts):
+    """
+    Content fingerprint for a completed multipart upload.
+    Mirrors S3's composite ETag (md5 of the part digests + part count), prefixed
+    with the object size. Part size is derived from the object size, so the same
+    recording always yields the same fingerprint.
+    """
+    if not parts:
+        return ''
+    digest = hashlib.md5()
+    for part in sorted(parts, key=lambda p: p['PartNumber']):
+        etag = str(part.get('ETag', '')).strip().strip('"')
+        try:
+            digest.update(bytes.fromhex(etag))
+        except ValueError:
+            digest.update(etag.encode('utf-8'))
+    return f"{int(size_bytes)}:{digest.hexdigest()}-{len(parts)}"
+
+
+def composite_etag_matches(fingerprint, object_etag):
+    """Check a fingerprint against the ETag S3 returned for the assembled object."""
+    etag = str(object_etag or '').strip().strip('"')
+    if not etag:
+        return True
+    return bool(fingerprint) and fingerprint.split(':', 1)[-1] == etag
+
+
+def find_reusable_session(fingerprint, user=None, exclude_id=None):
+    """Latest processed session with the same content, optionally limited to one user."""
+    if not fingerprint:
+        return None
+    qs = Session.objects.filter(
+        content_fingerprint=fingerprint,
+        processing_status=Session.STATUS_READY,
+    ).exclude(video_file='')
+    if user is not None:
+        qs = qs.filter(user=user)
+    if exclude_id:
+        qs = qs.exclude(pk=exclude_id)
+    return qs.order_by('-created_at').first()
+
+
+@transaction.atomic
+def reuse_processed_media(session, source):
+    """Point session at source's original and copy its derived assets; no transcode."""
+    SessionAsset.objects.filter(session=session).delete()
+    SessionAsset.objects.bulk_create([
+        SessionAsset(
+            session=session,
+            asset_type=asset.asset_type,
+            object_key=asset.object_key,
+            content_type=asset.content_type,
+            metadata_json={**(asset.metadata_json or {}), 'reused_from_session_id': source.id},
+        )
+        for asset in source.assets.all()
+    ])
+    session.video_file = source.video_file.name
+    session.content_fingerprint = source.content_fingerprint
+    if session.duration_seconds is None:
+        session.duration_seconds = source.duration_seconds
+    session.media_info = source.media_info
+    session.processing_status = Session.STATUS_READY
+    session.processing_error = ''
+    session.save(update_fields=[
+        'video_file', 'content_fingerprint', 'duration_seconds', 'media_info',
+        'processing_status', 'processing_error', 'updated_at',
+    ])
+    return session
+
+
 def _normalized_assets(assets: Iterable[dict]):
     normalized = []
     for raw in assets or []:
@@ -197,16 +439,167 @@ def _normalized_assets(assets: Iterable[dict]):
     return normalized
 
 
+PROCESSING_UPDATE_STATUSES = {Session.STATUS_PROCESSING, Session.STATUS_READY, Session.STATUS_FAILED}
+
+
+def _normalized_update(raw):
+    if not isinstance(raw, dict):
+        raise ValueError('Each update must be an object')
+    try:
+        session_id = int(raw.get('session_id'))
+    except (TypeError, ValueError):
+        raise ValueError('session_id is required')
+    next_status = str(raw.get('status') or '').strip().lower()
+    if next_status not in PROCESSING_UPDATE_STATUSES:
+        raise ValueError('Invalid processing status')
+    assets = raw.get('assets') or []
+    if not isinstance(assets, list):
+        raise ValueError('assets must be a list')
+    return {
+        'session_id': session_id,
+        'status': next_status,
+        'error': str(raw.get('processing_error') or '').strip(),
+        'assets': _normalized_assets(assets) if next_status == Session.STATUS_READY else [],
+        'event_id': str(raw.get('event_id') or '').strip()[:128],
+    }
+
+
+@transaction.atomic
+def apply_processing_updates(raw_updates):
+    """
+    Apply a batch of processing callbacks. Assets for every ready session are
+    upserted in one statement; updates whose event_id was already applied are
+    skipped, so a retried callback is a no-op. An update that cannot apply
+    (malformed, unknown session, ready without a proxy) is rejected on its own
+    so the rest of the batch still lands.
+    Returns (sessions, duplicate_event_ids, rejected).
+    """
+    updates = []
+    rejected = []
+    for raw in raw_updates or []:
+        try:
+            updates.append(_normalized_update(raw))
+        except ValueError as exc:
+            rejected.append({'session_id': raw.get('session_id') if isinstance(raw, dict) else None, 'error': str(exc)})
+    if not updates:
+        return [], [], rejected
+
+    event_ids = [update['event_id'] for update in updates if update['event_id']]
+    seen = set(ProcessingCallbackEvent.objects.filter(event_id__in=event_ids).values_list('event_id', flat=True))
+    duplicates = []
+    pending = []
+    for update in updates:
+        event_id = update['event_id']
+        if event_id and event_id in seen:
+            duplicates.append(event_id)
+            continue
+        if event_id:
+            seen.add(event_id)
+        pending.append(update)
+    if not pending:
+        return [], duplicates, rejected
+
+    sessions = Session.objects.in_bulk({update['session_id'] for update in pending})
+    ready_ids = {
+        update['session_id'] for update in pending
+        if update['status'] == Session.STATUS_READY and update['session_id'] in sessions
+    }
+    with_proxy = {
+        update['session_id'] for update in pending
+        if any(asset['asset_type'] == SessionAsset.TYPE_PROXY_MP4 for asset in update['assets'])
+    }
+    with_proxy.update(
+        SessionAsset.objects.filter(session_id__in=ready_ids - with_proxy, asset_type=SessionAsset.TYPE_PROXY_MP4)
+        .values_list('session_id', flat=True)
+    )
+    accepted = []
+    for update in pending:
+        session_id = update['session_id']
+        if session_id not in sessions:
+            error = f'Unknown session_id {session_id}'
+        elif update['status'] == Session.STATUS_READY and session_id not in with_proxy:
+            error = 'Ready status requires at least one proxy_mp4 asset'
+        else:
+            accepted.append(update)
+            continue
+        rejected.append({'session_id': session_id, 'error': error})
+    if rejected:
+        logger.warning('Rejected %s of %s processing updates: %s', len(rejected), len(raw_updates), rejected[:5])
+    if not accepted:
+        return [], duplicates, rejected
+
+    # Later updates for the same session win, matching the order callbacks were sent.
+    rows = {}
+    for update in accepted:
+        for asset in update['assets']:
+            rows[(update['session_id'], asset['asset_type'])] = asset
+    if rows:
+        SessionAsset.objects.bulk_create(
+            [
+                SessionAsset(
+                    session_id=session_id,
+                    asset_type=asset_type,
+                    object_key=asset['object_key'],
+                    content_type=asset['content_type'],
+                    metadata_json=asset['metadata_json'],
+                )
+                for (session_id, asset_type), asset in rows.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['session', 'asset_type'],
+            update_fields=['object_key', 'content_type', 'metadata_json', 'updated_at'],
+        )
+
+    final = {update['session_id']: update for update in accepted}
+    now = timezone.now()
+    changed = []
+    for session_id, update in final.items():
+        session = sessions[session_id]
+        session.processing_status = update['status']
+        session.processing_error = update['error']
+        session.updated_at = now
+        changed.append(session)
+    Session.objects.bulk_update(changed, ['processing_status', 'processing_error', 'updated_at'])
+
+    ProcessingCallbackEvent.objects.bulk_create(
+        [
+            ProcessingCallbackEvent(event_id=update['event_id'], session_id=update['session_id'], status=update['status'])
+            for update in accepted
+            if update['event_id']
+        ],
+        ignore_conflicts=True,
+    )
+    return changed, duplicates, rejected
+
+
+def apply_processing_update(session, status, error='', assets=None, event_id=''):
+    applied, _, rejected = apply_processing_updates([{
+        'session_id': session.id,
+        'status': status,
+        'processing_error': error,
+        'assets': assets or [],
+        'event_id': event_id,
+    }])
+    if rejected:
+        raise ValueError(rejected[0]['error'])
+    if applied:
+        session.refresh_from_db()
+    return session
+
+
 @transaction.atomic
-def apply_processing_update(session, status, error='', assets=None):
+def apply_comment_processing_update(comment, status, error='', assets=None):
     next_status = str(status or '').strip().lower()
     if next_status not in {Session.STATUS_PROCESSING, Session.STATUS_READY, Session.STATUS_FAILED}:
         raise ValueError('Invalid processing status')
 
     if next_status == Session.STATUS_READY:
+        allowed_types = {choice for choice, _ in CommentAsset.TYPE_CHOICES}
         for asset in _normalized_assets(assets):
-            SessionAsset.objects.update_or_create(
-                session=session,
+            if asset['asset_type'] not in allowed_types:
+                continue
+            CommentAsset.objects.update_or_create(
+                comment=comment,
                 asset_type=asset['asset_type'],
                 defaults={
                     'object_key': asset['object_key'],
@@ -214,11 +607,11 @@ def apply_processing_update(session, status, error='', assets=None):
                     'metadata_json': asset['metadata_json'],
                 },
             )
-        has_proxy = session.assets.filter(asset_type=SessionAsset.TYPE_PROXY_MP4).exists()
+        has_proxy = comment.assets.filter(asset_type=CommentAsset.TYPE_PROXY_MP4).exists()
         if not has_proxy:
             raise ValueError('Ready status requires at least one proxy_mp4 asset')
 
-    session.processing_status = next_status
-    session.processing_error = (error or '').strip()
-    session.save(update_fields=['processing_status', 'processing_error', 'updated_at'])
-    return session
+    comment.processing_status = next_status
+    comment.processing_error = (error or '').strip()
+    comment.save(update_fields=['processing_status', 'processing_error'])
+    return comment
@@ -0,0 +1,260 @@
+import math
+import struct
+
+MAX_MOOV_BYTES = 64 * 1024 * 1024
+
+
+class Mp4Error(ValueError):
+    pass
+
+
+def _box_header(buf, offset, limit):
+    if offset + 8 > limit:
+        raise Mp4Error('Truncated box header')
+    size, box_type = struct.unpack_from('>I4s', buf, offset)
+    header = 8
+    if size == 1:
+        if offset + 16 > limit:
+            raise Mp4Error('Truncated box header')
+        size = struct.unpack_from('>Q', buf, offset + 8)[0]
+        header = 16
+    elif size == 0:
+        size = limit - offset
+    if size < header:
+        raise Mp4Error(f'Invalid size for box {box_type!r}')
+    return box_type, size, header
+
+
+def _children(buf, start, end):
+    offset = start
+    while offset + 8 <= end:
+        box_type, size, header = _box_header(buf, offset, end)
+        yield box_type, offset + header, min(offset + size, end)
+        offset += size
+
+
+def _find(buf, start, end, box_type):
+    for child_type, payload, child_end in _children(buf, start, end):
+        if child_type == box_type:
+            return payload, child_end
+    return None
+
+
+def top_level_boxes(reader):
+    """Yield (box_type, offset, size) for each top-level box, one small ranged read per header."""
+    size = reader.size
+    offset = 0
+    while offset + 8 <= size:
+        head = reader.read(offset, 16)
+        raw_size, box_type = struct.unpack_from('>I4s', head)
+        if raw_size == 1:
+            box_size = struct.unpack_from('>Q', head, 8)[0]
+        elif raw_size == 0:
+            box_size = size - offset
+        else:
+            box_size = raw_size
+        if box_size < 8:
+            raise Mp4Error(f'Invalid size for box {box_type!r}')
+        yield box_type, offset, box_size
+        offset += box_size
+
+
+def read_moov(reader):
+    """
+    Locate and return the moov box by walking top-level headers with ranged
+    reads, so only a few small requests hit storage even when moov sits at the end.
+    """
+    return _read_moov(reader)[0]
+
+
+def _read_moov(reader):
+    """(moov bytes, top-level box types seen before it)."""
+    seen = []
+    for box_type, offset, box_size in top_level_boxes(reader):
+        if box_type == b'moov':
+            if box_size > MAX_MOOV_BYTES:
+                raise Mp4Error('moov box is too large to index')
+            return reader.read(offset, box_size), seen
+        seen.append(box_type)
+    raise Mp4Error('No moov box found')
+
+
+def _full_box_entries(buf, payload, fmt, count_offset=4):
+    count = struct.unpack_from('>I', buf, payload + count_offset)[0]
+    item = struct.calcsize(fmt)
+    start = payload + count_offset + 4
+    return [struct.unpack_from(fmt, buf, start + i * item) for i in range(count)]
+
+
+def _tracks(moov):
+    """Yield (handler_type, trak (payload, end), mdia (payload, end)) for each track."""
+    _, _, header = _box_header(moov, 0, len(moov))
+    for box_type, payload, end in _children(moov, header, len(moov)):
+        if box_type != b'trak':
+            continue
+        mdia = _find(moov, payload, end, b'mdia')
+        if not mdia:
+            continue
+        hdlr = _find(moov, mdia[0], mdia[1], b'hdlr')
+        if hdlr:
+            yield moov[hdlr[0] + 8:hdlr[0] + 12], (payload, end), mdia
+
+
+def _video_track(moov):
+    for handler, _trak, mdia in _tracks(moov):
+        if handler == b'vide':
+            return mdia
+    raise Mp4Error('No video track')
+
+
+def _timescale(moov, mdia):
+    mdhd = _find(moov, mdia[0], mdia[1], b'mdhd')
+    if not mdhd:
+        raise Mp4Error('Missing mdhd')
+    version = moov[mdhd[0]]
+    timescale = struct.unpack_from('>I', moov, mdhd[0] + (20 if version == 1 else 12))[0]
+    if not timescale:
+        raise Mp4Error('Invalid timescale')
+    return timescale
+
+
+def _sample_tables(moov, mdia):
+    minf = _find(moov, mdia[0], mdia[1], b'minf')
+    stbl = _find(moov, minf[0], minf[1], b'stbl') if minf else None
+    if not stbl:
+        raise Mp4Error('Missing sample table')
+    return {box_type: payload for box_type, payload, _ in _children(moov, stbl[0], stbl[1])}
+
+
+def keyframe_index(reader):
+    """
+    [(seconds, byte_offset), ...] for every sync sample of the first video
+    track, in decode order. Reads only the moov box.
+    """
+    moov = read_moov(reader)
+    try:
+        return _keyframes_from_moov(moov)
+    except (struct.error, IndexError) as exc:
+        raise Mp4Error(f'Malformed sample table: {exc}') from exc
+
+
+def _keyframes_from_moov(moov):
+    mdia = _video_track(moov)
+    timescale = _timescale(moov, mdia)
+    tables = _sample_tables(moov, mdia)
+    for required in (b'stts', b'stsc', b'stsz'):
+        if required not in tables:
+            raise Mp4Error(f'Missing {required.decode()}')
+
+    sample_size, sample_count = struct.unpack_from('>II', moov, tables[b'stsz'] + 4)
+    if sample_size:
+        sizes = [sample_size] * sample_count
+    else:
+        start = tables[b'stsz'] + 12
+        sizes = list(struct.unpack_from(f'>{sample_count}I', moov, start))
+
+    if b'stco' in tables:
+        chunk_offsets = [row[0] for row in _full_box_entries(moov, tables[b'stco'], '>I')]
+    elif b'co64' in tables:
+        chunk_offsets = [row[0] for row in _full_box_entries(moov, tables[b'co64'], '>Q')]
+    else:
+        raise Mp4Error('Missing chunk offsets')
+
+    if b'stss' in tables:
+        sync = {row[0] - 1 for row in _full_box_entries(moov, tables[b'stss'], '>I')}
+    else:
+        sync = None  # every sample is a sync sample
+
+    decode_times = []
+    elapsed = 0
+    for count, delta in _full_box_entries(moov, tables[b'stts'], '>II'):
+        for _ in range(count):
+            decode_times.append(elapsed)
+            elapsed += delta
+
+    stsc = _full_box_entries(moov, tables[b'stsc'], '>III')
+    index = []
+    sample = 0
+    for run, (first_chunk, per_chunk, _desc) in enumerate(stsc):
+        last_chunk = stsc[run + 1][0] - 1 if run + 1 < len(stsc) else len(chunk_offsets)
+        for chunk in range(first_chunk - 1, last_chunk):
+            offset = chunk_offsets[chunk]
+            for _ in range(per_chunk):
+                if sample >= sample_count:
+                    break
+                if (sync is None or sample in sync) and sample < len(decode_times):
+                    index.append((decode_times[sample] / timescale, offset))
+                offset += sizes[sample]
+                sample += 1
+    return index
+
+
+def _fixed_16_16(value):
+    return (value - (1 << 32) if value & 0x80000000 else value) / 65536
+
+
+def _track_header(moov, trak):
+    """(width, height, rotation) from tkhd; presentation size and display matrix."""
+    tkhd = _find(moov, trak[0], trak[1], b'tkhd')
+    if not tkhd:
+        return None, None, 0
+    version = moov[tkhd[0]]
+    matrix = tkhd[0] + (52 if version == 1 else 40)
+    a, b = (_fixed_16_16(v) for v in struct.unpack_from('>II', moov, matrix))
+    width, height = struct.unpack_from('>II', moov, matrix + 36)
+    rotation = round(math.degrees(math.atan2(b, a))) % 360
+    return width >> 16, height >> 16, rotation
+
+
+def _codec(moov, mdia):
+    """Fourcc of the first sample description (avc1, hvc1, mp4a, ...)."""
+    stsd = _sample_tables(moov, mdia).get(b'stsd')
+    if stsd is None:
+        return ''
+    return moov[stsd + 12:stsd + 16].decode('latin-1').strip()
+
+
+def probe(reader):
+    """
+    Container summary from the moov box alone: duration, display size,
+    rotation, codecs and whether moov precedes the media data (fast start).
+    """
+    moov, before = _read_moov(reader)
+    try:
+        return _probe_moov(moov, fast_start=b'mdat' not in before)
+    except (struct.error, IndexError) as exc:
+        raise Mp4Error(f'Malformed movie header: {exc}') from exc
+
+
+def _probe_moov(moov, fast_start):
+    _, _, header = _box_header(moov, 0, len(moov))
+    info = {
+        'fast_start': fast_start,
+        'duration_seconds': None,
+        'width': None,
+        'height': None,
+        'rotation': 0,
+        'video_codec': '',
+        'audio_codec': '',
+        'has_audio': False,
+    }
+    mvhd = _find(moov, header, len(moov), b'mvhd')
+    if mvhd:
+        if moov[mvhd[0]] == 1:
+            timescale, duration = struct.unpack_from('>IQ', moov, mvhd[0] + 20)
+        else:
+            timescale, duration = struct.unpack_from('>II', moov, mvhd[0] + 12)
+        # Fragmented files (Safari's MediaRecorder) leave this 0 and carry time in moof boxes.
+        if timescale and duration and duration not in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+            info['duration_seconds'] = round(duration / timescale, 3)
+
+    for handler, trak, mdia in _tracks(moov):
+        if handler == b'vide' and not info['video_codec']:
+            info['width'], info['height'], info['rotation'] = _track_header(moov, trak)
+            info['video_codec'] = _codec(moov, mdia)
+        elif handler == b'soun' and not info['audio_codec']:
+            info['has_audio'] = True
+            info['audio_codec'] = _codec(moov, mdia)
+    if not info['video_codec']:
+        raise Mp4Error('No video track')
+    return info
@@ -0,0 +1,162 @@
+import logging
+import struct
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from videos.services import mp4
+from videos.services.ranged_reads import RangeReader
+
+logger = logging.getLogger(__name__)
+
+EBML_MAGIC = b'\x1a\x45\xdf\xa3'
+MP4_TOP_LEVEL = {b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide', b'pnot'}
+WEBM_HEADER_BYTES = 256 * 1024  # MediaRecorder writes Info and Tracks in the first few KB
+
+# Matroska element IDs (marker bits kept, as they appear on the wire).
+SEGMENT = 0x18538067
+INFO = 0x1549A966
+TRACKS = 0x1654AE6B
+CLUSTER = 0x1F43B675
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+DOC_TYPE = 0x4282
+EBML_HEADER = 0x1A45DFA3
+MASTER_ELEMENTS = {EBML_HEADER, SEGMENT, INFO, TRACKS, TRACK_ENTRY, VIDEO}
+
+
+class ProbeError(ValueError):
+    pass
+
+
+class UnrecognizedContainer(ProbeError):
+    pass
+
+
+def _vint(buf, offset, keep_marker):
+    """(value, length, all_ones) for an EBML variable-length integer."""
+    if offset >= len(buf):
+        raise ProbeError('Truncated EBML header')
+    first = buf[offset]
+    length = 8 - first.bit_length() + 1
+    if length > 8 or offset + length > len(buf):
+        raise ProbeError('Invalid EBML integer')
+    value = int.from_bytes(buf[offset:offset + length], 'big')
+    if not keep_marker:
+        value &= (1 << (7 * length)) - 1
+    return value, length, value == (1 << (7 * length)) - 1
+
+
+def _elements(buf, start, end):
+    """Yield (element_id, payload_start, payload_end); unknown sizes run to `end`."""
+    offset = start
+    while offset < end:
+        element_id, id_len, _ = _vint(buf, offset, keep_marker=True)
+        size, size_len, unknown = _vint(buf, offset + id_len, keep_marker=False)
+        payload = offset + id_len + size_len
+        payload_end = end if unknown else min(payload + size, end)
+        yield element_id, payload, payload_end
+        if element_id == CLUSTER:
+            return
+        offset = payload_end
+
+
+def _uint(buf, start, end):
+    return int.from_bytes(buf[start:end], 'big')
+
+
+def probe_webm(reader):
+    """Duration, size and codecs from the Matroska Info and Tracks elements at the start of the file."""
+    buf = reader.read(0, WEBM_HEADER_BYTES)
+    info = {
+        'container': 'webm',
+        'fast_start': True,  # Matroska always leads with its headers
+        'duration_seconds': None,
+        'width': None,
+        'height': None,
+        'rotation': 0,
+        'video_codec': '',
+        'audio_codec': '',
+        'has_audio': False,
+    }
+    scale = 1000000
+    duration = None
+
+    def walk(start, end):
+        nonlocal scale, duration
+        track = {}
+        for element_id, payload, payload_end in _elements(buf, start, end):
+            if element_id == DOC_TYPE:
+                info['container'] = buf[payload:payload_end].decode('ascii', 'replace') or 'webm'
+            elif element_id == TIMECODE_SCALE:
+                scale = _uint(buf, payload, payload_end) or scale
+            elif element_id == DURATION and payload_end - payload in (4, 8):
+                duration = struct.unpack('>f' if payload_end - payload == 4 else '>d', buf[payload:payload_end])[0]
+            elif element_id == TRACK_TYPE:
+                track['type'] = _uint(buf, payload, payload_end)
+            elif element_id == CODEC_ID:
+                track['codec'] = buf[payload:payload_end].decode('ascii', 'replace')
+            elif element_id == PIXEL_WIDTH:
+                track['width'] = _uint(buf, payload, payload_end)
+            elif element_id == PIXEL_HEIGHT:
+                track['height'] = _uint(buf, payload, payload_end)
+            elif element_id == TRACK_ENTRY:
+                entry = walk(payload, payload_end)
+                if entry.get('type') == 1 and not info['video_codec']:
+                    info['video_codec'] = entry.get('codec', '')
+                    info['width'], info['height'] = entry.get('width'), entry.get('height')
+                elif entry.get('type') == 2 and not info['audio_codec']:
+                    info['has_audio'] = True
+                    info['audio_codec'] = entry.get('codec', '')
+            elif element_id in MASTER_ELEMENTS:
+                track.update(walk(payload, payload_end))
+        return track
+
+    try:
+        walk(0, len(buf))
+    except ProbeError:
+        # Headers longer than the read window; keep whatever was parsed before the cut.
+        if not info['video_codec']:
+            raise
+    if duration:
+        info['duration_seconds'] = round(duration * scale / 1e9, 3)
+    if not info['video_codec']:
+        raise ProbeError('No video track')
+    return info
+
+
+def probe_reader(reader):
+    head = reader.read(0, 12)
+    if head[:4] == EBML_MAGIC:
+        return probe_webm(reader)
+    if head[4:8] in MP4_TOP_LEVEL:
+        try:
+            info = mp4.probe(reader)
+        except mp4.Mp4Error as exc:
+            raise ProbeError(str(exc)) from exc
+        return {'container': 'mov' if head[4:12] == b'ftypqt  ' else 'mp4', **info}
+    raise UnrecognizedContainer('Unrecognized container')
+
+
+def probe_media(object_key):
+    """
+    Probe a stored upload from its container headers only (ranged reads).
+    Returns (info, error): error is set when the file is an MP4/WebM that
+    cannot be played (no video track, broken headers); both are empty when
+    the container is unknown or storage could not be read.
+    """
+    try:
+        return probe_reader(RangeReader(object_key)), ''
+    except UnrecognizedContainer:
+        logger.info('Media probe skipped unrecognized container key=%s', object_key)
+        return None, ''
+    except ProbeError as exc:
+        return None, str(exc)
+    except (OSError, BotoCoreError, ClientError) as exc:
+        logger.warning('Media probe failed for key=%s: %s', object_key, exc)
+        return None, ''
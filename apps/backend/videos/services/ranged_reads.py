@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from videos.services.storage_cleanup import _s3_client
+
+
+class RangeReader:
+    """
+    Byte-range access to a stored object without downloading it: S3 ranged GETs
+    when a bucket is configured, seek/read on local storage otherwise.
+    """
+
+    def __init__(self, object_key):
+        self.object_key = object_key
+        self.bucket = getattr(settings, 'AWS_STORAGE_BUCKET_NAME', '')
+        self._size = None
+        self.requests = 0
+
+    @property
+    def size(self):
+        if self._size is None:
+            if self.bucket:
+                self.requests += 1
+                head = _s3_client().head_object(Bucket=self.bucket, Key=self.object_key)
+                self._size = int(head['ContentLength'])
+            else:
+                self._size = int(default_storage.size(self.object_key))
+        return self._size
+
+    def read(self, offset, length):
+        if length <= 0 or offset >= self.size:
+            return b''
+        length = min(length, self.size - offset)
+        self.requests += 1
+        if self.bucket:
+            resp = _s3_client().get_object(
+                Bucket=self.bucket, Key=self.object_key, Range=f'bytes={offset}-{offset + length - 1}',
+            )
+            return resp['Body'].read()
+        with default_storage.open(self.object_key, 'rb') as fh:
+            fh.seek(offset)
+            return fh.read(length)
+
+    def iter_chunks(self, chunk_size):
+        """The whole object as a stream of chunks, one GET (or open) in total."""
+        self.requests += 1
+        if self.bucket:
+            body = _s3_client().get_object(Bucket=self.bucket, Key=self.object_key)['Body']
+            try:
+                yield from body.iter_chunks(chunk_size)
+            finally:
+                body.close()
+            return
+        with default_storage.open(self.object_key, 'rb') as fh:
+            while chunk := fh.read(chunk_size):
+                yield chunk
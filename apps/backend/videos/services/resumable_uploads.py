@@ -0,0 +1,98 @@
+import fcntl
+import os
+import shutil
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from videos.models import ResumableSessionUpload
+
+COPY_BUFFER_BYTES = 1024 * 1024
+
+
+class OffsetMismatch(ValueError):
+    """The client's Upload-Offset is not where the stored file ends."""
+
+    def __init__(self, offset):
+        super().__init__(f'Upload is at offset {offset}')
+        self.offset = offset
+
+
+class UploadBusy(ValueError):
+    """Another request is appending to this upload right now."""
+
+
+def partial_dir():
+    # Inside MEDIA_ROOT by default so finishing an upload is a rename, not a copy.
+    return getattr(settings, 'RESUMABLE_UPLOAD_DIR', '') or os.path.join(settings.MEDIA_ROOT, 'partial-uploads')
+
+
+def partial_path(upload):
+    return os.path.join(partial_dir(), f'{upload.id}.part')
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Append up to `length` bytes from `stream` at `offset` and return the new
+    committed offset. Bytes are fsync'd before the offset is recorded, so a
+    crash never leaves the database ahead of the file; anything written past
+    the recorded offset is truncated on the next append. A dropped connection
+    keeps whatever arrived, and the client resumes from the returned offset.
+    """
+    os.makedirs(partial_dir(), exist_ok=True)
+    fd = os.open(partial_path(upload), os.O_RDWR | os.O_CREAT, 0o640)
+    with os.fdopen(fd, 'r+b') as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError as exc:
+            raise UploadBusy('Upload is busy') from exc
+
+        committed = ResumableSessionUpload.objects.values_list('offset', flat=True).get(pk=upload.pk)
+        if offset != committed:
+            raise OffsetMismatch(committed)
+        if committed + length > upload.size_bytes:
+            raise ValueError('Chunk exceeds the declared upload size')
+
+        fh.truncate(committed)
+        fh.seek(committed)
+        received = 0
+        while received < length:
+            try:
+                data = stream.read(min(COPY_BUFFER_BYTES, length - received))
+            except OSError:
+                break  # client went away mid-chunk; keep what arrived
+            if not data:
+                break
+            fh.write(data)
+            received += len(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+        upload.offset = committed + received
+        ResumableSessionUpload.objects.filter(pk=upload.pk).update(offset=upload.offset, updated_at=timezone.now())
+    return upload.offset
+
+
+def finalize_upload(upload):
+    """Move the completed partial file to its storage key and return the saved name."""
+    source = partial_path(upload)
+    try:
+        key = default_storage.get_available_name(upload.storage_key)
+        destination = default_storage.path(key)
+    except NotImplementedError:
+        with open(source, 'rb') as fh:
+            key = default_storage.save(upload.storage_key, File(fh))
+        os.remove(source)
+        return key
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    shutil.move(source, destination)  # a rename when RESUMABLE_UPLOAD_DIR shares MEDIA_ROOT's filesystem
+    return key
+
+
+def discard_partial(upload):
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,89 @@
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'signed-url:v1'
+
+
+def signing_window_seconds():
+    """
+    Length of one expiry bucket. Every URL for a key is reused for the rest of
+    the bucket it was signed in, so a URL is never handed out with less than
+    (AWS_QUERYSTRING_EXPIRE - window) seconds of validity left.
+    """
+    expire = int(getattr(settings, 'AWS_QUERYSTRING_EXPIRE', 3600) or 3600)
+    window = int(getattr(settings, 'SIGNED_URL_CACHE_WINDOW', 0) or 0) or expire // 2
+    return max(1, min(window, expire // 2))
+
+
+def _is_passthrough(key):
+    return key.startswith('http://') or key.startswith('https://') or key.startswith('/')
+
+
+def _cache_key(object_key, bucket):
+    digest = hashlib.sha1(object_key.encode('utf-8')).hexdigest()
+    return f"{CACHE_KEY_PREFIX}:{bucket}:{digest}"
+
+
+def _sign(object_key):
+    from videos.services.local_media import local_media_url
+
+    try:
+        if isinstance(default_storage, FileSystemStorage):
+            return local_media_url(object_key)
+        return default_storage.url(object_key)
+    except Exception:
+        logger.warning('Could not build storage URL for key=%s', object_key)
+        return object_key
+
+
+def signed_urls(object_keys, now=None):
+    """
+    Map object keys to (cached) storage URLs with one cache round trip.
+    Keys already shaped like URLs or absolute paths are returned untouched.
+    """
+    urls = {}
+    pending = []
+    for raw in object_keys or []:
+        key = (raw or '').strip()
+        if not key or key in urls:
+            continue
+        if _is_passthrough(key):
+            urls[key] = key
+        else:
+            urls[key] = None
+            pending.append(key)
+    if not pending:
+        return urls
+
+    now = time.time() if now is None else now
+    window = signing_window_seconds()
+    bucket = int(now // window)
+    cache_keys = {_cache_key(key, bucket): key for key in pending}
+    cached = cache.get_many(list(cache_keys))
+
+    fresh = {}
+    for cache_key, key in cache_keys.items():
+        url = cached.get(cache_key)
+        if url is None:
+            url = _sign(key)
+            fresh[cache_key] = url
+        urls[key] = url
+
+    if fresh:
+        remaining = max(1, int((bucket + 1) * window - now))
+        cache.set_many(fresh, timeout=remaining)
+    return urls
+
+
+def signed_url(object_key, now=None):
+    key = (object_key or '').strip()
+    if not key:
+        return ''
+    return signed_urls([key], now=now).get(key) or ''
@@ -0,0 +1,183 @@
+import json
+import logging
+import posixpath
+import time
+import zipfile
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.text import slugify
+
+from videos.models import Chapter, Comment, Session, SpaceMember
+from videos.services.ranged_reads import RangeReader
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+ITERATOR_CHUNK = 500
+
+
+class _StreamSink:
+    """
+    Write-only target for ZipFile. It has tell() but no seek(), so zipfile
+    writes data descriptors instead of seeking back to patch headers, and
+    whatever was written since the last drain() can be sent immediately.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def export_filename(space):
+    return f"{slugify(space.name) or 'space'}-{space.id}.zip"
+
+
+def _session_dir(session):
+    return f"sessions/{session.id}-{slugify(session.title)[:50] or 'session'}/"
+
+
+def _json_bytes(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, indent=2).encode('utf-8')
+
+
+def _space_metadata(space):
+    members = (
+        SpaceMember.objects.filter(space=space).select_related('user')
+        .order_by('created_at').iterator(chunk_size=ITERATOR_CHUNK)
+    )
+    return {
+        'id': space.id,
+        'name': space.name,
+        'owner': space.owner.username,
+        'main_session_id': space.main_session_id,
+        'created_at': space.created_at,
+        'members': [{'username': member.user.username, 'joined_at': member.created_at} for member in members],
+    }
+
+
+def _session_metadata(session):
+    chapters = (
+        Chapter.objects.filter(session=session).select_related('exercise')
+        .order_by('timestamp_seconds').iterator(chunk_size=ITERATOR_CHUNK)
+    )
+    return {
+        'id': session.id,
+        'title': session.title,
+        'description': session.description,
+        'owner': session.user.username if session.user_id else None,
+        'recorded_at': session.recorded_at,
+        'duration_seconds': session.duration_seconds,
+        'tags': sorted(tag.name for tag in session.tags.all()),
+        'chapters': [
+            {
+                'title': chapter.title,
+                'exercise': chapter.exercise.name if chapter.exercise_id else None,
+                'timestamp_seconds': chapter.timestamp_seconds,
+                'end_seconds': chapter.end_seconds,
+                'notes': chapter.notes,
+            }
+            for chapter in chapters
+        ],
+        'comments': [],
+    }
+
+
+class SpaceExport:
+    """Build a space archive as a stream of bytes; iterate to get the ZIP."""
+
+    def __init__(self, space, chunk_size=CHUNK_SIZE):
+        self.space = space
+        self.chunk_size = chunk_size
+        self.sink = _StreamSink()
+        self.zip = zipfile.ZipFile(self.sink, mode='w', compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+        self._written = {}  # storage key -> archive path, so deduplicated uploads are stored once
+        self.missing = []
+
+    def __iter__(self):
+        yield from self._write_json('space.json', _space_metadata(self.space))
+        sessions = (
+            Session.objects.filter(space=self.space).select_related('user')
+            .prefetch_related('tags').order_by('recorded_at', 'id')
+        )
+        for session in sessions.iterator(chunk_size=ITERATOR_CHUNK):
+            yield from self._write_session(session)
+        if self.missing:
+            yield from self._write_json('missing-media.json', self.missing)
+        self.zip.close()
+        yield from self._flush()
+
+    def _flush(self):
+        data = self.sink.drain()
+        if data:
+            yield data
+
+    def _write_json(self, arcname, value):
+        self.zip.writestr(arcname, _json_bytes(value))
+        yield from self._flush()
+
+    def _media(self, key, arcname):
+        """Copy one stored object into the archive chunk by chunk; returns its archive path."""
+        if key in self._written:
+            return self._written[key]
+        chunks = RangeReader(key).iter_chunks(self.chunk_size)
+        try:
+            first = next(chunks, b'')
+        except (OSError, BotoCoreError, ClientError) as exc:
+            logger.warning('Export skipped unreadable media key=%s: %s', key, exc)
+            self.missing.append(key)
+            return None
+        info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED  # video is already compressed
+        with self.zip.open(info, mode='w', force_zip64=True) as dest:
+            dest.write(first)
+            yield from self._flush()
+            for chunk in chunks:
+                dest.write(chunk)
+                yield from self._flush()
+        yield from self._flush()
+        self._written[key] = arcname
+        return arcname
+
+    def _write_session(self, session):
+        base = _session_dir(session)
+        metadata = _session_metadata(session)
+        if session.video_file:
+            key = session.video_file.name
+            metadata['video'] = yield from self._media(key, base + posixpath.basename(key))
+
+        comments = (
+            Comment.objects.filter(session=session).select_related('user')
+            .order_by('timestamp_seconds', 'created_at').iterator(chunk_size=ITERATOR_CHUNK)
+        )
+        for comment in comments:
+            entry = {
+                'user': comment.user.username,
+                'timestamp_seconds': comment.timestamp_seconds,
+                'text': comment.text,
+                'created_at': comment.created_at,
+                'video': None,
+            }
+            if comment.video_reply:
+                key = comment.video_reply.name
+                entry['video'] = yield from self._media(
+                    key, f"{base}comments/{comment.id}-{posixpath.basename(key)}",
+                )
+            metadata['comments'].append(entry)
+        yield from self._write_json(base + 'session.json', metadata)
@@ -0,0 +1,132 @@
+import os
+import shutil
+
+import boto3
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from videos.models import (
+    Comment, CommentAsset, MultipartCommentUpload, MultipartSessionUpload, Session, SessionAsset,
+)
+
+# DeleteObjects accepts at most this many keys per call.
+DELETE_BATCH = 1000
+
+
+class StorageCleanupError(Exception):
+    pass
+
+
+def _s3_client():
+    # The one S3 client factory; other modules import it (aws_standin patches each import).
+    return boto3.client('s3', region_name=getattr(settings, 'AWS_S3_REGION_NAME', None))
+
+
+def session_output_prefix(session_id):
+    """Where MediaConvert writes a session's outputs (see media_pipeline._base_output_prefix)."""
+    custom_prefix = (getattr(settings, 'AWS_MEDIA_CONVERT_OUTPUT_PREFIX', '') or '').strip('/')
+    return f"{custom_prefix or 'processed/sessions'}/{session_id}/"
+
+
+def comment_output_prefix(comment_id):
+    return f"processed/comments/{comment_id}/"
+
+
+def is_object_key(key):
+    return bool(key) and not key.startswith(('http://', 'https://', '/', 's3://'))
+
+
+def referenced_keys(keys):
+    """Keys still pointed at by a row; deduplicated uploads share originals and outputs."""
+    keys = list(keys)
+    if not keys:
+        return set()
+    found = set(Session.objects.filter(video_file__in=keys).values_list('video_file', flat=True))
+    found |= set(SessionAsset.objects.filter(object_key__in=keys).values_list('object_key', flat=True))
+    found |= set(Comment.objects.filter(video_reply__in=keys).values_list('video_reply', flat=True))
+    found |= set(CommentAsset.objects.filter(object_key__in=keys).values_list('object_key', flat=True))
+    found |= set(MultipartSessionUpload.objects.filter(
+        s3_key__in=keys, status=MultipartSessionUpload.STATUS_INITIATED,
+    ).values_list('s3_key', flat=True))
+    found |= set(MultipartCommentUpload.objects.filter(
+        s3_key__in=keys, status=MultipartCommentUpload.STATUS_INITIATED,
+    ).values_list('s3_key', flat=True))
+    return found
+
+
+def prefix_referenced(prefix):
+    return (
+        Session.objects.filter(video_file__startswith=prefix).exists()
+        or SessionAsset.objects.filter(object_key__startswith=prefix).exists()
+        or Comment.objects.filter(video_reply__startswith=prefix).exists()
+        or CommentAsset.objects.filter(object_key__startswith=prefix).exists()
+    )
+
+
+def uses_s3():
+    try:
+        default_storage.path('')
+    except NotImplementedError:
+        return True
+    return False
+
+
+def delete_s3_batches(client, bucket, keys):
+    deleted = 0
+    for start in range(0, len(keys), DELETE_BATCH):
+        batch = keys[start:start + DELETE_BATCH]
+        resp = client.delete_objects(
+            Bucket=bucket, Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True},
+        )
+        errors = resp.get('Errors') or []
+        if errors:
+            first = errors[0]
+            raise StorageCleanupError(
+                f"{len(errors)} of {len(batch)} deletes failed, e.g. {first.get('Key')}: {first.get('Code')}"
+            )
+        deleted += len(batch)
+    return deleted
+
+
+def _delete_s3(keys, prefixes):
+    client = _s3_client()
+    bucket = getattr(default_storage, 'bucket_name', '') or settings.AWS_STORAGE_BUCKET_NAME
+    deleted = delete_s3_batches(client, bucket, keys)
+    paginator = client.get_paginator('list_objects_v2')
+    for prefix in prefixes:
+        # Pages hold at most 1000 keys, so each page is one DeleteObjects call.
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            page_keys = [item['Key'] for item in page.get('Contents') or []]
+            deleted += delete_s3_batches(client, bucket, page_keys)
+    return deleted
+
+
+def _delete_local(keys, prefixes):
+    deleted = 0
+    for key in keys:
+        if default_storage.exists(key):
+            default_storage.delete(key)
+            deleted += 1
+    for prefix in prefixes:
+        path = default_storage.path(prefix)
+        if os.path.isdir(path):
+            deleted += sum(len(files) for _, _, files in os.walk(path))
+            shutil.rmtree(path)
+    return deleted
+
+
+def delete_storage_objects(keys=(), prefixes=()):
+    """
+    Delete objects left behind by removed rows, skipping any key or prefix that
+    another row still references. Returns the number of objects deleted.
+    """
+    keys = sorted({key for key in keys if is_object_key(key)})
+    prefixes = sorted({prefix for prefix in prefixes if is_object_key(prefix) and prefix.endswith('/')})
+    prefixes = [prefix for prefix in prefixes if not prefix_referenced(prefix)]
+    keep = referenced_keys(keys)
+    keys = [key for key in keys if key not in keep and not key.startswith(tuple(prefixes))]
+    if not keys and not prefixes:
+        return 0
+    if uses_s3():
+        return _delete_s3(keys, prefixes)
+    return _delete_local(keys, prefixes)
@@ -0,0 +1,98 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from videos.services.media_pipeline import multipart_fingerprint
+from videos.services.storage_cleanup import _s3_client
+
+# Same part size the multipart client uses for anything under 50 GB, so a
+# streamed upload gets the same fingerprint as a direct multipart upload.
+PART_SIZE = 5 * 1024 * 1024
+
+
+class _ObjectWriter:
+    """Write an object sequentially while fingerprinting it in PART_SIZE parts."""
+
+    def __init__(self, key):
+        self.key = key
+        self.size = 0
+        self._buffer = bytearray()
+        self._part_etags = []
+
+    def write(self, data):
+        self._buffer += data
+        self.size += len(data)
+        while len(self._buffer) >= PART_SIZE:
+            self._flush_part(bytes(self._buffer[:PART_SIZE]))
+            del self._buffer[:PART_SIZE]
+
+    def _flush_part(self, part):
+        self._part_etags.append(hashlib.md5(part).hexdigest())
+        self._write_part(len(self._part_etags), part)
+
+    def close(self):
+        """Flush the tail and return the content fingerprint."""
+        if self._buffer or not self._part_etags:
+            self._flush_part(bytes(self._buffer))
+            self._buffer.clear()
+        self._finish()
+        return multipart_fingerprint(self.size, [
+            {'PartNumber': number, 'ETag': etag} for number, etag in enumerate(self._part_etags, start=1)
+        ])
+
+
+class LocalObjectWriter(_ObjectWriter):
+    def __init__(self, key):
+        super().__init__(default_storage.get_available_name(key))
+        path = default_storage.path(self.key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, 'wb')
+
+    def _write_part(self, number, part):
+        self._file.write(part)
+
+    def _finish(self):
+        self._file.close()
+
+    def abort(self):
+        self._file.close()
+        default_storage.delete(self.key)
+
+
+class S3ObjectWriter(_ObjectWriter):
+    """S3 multipart upload fed part by part; at most one part is held in memory."""
+
+    def __init__(self, key, content_type=''):
+        super().__init__(key)
+        self.bucket = getattr(default_storage, 'bucket_name', '') or settings.AWS_STORAGE_BUCKET_NAME
+        self._client = _s3_client()
+        params = {'Bucket': self.bucket, 'Key': key}
+        if content_type:
+            params['ContentType'] = content_type
+        self._upload_id = self._client.create_multipart_upload(**params)['UploadId']
+        self._parts = []
+
+    def _write_part(self, number, part):
+        resp = self._client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, PartNumber=number, Body=part,
+        )
+        self._parts.append({'PartNumber': number, 'ETag': resp['ETag']})
+
+    def _finish(self):
+        self._client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, MultipartUpload={'Parts': self._parts},
+        )
+
+    def abort(self):
+        self._client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+
+
+def open_object_writer(key, content_type=''):
+    """A writer for whichever backend default_storage really is (filesystem if it has paths, else S3)."""
+    try:
+        default_storage.path(key)
+    except NotImplementedError:
+        return S3ObjectWriter(key, content_type)
+    return LocalObjectWriter(key)
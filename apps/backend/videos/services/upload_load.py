@@ -0,0 +1,303 @@
+"""
+Upload load driver: replays the frontend's multipart call pattern
+(runMultipartUpload in frontend/src/utils.js) against the API, with S3 and
+MediaConvert served by the stand-in in aws_standin.
+
+Each upload is initiate -> {sign-part, PUT} for every part on a small worker
+pool, with the frontend's retry/backoff on PUTs -> complete. An upload whose
+parts fail even after retries resumes the way a returning browser does
+(status -> missing parts -> complete). Afterwards the pipeline is driven to
+the end: queued MediaConvert submissions are dispatched, jobs are polled and
+their results posted to the processing callback, as EventBridge would.
+"""
+
+import os
+import random
+import threading
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from urllib.error import URLError
+
+from botocore.exceptions import ClientError
+from django.db import connections
+from rest_framework.test import APIClient
+
+from videos.models import MediaJob, MultipartSessionUpload, Session, SessionAsset
+from videos.services.deletion import delete_sessions
+from videos.services.jobs import RATE_LIMITED_KINDS, dispatch_media_jobs
+
+# Mirrors MULTIPART_CONCURRENCY, MAX_PART_RETRIES and RETRY_*_DELAY_MS in the frontend.
+PART_CONCURRENCY = 4
+MAX_PART_RETRIES = 3
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 4.0
+RETRY_JITTER_SECONDS = 0.25
+
+# Not an MP4/WebM signature, so the media probe skips it instead of failing the session.
+CONTENT_MAGIC = b'PRACTICA-LOADTEST\n'
+
+ASSET_TYPES = (
+    ('_proxy.mp4', SessionAsset.TYPE_PROXY_MP4, 'video/mp4'),
+    ('.m3u8', SessionAsset.TYPE_HLS_MASTER, 'application/vnd.apple.mpegurl'),
+)
+
+
+class PartFailed(Exception):
+    pass
+
+
+class Recorder:
+    """Thread-safe latency samples per step, plus outcome counters."""
+
+    def __init__(self):
+        self.samples = {}
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def time(self, step, call):
+        started = time.perf_counter()
+        try:
+            return call()
+        finally:
+            self.add(step, time.perf_counter() - started)
+
+    def add(self, step, seconds):
+        with self._lock:
+            self.samples.setdefault(step, []).append(seconds)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counts[name] += amount
+
+
+class UploadDriver:
+    def __init__(self, standin, recorder=None, part_concurrency=PART_CONCURRENCY, retry_base=RETRY_BASE_SECONDS,
+                 resumes=1, http=False, seed=None):
+        self.standin = standin
+        self.recorder = recorder or Recorder()
+        self.part_concurrency = part_concurrency
+        self.retry_base = retry_base
+        self.resumes = resumes
+        self.http = http
+        self.random = random.Random(seed)
+        self.session_ids = []
+        self.upload_ids = []
+        self._lock = threading.Lock()
+
+    def _client(self, user):
+        # Server errors come back as 500s, the way the browser would see them.
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user)
+        return client
+
+    def _post(self, client, step, url, body):
+        response = self.recorder.time(step, lambda: client.post(url, body, format='json'))
+        self.recorder.count(f'{step} {response.status_code}')
+        return response
+
+    def _sleep_backoff(self, attempt):
+        if self.retry_base <= 0:
+            return
+        backoff = min(RETRY_MAX_SECONDS, self.retry_base * (2 ** (attempt - 1)))
+        time.sleep(backoff + self.random.uniform(0, RETRY_JITTER_SECONDS))
+
+    def _put(self, url, body):
+        if not self.http:
+            return self.standin.s3.put_presigned(url, body)
+        request = urllib.request.Request(url, data=body, method='PUT')
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.headers.get('ETag', '').strip()
+
+    def _upload_part(self, client, upload_id, part_number, body):
+        signed = self._post(client, 'sign-part', '/api/sessions/multipart/sign-part/', {
+            'multipart_upload_id': upload_id, 'part_number': part_number,
+        })
+        if signed.status_code != 200:
+            raise PartFailed(f'sign-part returned {signed.status_code}')
+        for attempt in range(1, MAX_PART_RETRIES + 1):
+            try:
+                etag = self.recorder.time('put-part', lambda: self._put(signed.json()['signed_url'], body))
+                if etag:
+                    self.recorder.count('bytes', len(body))
+                    return etag
+            except (ClientError, URLError, OSError):
+                pass
+            self.recorder.count('put-part retries' if attempt < MAX_PART_RETRIES else 'put-part failures')
+            if attempt < MAX_PART_RETRIES:
+                self._sleep_backoff(attempt)
+        raise PartFailed(f'part {part_number} failed {MAX_PART_RETRIES} times')
+
+    def _upload_parts(self, user, upload_id, numbers, part_size, size, token, etags):
+        def one(number):
+            start = (number - 1) * part_size
+            body = _part_body(token, number, min(part_size, size - start))
+            etags[number] = self._upload_part(self._client(user), upload_id, number, body)
+
+        def worker(numbers_):
+            try:
+                for number in numbers_:
+                    one(number)
+            finally:
+                connections.close_all()
+
+        if self.part_concurrency <= 1 or len(numbers) <= 1:
+            for number in numbers:
+                one(number)
+            return
+        # Same shape as the frontend's pool: each worker takes the next missing part.
+        pending = iter(numbers)
+        lock = threading.Lock()
+
+        def next_numbers():
+            while True:
+                with lock:
+                    number = next(pending, None)
+                if number is None:
+                    return
+                yield number
+
+        with ThreadPoolExecutor(min(self.part_concurrency, len(numbers))) as pool:
+            futures = [pool.submit(worker, next_numbers()) for _ in range(min(self.part_concurrency, len(numbers)))]
+            for future in futures:
+                future.result()
+
+    def upload(self, user, space_id, size, title='Load test upload'):
+        """One multipart upload as the frontend does it. Returns the session id, or None when it failed."""
+        client = self._client(user)
+        token = os.urandom(8).hex()
+        started = time.perf_counter()
+        initiated = self._post(client, 'initiate', '/api/sessions/multipart/initiate/', {
+            'title': title, 'size_bytes': size, 'content_type': 'video/webm', 'filename': f'{token}.webm',
+            'space': space_id, 'duration_seconds': 60,
+        })
+        if initiated.status_code != 201:
+            self.recorder.count('uploads failed')
+            return None
+        upload_id = initiated.json()['multipart_upload_id']
+        with self._lock:
+            self.upload_ids.append(upload_id)
+        part_size, total_parts = initiated.json()['part_size'], initiated.json()['total_parts']
+
+        etags = {}
+        missing = list(range(1, total_parts + 1))
+        for attempt in range(self.resumes + 1):
+            try:
+                self._upload_parts(user, upload_id, missing, part_size, size, token, etags)
+                break
+            except PartFailed:
+                if attempt == self.resumes:
+                    self.recorder.count('uploads failed')
+                    return None
+            # A returning browser asks what S3 already has and sends the rest.
+            self.recorder.count('resumes')
+            status = self._post(client, 'status', '/api/sessions/multipart/status/', {'multipart_upload_id': upload_id})
+            if status.status_code != 200:
+                self.recorder.count('uploads failed')
+                return None
+            etags = {part['part_number']: part['etag'] for part in status.json()['uploaded_parts']}
+            missing = [number for number in range(1, total_parts + 1) if number not in etags]
+
+        completed = self._post(client, 'complete', '/api/sessions/multipart/complete/', {
+            'multipart_upload_id': upload_id,
+            'parts': [{'part_number': number, 'etag': etags[number]} for number in sorted(etags)],
+        })
+        if completed.status_code != 201:
+            self.recorder.count('uploads failed')
+            return None
+        self.recorder.count('uploads ok')
+        self.recorder.add('upload', time.perf_counter() - started)
+        with self._lock:
+            self.session_ids.append(completed.json()['id'])
+        return completed.json()['id']
+
+    def run(self, uploaders, uploads, size, concurrency):
+        """`uploads` uploads spread over `uploaders` [(user, space_id)], `concurrency` at a time."""
+        def task(index):
+            user, space_id = uploaders[index % len(uploaders)]
+            try:
+                return self.upload(user, space_id, size, title=f'Load test upload {index + 1}')
+            finally:
+                if concurrency > 1:
+                    connections.close_all()
+
+        if concurrency <= 1:
+            return [task(index) for index in range(uploads)]
+        with ThreadPoolExecutor(concurrency) as pool:
+            return list(pool.map(task, range(uploads)))
+
+    def finish_processing(self, timeout=60.0, poll_seconds=0.2):
+        """
+        Dispatch queued submissions and deliver MediaConvert results until
+        every uploaded session is ready or failed. Returns seconds from
+        upload completion to a final status, per session.
+        """
+        client = APIClient(raise_request_exception=False)
+        settled = {}
+        created = dict(Session.objects.filter(id__in=self.session_ids).values_list('id', 'created_at'))
+        delivered = set()
+        deadline = time.monotonic() + timeout
+        while len(settled) < len(created) and time.monotonic() < deadline:
+            dispatch_media_jobs(kinds=RATE_LIMITED_KINDS)
+            submitted = MediaJob.objects.filter(
+                session_id__in=created, kind__in=RATE_LIMITED_KINDS, status=MediaJob.STATUS_SUBMITTED,
+            ).exclude(external_id__in=delivered).values_list('session_id', 'external_id')
+            updates = []
+            for session_id, job_id in submitted:
+                try:
+                    job = self.standin.mediaconvert.get_job(Id=job_id)['Job']
+                except ClientError:
+                    self.recorder.count('get-job errors')
+                    continue
+                if job['Status'] not in ('COMPLETE', 'ERROR'):
+                    continue
+                delivered.add(job_id)
+                updates.append(_callback_update(session_id, job))
+            if updates:
+                response = self._callback(client, updates)
+                self.recorder.count(f'callback {response.status_code}')
+            for session_id, status, updated in Session.objects.filter(
+                id__in=set(created) - set(settled),
+                processing_status__in=[Session.STATUS_READY, Session.STATUS_FAILED],
+            ).values_list('id', 'processing_status', 'updated_at'):
+                settled[session_id] = (updated - created[session_id]).total_seconds()
+                self.recorder.count(f'sessions {status}')
+            if len(settled) < len(created):
+                time.sleep(poll_seconds)
+        self.recorder.count('sessions unfinished', len(created) - len(settled))
+        return settled
+
+    def cleanup(self):
+        """Delete the sessions and upload records this run created. Returns the number of sessions deleted."""
+        # Their objects only ever existed in the stand-in, so there is nothing to queue for storage cleanup.
+        with patch('videos.services.deletion.enqueue_storage_cleanup'):
+            deleted = delete_sessions(self.session_ids)
+        MultipartSessionUpload.objects.filter(id__in=self.upload_ids).delete()
+        return deleted
+
+    def _callback(self, client, updates):
+        return self.recorder.time('processing-update', lambda: client.post(
+            '/api/sessions/processing-update/', {'updates': updates}, format='json',
+            HTTP_X_PROCESSING_TOKEN=self.standin.callback_token,
+        ))
+
+
+def _part_body(token, number, length):
+    head = CONTENT_MAGIC + f'{token}:{number}\n'.encode()
+    return (head + bytes(max(0, length - len(head))))[:length]
+
+
+def _callback_update(session_id, job):
+    update = {'session_id': session_id, 'event_id': f"standin-{job['Id']}"}
+    if job['Status'] == 'ERROR':
+        return {**update, 'status': Session.STATUS_FAILED, 'processing_error': job.get('ErrorMessage', '')}
+    assets = []
+    for group in job.get('OutputGroupDetails', []):
+        for path in group['OutputDetails'][0]['OutputFilePaths']:
+            key = path.split('/', 3)[-1]
+            for suffix, asset_type, content_type in ASSET_TYPES:
+                if key.endswith(suffix):
+                    assets.append({'asset_type': asset_type, 'object_key': key, 'content_type': content_type})
+    return {**update, 'status': Session.STATUS_READY, 'assets': assets}
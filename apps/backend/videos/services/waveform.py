@@ -0,0 +1,156 @@
+import posixpath
+import struct
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from videos.models import SessionAsset
+from videos.services.ranged_reads import RangeReader
+
+# Layout: magic, version, sample rate, level count; per level: samples per
+# peak, peak count, then interleaved int8 (min, max) pairs. Little-endian.
+MAGIC = b'PKWF'
+VERSION = 1
+CONTENT_TYPE = 'application/vnd.practica.waveform'
+BASE_SAMPLES_PER_PEAK = 256   # ~31 peaks/second at the 8 kHz analysis rate
+MIN_LEVEL_PEAKS = 256         # stop halving once a level fits a narrow scrubber
+READ_BLOCK_BYTES = 4 * 1024 * 1024
+
+
+def read_wav_format(reader):
+    """(channels, sample_rate, bits_per_sample, data_offset, data_size) from RIFF chunk headers."""
+    head = reader.read(0, 12)
+    if len(head) < 12 or head[:4] != b'RIFF' or head[8:12] != b'WAVE':
+        raise ValueError('Not a WAV file')
+    offset = 12
+    fmt = None
+    while offset + 8 <= reader.size:
+        chunk_id, chunk_size = struct.unpack('<4sI', reader.read(offset, 8))
+        if chunk_id == b'fmt ':
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', reader.read(offset + 8, 16))
+            if audio_format not in (1, 0xFFFE) or bits != 16:
+                raise ValueError('Only 16-bit PCM WAV is supported')
+            fmt = (channels, sample_rate, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError('WAV data chunk before fmt chunk')
+            # Streaming writers leave the size as 0/0xFFFFFFFF; fall back to the object size.
+            if chunk_size in (0, 0xFFFFFFFF) or offset + 8 + chunk_size > reader.size:
+                chunk_size = reader.size - offset - 8
+            return (*fmt, offset + 8, chunk_size)
+        offset += 8 + chunk_size + (chunk_size & 1)
+    raise ValueError('WAV has no data chunk')
+
+
+def _downsample(level):
+    """Halve a (n, 2) min/max level by merging neighbouring peaks."""
+    if len(level) % 2:
+        level = np.vstack([level, level[-1:]])
+    pairs = level.reshape(-1, 2, 2)
+    return np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1)
+
+
+def pcm_blocks(reader):
+    """
+    (sample_rate, iterator of float32 mono sample blocks) for a 16-bit PCM WAV,
+    read in READ_BLOCK_BYTES ranges so memory stays bounded for hour-long takes.
+    """
+    channels, sample_rate, _bits, data_offset, data_size = read_wav_format(reader)
+    frame_bytes = 2 * channels
+    block = max(frame_bytes, READ_BLOCK_BYTES - READ_BLOCK_BYTES % frame_bytes)
+
+    def blocks():
+        position = 0
+        while position < data_size:
+            raw = reader.read(data_offset + position, min(block, data_size - position))
+            if not raw:
+                return
+            position += len(raw)
+            samples = np.frombuffer(raw[:len(raw) - len(raw) % frame_bytes], dtype='<i2').astype(np.float32)
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1)
+            yield samples
+
+    return sample_rate, blocks()
+
+
+def compute_peaks(reader, samples_per_peak=BASE_SAMPLES_PER_PEAK):
+    """
+    Stream the PCM data and return (sample_rate, [(samples_per_peak, int8 array (n, 2)), ...])
+    from finest to coarsest.
+    """
+    sample_rate, blocks = pcm_blocks(reader)
+    chunks = []
+    carry = np.empty(0, dtype=np.float32)
+    for samples in blocks:
+        samples = np.concatenate([carry, samples])
+        whole = len(samples) - len(samples) % samples_per_peak
+        if whole:
+            windows = samples[:whole].reshape(-1, samples_per_peak)
+            chunks.append(np.stack([windows.min(axis=1), windows.max(axis=1)], axis=1))
+        carry = samples[whole:]
+    if len(carry):
+        chunks.append(np.array([[carry.min(), carry.max()]], dtype=np.float32))
+
+    base = np.vstack(chunks) if chunks else np.zeros((0, 2), dtype=np.float32)
+    base = np.clip(np.round(base / 32768.0 * 127), -127, 127).astype(np.int8)
+
+    levels = [(samples_per_peak, base)]
+    while len(levels[-1][1]) > MIN_LEVEL_PEAKS:
+        spp, level = levels[-1]
+        levels.append((spp * 2, _downsample(level)))
+    return sample_rate, levels
+
+
+def pack_peaks(sample_rate, levels):
+    out = [struct.pack('<4sBIB', MAGIC, VERSION, sample_rate, len(levels))]
+    for samples_per_peak, level in levels:
+        out.append(struct.pack('<II', samples_per_peak, len(level)))
+        out.append(np.ascontiguousarray(level, dtype=np.int8).tobytes())
+    return b''.join(out)
+
+
+def unpack_peaks(blob):
+    magic, version, sample_rate, level_count = struct.unpack_from('<4sBIB', blob, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Unsupported waveform peaks')
+    offset = 10
+    levels = []
+    for _ in range(level_count):
+        samples_per_peak, count = struct.unpack_from('<II', blob, offset)
+        offset += 8
+        level = np.frombuffer(blob, dtype=np.int8, count=count * 2, offset=offset).reshape(-1, 2)
+        offset += count * 2
+        levels.append((samples_per_peak, level))
+    return sample_rate, levels
+
+
+def build_waveform_peaks(session):
+    """Compute peaks from the session's analysis WAV and store them next to the other derived assets."""
+    audio = session.assets.filter(asset_type=SessionAsset.TYPE_AUDIO_ANALYSIS).first()
+    if audio is None:
+        raise ValueError('Session has no analysis audio')
+
+    sample_rate, levels = compute_peaks(RangeReader(audio.object_key))
+    key = f"{posixpath.dirname(posixpath.dirname(audio.object_key))}/waveform/peaks.bin"
+    if default_storage.exists(key):
+        default_storage.delete(key)
+    key = default_storage.save(key, ContentFile(pack_peaks(sample_rate, levels)))
+
+    base_spp, base = levels[0]
+    asset, _ = SessionAsset.objects.update_or_create(
+        session=session,
+        asset_type=SessionAsset.TYPE_WAVEFORM_PEAKS,
+        defaults={
+            'object_key': key,
+            'content_type': CONTENT_TYPE,
+            'metadata_json': {
+                'format': f'pkwf{VERSION}',
+                'sample_rate': sample_rate,
+                'duration_seconds': round(len(base) * base_spp / sample_rate, 3) if sample_rate else 0,
+                'levels': [{'samples_per_peak': spp, 'count': len(level)} for spp, level in levels],
+            },
+        },
+    )
+    return asset
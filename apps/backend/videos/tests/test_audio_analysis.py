@@ -0,0 +1,87 @@
+import shutil
+import tempfile
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from videos.models import ChapterSuggestion, Session, SessionAsset, Space
+from videos.services.audio_analysis import analyze, build_chapter_suggestions
+from videos.tests.test_waveform import BytesReader, _wav
+
+RATE = 8000
+
+
+def _clicks(bpm, seconds):
+    """A click track: short decaying noise bursts on every beat."""
+    rng = np.random.default_rng(bpm)
+    samples = np.zeros(int(seconds * RATE))
+    burst = rng.uniform(-1, 1, 400) * np.exp(-np.arange(400) / 80) * 20000
+    for beat in np.arange(0, seconds, 60 / bpm):
+        start = int(beat * RATE)
+        samples[start:start + 400] = burst[:len(samples) - start]
+    return samples
+
+
+def _silence(seconds):
+    return np.zeros(int(seconds * RATE))
+
+
+class AudioAnalysisTests(TestCase):
+    def test_segments_split_on_silence_with_tempo(self):
+        audio = np.concatenate([_silence(2), _clicks(90, 20), _silence(5), _clicks(140, 16), _silence(2)])
+        suggestions = analyze(BytesReader(_wav(audio)))
+
+        self.assertEqual(len(suggestions), 2)
+        first, second = suggestions
+        self.assertAlmostEqual(first['start_seconds'], 2, delta=0.2)
+        self.assertAlmostEqual(first['end_seconds'], 21.5, delta=0.5)
+        self.assertAlmostEqual(second['start_seconds'], 27, delta=0.2)
+        self.assertAlmostEqual(first['tempo_bpm'], 90, delta=3)
+        self.assertAlmostEqual(second['tempo_bpm'], 140, delta=3)
+        self.assertAlmostEqual(first['onset_count'], 30, delta=3)
+
+    def test_short_pauses_and_fragments(self):
+        audio = np.concatenate([_clicks(120, 10), _silence(1), _clicks(120, 10), _silence(4), _clicks(120, 3)])
+        suggestions = analyze(BytesReader(_wav(audio)))
+        # The 1 s pause stays inside one segment; the trailing 3 s fragment is dropped.
+        self.assertEqual(len(suggestions), 1)
+        self.assertGreater(suggestions[0]['end_seconds'], 20)
+
+    def test_silent_audio_has_no_suggestions(self):
+        self.assertEqual(analyze(BytesReader(_wav(_silence(10)))), [])
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='')
+class ChapterSuggestionBuildTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(MEDIA_ROOT=self.media_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        user = User.objects.create_user(username='suggest', password='pass1234')
+        space = Space.objects.create(name='Piano', owner=user)
+        self.session = Session.objects.create(
+            user=user, space=space, title='Scales', processing_status=Session.STATUS_READY,
+        )
+
+    def test_build_replaces_suggestions(self):
+        with self.assertRaises(ValueError):
+            build_chapter_suggestions(self.session)
+
+        key = default_storage.save(
+            f'processed/sessions/{self.session.id}/audio/take_analysis.wav',
+            ContentFile(_wav(np.concatenate([_clicks(100, 12), _silence(3)]))),
+        )
+        SessionAsset.objects.create(
+            session=self.session, asset_type=SessionAsset.TYPE_AUDIO_ANALYSIS, object_key=key,
+        )
+        ChapterSuggestion.objects.create(session=self.session, start_seconds=99, end_seconds=120)
+
+        created = build_chapter_suggestions(self.session)
+        self.assertEqual(len(created), 1)
+        self.assertEqual(list(self.session.chapter_suggestions.values_list('start_seconds', flat=True)), [0.0])
@@ -0,0 +1,175 @@
+from io import StringIO
+
+from botocore.exceptions import ClientError
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from videos.models import MediaJob, MultipartSessionUpload, Session, SessionAsset, Space
+from videos.services.aws_standin import BUCKET, StandIn
+from videos.services.media_pipeline import SubmissionThrottled, _submit_job, multipart_fingerprint
+from videos.services.upload_load import UploadDriver
+
+MB = 1024 * 1024
+
+
+def _error_code(exc):
+    return exc.exception.response['Error']['Code']
+
+
+class StandInS3Tests(TestCase):
+    def setUp(self):
+        self.s3 = StandIn(min_part_size=4).s3
+        self.upload_id = self.s3.create_multipart_upload(Bucket=BUCKET, Key='clip.webm')['UploadId']
+
+    def _put(self, number, body):
+        url = self.s3.generate_presigned_url(
+            'upload_part', Params={'Bucket': BUCKET, 'Key': 'clip.webm', 'UploadId': self.upload_id, 'PartNumber': number},
+        )
+        return self.s3.put_presigned(url, body)
+
+    def test_multipart_round_trip_matches_the_app_fingerprint(self):
+        parts = [{'PartNumber': 1, 'ETag': self._put(1, b'head-bytes')}, {'PartNumber': 2, 'ETag': self._put(2, b'tail')}]
+
+        page = self.s3.list_parts(Bucket=BUCKET, Key='clip.webm', UploadId=self.upload_id, MaxParts=1)
+        self.assertEqual([part['PartNumber'] for part in page['Parts']], [1])
+        self.assertTrue(page['IsTruncated'])
+        rest = self.s3.list_parts(
+            Bucket=BUCKET, Key='clip.webm', UploadId=self.upload_id, PartNumberMarker=page['NextPartNumberMarker'],
+        )
+        self.assertEqual([part['PartNumber'] for part in rest['Parts']], [2])
+
+        completed = self.s3.complete_multipart_upload(
+            Bucket=BUCKET, Key='clip.webm', UploadId=self.upload_id, MultipartUpload={'Parts': parts},
+        )
+        self.assertEqual(completed['ETag'].strip('"'), multipart_fingerprint(14, parts).split(':', 1)[1])
+        self.assertEqual(self.s3.head_object(Bucket=BUCKET, Key='clip.webm')['ContentLength'], 14)
+        body = self.s3.get_object(Bucket=BUCKET, Key='clip.webm', Range='bytes=0-3')['Body'].read()
+        self.assertEqual(body, b'head')
+
+    def test_rejects_wrong_etags_small_parts_and_tampered_urls(self):
+        self._put(1, b'ab')
+        self._put(2, b'cd')
+        with self.assertRaises(ClientError) as exc:
+            self.s3.complete_multipart_upload(
+                Bucket=BUCKET, Key='clip.webm', UploadId=self.upload_id,
+                MultipartUpload={'Parts': [{'PartNumber': 1, 'ETag': '"0000"'}]},
+            )
+        self.assertEqual(_error_code(exc), 'InvalidPart')
+
+        listed = self.s3.list_parts(Bucket=BUCKET, Key='clip.webm', UploadId=self.upload_id)['Parts']
+        with self.assertRaises(ClientError) as exc:
+            self.s3.complete_multipart_upload(
+                Bucket=BUCKET, Key='clip.webm', UploadId=self.upload_id,
+                MultipartUpload={'Parts': [{'PartNumber': p['PartNumber'], 'ETag': p['ETag']} for p in listed]},
+            )
+        self.assertEqual(_error_code(exc), 'EntityTooSmall')
+
+        url = self.s3.generate_presigned_url(
+            'upload_part', Params={'Bucket': BUCKET, 'Key': 'clip.webm', 'UploadId': self.upload_id, 'PartNumber': 3},
+        )
+        with self.assertRaises(ClientError) as exc:
+            self.s3.put_presigned(url.replace('partNumber=3', 'partNumber=4'), b'x')
+        self.assertEqual(_error_code(exc), 'SignatureDoesNotMatch')
+
+    def test_injected_failures_use_the_aws_error_codes(self):
+        standin = StandIn(failures={'upload_part': 1.0, 'create_job': 1.0}, seed=1)
+        upload_id = standin.s3.create_multipart_upload(Bucket=BUCKET, Key='k')['UploadId']
+        with self.assertRaises(ClientError) as exc:
+            standin.s3.upload_part(Bucket=BUCKET, Key='k', UploadId=upload_id, PartNumber=1, Body=b'x')
+        self.assertEqual(_error_code(exc), 'SlowDown')
+        self.assertEqual(standin.faults.injected['upload_part'], 1)
+
+        with standin.activate():
+            with self.assertRaises(SubmissionThrottled):
+                _submit_job({'Inputs': []}, {'session_id': '1'})
+
+
+class StandInMediaConvertTests(TestCase):
+    def test_jobs_complete_with_outputs_or_fail(self):
+        standin = StandIn(job_seconds=0)
+        settings_ = {
+            'Inputs': [{'FileInput': f's3://{BUCKET}/sessions/1/take.webm'}],
+            'OutputGroups': [{
+                'Name': 'proxy-mp4',
+                'OutputGroupSettings': {
+                    'Type': 'FILE_GROUP_SETTINGS',
+                    'FileGroupSettings': {'Destination': f's3://{BUCKET}/processed/sessions/1/proxy/'},
+                },
+                'Outputs': [{'NameModifier': '_proxy', 'ContainerSettings': {'Container': 'MP4'}}],
+            }],
+        }
+        job_id = standin.mediaconvert.create_job(Role='role', Settings=settings_)['Job']['Id']
+        job = standin.mediaconvert.get_job(Id=job_id)['Job']
+        self.assertEqual(job['Status'], 'COMPLETE')
+        self.assertEqual(
+            job['OutputGroupDetails'][0]['OutputDetails'][0]['OutputFilePaths'],
+            [f's3://{BUCKET}/processed/sessions/1/proxy/take_proxy.mp4'],
+        )
+        self.assertIn('processed/sessions/1/proxy/take_proxy.mp4', standin.s3.objects)
+
+        standin.mediaconvert.job_failure_rate = 1.0
+        failed = standin.mediaconvert.create_job(Role='role', Settings=settings_)['Job']['Id']
+        self.assertEqual(standin.mediaconvert.get_job(Id=failed)['Job']['Status'], 'ERROR')
+        with self.assertRaises(ClientError) as exc:
+            standin.mediaconvert.get_job(Id='missing')
+        self.assertEqual(_error_code(exc), 'NotFoundException')
+
+
+class UploadDriverTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='coach', password='pass1234')
+        self.space = Space.objects.create(name='Studio', owner=self.user)
+
+    def test_uploads_flow_through_processing_and_are_cleaned_up(self):
+        standin = StandIn(job_seconds=0)
+        driver = UploadDriver(standin, part_concurrency=1, retry_base=0)
+        with standin.activate():
+            ids = driver.run([(self.user, self.space.id)], uploads=2, size=6 * MB, concurrency=1)
+            settled = driver.finish_processing(timeout=5, poll_seconds=0)
+
+        self.assertEqual(sorted(settled), sorted(ids))
+        self.assertEqual(driver.recorder.counts['uploads ok'], 2)
+        self.assertEqual(len(driver.recorder.samples['put-part']), 4)
+        for session in Session.objects.filter(id__in=ids):
+            self.assertEqual(session.processing_status, Session.STATUS_READY)
+            self.assertTrue(session.content_fingerprint)
+            self.assertTrue(session.assets.filter(asset_type=SessionAsset.TYPE_PROXY_MP4).exists())
+        self.assertEqual(MediaJob.objects.get(session_id=ids[0], kind=MediaJob.KIND_SESSION_PROCESSING).status,
+                         MediaJob.STATUS_SUBMITTED)
+
+        with standin.activate():
+            self.assertEqual(driver.cleanup(), 2)
+        self.assertFalse(Session.objects.filter(id__in=ids).exists())
+        self.assertFalse(MultipartSessionUpload.objects.exists())
+        self.assertFalse(MediaJob.objects.filter(kind=MediaJob.KIND_STORAGE_CLEANUP).exists())
+
+    def test_failed_parts_are_retried_then_resumed_over_http(self):
+        standin = StandIn(failures={'upload_part': 1.0})
+        driver = UploadDriver(standin, part_concurrency=1, retry_base=0, resumes=1, http=True)
+        with standin.activate(), standin.serve():
+            ids = driver.run([(self.user, self.space.id)], uploads=1, size=6 * MB, concurrency=1)
+
+        counts = driver.recorder.counts
+        self.assertEqual(ids, [None])
+        self.assertEqual(standin.faults.injected['upload_part'], 6)
+        self.assertEqual((counts['put-part retries'], counts['put-part failures']), (4, 2))
+        self.assertEqual((counts['resumes'], counts['status 200'], counts['uploads failed']), (1, 1, 1))
+
+
+class LoadTestCommandTests(TestCase):
+    def test_reports_uploads_and_processing(self):
+        call_command(
+            'generate_dataset', '--coaches', '1', '--spaces-per-coach', '1', '--students', '2',
+            '--members-per-space', '1', '--sessions-per-space', '1', '--metric-days', '0', '--allow-production',
+            stdout=StringIO(),
+        )
+        out = StringIO()
+        call_command(
+            'load_test_uploads', '--uploads', '2', '--concurrency', '1', '--part-concurrency', '1',
+            '--size-mb', '6', '--job-seconds', '0', '--retry-base', '0', stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('2 uploads ok, 0 failed', output)
+        self.assertIn('Processing: 2 ready, 0 failed, 0 unfinished', output)
+        self.assertFalse(Session.objects.filter(title__startswith='Load test').exists())
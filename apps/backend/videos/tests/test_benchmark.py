@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from videos.models import MultipartSessionUpload, Session
+from videos.services.benchmark import compare
+
+
+class BenchmarkCommandTests(TestCase):
+    def setUp(self):
+        call_command(
+            'generate_dataset', '--coaches', '1', '--spaces-per-coach', '2', '--students', '6',
+            '--members-per-space', '3', '--sessions-per-space', '3', '--max-comments', '8',
+            '--allow-production', '--metric-days', '1', stdout=StringIO(),
+        )
+        handle, self.output = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.output)
+
+    def _benchmark(self, *args):
+        out = StringIO()
+        call_command('benchmark', '--iterations', '2', '--warmup', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reports_every_flow_and_rolls_back_writes(self):
+        sessions = Session.objects.count()
+        output = self._benchmark('--output', self.output)
+
+        self.assertIn('scenarios within budget', output)
+        results = json.loads(open(self.output).read())
+        self.assertEqual(results['meta']['sessions'], sessions)
+        scenarios = results['scenarios']
+        for name in ('session list', 'session detail (busiest)', 'exercise progress', 'spaces', 'tags', 'me',
+                     'multipart initiate', 'multipart sign part', 'multipart complete', 'coach metrics build (1 day)'):
+            self.assertIn(name, scenarios)
+            self.assertGreaterEqual(scenarios[name]['p95_ms'], scenarios[name]['p50_ms'])
+            self.assertIsNotNone(scenarios[name]['alloc_peak_kb'])
+        http = {name: result for name, result in scenarios.items() if name != 'coach metrics build (1 day)'}
+        self.assertTrue(all(status < 300 for result in http.values() for status in result['statuses']))
+        self.assertEqual(scenarios['session list']['query_budget'], 12)
+
+        self.assertEqual(Session.objects.count(), sessions)
+        self.assertFalse(MultipartSessionUpload.objects.exists())
+
+    def test_baseline_with_fewer_queries_is_a_regression(self):
+        self._benchmark('--only', 'tags', '--output', self.output)
+        results = json.loads(open(self.output).read())
+        results['scenarios']['tags']['queries'] -= 1
+        with open(self.output, 'w') as fh:
+            json.dump(results, fh)
+
+        with self.assertRaisesMessage(CommandError, 'tags: 1 queries, baseline 0'):
+            self._benchmark('--only', 'tags', '--baseline', self.output)
+
+    def test_coach_metrics_build_is_skipped_without_its_tables(self):
+        with patch('videos.services.benchmark.coach_metrics_tables_present', return_value=False):
+            output = self._benchmark('--only', 'coach metrics', '--only', 'tags', '--output', self.output)
+
+        self.assertIn('Skipping coach metrics build', output)
+        self.assertEqual(list(json.loads(open(self.output).read())['scenarios']), ['tags'])
+
+    def test_missing_dataset_points_at_generate_dataset(self):
+        with self.assertRaisesMessage(CommandError, 'generate_dataset'):
+            self._benchmark('--prefix', 'nope')
+
+    def test_compare_flags_budget_and_latency(self):
+        current = {'spaces': {'p95_ms': 80.0, 'queries': 9, 'query_budget': 8}}
+        baseline = {'spaces': {'p95_ms': 40.0, 'queries': 9}}
+        self.assertEqual(compare(current, baseline, 0.25), [
+            'spaces: 9 queries exceeds budget 8',
+            'spaces: p95 80.0ms, baseline 40.0ms (+25% allowed)',
+        ])
+        current['spaces'].update(p95_ms=44.0, queries=8)
+        self.assertEqual(compare(current, baseline, 0.25), [])
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from videos.models import MediaJob, Session, SessionAsset, Space
+from videos.services import bulk_import
+from videos.services.jobs import PRIORITY_BACKFILL, dispatch_media_jobs
+from videos.tests.test_keyframes import _mp4
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='', AWS_MEDIA_CONVERT_ROLE_ARN='', AWS_MEDIA_CONVERT_ENDPOINT_URL='')
+class LocalImportTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(MEDIA_ROOT=self.media_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        self.user = User.objects.create_user(username='archivist', password='pass1234')
+        self.space = Space.objects.create(name='Archive', owner=self.user)
+        self.other_space = Space.objects.create(name='Recitals', owner=self.user)
+        for name in ('2019/scales_in_c.mp4', '2019/recital.mov', '2019/notes.txt', '2020/etude.webm'):
+            default_storage.save(f'archive/{name}', ContentFile(b'media-bytes'))
+
+    def _manifest(self, text):
+        path = os.path.join(self.media_root, 'manifest.csv')
+        with open(path, 'w') as fh:
+            fh.write(text)
+        return path
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('import_recordings', 'archive/', '--user', 'archivist', *args, stdout=out)
+        return out.getvalue()
+
+    def test_imports_media_with_manifest_metadata(self):
+        manifest = self._manifest(
+            'key,title,tags,space_id\n'
+            f'archive/2019/recital.mov,Spring recital,"performance, Recital",{self.other_space.id}\n'
+        )
+        output = self._run('--space', str(self.space.id), '--manifest', manifest, '--batch-size', '2')
+
+        self.assertIn('Imported 3 of 3', output)
+        recital = Session.objects.get(video_file='archive/2019/recital.mov')
+        self.assertEqual(recital.title, 'Spring recital')
+        self.assertEqual(recital.space, self.other_space)
+        self.assertEqual(sorted(recital.tags.values_list('name', flat=True)), ['Recital', 'performance'])
+
+        scales = Session.objects.get(video_file='archive/2019/scales_in_c.mp4')
+        self.assertEqual(scales.title, 'scales in c')
+        self.assertEqual(scales.space, self.space)
+        self.assertEqual(scales.processing_status, Session.STATUS_READY)
+        self.assertTrue(SessionAsset.objects.filter(session=scales, asset_type=SessionAsset.TYPE_PROXY_MP4).exists())
+
+    def test_rerun_skips_imported_keys(self):
+        self._run()
+        output = self._run()
+        self.assertIn('Imported 0 of 3', output)
+        self.assertEqual(Session.objects.count(), 3)
+
+    def test_dry_run_creates_nothing(self):
+        output = self._run('--dry-run')
+        self.assertIn('Would import 3 of 3', output)
+        self.assertIn('archive/2020/etude.webm', output)
+        self.assertFalse(Session.objects.exists())
+
+    def test_manifest_with_unknown_space_is_rejected(self):
+        manifest = self._manifest('key,space_id\narchive/2019/recital.mov,9999\n')
+        with self.assertRaisesMessage(Exception, 'unknown space'):
+            self._run('--manifest', manifest)
+
+    def test_originals_from_one_prefix_get_distinct_keyframe_indexes(self):
+        for name in ('take_1.mp4', 'take_2.mp4'):
+            default_storage.save(f'takes/{name}', ContentFile(_mp4([100, 10], sync_samples=[1], timescale=1, delta=1)))
+        call_command('import_recordings', 'takes/', '--user', 'archivist', stdout=StringIO())
+
+        self.assertEqual(dispatch_media_jobs(), 2)
+        keys = SessionAsset.objects.filter(
+            asset_type=SessionAsset.TYPE_KEYFRAME_INDEX,
+        ).values_list('object_key', flat=True)
+        self.assertEqual(len(set(keys)), 2)
+
+
+class PipelineImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='archivist', password='pass1234')
+
+    def test_pipeline_jobs_are_queued_at_backfill_priority(self):
+        recordings = [
+            bulk_import.StoredRecording(f'archive/take-{index}.mp4', 10, '10:abc-1') for index in range(3)
+        ]
+        with patch.object(bulk_import, 'media_pipeline_enabled', return_value=True):
+            sessions = bulk_import.import_batch(recordings, self.user)
+
+        self.assertEqual(len(sessions), 3)
+        self.assertTrue(all(session.processing_status == Session.STATUS_PROCESSING for session in sessions))
+        jobs = MediaJob.objects.filter(kind=MediaJob.KIND_SESSION_PROCESSING)
+        self.assertEqual(jobs.count(), 3)
+        self.assertEqual(set(jobs.values_list('priority', flat=True)), {PRIORITY_BACKFILL})
+
+    def test_listing_etag_becomes_fingerprint(self):
+        self.assertEqual(bulk_import._etag_fingerprint(100, '"abc-3"'), '100:abc-3')
+        self.assertTrue(bulk_import._etag_fingerprint(100, '"' + 'f' * 32 + '"').endswith('-1'))
@@ -12,6 +12,7 @@ from rest_framework.test import APITestCase
 
 from videos.models import CoachDailyMetric, CoachEvent, Comment, Profile, Session, Space, SpaceMember
 from videos.services.coach_metrics import compute_daily_metric_for_coach
+from videos.tests.utils import TemporaryMediaRootMixin
 
 
 class CoachMetricModelTests(TestCase):
@@ -33,8 +34,9 @@ class CoachMetricModelTests(TestCase):
 
 
 @override_settings(COACH_METRICS_ENABLED=True)
-class CoachMetricsEventCaptureTests(APITestCase):
+class CoachMetricsEventCaptureTests(TemporaryMediaRootMixin, APITestCase):
     def setUp(self):
+        super().setUp()
         self.owner = User.objects.create_user(username='owner-events', password='pass1234')
         self.member = User.objects.create_user(username='member-events', password='pass1234')
         Profile.objects.create(user=self.owner, display_name='Owner')
@@ -93,8 +95,9 @@ class CoachMetricsEventCaptureTests(APITestCase):
         )
 
 
-class CoachMetricsAggregationTests(TestCase):
+class CoachMetricsAggregationTests(TemporaryMediaRootMixin, TestCase):
     def setUp(self):
+        super().setUp()
         self.coach = User.objects.create_user(username='coach-agg', password='pass1234')
         self.student_a = User.objects.create_user(username='student-a', password='pass1234')
         self.student_b = User.objects.create_user(username='student-b', password='pass1234')
@@ -203,8 +206,9 @@ class CoachMetricsAggregationTests(TestCase):
         self.assertEqual(second_count, 2)
 
 
-class CoachMetricsSummaryApiTests(APITestCase):
+class CoachMetricsSummaryApiTests(TemporaryMediaRootMixin, APITestCase):
     def setUp(self):
+        super().setUp()
         self.coach = User.objects.create_user(username='coach-api', password='pass1234')
         self.other = User.objects.create_user(username='coach-other', password='pass1234')
         self.metric_dates = [
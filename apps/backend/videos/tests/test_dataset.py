@@ -0,0 +1,98 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+from django.utils import timezone
+
+from videos.models import CoachDailyMetric, CoachEvent, Comment, Session, Space, SpaceMember
+
+
+def _generate(*args):
+    out = StringIO()
+    call_command(
+        'generate_dataset', '--coaches', '2', '--spaces-per-coach', '2', '--students', '12',
+        '--members-per-space', '5', '--sessions-per-space', '3', '--max-comments', '25',
+        '--allow-production', '--metric-days', '2', *args, stdout=out,
+    )
+    return out.getvalue()
+
+
+def _shape(prefix):
+    sessions = Session.objects.filter(user__username__startswith=f'{prefix}-').order_by('id')
+    return [
+        (session.title, session.duration_seconds, session.comments.count(), session.chapters.count())
+        for session in sessions
+    ]
+
+
+class GenerateDatasetTests(TestCase):
+    def test_generates_requested_fan_out(self):
+        output = _generate('--prefix', 'perf')
+
+        self.assertIn('Created', output)
+        self.assertEqual(User.objects.filter(username__startswith='perf-').count(), 14)
+        self.assertEqual(Space.objects.count(), 4)
+        self.assertEqual(SpaceMember.objects.count(), 20)
+        self.assertEqual(Session.objects.count(), 12)
+        self.assertTrue(all(space.main_session_id for space in Space.objects.all()))
+        self.assertEqual(CoachDailyMetric.objects.count(), 4)
+
+        busiest = Comment.objects.values('session').annotate(n=Count('id')).order_by('-n')
+        self.assertEqual([row['n'] for row in busiest[:2]], [25, 25])
+
+        oldest = Session.objects.order_by('created_at').first().created_at
+        self.assertLess(oldest, timezone.now() - timedelta(days=1))
+        self.assertGreaterEqual(oldest, timezone.now() - timedelta(days=61))
+
+    def test_same_seed_gives_same_data(self):
+        _generate('--prefix', 'one', '--seed', '7')
+        _generate('--prefix', 'two', '--seed', '7')
+        self.assertEqual(_shape('one'), _shape('two'))
+
+    def test_existing_prefix_needs_replace(self):
+        _generate('--prefix', 'perf')
+        with self.assertRaisesMessage(CommandError, 'already exists'):
+            _generate('--prefix', 'perf')
+        _generate('--prefix', 'perf', '--replace')
+        self.assertEqual(Session.objects.count(), 12)
+
+    def test_dry_run_writes_nothing(self):
+        output = _generate('--dry-run', '--scale', 'large')
+        self.assertIn('Scale large (seed 1): about 14 users, 4 spaces, 20 memberships, 12 sessions', output)
+        self.assertFalse(User.objects.exists())
+
+    def test_refuses_to_run_without_debug(self):
+        with self.assertRaisesMessage(CommandError, '--allow-production'):
+            call_command('generate_dataset', '--coaches', '1', '--students', '1', stdout=StringIO())
+        self.assertFalse(User.objects.exists())
+
+    def test_accounts_cannot_log_in_unless_asked(self):
+        output = _generate('--prefix', 'perf')
+        self.assertNotIn('Log in as', output)
+        self.assertFalse(any(user.has_usable_password() for user in User.objects.all()))
+
+        output = _generate('--prefix', 'login', '--login')
+        password = output.split('login-coach-0000 / ', 1)[1].split(' ', 1)[0]
+        self.assertTrue(User.objects.get(username='login-coach-0000').check_password(password))
+
+    def test_replace_only_deletes_generated_accounts(self):
+        _generate('--prefix', 'perf')
+        bystander = User.objects.create_user(username='perf-ops-admin', password='pass1234')
+        _generate('--prefix', 'perf', '--replace')
+        self.assertTrue(User.objects.filter(id=bystander.id).exists())
+
+    def test_skips_coach_metrics_when_their_tables_were_dropped(self):
+        dropped = {CoachEvent._meta.db_table, CoachDailyMetric._meta.db_table}
+        tables = [name for name in connection.introspection.table_names() if name not in dropped]
+        with patch.object(connection.introspection, 'table_names', return_value=tables):
+            output = _generate('--prefix', 'perf')
+
+        self.assertIn('Skipped CoachEvent, CoachDailyMetric', output)
+        self.assertEqual(Session.objects.count(), 12)
+        self.assertFalse(CoachEvent.objects.exists())
+        self.assertFalse(CoachDailyMetric.objects.exists())
@@ -0,0 +1,190 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from videos.models import (
+    Chapter, Comment, CommentAsset, MediaJob, Session, SessionAsset, SessionLastSeen, Space, SpaceMember,
+)
+from videos.services import storage_cleanup
+from videos.services.jobs import dispatch_media_jobs, enqueue_storage_cleanup
+
+# Reverse relations videos.services.deletion clears before its raw DELETEs.
+# A new FK to one of these models must be handled there and listed here.
+HANDLED_RELATIONS = {
+    Session: {
+        'assets', 'multipart_upload_records', 'resumable_upload_records', 'chapters', 'chapter_suggestions',
+        'last_seen_by', 'comments', 'comment_uploads', 'processing_events', 'media_jobs', 'coach_events',
+        'main_in_spaces',
+    },
+    Comment: {'assets', 'upload_records', 'media_jobs'},
+    Space: {
+        'members', 'sessions', 'multipart_uploads', 'resumable_uploads', 'invite_codes', 'coach_events',
+    },
+}
+
+
+class DeletionCoverageTests(TestCase):
+    def test_every_reverse_relation_is_handled(self):
+        for model, handled in HANDLED_RELATIONS.items():
+            names = {rel.related_name or rel.get_accessor_name() for rel in model._meta.related_objects}
+            self.assertEqual(names - handled, set(), model.__name__)
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='')
+class SessionDeletionTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(MEDIA_ROOT=self.media_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        self.user = User.objects.create_user(username='deleter', password='pass1234')
+        self.space = Space.objects.create(name='Flute', owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def _session(self, title='Scales', key=None):
+        key = key or default_storage.save('sessions/take.mp4', ContentFile(b'original'))
+        session = Session.objects.create(user=self.user, space=self.space, title=title, video_file=key)
+        proxy = default_storage.save(f'processed/sessions/{session.id}/proxy.mp4', ContentFile(b'proxy'))
+        SessionAsset.objects.create(session=session, asset_type=SessionAsset.TYPE_PROXY_MP4, object_key=proxy)
+        return session
+
+    def test_delete_removes_rows_and_queues_storage(self):
+        session = self._session()
+        reply = default_storage.save('comment_videos/reply.webm', ContentFile(b'reply'))
+        comment = Comment.objects.create(session=session, user=self.user, text='', video_reply=reply)
+        CommentAsset.objects.create(comment=comment, asset_type=CommentAsset.TYPE_PROXY_MP4, object_key='x.mp4')
+        Chapter.objects.create(session=session, title='Intro', timestamp_seconds=0)
+        SessionLastSeen.objects.create(session=session, user=self.user)
+        session.tags.create(name='tone')
+        self.space.main_session = session
+        self.space.save()
+
+        res = self.client.delete(f'/api/sessions/{session.id}/')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Session.objects.filter(pk=session.id).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(SessionAsset.objects.exists())
+        self.space.refresh_from_db()
+        self.assertIsNone(self.space.main_session_id)
+
+        job = MediaJob.objects.get(kind=MediaJob.KIND_STORAGE_CLEANUP)
+        self.assertIn(session.video_file.name, job.payload['keys'])
+        self.assertIn(reply, job.payload['keys'])
+        self.assertIn(f'processed/sessions/{session.id}/', job.payload['prefixes'])
+        self.assertTrue(default_storage.exists(session.video_file.name))
+
+        self.assertEqual(dispatch_media_jobs(kinds=[MediaJob.KIND_STORAGE_CLEANUP]), 1)
+        self.assertFalse(default_storage.exists(session.video_file.name))
+        self.assertFalse(default_storage.exists(reply))
+        self.assertFalse(default_storage.exists(f'processed/sessions/{session.id}/proxy.mp4'))
+
+    def test_shared_media_survives_deleting_one_owner(self):
+        source = self._session()
+        duplicate = Session.objects.create(
+            user=self.user, title='Same take', video_file=source.video_file.name,
+        )
+        SessionAsset.objects.create(
+            session=duplicate, asset_type=SessionAsset.TYPE_PROXY_MP4, object_key=source.assets.get().object_key,
+        )
+
+        self.client.delete(f'/api/sessions/{source.id}/')
+        dispatch_media_jobs(kinds=[MediaJob.KIND_STORAGE_CLEANUP])
+        self.assertTrue(default_storage.exists(source.video_file.name))
+        self.assertTrue(default_storage.exists(duplicate.assets.get().object_key))
+
+    def test_removing_comment_deletes_reply_video(self):
+        session = self._session()
+        reply = default_storage.save('comment_videos/reply.webm', ContentFile(b'reply'))
+        comment = Comment.objects.create(session=session, user=self.user, text='', video_reply=reply)
+
+        res = self.client.delete(f'/api/sessions/{session.id}/comments/{comment.id}/')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        dispatch_media_jobs(kinds=[MediaJob.KIND_STORAGE_CLEANUP])
+        self.assertFalse(default_storage.exists(reply))
+        self.assertTrue(default_storage.exists(session.video_file.name))
+
+    def test_space_delete_detaches_sessions(self):
+        session = self._session()
+        member = User.objects.create_user(username='member', password='pass1234')
+        SpaceMember.objects.create(space=self.space, user=member)
+
+        res = self.client.delete(f'/api/spaces/{self.space.id}/')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Space.objects.exists())
+        self.assertFalse(SpaceMember.objects.exists())
+        session.refresh_from_db()
+        self.assertIsNone(session.space_id)
+        self.assertFalse(MediaJob.objects.filter(kind=MediaJob.KIND_STORAGE_CLEANUP).exists())
+
+
+class FakeS3:
+    def __init__(self, listed=()):
+        self.deleted = []
+        self.listed = list(listed)
+
+    def delete_objects(self, Bucket, Delete):
+        self.deleted.append([item['Key'] for item in Delete['Objects']])
+        return {}
+
+    def get_paginator(self, name):
+        listed = self.listed
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                matches = [key for key in listed if key.startswith(Prefix)]
+                for start in range(0, len(matches), 1000):
+                    yield {'Contents': [{'Key': key} for key in matches[start:start + 1000]]}
+
+        return Paginator()
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='bucket')
+class S3CleanupTests(TestCase):
+    def test_keys_are_deleted_in_batches_of_1000(self):
+        keys = [f'sessions/{index}.mp4' for index in range(2500)]
+        fake = FakeS3(listed=[f'processed/sessions/9/seg_{index}.ts' for index in range(1200)])
+        with patch.object(storage_cleanup, 'uses_s3', return_value=True), \
+                patch.object(storage_cleanup, '_s3_client', return_value=fake):
+            deleted = storage_cleanup.delete_storage_objects(keys, ['processed/sessions/9/'])
+
+        self.assertEqual(deleted, 3700)
+        self.assertEqual([len(batch) for batch in fake.deleted], [1000, 1000, 500, 1000, 200])
+
+    def test_cleanup_jobs_split_by_batch(self):
+        jobs = enqueue_storage_cleanup([f'k{index}' for index in range(1500)], ['processed/sessions/1/'])
+        self.assertEqual([len(job.payload['keys']) for job in jobs], [1000, 500])
+        self.assertEqual([job.payload['prefixes'] for job in jobs], [['processed/sessions/1/'], []])
+
+    @override_settings(MEDIA_JOB_MAX_ATTEMPTS=2)
+    def test_throttled_cleanup_is_retried_with_backoff(self):
+        job = enqueue_storage_cleanup(['sessions/gone.mp4'])[0]
+        slow_down = ClientError({'Error': {'Code': 'SlowDown', 'Message': 'Reduce your request rate'}}, 'DeleteObjects')
+        fake = FakeS3()
+        with patch.object(storage_cleanup, 'uses_s3', return_value=True), \
+                patch.object(storage_cleanup, '_s3_client', return_value=fake), \
+                patch.object(fake, 'delete_objects', side_effect=slow_down):
+            self.assertEqual(dispatch_media_jobs(kinds=[MediaJob.KIND_STORAGE_CLEANUP]), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (MediaJob.STATUS_QUEUED, 1))
+        self.assertIn('SlowDown', job.last_error)
+        self.assertGreater(job.available_at, timezone.now())
+
+        with patch.object(storage_cleanup, 'uses_s3', return_value=True), \
+                patch.object(storage_cleanup, '_s3_client', return_value=fake):
+            later = timezone.now() + timedelta(minutes=10)
+            self.assertEqual(dispatch_media_jobs(now=later, kinds=[MediaJob.KIND_STORAGE_CLEANUP]), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (MediaJob.STATUS_SUBMITTED, 2))
+        self.assertEqual(fake.deleted, [['sessions/gone.mp4']])
@@ -6,10 +6,12 @@ from rest_framework import status
 from rest_framework.test import APITestCase
 
 from videos.models import Chapter, Exercise, ExerciseReferenceClip, Session, Space
+from videos.tests.utils import TemporaryMediaRootMixin
 
 
-class ExerciseReferenceClipModelTests(TestCase):
+class ExerciseReferenceClipModelTests(TemporaryMediaRootMixin, TestCase):
     def setUp(self):
+        super().setUp()
         self.user = User.objects.create_user(username='clip-model-user', password='pass1234')
         self.exercise = Exercise.objects.create(name='Circle Hands')
 
@@ -39,8 +41,9 @@ class ExerciseReferenceClipModelTests(TestCase):
                 )
 
 
-class ExerciseReferenceClipApiTests(APITestCase):
+class ExerciseReferenceClipApiTests(TemporaryMediaRootMixin, APITestCase):
     def setUp(self):
+        super().setUp()
         self.user = User.objects.create_user(username='clip-api-user', password='pass1234')
         self.other_user = User.objects.create_user(username='clip-api-other', password='pass1234')
         self.exercise = Exercise.objects.create(name='Circle Hands API')
@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from videos.models import MediaJob
+from videos.services import health
+
+
+def _unreachable():
+    raise ConnectionError('bucket unreachable')
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='', HEALTH_PROBE_CACHE_SECONDS=30, HEALTH_BACKLOG_MAX_WAIT_SECONDS=600)
+class HealthEndpointTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(MEDIA_ROOT=self.media_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        health.clear()
+        self.addCleanup(health.clear)
+
+    def test_liveness_touches_no_dependency(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/health/live/')
+        self.assertEqual(response.json(), {'status': 'alive'})
+
+    def test_deep_check_reports_every_probe_with_latency(self):
+        response = self.client.get('/health/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['status'], 'healthy')
+        self.assertEqual(set(body['services']), {'database', 'cache', 'storage', 'backlog'})
+        self.assertTrue(all('latency_ms' in result for result in body['services'].values()))
+
+    def test_probe_results_are_reused_within_the_window(self):
+        self.client.get('/health/ready/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/health/ready/')
+        self.assertEqual(response.json()['status'], 'ready')
+
+    def test_storage_failure_makes_worker_unready(self):
+        with patch.dict(health.PROBES, storage=_unreachable), self.assertLogs('videos.services.health', 'WARNING'):
+            response = self.client.get('/health/ready/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['storage']['status'], health.FAILED)
+        self.assertNotIn('detail', response.json()['checks']['storage'])
+        self.assertNotIn('bucket unreachable', response.content.decode())
+
+    def test_failure_detail_is_shown_to_staff_only(self):
+        with patch.dict(health.PROBES, storage=_unreachable), self.assertLogs('videos.services.health', 'WARNING'):
+            self.client.get('/health/')
+        self.client.force_login(User.objects.create_user(username='ops', password='pass1234', is_staff=True))
+        response = self.client.get('/health/')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('bucket unreachable', response.json()['services']['storage']['detail'])
+
+    def test_old_backlog_degrades_without_failing(self):
+        MediaJob.objects.create(kind=MediaJob.KIND_KEYFRAME_INDEX, available_at=timezone.now() - timedelta(hours=1))
+        MediaJob.objects.create(kind=MediaJob.KIND_KEYFRAME_INDEX, available_at=timezone.now() + timedelta(hours=1))
+
+        response = self.client.get('/health/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['status'], 'degraded')
+        self.assertEqual(body['services']['backlog']['queued'], 2)
+        self.assertGreaterEqual(body['services']['backlog']['oldest_wait_seconds'], 3600)
+        self.assertEqual(self.client.get('/health/ready/').status_code, 200)
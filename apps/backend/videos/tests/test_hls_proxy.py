@@ -0,0 +1,124 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from videos.models import Session, SessionAsset, Space
+from videos.services.hls import manifest_token, manifest_token_valid, resolve_manifest_key, rewrite_playlist
+
+MASTER_KEY = 'processed/sessions/7/hls/master.m3u8'
+MASTER = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=1500000,RESOLUTION=1280x720
+master_720p.m3u8
+"""
+MEDIA = """#EXTM3U
+#EXT-X-VERSION:7
+#EXT-X-MAP:URI="master_720p_init.mp4"
+#EXTINF:6.0,
+master_720p_00001.ts
+#EXTINF:6.0,
+master_720p_00002.ts
+#EXT-X-ENDLIST
+"""
+
+
+def _fake_url(key):
+    return f"https://bucket.example.test/{key}?X-Amz-Signature=sig"
+
+
+@override_settings(AWS_QUERYSTRING_EXPIRE=3600, SIGNED_URL_CACHE_WINDOW=1800)
+class PlaylistRewriteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_child_playlists_point_back_at_proxy(self):
+        body = rewrite_playlist(MASTER, MASTER_KEY, 7, MASTER_KEY, 'tok')
+        self.assertIn('/api/sessions/7/hls/master_720p.m3u8/?token=tok', body)
+        self.assertIn('#EXT-X-STREAM-INF:BANDWIDTH=1500000', body)
+
+    def test_segments_and_init_map_are_signed_in_one_pass(self):
+        key = 'processed/sessions/7/hls/master_720p.m3u8'
+        with patch('videos.services.signed_urls.default_storage') as storage:
+            storage.url.side_effect = _fake_url
+            body = rewrite_playlist(MEDIA, key, 7, MASTER_KEY, 'tok')
+        self.assertEqual(storage.url.call_count, 3)
+        self.assertIn(f'URI="{_fake_url("processed/sessions/7/hls/master_720p_init.mp4")}"', body)
+        self.assertIn(_fake_url('processed/sessions/7/hls/master_720p_00002.ts'), body)
+        self.assertNotIn('\nmaster_720p_00001.ts', body)
+
+    def test_resolve_rejects_paths_outside_master_directory(self):
+        self.assertEqual(resolve_manifest_key(MASTER_KEY, 'master_720p.m3u8'),
+                         'processed/sessions/7/hls/master_720p.m3u8')
+        self.assertEqual(resolve_manifest_key(MASTER_KEY, '../../8/hls/master.m3u8'), '')
+        self.assertEqual(resolve_manifest_key(MASTER_KEY, 'master_720p_00001.ts'), '')
+
+    def test_token_is_bound_to_session_and_window(self):
+        token = manifest_token(7, now=3600 * 10)
+        self.assertTrue(manifest_token_valid(token, 7, now=3600 * 10 + 1900))
+        self.assertFalse(manifest_token_valid(token, 8, now=3600 * 10))
+        self.assertFalse(manifest_token_valid(token, 7, now=3600 * 10 + 3600 * 2))
+        self.assertFalse(manifest_token_valid('garbage', 7))
+
+
+@override_settings(
+    AWS_STORAGE_BUCKET_NAME='practica-test', AWS_QUERYSTRING_EXPIRE=3600, SIGNED_URL_CACHE_WINDOW=1800,
+)
+class HlsManifestProxyApiTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='hls-owner', password='pass1234')
+        self.other = User.objects.create_user(username='hls-other', password='pass1234')
+        space = Space.objects.create(name='HLS', owner=self.owner)
+        self.session = Session.objects.create(
+            user=self.owner, space=space, title='Take', processing_status=Session.STATUS_READY,
+        )
+        self.master_key = f'processed/sessions/{self.session.id}/hls/master.m3u8'
+        SessionAsset.objects.create(
+            session=self.session,
+            asset_type=SessionAsset.TYPE_HLS_MASTER,
+            object_key=self.master_key,
+            content_type='application/vnd.apple.mpegurl',
+        )
+
+    def _get(self, path, **params):
+        url = f'/api/sessions/{self.session.id}/hls/{path}/'
+        with patch('videos.services.hls.fetch_playlist', return_value=MEDIA) as fetch, \
+                patch('videos.services.signed_urls.default_storage') as storage:
+            storage.url.side_effect = _fake_url
+            response = self.client.get(url, params)
+        return response, fetch
+
+    def test_owner_gets_signed_playlist(self):
+        self.client.force_authenticate(self.owner)
+        response, fetch = self._get('master_720p.m3u8')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.apple.mpegurl')
+        self.assertIn('private, max-age=', response['Cache-Control'])
+        fetch.assert_called_once_with(f'processed/sessions/{self.session.id}/hls/master_720p.m3u8')
+        self.assertIn('X-Amz-Signature', response.content.decode())
+
+    def test_token_grants_anonymous_access(self):
+        response, _ = self._get('master_720p.m3u8', token=manifest_token(self.session.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_non_member_without_token_is_rejected(self):
+        self.client.force_authenticate(self.other)
+        response, fetch = self._get('master_720p.m3u8')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        fetch.assert_not_called()
+
+    def test_path_traversal_is_not_found(self):
+        self.client.force_authenticate(self.owner)
+        response, fetch = self._get('..%2F..%2F9%2Fhls%2Fmaster.m3u8')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        fetch.assert_not_called()
+
+    def test_master_asset_url_uses_proxy(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(f'/api/sessions/{self.session.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        master = next(a for a in response.data['assets'] if a['asset_type'] == 'hls_master')
+        self.assertIn(f'/api/sessions/{self.session.id}/hls/master.m3u8/?token=', master['url'])
@@ -0,0 +1,146 @@
+import shutil
+import struct
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from videos.models import Chapter, MediaJob, Session, SessionAsset, Space
+from videos.services.jobs import dispatch_media_jobs, enqueue_keyframe_jobs
+from videos.services.keyframes import UNIT_BYTE, build_keyframe_index, pack_index, snap, unpack_index
+from videos.services.mp4 import Mp4Error, keyframe_index
+
+
+def _box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def _full(box_type, payload, version=0):
+    return _box(box_type, struct.pack('>I', version << 24) + payload)
+
+
+def _mp4(sample_sizes, sync_samples, timescale=1000, delta=500, per_chunk=2):
+    """A tiny MP4 with moov after mdat, as MediaConvert writes without fast start."""
+    ftyp = _box(b'ftyp', b'isom' + b'\0\0\0\0')
+    mdat = _box(b'mdat', b''.join(b'\0' * size for size in sample_sizes))
+    mdat_payload_start = len(ftyp) + 8
+
+    chunk_offsets = []
+    offset = mdat_payload_start
+    for start in range(0, len(sample_sizes), per_chunk):
+        chunk_offsets.append(offset)
+        offset += sum(sample_sizes[start:start + per_chunk])
+
+    stbl = _box(b'stbl', b''.join([
+        _full(b'stts', struct.pack('>III', 1, len(sample_sizes), delta)),
+        _full(b'stss', struct.pack(f'>I{len(sync_samples)}I', len(sync_samples), *sync_samples)),
+        _full(b'stsc', struct.pack('>IIII', 1, 1, per_chunk, 1)),
+        _full(b'stsz', struct.pack(f'>II{len(sample_sizes)}I', 0, len(sample_sizes), *sample_sizes)),
+        _full(b'stco', struct.pack(f'>I{len(chunk_offsets)}I', len(chunk_offsets), *chunk_offsets)),
+    ]))
+    mdia = _box(b'mdia', b''.join([
+        _full(b'mdhd', struct.pack('>IIII', 0, 0, timescale, 0) + b'\0' * 4),
+        _full(b'hdlr', b'\0' * 4 + b'vide' + b'\0' * 13),
+        _box(b'minf', stbl),
+    ]))
+    moov = _box(b'moov', _box(b'trak', mdia))
+    return ftyp + mdat + moov
+
+
+class BytesReader:
+    def __init__(self, data):
+        self.data = data
+        self.size = len(data)
+        self.requests = 0
+
+    def read(self, offset, length):
+        self.requests += 1
+        return self.data[offset:offset + length]
+
+
+class Mp4KeyframeParsingTests(TestCase):
+    def test_sync_samples_map_to_time_and_byte_offset(self):
+        sizes = [100, 10, 20, 200, 30, 40]
+        reader = BytesReader(_mp4(sizes, sync_samples=[1, 4]))
+        index = keyframe_index(reader)
+        mdat_start = 16 + 8
+        self.assertEqual(index, [(0.0, mdat_start), (1.5, mdat_start + 130)])
+        # Three box headers plus the moov body; the media payload is never read.
+        self.assertEqual(reader.requests, 4)
+
+    def test_non_mp4_is_rejected(self):
+        with self.assertRaises(Mp4Error):
+            keyframe_index(BytesReader(_box(b'ftyp', b'isom') + _box(b'free', b'')))
+
+    def test_pack_roundtrip_and_snap(self):
+        blob = pack_index([('proxy', UNIT_BYTE, [(0.0, 40), (2.0, 900), (4.5, 5000)])])
+        self.assertEqual(len(blob), 6 + 1 + 5 + 5 + 3 * 12)
+        entries = unpack_index(blob)['proxy']['entries']
+        self.assertEqual(snap(entries, 3), (2.0, 900))
+        self.assertEqual(snap(entries, 4.5), (4.5, 5000))
+        self.assertEqual(snap(entries, 0), (0.0, 40))
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='')
+class KeyframeIndexJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(MEDIA_ROOT=self.media_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        user = User.objects.create_user(username='keyframes', password='pass1234')
+        space = Space.objects.create(name='Keys', owner=user)
+        self.session = Session.objects.create(
+            user=user, space=space, title='Drums', processing_status=Session.STATUS_READY,
+        )
+        proxy_key = default_storage.save(
+            f'processed/sessions/{self.session.id}/proxy/take_proxy.mp4',
+            ContentFile(_mp4([100, 10, 20, 200, 30, 40], sync_samples=[1, 4], timescale=1, delta=1)),
+        )
+        SessionAsset.objects.create(
+            session=self.session, asset_type=SessionAsset.TYPE_PROXY_MP4, object_key=proxy_key,
+        )
+        self.chapter = Chapter.objects.create(session=self.session, timestamp_seconds=4)
+
+    def test_build_stores_asset_and_snaps_chapters(self):
+        asset = build_keyframe_index(self.session)
+        self.assertEqual(asset.asset_type, SessionAsset.TYPE_KEYFRAME_INDEX)
+        self.assertEqual(asset.metadata_json['tracks'][0]['count'], 2)
+        self.assertTrue(default_storage.exists(asset.object_key))
+
+        self.chapter.refresh_from_db()
+        self.assertEqual(self.chapter.keyframe_seconds, 3.0)
+        self.assertEqual(self.chapter.keyframe_byte_offset, 16 + 8 + 130)
+
+    def test_worker_runs_keyframe_jobs_without_submission_tokens(self):
+        enqueue_keyframe_jobs([self.session])
+        with self.settings(MEDIACONVERT_SUBMIT_BURST=1, MEDIACONVERT_SUBMIT_RATE=0.001):
+            cache.set('mediaconvert-submit:bucket', (0.0, 0.0), timeout=None)
+            self.assertEqual(dispatch_media_jobs(), 1)
+        self.assertEqual(MediaJob.objects.get().status, MediaJob.STATUS_SUBMITTED)
+        self.assertTrue(self.session.assets.filter(asset_type=SessionAsset.TYPE_KEYFRAME_INDEX).exists())
+
+    def test_original_as_proxy_sessions_get_their_own_index(self):
+        user = self.session.user
+        keys = []
+        for original_key in (f'sessions/{user.id}/a.mp4', f'sessions/{user.id}/b.mp4', 'sessions/clip.mp4'):
+            session = Session.objects.create(
+                user=user, space=self.session.space, title=original_key, processing_status=Session.STATUS_READY,
+            )
+            stored_key = default_storage.save(
+                original_key, ContentFile(_mp4([100, 10], sync_samples=[1], timescale=1, delta=1)),
+            )
+            SessionAsset.objects.create(
+                session=session, asset_type=SessionAsset.TYPE_PROXY_MP4, object_key=stored_key,
+            )
+            keys.append(build_keyframe_index(session).object_key)
+
+        self.assertEqual(len(set(keys)), 3)
+        for key in keys:
+            self.assertTrue(default_storage.exists(key))
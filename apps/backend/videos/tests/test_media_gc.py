@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from videos.models import Session, SessionAsset
+from videos.services import media_gc
+
+
+def _age(key, hours=48):
+    stamp = time.time() - hours * 3600
+    os.utime(default_storage.path(key), (stamp, stamp))
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='', AWS_MEDIA_CONVERT_OUTPUT_PREFIX='')
+class LocalGarbageCollectionTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(MEDIA_ROOT=self.media_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        user = User.objects.create_user(username='collector', password='pass1234')
+        self.session = Session.objects.create(
+            user=user, title='Etudes', video_file=self._save('sessions/live.mp4', b'live'),
+        )
+        master = self._save(f'processed/sessions/{self.session.id}/hls/master.m3u8', b'#EXTM3U')
+        SessionAsset.objects.create(
+            session=self.session, asset_type=SessionAsset.TYPE_HLS_MASTER, object_key=master,
+        )
+        self.segment = self._save(f'processed/sessions/{self.session.id}/hls/seg_00001.ts', b'ts')
+        self.orphan = self._save('sessions/failed-upload.mp4', b'x' * 300)
+        self.stale_output = self._save('processed/sessions/99999/proxy.mp4', b'y' * 200)
+        self.fresh = self._save('comment_videos/just-uploaded.webm', b'z')
+        for key in (self.session.video_file.name, master, self.segment, self.orphan, self.stale_output):
+            _age(key)
+
+    def _save(self, key, data):
+        return default_storage.save(key, ContentFile(data))
+
+    def test_sweep_deletes_only_old_unreferenced_objects(self):
+        result = media_gc.sweep(media_gc.mark())
+
+        self.assertEqual(result.orphans, 2)
+        self.assertEqual(result.bytes_reclaimed, 500)
+        self.assertFalse(default_storage.exists(self.orphan))
+        self.assertFalse(default_storage.exists(self.stale_output))
+        self.assertTrue(default_storage.exists(self.session.video_file.name))
+        # Segments are not rows, but live under a live session's output directory.
+        self.assertTrue(default_storage.exists(self.segment))
+        # Inside the grace period: the row may not exist yet.
+        self.assertTrue(default_storage.exists(self.fresh))
+
+    def test_rows_created_after_mark_are_respected(self):
+        refs = media_gc.mark()
+        SessionAsset.objects.create(
+            session=self.session, asset_type=SessionAsset.TYPE_PROXY_MP4, object_key=self.orphan,
+        )
+        media_gc.sweep(refs)
+        self.assertTrue(default_storage.exists(self.orphan))
+
+    def test_dry_run_command_reports_without_deleting(self):
+        out = StringIO()
+        call_command('collect_orphaned_media', '--dry-run', stdout=out)
+        self.assertIn('2 orphan(s)', out.getvalue())
+        self.assertIn('Would reclaim 500 B', out.getvalue())
+        self.assertIn(f'would delete {self.orphan}', out.getvalue())
+        self.assertTrue(default_storage.exists(self.orphan))
+
+
+class FakeListingS3:
+    def __init__(self, objects):
+        self.objects = objects
+        self.deleted = []
+
+    def get_paginator(self, name):
+        objects = self.objects
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                matches = [obj for obj in objects if obj['Key'].startswith(Prefix)]
+                for start in range(0, len(matches), 1000):
+                    yield {'Contents': matches[start:start + 1000]}
+
+        return Paginator()
+
+    def delete_objects(self, Bucket, Delete):
+        self.deleted.append(len(Delete['Objects']))
+        return {}
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='bucket', AWS_MEDIA_CONVERT_OUTPUT_PREFIX='')
+class S3GarbageCollectionTests(TestCase):
+    def test_listing_is_streamed_and_deleted_in_batches(self):
+        old = datetime.now(tz=dt_timezone.utc) - timedelta(days=3)
+        objects = [{'Key': f'sessions/orphan-{index}.mp4', 'Size': 10, 'LastModified': old} for index in range(2300)]
+        fake = FakeListingS3(objects)
+        with patch.object(media_gc, 'uses_s3', return_value=True), \
+                patch.object(media_gc, '_s3_client', return_value=fake):
+            result = media_gc.sweep(media_gc.mark())
+
+        self.assertEqual(result.scanned, 2300)
+        self.assertEqual(result.deleted, 2300)
+        self.assertEqual(result.bytes_reclaimed, 23000)
+        self.assertEqual(fake.deleted, [1000, 1000, 300])
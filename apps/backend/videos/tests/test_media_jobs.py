@@ -0,0 +1,167 @@
+import struct
+from datetime import timedelta
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from videos.models import MediaJob, Session, Space
+from videos.services.jobs import HANDLERS, dispatch_media_jobs, enqueue_keyframe_jobs, enqueue_session_job
+
+PIPELINE = dict(
+    AWS_STORAGE_BUCKET_NAME='test-bucket',
+    AWS_MEDIA_CONVERT_ROLE_ARN='arn:aws:iam::123:role/mc',
+    AWS_MEDIA_CONVERT_ENDPOINT_URL='https://mc.example.test',
+)
+
+
+def _throttled():
+    return ClientError(
+        {'Error': {'Code': 'TooManyRequestsException', 'Message': 'Too many requests'},
+         'ResponseMetadata': {'HTTPStatusCode': 429}},
+        'CreateJob',
+    )
+
+
+@override_settings(**PIPELINE, MEDIACONVERT_SUBMIT_RATE=0.001, MEDIACONVERT_SUBMIT_BURST=10)
+class MediaJobSchedulerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='scheduler', password='pass1234')
+        self.space = Space.objects.create(name='Class', owner=self.user)
+
+    def _session(self, title, duration=None):
+        return Session.objects.create(
+            user=self.user, space=self.space, title=title, video_file=f'sessions/{title}.mp4',
+            duration_seconds=duration, processing_status=Session.STATUS_PROCESSING,
+        )
+
+    def _submitted_session_ids(self, client_factory):
+        return [
+            int(call.kwargs['UserMetadata']['session_id'])
+            for call in client_factory.return_value.create_job.call_args_list
+        ]
+
+    def test_main_session_and_short_takes_are_submitted_first(self):
+        long_take = self._session('long', duration=3600)
+        short_take = self._session('short', duration=90)
+        main = self._session('main', duration=3600)
+        self.space.main_session = main
+        self.space.save(update_fields=['main_session'])
+        for session in (long_take, short_take, main):
+            enqueue_session_job(session)
+
+        with patch('videos.services.media_pipeline._mediaconvert_client') as client_factory:
+            client_factory.return_value.create_job.return_value = {'Job': {'Id': 'job'}}
+            self.assertEqual(dispatch_media_jobs(), 3)
+        self.assertEqual(self._submitted_session_ids(client_factory), [main.id, short_take.id, long_take.id])
+
+    @override_settings(MEDIACONVERT_SUBMIT_BURST=2)
+    def test_token_bucket_caps_submissions(self):
+        for idx in range(3):
+            enqueue_session_job(self._session(f'take-{idx}'))
+
+        with patch('videos.services.media_pipeline._mediaconvert_client') as client_factory:
+            client_factory.return_value.create_job.return_value = {'Job': {'Id': 'job'}}
+            self.assertEqual(dispatch_media_jobs(), 2)
+        self.assertEqual(MediaJob.objects.filter(status=MediaJob.STATUS_QUEUED).count(), 1)
+
+    def test_throttled_submission_is_retried_not_failed(self):
+        session = self._session('throttled')
+        job = enqueue_session_job(session)
+
+        with patch('videos.services.media_pipeline._mediaconvert_client') as client_factory:
+            client_factory.return_value.create_job.side_effect = _throttled()
+            self.assertEqual(dispatch_media_jobs(), 0)
+        job.refresh_from_db()
+        session.refresh_from_db()
+        self.assertEqual(job.status, MediaJob.STATUS_QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.available_at, timezone.now())
+        self.assertEqual(session.processing_status, Session.STATUS_PROCESSING)
+
+        cache.clear()
+        with patch('videos.services.media_pipeline._mediaconvert_client') as client_factory:
+            client_factory.return_value.create_job.return_value = {'Job': {'Id': 'job-2'}}
+            self.assertEqual(dispatch_media_jobs(now=timezone.now() + timedelta(minutes=10)), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, MediaJob.STATUS_SUBMITTED)
+        self.assertEqual(job.external_id, 'job-2')
+
+    @override_settings(MEDIA_JOB_MAX_ATTEMPTS=1)
+    def test_session_fails_after_max_throttled_attempts(self):
+        session = self._session('give-up')
+        enqueue_session_job(session)
+
+        with patch('videos.services.media_pipeline._mediaconvert_client') as client_factory:
+            client_factory.return_value.create_job.side_effect = _throttled()
+            dispatch_media_jobs()
+        session.refresh_from_db()
+        self.assertEqual(session.processing_status, Session.STATUS_FAILED)
+        self.assertIn('throttled', session.processing_error)
+
+    def test_non_throttling_error_fails_immediately(self):
+        session = self._session('bad-input')
+        enqueue_session_job(session)
+
+        with patch('videos.services.media_pipeline._mediaconvert_client') as client_factory:
+            client_factory.return_value.create_job.side_effect = ClientError(
+                {'Error': {'Code': 'BadRequestException', 'Message': 'bad input'}}, 'CreateJob',
+            )
+            dispatch_media_jobs()
+        session.refresh_from_db()
+        self.assertEqual(session.processing_status, Session.STATUS_FAILED)
+        self.assertEqual(MediaJob.objects.get().status, MediaJob.STATUS_FAILED)
+
+    def test_enqueue_reuses_pending_job(self):
+        session = self._session('dup')
+        self.assertEqual(enqueue_session_job(session).id, enqueue_session_job(session).id)
+
+    def test_handler_runs_after_the_claim_commits(self):
+        job = enqueue_keyframe_jobs([self._session('claimed')])[0]
+        depth = len(connection.atomic_blocks)
+        seen = {}
+
+        def handler(claimed):
+            seen['depth'] = len(connection.atomic_blocks)
+            seen['row'] = MediaJob.objects.values_list('status', 'attempts').get(id=claimed.id)
+            return True, '', ''
+
+        with patch.dict(HANDLERS, {MediaJob.KIND_KEYFRAME_INDEX: handler}):
+            self.assertEqual(dispatch_media_jobs(), 1)
+        self.assertEqual(seen, {'depth': depth, 'row': (MediaJob.STATUS_RUNNING, 1)})
+        job.refresh_from_db()
+        self.assertEqual(job.status, MediaJob.STATUS_SUBMITTED)
+
+    @override_settings(MEDIA_JOB_MAX_ATTEMPTS=2)
+    def test_unexpected_handler_error_backs_off_then_fails(self):
+        job = enqueue_keyframe_jobs([self._session('malformed')])[0]
+        broken = patch('videos.services.jobs.build_keyframe_index', side_effect=struct.error('unpack requires 8 bytes'))
+
+        with broken, self.assertLogs('videos.services.jobs', 'ERROR'):
+            self.assertEqual(dispatch_media_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (MediaJob.STATUS_QUEUED, 1))
+        self.assertEqual(job.last_error, 'error: unpack requires 8 bytes')
+        self.assertGreater(job.available_at, timezone.now())
+
+        with broken, self.assertLogs('videos.services.jobs', 'ERROR'):
+            dispatch_media_jobs(now=timezone.now() + timedelta(minutes=10))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (MediaJob.STATUS_FAILED, 2))
+
+    @override_settings(MEDIA_JOB_RUNNING_TIMEOUT_SECONDS=60)
+    def test_job_left_running_by_a_dead_worker_is_claimed_again(self):
+        job = enqueue_keyframe_jobs([self._session('orphaned')])[0]
+        MediaJob.objects.filter(id=job.id).update(status=MediaJob.STATUS_RUNNING, attempts=1)
+
+        with patch('videos.services.jobs.build_keyframe_index') as build:
+            self.assertEqual(dispatch_media_jobs(), 0)
+            self.assertEqual(dispatch_media_jobs(now=timezone.now() + timedelta(minutes=2)), 1)
+        build.assert_called_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (MediaJob.STATUS_SUBMITTED, 2))
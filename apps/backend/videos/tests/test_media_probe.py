@@ -0,0 +1,190 @@
+import struct
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from videos.models import MultipartSessionUpload, Session, Space
+from videos.services.media_pipeline import _create_job_settings
+from videos.services.probe import ProbeError, probe_media, probe_reader
+from videos.tests.test_keyframes import BytesReader, _box, _full
+from videos.tests.test_multipart_uploads import FakeS3Client
+
+ROTATE_90 = (0, 0x10000, 0, -0x10000 & 0xFFFFFFFF, 0, 0, 0, 0, 0x40000000)
+IDENTITY = (0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+
+
+def _trak(handler, codec, width=0, height=0, matrix=IDENTITY):
+    tkhd = _full(b'tkhd', struct.pack('>IIIII', 0, 0, 1, 0, 0) + b'\0' * 16 + struct.pack('>9I', *matrix)
+                 + struct.pack('>II', width << 16, height << 16))
+    stsd = _full(b'stsd', struct.pack('>I', 1) + _box(codec, b'\0' * 8))
+    mdia = _box(b'mdia', b''.join([
+        _full(b'mdhd', struct.pack('>IIII', 0, 0, 1000, 0) + b'\0' * 4),
+        _full(b'hdlr', b'\0' * 4 + handler + b'\0' * 13),
+        _box(b'minf', _box(b'stbl', stsd)),
+    ]))
+    return _box(b'trak', tkhd + mdia)
+
+
+def _movie(traks, duration=90500, timescale=1000, fast_start=False, brand=b'isom'):
+    ftyp = _box(b'ftyp', brand + b'\0\0\0\0')
+    mvhd = _full(b'mvhd', struct.pack('>IIII', 0, 0, timescale, duration) + b'\0' * 80)
+    moov = _box(b'moov', mvhd + b''.join(traks))
+    mdat = _box(b'mdat', b'\0' * 4096)
+    return ftyp + (moov + mdat if fast_start else mdat + moov)
+
+
+def _ebml(element_id, payload):
+    if isinstance(payload, int):
+        payload = payload.to_bytes(max(1, (payload.bit_length() + 7) // 8), 'big')
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+    return id_bytes + bytes([0x80 | len(payload)]) + payload
+
+
+def _webm(duration_ms=None, with_audio=True):
+    header = _ebml(0x1A45DFA3, _ebml(0x4282, b'webm'))
+    info = _ebml(0x2AD7B1, 1000000)
+    if duration_ms is not None:
+        info += _ebml(0x4489, struct.pack('>d', duration_ms))
+    tracks = _ebml(0xAE, _ebml(0x83, 1) + _ebml(0x86, b'V_VP8') + _ebml(0xE0, _ebml(0xB0, 640) + _ebml(0xBA, 480)))
+    if with_audio:
+        tracks += _ebml(0xAE, _ebml(0x83, 2) + _ebml(0x86, b'A_OPUS'))
+    cluster = b'\x1f\x43\xb6\x75\x01\xff\xff\xff\xff\xff\xff\xff' + b'\0' * 64
+    # MediaRecorder streams the Segment with an unknown size.
+    segment = b'\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff' + _ebml(0x1549A966, info) + _ebml(0x1654AE6B, tracks)
+    return header + segment + cluster
+
+
+class MediaProbeTests(TestCase):
+    def test_mp4_with_moov_at_end(self):
+        data = _movie([_trak(b'vide', b'avc1', 1920, 1080), _trak(b'soun', b'mp4a')])
+        reader = BytesReader(data)
+        info = probe_reader(reader)
+        self.assertEqual(info['container'], 'mp4')
+        self.assertEqual(info['duration_seconds'], 90.5)
+        self.assertEqual((info['width'], info['height'], info['rotation']), (1920, 1080, 0))
+        self.assertEqual((info['video_codec'], info['audio_codec']), ('avc1', 'mp4a'))
+        self.assertTrue(info['has_audio'])
+        self.assertFalse(info['fast_start'])
+        # Sniff, three top-level headers, moov body; the media data is never fetched.
+        self.assertEqual(reader.requests, 5)
+
+    def test_rotated_phone_take_with_fast_start(self):
+        data = _movie([_trak(b'vide', b'hvc1', 1920, 1080, matrix=ROTATE_90)], fast_start=True, brand=b'qt  ')
+        info = probe_reader(BytesReader(data))
+        self.assertEqual(info['container'], 'mov')
+        self.assertEqual(info['rotation'], 90)
+        self.assertTrue(info['fast_start'])
+        self.assertFalse(info['has_audio'])
+
+    def test_audio_only_mp4_is_rejected(self):
+        with self.assertRaises(ProbeError):
+            probe_reader(BytesReader(_movie([_trak(b'soun', b'mp4a')])))
+
+    def test_webm_from_media_recorder(self):
+        info = probe_reader(BytesReader(_webm()))
+        self.assertEqual(info['container'], 'webm')
+        self.assertIsNone(info['duration_seconds'])
+        self.assertEqual((info['width'], info['height']), (640, 480))
+        self.assertEqual((info['video_codec'], info['audio_codec']), ('V_VP8', 'A_OPUS'))
+
+        info = probe_reader(BytesReader(_webm(duration_ms=12345.0, with_audio=False)))
+        self.assertEqual(info['duration_seconds'], 12.345)
+        self.assertFalse(info['has_audio'])
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='')
+    def test_unknown_container_is_not_an_error(self):
+        with patch('videos.services.probe.RangeReader', return_value=BytesReader(b'RIFF....AVI LIST')):
+            self.assertEqual(probe_media('sessions/take.avi'), (None, ''))
+
+
+class JobSettingsFromProbeTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='probe', password='pass1234')
+        self.session = Session.objects.create(user=user, title='Take', video_file='sessions/take.mp4')
+
+    def _sizes(self, job):
+        return {
+            group['Name']: (group['Outputs'][0]['VideoDescription']['Width'],
+                            group['Outputs'][0]['VideoDescription']['Height'])
+            for group in job['OutputGroups'] if 'VideoDescription' in group['Outputs'][0]
+        }
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket')
+    def test_unprobed_session_keeps_presets(self):
+        job = _create_job_settings(self.session)
+        self.assertEqual(self._sizes(job)['hls-cmaf'], (1280, 720))
+        self.assertIn('audio-analysis', [group['Name'] for group in job['OutputGroups']])
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket')
+    def test_portrait_source_without_audio(self):
+        self.session.media_info = {'width': 1920, 'height': 1080, 'rotation': 90, 'has_audio': False}
+        job = _create_job_settings(self.session)
+        sizes = self._sizes(job)
+        self.assertEqual(sizes['proxy-mp4'], (540, 960))
+        self.assertEqual(sizes['hls-cmaf'], (720, 1280))
+        self.assertEqual(job['Inputs'][0]['VideoSelector'], {'Rotate': 'AUTO'})
+        self.assertNotIn('AudioSelectors', job['Inputs'][0])
+        self.assertNotIn('audio-analysis', [group['Name'] for group in job['OutputGroups']])
+        self.assertNotIn('AudioDescriptions', job['OutputGroups'][0]['Outputs'][0])
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket')
+    def test_small_source_is_not_upscaled(self):
+        self.session.media_info = {'width': 640, 'height': 360, 'has_audio': True}
+        self.assertEqual(self._sizes(_create_job_settings(self.session))['hls-cmaf'], (640, 360))
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket', AWS_S3_REGION_NAME='us-east-1')
+class MultipartCompleteProbeTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='prober', password='pass1234')
+        self.space = Space.objects.create(name='Violin', owner=self.user)
+        self.upload = MultipartSessionUpload.objects.create(
+            user=self.user,
+            space=self.space,
+            status=MultipartSessionUpload.STATUS_INITIATED,
+            title='Etude',
+            original_filename='etude.mp4',
+            content_type='video/mp4',
+            size_bytes=10 * 1024 * 1024,
+            s3_key='sessions/prober/etude.mp4',
+            s3_upload_id='upload-probe-1',
+            duration_seconds=30,
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def _complete(self, probe_result):
+        with patch('videos.views._s3_client', return_value=FakeS3Client()), \
+                patch('videos.views.probe_media', return_value=probe_result), \
+                patch('videos.views._start_processing_pipeline') as start:
+            res = self.client.post(
+                '/api/sessions/multipart/complete/',
+                {'multipart_upload_id': self.upload.id, 'parts': [{'part_number': 1, 'etag': '"etag-1"'}]},
+                format='json',
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return Session.objects.get(id=res.data['id']), start
+
+    def test_probe_overrides_client_duration(self):
+        info = {'container': 'mp4', 'duration_seconds': 95.6, 'width': 1280, 'height': 720, 'has_audio': True}
+        session, start = self._complete((info, ''))
+        self.assertEqual(session.duration_seconds, 96)
+        self.assertEqual(session.media_info['width'], 1280)
+        start.assert_called_once()
+
+    def test_unplayable_upload_fails_without_transcoding(self):
+        session, start = self._complete((None, 'No video track'))
+        self.assertEqual(session.processing_status, Session.STATUS_FAILED)
+        self.assertIn('No video track', session.processing_error)
+        start.assert_not_called()
+
+    def test_unreadable_probe_keeps_client_values(self):
+        session, start = self._complete((None, ''))
+        self.assertEqual(session.duration_seconds, 30)
+        self.assertEqual(session.media_info, {})
+        start.assert_called_once()
@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from videos.models import Session, SessionAsset, Space
+from videos.services.local_media import local_media_url, media_token, parse_range
+from videos.services.signed_urls import signed_url
+
+BODY = bytes(range(256)) * 4
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='', MEDIA_ACCEL_REDIRECT='', MEDIA_URL='/media/')
+class MediaServingTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(MEDIA_ROOT=self.media_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        self.owner = User.objects.create_user(username='player', password='pass1234')
+        self.space = Space.objects.create(name='Oboe', owner=self.owner)
+        key = default_storage.save('sessions/take.mp4', ContentFile(BODY))
+        self.session = Session.objects.create(user=self.owner, space=self.space, title='Reeds', video_file=key)
+        self.key = self.session.video_file.name
+
+    def _read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_owner_gets_whole_file_with_range_support(self):
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.get(f'/media/{self.key}')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertEqual(res['Content-Type'], 'video/mp4')
+        self.assertEqual(res['Content-Length'], str(len(BODY)))
+        self.assertEqual(self._read(res), BODY)
+
+    def test_range_request_returns_partial_content(self):
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.get(f'/media/{self.key}', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res['Content-Range'], f'bytes 100-199/{len(BODY)}')
+        self.assertEqual(res['Content-Length'], '100')
+        self.assertEqual(self._read(res), BODY[100:200])
+
+        res = self.client.get(f'/media/{self.key}', HTTP_RANGE='bytes=-10')
+        self.assertEqual(self._read(res), BODY[-10:])
+
+    def test_unsatisfiable_range(self):
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.get(f'/media/{self.key}', HTTP_RANGE=f'bytes={len(BODY)}-')
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(BODY)}')
+
+    def test_outsiders_need_a_token(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='stranger', password='pass1234'))
+        self.assertEqual(self.client.get(f'/media/{self.key}').status_code, 403)
+
+        self.client.force_authenticate(user=None)
+        res = self.client.get(local_media_url(self.key))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self._read(res), BODY)
+
+        forged = f'/media/sessions/other.mp4?token={media_token(self.key)}'
+        self.assertEqual(self.client.get(forged).status_code, 403)
+
+    def test_processed_outputs_follow_session_visibility(self):
+        default_storage.save(f'processed/sessions/{self.session.id}/hls/seg_0.ts', ContentFile(b'ts'))
+        SessionAsset.objects.create(
+            session=self.session, asset_type=SessionAsset.TYPE_HLS_MASTER,
+            object_key=f'processed/sessions/{self.session.id}/hls/master.m3u8',
+        )
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.get(f'/media/processed/sessions/{self.session.id}/hls/seg_0.ts')
+        self.assertEqual(res.status_code, 200)
+
+    def test_path_traversal_is_rejected(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='staff', password='x', is_staff=True))
+        self.assertEqual(self.client.get('/media/sessions/../../settings.py').status_code, 404)
+
+    def test_signed_urls_point_at_local_media_view(self):
+        url = signed_url(self.key)
+        self.assertTrue(url.startswith(f'/media/{self.key}?token='))
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_accel_redirect_hands_off_to_proxy(self):
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.get(f'/media/{self.key}', HTTP_RANGE='bytes=0-9')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['X-Accel-Redirect'], f'/protected-media/{self.key}')
+        self.assertEqual(res.content, b'')
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='x-sendfile')
+    def test_sendfile_header_uses_absolute_path(self):
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.get(f'/media/{self.key}')
+        self.assertEqual(res['X-Sendfile'], default_storage.path(self.key))
+
+
+class ParseRangeTests(APITestCase):
+    def test_forms(self):
+        self.assertIsNone(parse_range('', 100))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertEqual(parse_range('bytes=10-', 100), (10, 99))
+        self.assertEqual(parse_range('bytes=10-500', 100), (10, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=100-', 100)
@@ -0,0 +1,104 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from practica import metrics
+from videos.models import MediaJob, Session
+
+
+def _exited_pid():
+    child = subprocess.Popen([sys.executable, '-c', 'pass'])
+    child.wait()
+    return child.pid
+
+
+class RegistryTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = metrics.Registry()
+        for value in (0.003, 0.02, 0.02, 20.0):
+            registry.observe('practica_http_request_duration_seconds', value, method='GET', view='session-list')
+        registry.inc('practica_http_requests_total', method='GET', view='session-list', status='200')
+        text = metrics.render(registry.collect())
+
+        labels = 'method="GET",view="session-list"'
+        self.assertIn('# TYPE practica_http_request_duration_seconds histogram', text)
+        self.assertIn(f'practica_http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1', text)
+        self.assertIn(f'practica_http_request_duration_seconds_bucket{{{labels},le="0.025"}} 3', text)
+        self.assertIn(f'practica_http_request_duration_seconds_bucket{{{labels},le="10.0"}} 3', text)
+        self.assertIn(f'practica_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 4', text)
+        self.assertIn(f'practica_http_request_duration_seconds_count{{{labels}}} 4', text)
+        self.assertIn('practica_http_requests_total{method="GET",status="200",view="session-list"} 1', text)
+
+    def test_workers_are_merged_and_exited_ones_archived(self):
+        with override_settings(METRICS_DIR=self.directory, METRICS_FLUSH_SECONDS=0):
+            exited = metrics.Registry()
+            exited._name = f'{socket.gethostname()}-{_exited_pid()}-1.json'
+            exited.inc('practica_upload_bytes_total', 100, path='streamed')
+            exited.observe('practica_db_query_duration_seconds', 0.002, alias='default')
+
+            live = metrics.Registry()
+            live.inc('practica_upload_bytes_total', 50, path='streamed')
+            live.observe('practica_db_query_duration_seconds', 0.2, alias='default')
+
+            first = live.collect()
+            self.assertEqual(first[('practica_upload_bytes_total', (('path', 'streamed'),))], 150)
+            self.assertEqual(sorted(os.listdir(self.directory)), sorted([metrics.ARCHIVE, live._name, '.lock']))
+
+            again = live.collect()
+            self.assertEqual(again, first)
+            row = again[('practica_db_query_duration_seconds', (('alias', 'default'),))]
+            self.assertEqual(row[-1], 2)
+
+    def test_snapshots_from_other_hosts_are_merged_but_not_reaped(self):
+        with override_settings(METRICS_DIR=self.directory, METRICS_FLUSH_SECONDS=0):
+            worker = metrics.Registry()
+            worker._name = f'worker-container-{_exited_pid()}-1.json'
+            worker.inc('practica_upload_bytes_total', 100, path='streamed')
+
+            live = metrics.Registry()
+            live.inc('practica_upload_bytes_total', 50, path='streamed')
+
+            merged = live.collect()
+            self.assertEqual(merged[('practica_upload_bytes_total', (('path', 'streamed'),))], 150)
+            self.assertIn(worker._name, os.listdir(self.directory))
+            self.assertNotIn(metrics.ARCHIVE, os.listdir(self.directory))
+
+
+@override_settings(METRICS_DIR='', METRICS_TOKEN='scrape-secret')
+class MetricsEndpointTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='player', password='pass1234')
+        Session.objects.create(user=self.user, title='Take', processing_status=Session.STATUS_PROCESSING)
+        MediaJob.objects.create(kind=MediaJob.KIND_KEYFRAME_INDEX)
+
+    def test_requires_token_or_staff(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_scrape_reports_requests_and_queue_depth(self):
+        self.client.get('/health/')
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('practica_http_requests_total{method="GET",status="200",view="health_check"}', text)
+        self.assertIn('practica_db_query_duration_seconds_count{alias="default"}', text)
+        self.assertIn('practica_media_jobs_queued{kind="keyframe_index"} 1', text)
+        self.assertIn('practica_media_jobs_queued{kind="session_processing"} 0', text)
+        self.assertIn('practica_sessions_processing 1', text)
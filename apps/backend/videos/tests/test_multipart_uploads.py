@@ -7,7 +7,8 @@ from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from videos.models import MultipartSessionUpload, Profile, Session, Space, SpaceMember
+from videos.models import Comment, MultipartCommentUpload, MultipartSessionUpload, Profile, Session, SessionAsset, Space, SpaceMember
+from videos.services.media_pipeline import multipart_fingerprint
 
 
 class FakeS3Client:
@@ -35,6 +36,10 @@ class FakeS3Client:
         self.aborted = kwargs
         return {}
 
+    def delete_object(self, **kwargs):
+        self.deleted = kwargs
+        return {}
+
     def list_parts(self, **kwargs):
         upload_id = kwargs.get('UploadId')
         return {
@@ -198,3 +203,222 @@ class MultipartUploadApiTests(APITestCase):
             )
         self.assertEqual(status_res.status_code, status.HTTP_200_OK)
         self.assertEqual(status_res.data['status'], MultipartSessionUpload.STATUS_EXPIRED)
+
+    def _ready_source_session(self, fingerprint):
+        source = Session.objects.create(
+            user=self.member,
+            space=self.space,
+            title='Original take',
+            video_file='sessions/member/original.mp4',
+            processing_status=Session.STATUS_READY,
+            content_fingerprint=fingerprint,
+            duration_seconds=600,
+        )
+        SessionAsset.objects.create(
+            session=source,
+            asset_type=SessionAsset.TYPE_PROXY_MP4,
+            object_key=f'processed/sessions/{source.id}/proxy/original_proxy.mp4',
+            content_type='video/mp4',
+        )
+        return source
+
+    def test_complete_reuses_processed_media_for_duplicate_content(self):
+        fake_s3 = FakeS3Client()
+        size_bytes = 10 * 1024 * 1024
+        parts = [{'PartNumber': 1, 'ETag': '"0123456789abcdef0123456789abcdef"'}]
+        source = self._ready_source_session(multipart_fingerprint(size_bytes, parts))
+        upload = MultipartSessionUpload.objects.create(
+            user=self.owner,
+            space=self.space,
+            status=MultipartSessionUpload.STATUS_INITIATED,
+            title='Same take, other space',
+            original_filename='take.mp4',
+            content_type='video/mp4',
+            size_bytes=size_bytes,
+            s3_key='sessions/owner/take.mp4',
+            s3_upload_id='upload-dup-1',
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+        self.client.force_authenticate(user=self.owner)
+        with patch('videos.views._s3_client', return_value=fake_s3), \
+                patch('videos.views.enqueue_session_job') as enqueue:
+            res = self.client.post(
+                '/api/sessions/multipart/complete/',
+                {
+                    'multipart_upload_id': upload.id,
+                    'parts': [{'part_number': 1, 'etag': '"0123456789abcdef0123456789abcdef"'}],
+                },
+                format='json',
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        enqueue.assert_not_called()
+
+        session = Session.objects.get(id=res.data['id'])
+        self.assertEqual(session.processing_status, Session.STATUS_READY)
+        self.assertEqual(session.video_file.name, source.video_file.name)
+        self.assertEqual(session.duration_seconds, 600)
+        self.assertEqual(
+            list(session.assets.values_list('object_key', flat=True)),
+            list(source.assets.values_list('object_key', flat=True)),
+        )
+        self.assertEqual(fake_s3.deleted['Key'], 'sessions/owner/take.mp4')
+
+    def test_initiate_with_known_client_fingerprint_skips_upload(self):
+        fake_s3 = FakeS3Client()
+        size_bytes = 10 * 1024 * 1024
+        fingerprint = multipart_fingerprint(size_bytes, [{'PartNumber': 1, 'ETag': '"aa"'}])
+        source = self._ready_source_session(fingerprint)
+
+        self.client.force_authenticate(user=self.member)
+        with patch('videos.views._s3_client', return_value=fake_s3):
+            res = self.client.post(
+                '/api/sessions/multipart/initiate/',
+                {
+                    'title': 'Again',
+                    'size_bytes': size_bytes,
+                    'filename': 'take.mp4',
+                    'content_type': 'video/mp4',
+                    'duration_seconds': 600,
+                    'content_fingerprint': fingerprint,
+                },
+                format='json',
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(res.data['deduplicated'])
+        self.assertFalse(hasattr(fake_s3, 'created'))
+        self.assertEqual(res.data['session']['video_file'].split('?')[0].split('/')[-1], 'original.mp4')
+        self.assertEqual(MultipartSessionUpload.objects.count(), 0)
+        self.assertEqual(Session.objects.filter(video_file=source.video_file.name).count(), 2)
+
+    def test_client_fingerprint_of_other_user_is_not_reused_at_initiate(self):
+        fake_s3 = FakeS3Client()
+        size_bytes = 10 * 1024 * 1024
+        fingerprint = multipart_fingerprint(size_bytes, [{'PartNumber': 1, 'ETag': '"bb"'}])
+        self._ready_source_session(fingerprint)
+
+        self.client.force_authenticate(user=self.owner)
+        with patch('videos.views._s3_client', return_value=fake_s3):
+            res = self.client.post(
+                '/api/sessions/multipart/initiate/',
+                {
+                    'title': 'Not mine',
+                    'size_bytes': size_bytes,
+                    'filename': 'take.mp4',
+                    'duration_seconds': 600,
+                    'content_fingerprint': fingerprint,
+                },
+                format='json',
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('multipart_upload_id', res.data)
+
+
+@override_settings(
+    AWS_STORAGE_BUCKET_NAME='test-bucket',
+    AWS_S3_REGION_NAME='us-east-1',
+    UPLOAD_MAX_BYTES=2147483648,
+)
+class CommentReplyUploadApiTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='coach', password='pass1234')
+        self.member = User.objects.create_user(username='student', password='pass1234')
+        self.outsider = User.objects.create_user(username='outsider', password='pass1234')
+        self.space = Space.objects.create(name='Lessons', owner=self.owner)
+        SpaceMember.objects.create(space=self.space, user=self.member)
+        self.session = Session.objects.create(
+            user=self.member,
+            space=self.space,
+            title='Groove practice',
+            video_file='sessions/student/groove.mp4',
+            processing_status=Session.STATUS_READY,
+        )
+
+    def _base(self):
+        return f'/api/sessions/{self.session.id}/comment-upload'
+
+    def test_comment_created_on_completion(self):
+        fake_s3 = FakeS3Client()
+        self.client.force_authenticate(user=self.owner)
+
+        with patch('videos.views._s3_client', return_value=fake_s3):
+            init_res = self.client.post(
+                f'{self._base()}/initiate/',
+                {
+                    'size_bytes': 3 * 1024 * 1024,
+                    'filename': 'reply.webm',
+                    'content_type': 'video/webm',
+                    'text': 'Watch the hi-hat',
+                    'timestamp_seconds': 42,
+                },
+                format='json',
+            )
+            self.assertEqual(init_res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(init_res.data['total_parts'], 1)
+            upload_id = init_res.data['multipart_upload_id']
+            self.assertTrue(fake_s3.created['Key'].startswith(f'comment_videos/{self.owner.id}/'))
+            self.assertEqual(Comment.objects.count(), 0)
+
+            sign_res = self.client.post(
+                f'{self._base()}/sign-part/',
+                {'multipart_upload_id': upload_id, 'part_number': 1},
+                format='json',
+            )
+            self.assertEqual(sign_res.status_code, status.HTTP_200_OK)
+
+            complete_res = self.client.post(
+                f'{self._base()}/complete/',
+                {'multipart_upload_id': upload_id, 'parts': [{'part_number': 1, 'etag': '"etag-1"'}]},
+                format='json',
+            )
+        self.assertEqual(complete_res.status_code, status.HTTP_201_CREATED)
+
+        comment = Comment.objects.get(session=self.session)
+        self.assertEqual(comment.user, self.owner)
+        self.assertEqual(comment.text, 'Watch the hi-hat')
+        self.assertEqual(comment.timestamp_seconds, 42)
+        self.assertEqual(comment.video_reply.name, fake_s3.created['Key'])
+        self.assertFalse(comment.legacy_text_only)
+
+        upload = MultipartCommentUpload.objects.get(pk=upload_id)
+        self.assertEqual(upload.status, MultipartCommentUpload.STATUS_COMPLETED)
+        self.assertEqual(upload.comment, comment)
+        self.assertEqual(len(complete_res.data['comments']), 1)
+
+    def test_initiate_requires_video_content_type(self):
+        self.client.force_authenticate(user=self.owner)
+        with patch('videos.views._s3_client', return_value=FakeS3Client()):
+            res = self.client.post(
+                f'{self._base()}/initiate/',
+                {'size_bytes': 1024, 'filename': 'notes.txt', 'content_type': 'text/plain'},
+                format='json',
+            )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_outsider_cannot_start_comment_upload(self):
+        self.client.force_authenticate(user=self.outsider)
+        with patch('videos.views._s3_client', return_value=FakeS3Client()):
+            res = self.client.post(
+                f'{self._base()}/initiate/',
+                {'size_bytes': 1024, 'filename': 'reply.webm', 'content_type': 'video/webm'},
+                format='json',
+            )
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_abort_marks_upload_aborted(self):
+        fake_s3 = FakeS3Client()
+        upload = MultipartCommentUpload.objects.create(
+            user=self.owner,
+            session=self.session,
+            original_filename='reply.webm',
+            content_type='video/webm',
+            size_bytes=1024,
+            s3_key='comment_videos/coach/reply.webm',
+            s3_upload_id='comment-upload-1',
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        self.client.force_authenticate(user=self.owner)
+        with patch('videos.views._s3_client', return_value=fake_s3):
+            res = self.client.post(f'{self._base()}/abort/', {'multipart_upload_id': upload.id}, format='json')
+        self.assertEqual(res.data['status'], 'aborted')
+        self.assertEqual(fake_s3.aborted['UploadId'], 'comment-upload-1')
@@ -0,0 +1,71 @@
+import pstats
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from practica import profiling
+from videos.models import Session, Space
+
+
+class RequestProfilingTests(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        profile_override = override_settings(REQUEST_PROFILE_DIR=self.directory, REQUEST_PROFILE_KEEP=2)
+        profile_override.enable()
+        self.addCleanup(profile_override.disable)
+
+        self.staff = User.objects.create_user(username='oncall', password='pass1234', is_staff=True)
+        self.player = User.objects.create_user(username='player', password='pass1234')
+        space = Space.objects.create(name='Studio', owner=self.staff)
+        self.session = Session.objects.create(user=self.staff, space=space, title='Slow one')
+
+    def _as(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_staff_token_request_is_profiled_with_sql_log(self):
+        self._as(self.staff)
+        response = self.client.get(f'/api/sessions/{self.session.id}/', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+
+        detail = self.client.get(f'/api/profiles/{profile_id}/').json()
+        self.assertEqual(detail['view'], 'session-detail')
+        self.assertEqual(detail['user'], 'oncall')
+        self.assertEqual(detail['queries'], len(detail['sql']))
+        self.assertTrue(any('videos_session' in entry['sql'] for entry in detail['sql']))
+        self.assertIn('retrieve', detail['top_functions'])
+
+        listing = self.client.get('/api/profiles/').json()['results']
+        self.assertEqual([item['id'] for item in listing], [profile_id])
+        self.assertNotIn('sql', listing[0])
+
+        download = self.client.get(f'/api/profiles/{profile_id}/download/')
+        with tempfile.NamedTemporaryFile(suffix='.prof') as fh:
+            fh.write(b''.join(download.streaming_content))
+            fh.flush()
+            self.assertGreater(pstats.Stats(fh.name).total_calls, 0)
+
+    def test_query_flag_works_and_old_profiles_are_pruned(self):
+        self._as(self.staff)
+        ids = [self.client.get('/api/sessions/?_profile=1')['X-Profile-Id'] for _ in range(3)]
+        stored = [item['id'] for item in profiling.list_profiles()]
+        self.assertEqual(len(stored), 2)
+        self.assertNotIn(min(ids), stored)
+
+    def test_non_staff_cannot_profile_or_read_profiles(self):
+        self._as(self.player)
+        response = self.client.get('/api/sessions/', HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(profiling.list_profiles(), [])
+        self.assertEqual(self.client.get('/api/profiles/').status_code, 403)
+
+    def test_unknown_or_malformed_ids_are_not_found(self):
+        self._as(self.staff)
+        self.assertEqual(self.client.get('/api/profiles/20260101T000000000000-deadbeef/').status_code, 404)
+        self.assertEqual(self.client.get('/api/profiles/..%2Fsecrets/download/').status_code, 404)
@@ -0,0 +1,89 @@
+import re
+
+import boto3
+from botocore.stub import Stubber
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from practica.request_metrics import QueryBudgetExceeded, RequestMetricsMiddleware
+from videos.models import Comment, Session, Space
+
+
+def _db_timing(response):
+    match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries, (\d+) repeated"', response['Server-Timing'])
+    return int(match.group(1)), int(match.group(2))
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_SERVER_TIMING=True)
+class ServerTimingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='measured', password='pass1234')
+        self.space = Space.objects.create(name='Timing', owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def _add_sessions(self, count):
+        for index in range(count):
+            session = Session.objects.create(
+                user=self.user, space=self.space, title=f'Take {index}', video_file=f'sessions/{index}.mp4',
+                processing_status=Session.STATUS_READY,
+            )
+            session.tags.create(name=f'tag-{session.id}')
+            Comment.objects.create(session=session, user=self.user, text='ok', legacy_text_only=True)
+
+    def test_session_list_query_count_does_not_grow_with_rows(self):
+        self._add_sessions(2)
+        small, _ = _db_timing(self.client.get('/api/sessions/'))
+        self._add_sessions(8)
+        response = self.client.get('/api/sessions/')
+        large, repeated = _db_timing(response)
+        self.assertEqual(large, small)
+        self.assertEqual(repeated, 0)
+        self.assertIn('app;dur=', response['Server-Timing'])
+
+    @override_settings(REQUEST_METRICS_SERVER_TIMING=False)
+    def test_header_only_for_staff_when_not_public(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/sessions/'))
+        self.user.is_staff = True
+        self.user.save()
+        self.assertIn('Server-Timing', self.client.get('/api/sessions/'))
+
+    @override_settings(REQUEST_QUERY_BUDGETS={'GET session-list': 1}, REQUEST_QUERY_BUDGET_STRICT=True)
+    def test_strict_budget_fails_the_request(self):
+        self._add_sessions(1)
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'GET session-list ran'):
+            self.client.get('/api/sessions/')
+
+    @override_settings(REQUEST_QUERY_BUDGETS={'session-list': 1}, REQUEST_QUERY_BUDGET_STRICT=False)
+    def test_lenient_budget_logs_warning(self):
+        self._add_sessions(1)
+        with self.assertLogs('practica.request_metrics', level='WARNING') as logs:
+            response = self.client.get('/api/sessions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Query budget exceeded', logs.output[0])
+
+    def test_request_is_logged_with_structured_fields(self):
+        with self.assertLogs('practica.request_metrics', level='INFO') as logs:
+            self.client.get('/api/sessions/')
+        record = logs.records[0]
+        self.assertEqual(record.request_metrics['view'], 'session-list')
+        self.assertGreater(record.request_metrics['queries'], 0)
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_SERVER_TIMING=True)
+class AwsTimingTests(TestCase):
+    def test_boto3_calls_are_counted(self):
+        def view(request):
+            client = boto3.client(
+                's3', region_name='us-east-1', aws_access_key_id='test', aws_secret_access_key='test',
+            )
+            with Stubber(client) as stub:
+                stub.add_response('head_bucket', {}, {'Bucket': 'practica'})
+                stub.add_response('head_bucket', {}, {'Bucket': 'practica'})
+                client.head_bucket(Bucket='practica')
+                client.head_bucket(Bucket='practica')
+            return HttpResponse('ok')
+
+        response = RequestMetricsMiddleware(view)(RequestFactory().get('/anything/'))
+        self.assertRegex(response['Server-Timing'], r'aws;dur=[\d.]+;desc="2 calls"')
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from videos.models import ResumableSessionUpload, Session, Space
+from videos.services.resumable_uploads import partial_path
+
+PAYLOAD = bytes(range(256)) * 40  # 10 KiB
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='', RESUMABLE_UPLOAD_DIR='')
+class ResumableUploadApiTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(MEDIA_ROOT=self.media_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        self.user = User.objects.create_user(username='uploader', password='pass1234')
+        self.space = Space.objects.create(name='Cello', owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def _create(self, size=len(PAYLOAD)):
+        res = self.client.post('/api/sessions/resumable/', {
+            'title': 'Long rehearsal',
+            'filename': 'rehearsal.webm',
+            'content_type': 'video/webm',
+            'size_bytes': size,
+            'space': self.space.id,
+            'tags': ['bowing'],
+            'duration_seconds': 3600,
+        }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res
+
+    def _patch(self, upload_id, offset, data):
+        return self.client.generic(
+            'PATCH', f'/api/sessions/resumable/{upload_id}/', data,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_chunks_resume_and_assemble_session(self):
+        res = self._create()
+        upload_id = res.data['resumable_upload_id']
+        self.assertEqual(res['Upload-Offset'], '0')
+        self.assertEqual(res['Location'], f'/api/sessions/resumable/{upload_id}/')
+
+        res = self._patch(upload_id, 0, PAYLOAD[:4000])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Upload-Offset'], '4000')
+
+        # After a dropped connection the client asks where to resume.
+        head = self.client.head(f'/api/sessions/resumable/{upload_id}/')
+        self.assertEqual(head['Upload-Offset'], '4000')
+        self.assertEqual(head['Upload-Length'], str(len(PAYLOAD)))
+
+        res = self._patch(upload_id, 4000, PAYLOAD[4000:])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        session = Session.objects.get(pk=res.data['id'])
+        self.assertEqual(session.space, self.space)
+        self.assertEqual(list(session.tags.values_list('name', flat=True)), ['bowing'])
+        self.assertEqual(session.processing_status, Session.STATUS_READY)
+        with default_storage.open(session.video_file.name, 'rb') as fh:
+            self.assertEqual(fh.read(), PAYLOAD)
+
+        upload = ResumableSessionUpload.objects.get(pk=upload_id)
+        self.assertEqual(upload.status, ResumableSessionUpload.STATUS_COMPLETED)
+        self.assertEqual(upload.session, session)
+        self.assertFalse(os.path.exists(partial_path(upload)))
+
+    def test_offset_mismatch_reports_committed_offset(self):
+        upload_id = self._create().data['resumable_upload_id']
+        self._patch(upload_id, 0, PAYLOAD[:1000])
+
+        res = self._patch(upload_id, 0, PAYLOAD[:1000])
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res['Upload-Offset'], '1000')
+
+    def test_bytes_past_committed_offset_are_discarded(self):
+        upload_id = self._create().data['resumable_upload_id']
+        self._patch(upload_id, 0, PAYLOAD[:1000])
+        upload = ResumableSessionUpload.objects.get(pk=upload_id)
+        # A worker died after writing but before recording the new offset.
+        with open(partial_path(upload), 'ab') as fh:
+            fh.write(b'garbage' * 10)
+
+        res = self._patch(upload_id, 1000, PAYLOAD[1000:])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        with default_storage.open(Session.objects.get(pk=res.data['id']).video_file.name, 'rb') as fh:
+            self.assertEqual(fh.read(), PAYLOAD)
+
+    def test_chunk_past_declared_size_is_rejected(self):
+        upload_id = self._create(size=100).data['resumable_upload_id']
+        res = self._patch(upload_id, 0, PAYLOAD[:200])
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ResumableSessionUpload.objects.get(pk=upload_id).offset, 0)
+
+    def test_delete_aborts_and_removes_partial(self):
+        upload_id = self._create().data['resumable_upload_id']
+        self._patch(upload_id, 0, PAYLOAD[:1000])
+        upload = ResumableSessionUpload.objects.get(pk=upload_id)
+        self.assertTrue(os.path.exists(partial_path(upload)))
+
+        res = self.client.delete(f'/api/sessions/resumable/{upload_id}/')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(os.path.exists(partial_path(upload)))
+        self.assertEqual(self._patch(upload_id, 1000, PAYLOAD[1000:]).status_code, status.HTTP_410_GONE)
+
+    def test_other_users_cannot_touch_upload(self):
+        upload_id = self._create().data['resumable_upload_id']
+        self.client.force_authenticate(user=User.objects.create_user(username='other', password='pass1234'))
+        self.assertEqual(self._patch(upload_id, 0, PAYLOAD).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket')
+    def test_s3_deployments_use_multipart(self):
+        res = self.client.post('/api/sessions/resumable/', {'title': 'x', 'size_bytes': 10}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,106 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from videos.models import Comment, CommentAsset, Session, SessionAsset, Space
+from videos.services.signed_urls import signed_url, signed_urls, signing_window_seconds
+
+
+def _fake_url(key):
+    return f"https://bucket.example.test/{key}?X-Amz-Signature=sig"
+
+
+@override_settings(AWS_QUERYSTRING_EXPIRE=3600, SIGNED_URL_CACHE_WINDOW=1800)
+class SignedUrlCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_window_never_exceeds_half_of_expiry(self):
+        self.assertEqual(signing_window_seconds(), 1800)
+        with self.settings(SIGNED_URL_CACHE_WINDOW=3500):
+            self.assertEqual(signing_window_seconds(), 1800)
+        with self.settings(SIGNED_URL_CACHE_WINDOW=600):
+            self.assertEqual(signing_window_seconds(), 600)
+
+    def test_url_is_stable_within_bucket_and_resigned_after(self):
+        with patch('videos.services.signed_urls.default_storage') as storage:
+            storage.url.side_effect = lambda key: f"{_fake_url(key)}&t={storage.url.call_count}"
+            first = signed_url('sessions/1/a.mp4', now=3600 * 10)
+            again = signed_url('sessions/1/a.mp4', now=3600 * 10 + 1700)
+            later = signed_url('sessions/1/a.mp4', now=3600 * 10 + 1800)
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, later)
+        self.assertEqual(storage.url.call_count, 2)
+
+    def test_bulk_signing_skips_urls_and_duplicates(self):
+        with patch('videos.services.signed_urls.default_storage') as storage:
+            storage.url.side_effect = _fake_url
+            urls = signed_urls(['a.mp4', 'a.mp4', '', 'https://cdn.test/b.mp4', '/media/c.mp4', 'd.vtt'])
+        self.assertEqual(storage.url.call_count, 2)
+        self.assertEqual(urls['https://cdn.test/b.mp4'], 'https://cdn.test/b.mp4')
+        self.assertEqual(urls['/media/c.mp4'], '/media/c.mp4')
+        self.assertEqual(urls['d.vtt'], _fake_url('d.vtt'))
+
+
+class SessionListSigningTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='signer', password='pass1234')
+        self.space = Space.objects.create(name='Signing', owner=self.user)
+        for idx in range(3):
+            session = Session.objects.create(
+                user=self.user,
+                space=self.space,
+                title=f'Session {idx}',
+                video_file=f'sessions/{self.user.id}/take-{idx}.mp4',
+                processing_status=Session.STATUS_READY,
+            )
+            SessionAsset.objects.create(
+                session=session,
+                asset_type=SessionAsset.TYPE_PROXY_MP4,
+                object_key=f'processed/sessions/{session.id}/proxy/p.mp4',
+            )
+            SessionAsset.objects.create(
+                session=session,
+                asset_type=SessionAsset.TYPE_THUMB_VTT,
+                object_key=f'processed/sessions/{session.id}/thumbs/t.vtt',
+            )
+
+    def test_list_signs_each_key_once_across_requests(self):
+        self.client.force_authenticate(user=self.user)
+        with patch('videos.services.signed_urls.default_storage') as storage:
+            storage.url.side_effect = _fake_url
+            first = self.client.get('/api/sessions/')
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            self.assertEqual(storage.url.call_count, 9)
+
+            second = self.client.get('/api/sessions/')
+            self.assertEqual(storage.url.call_count, 9)
+
+        first_urls = [(s['video_file'], [a['url'] for a in s['assets']]) for s in first.data['results']]
+        second_urls = [(s['video_file'], [a['url'] for a in s['assets']]) for s in second.data['results']]
+        self.assertEqual(first_urls, second_urls)
+        self.assertTrue(first_urls[0][0].startswith('https://bucket.example.test/sessions/'))
+
+    def test_detail_signs_session_and_comment_media_in_one_round_trip(self):
+        session = Session.objects.filter(space=self.space).first()
+        comment = Comment.objects.create(
+            session=session, user=self.user, text='Nice', video_reply=f'comment_videos/{self.user.id}/reply.webm',
+        )
+        CommentAsset.objects.create(
+            comment=comment, asset_type=CommentAsset.TYPE_PROXY_MP4, object_key=f'processed/comments/{comment.id}/p.mp4',
+        )
+        self.client.force_authenticate(user=self.user)
+        with patch('videos.services.signed_urls.default_storage') as storage, \
+                patch('videos.services.signed_urls.cache', wraps=cache) as cache_spy:
+            storage.url.side_effect = _fake_url
+            res = self.client.get(f'/api/sessions/{session.id}/')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(cache_spy.get_many.call_count, 1)
+        self.assertEqual(storage.url.call_count, 5)
+        self.assertEqual(res.data['comments'][0]['assets'][0]['url'], _fake_url(f'processed/comments/{comment.id}/p.mp4'))
@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from videos.models import Chapter, Comment, Session, Space, SpaceMember
+from videos.services.space_export import SpaceExport
+
+VIDEO = bytes(range(256)) * 64  # 16 KiB
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='')
+class SpaceExportTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(MEDIA_ROOT=self.media_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        self.coach = User.objects.create_user(username='coach', password='pass1234')
+        self.student = User.objects.create_user(username='student', password='pass1234')
+        self.space = Space.objects.create(name='Studio Piano', owner=self.coach)
+        SpaceMember.objects.create(space=self.space, user=self.student)
+
+        key = default_storage.save('sessions/lesson.mp4', ContentFile(VIDEO))
+        self.session = Session.objects.create(user=self.student, space=self.space, title='Lesson 1', video_file=key)
+        self.session.tags.create(name='arpeggios')
+        Chapter.objects.create(session=self.session, title='Warmup', timestamp_seconds=0, end_seconds=60)
+        reply = default_storage.save('comment_videos/fix.webm', ContentFile(b'reply-video'))
+        Comment.objects.create(
+            session=self.session, user=self.coach, text='Relax the wrist', timestamp_seconds=42, video_reply=reply,
+        )
+        # A deduplicated upload pointing at the same original.
+        Session.objects.create(user=self.student, space=self.space, title='Lesson 1 again', video_file=key)
+
+    def _archive(self, chunks):
+        return zipfile.ZipFile(BytesIO(b''.join(chunks)))
+
+    def test_owner_downloads_streamed_archive(self):
+        self.client.force_authenticate(user=self.coach)
+        res = self.client.get(f'/api/spaces/{self.space.id}/export/')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/zip')
+        self.assertIn(f'studio-piano-{self.space.id}.zip', res['Content-Disposition'])
+
+        archive = self._archive(res.streaming_content)
+        self.assertIsNone(archive.testzip())
+        space = json.loads(archive.read('space.json'))
+        self.assertEqual(space['members'][0]['username'], 'student')
+
+        base = f'sessions/{self.session.id}-lesson-1/'
+        self.assertEqual(archive.read(base + 'lesson.mp4'), VIDEO)
+        metadata = json.loads(archive.read(base + 'session.json'))
+        self.assertEqual(metadata['tags'], ['arpeggios'])
+        self.assertEqual(metadata['chapters'][0]['title'], 'Warmup')
+        comment = metadata['comments'][0]
+        self.assertEqual(comment['text'], 'Relax the wrist')
+        self.assertEqual(archive.read(comment['video']), b'reply-video')
+
+        # The shared original is stored once and referenced from the duplicate.
+        self.assertEqual(sum(name.endswith('lesson.mp4') for name in archive.namelist()), 1)
+        duplicate = next(name for name in archive.namelist() if name.endswith('lesson-1-again/session.json'))
+        self.assertEqual(json.loads(archive.read(duplicate))['video'], base + 'lesson.mp4')
+
+    def test_media_is_streamed_in_bounded_chunks(self):
+        chunks = list(SpaceExport(self.space, chunk_size=1024))
+        self.assertGreater(len(chunks), len(VIDEO) // 1024)
+        self.assertLess(max(len(chunk) for chunk in chunks), 4096)
+        self.assertEqual(self._archive(chunks).read(f'sessions/{self.session.id}-lesson-1/lesson.mp4'), VIDEO)
+
+    def test_missing_media_is_listed_not_fatal(self):
+        os.remove(default_storage.path('comment_videos/fix.webm'))
+        archive = self._archive(SpaceExport(self.space))
+        self.assertEqual(json.loads(archive.read('missing-media.json')), ['comment_videos/fix.webm'])
+
+    def test_members_cannot_export(self):
+        self.client.force_authenticate(user=self.student)
+        res = self.client.get(f'/api/spaces/{self.space.id}/export/')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_command_writes_archive(self):
+        output = os.path.join(self.media_root, 'out.zip')
+        call_command('export_space', self.space.id, '--output', output, stdout=StringIO())
+        with zipfile.ZipFile(output) as archive:
+            self.assertIn('space.json', archive.namelist())
@@ -4,10 +4,12 @@ from rest_framework import status
 from rest_framework.test import APITestCase
 
 from videos.models import Profile, Session, Space, SpaceMember
+from videos.tests.utils import TemporaryMediaRootMixin
 
 
-class SpacePermissionTests(APITestCase):
+class SpacePermissionTests(TemporaryMediaRootMixin, APITestCase):
     def setUp(self):
+        super().setUp()
         self.owner = User.objects.create_user(username='space-owner', password='pass1234')
         self.member = User.objects.create_user(username='space-member', password='pass1234')
 
@@ -0,0 +1,126 @@
+import hashlib
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from videos.models import Comment, Session, SessionAsset, Space
+from videos.services import storage_writers
+from videos.services.media_pipeline import multipart_fingerprint
+
+CONTENT = b'recorded-take' + bytes(range(256)) * 12
+
+
+def _fingerprint(data, part_size):
+    parts = [
+        {'PartNumber': number, 'ETag': hashlib.md5(data[start:start + part_size]).hexdigest()}
+        for number, start in enumerate(range(0, len(data), part_size), start=1)
+    ]
+    return multipart_fingerprint(len(data), parts)
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='')
+class StreamingUploadTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(MEDIA_ROOT=self.media_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        self.user = User.objects.create_user(username='streamer', password='pass1234')
+        self.space = Space.objects.create(name='Horn', owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def _post(self, data=CONTENT):
+        return self.client.post('/api/sessions/', {
+            'title': 'Long tones',
+            'space': self.space.id,
+            'video_file': SimpleUploadedFile('tones.mp4', data, content_type='video/mp4'),
+        }, format='multipart')
+
+    def test_video_is_written_once_and_fingerprinted(self):
+        # Nothing may go through Storage.save: the handler already wrote the object.
+        with patch.object(FileSystemStorage, 'save', side_effect=AssertionError('copied through storage')):
+            res = self._post()
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        session = Session.objects.get(pk=res.data['id'])
+        self.assertTrue(session.video_file.name.startswith('sessions/'))
+        self.assertTrue(session.video_file.name.endswith('-tones.mp4'))
+        with default_storage.open(session.video_file.name, 'rb') as fh:
+            self.assertEqual(fh.read(), CONTENT)
+        self.assertEqual(session.content_fingerprint, _fingerprint(CONTENT, storage_writers.PART_SIZE))
+
+    def test_fingerprint_matches_multipart_etag_across_parts(self):
+        with patch.object(storage_writers, 'PART_SIZE', 1024):
+            res = self._post()
+        session = Session.objects.get(pk=res.data['id'])
+        self.assertEqual(session.content_fingerprint, _fingerprint(CONTENT, 1024))
+        self.assertTrue(session.content_fingerprint.endswith('-4'))
+
+    def test_duplicate_content_reuses_processed_session(self):
+        source = Session.objects.get(pk=self._post().data['id'])
+        SessionAsset.objects.create(
+            session=source, asset_type=SessionAsset.TYPE_HLS_MASTER, object_key='processed/hls/master.m3u8',
+        )
+
+        res = self._post()
+        session = Session.objects.get(pk=res.data['id'])
+        self.assertEqual(session.video_file.name, source.video_file.name)
+        self.assertEqual(session.processing_status, Session.STATUS_READY)
+        self.assertTrue(session.assets.filter(asset_type=SessionAsset.TYPE_HLS_MASTER).exists())
+        self.assertEqual(len(default_storage.listdir('sessions')[1]), 1)
+
+    def test_comment_reply_is_streamed(self):
+        session = Session.objects.get(pk=self._post().data['id'])
+        res = self.client.post(
+            f'/api/sessions/{session.id}/add_comment/',
+            {'text': '', 'video_reply': SimpleUploadedFile('reply.webm', b'webm-bytes', content_type='video/webm')},
+            format='multipart',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        comment = Comment.objects.get(session=session)
+        self.assertTrue(comment.video_reply.name.startswith('comment_videos/'))
+        with default_storage.open(comment.video_reply.name, 'rb') as fh:
+            self.assertEqual(fh.read(), b'webm-bytes')
+
+
+class FakeMultipartS3:
+    def __init__(self):
+        self.parts = []
+        self.completed = None
+
+    def create_multipart_upload(self, **kwargs):
+        return {'UploadId': 'up-1'}
+
+    def upload_part(self, **kwargs):
+        self.parts.append(kwargs['Body'])
+        return {'ETag': f'"{hashlib.md5(kwargs["Body"]).hexdigest()}"'}
+
+    def complete_multipart_upload(self, **kwargs):
+        self.completed = kwargs
+
+
+class S3ObjectWriterTests(TestCase):
+    @override_settings(AWS_STORAGE_BUCKET_NAME='bucket')
+    def test_parts_are_uploaded_as_they_fill(self):
+        fake = FakeMultipartS3()
+        with patch.object(storage_writers, '_s3_client', return_value=fake), \
+                patch.object(storage_writers, 'PART_SIZE', 1000):
+            writer = storage_writers.S3ObjectWriter('sessions/x.mp4', 'video/mp4')
+            for start in range(0, len(CONTENT), 700):
+                writer.write(CONTENT[start:start + 700])
+                self.assertLess(len(writer._buffer), 1000)
+            fingerprint = writer.close()
+
+        self.assertEqual(b''.join(fake.parts), CONTENT)
+        self.assertEqual([len(part) for part in fake.parts[:-1]], [1000] * (len(fake.parts) - 1))
+        self.assertEqual(len(fake.completed['MultipartUpload']['Parts']), len(fake.parts))
+        self.assertEqual(fingerprint, _fingerprint(CONTENT, 1000))
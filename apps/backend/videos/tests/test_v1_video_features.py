@@ -1,15 +1,21 @@
+from unittest.mock import patch
+
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from videos.models import Comment, Profile, Session, SessionAsset, Space, SpaceMember
+from videos.models import (
+    Comment, CommentAsset, MediaJob, ProcessingCallbackEvent, Profile, Session, SessionAsset, Space, SpaceMember,
+)
+from videos.tests.utils import TemporaryMediaRootMixin
 
 
 @override_settings(AWS_STORAGE_BUCKET_NAME='')
-class V1VideoFeaturesTests(APITestCase):
+class V1VideoFeaturesTests(TemporaryMediaRootMixin, APITestCase):
     def setUp(self):
+        super().setUp()
         self.owner = User.objects.create_user(username='owner-v1', password='pass1234')
         self.member = User.objects.create_user(username='member-v1', password='pass1234')
         Profile.objects.create(user=self.owner, display_name='Owner V1')
@@ -165,6 +171,95 @@ class V1VideoFeaturesTests(APITestCase):
         self.assertEqual(session.processing_status, Session.STATUS_READY)
         self.assertEqual(session.assets.count(), 2)
 
+    @override_settings(MEDIA_PROCESSING_CALLBACK_TOKEN='callback-secret')
+    def test_batched_processing_update_upserts_and_ignores_replayed_events(self):
+        first = self._create_session(title='Batch 1')
+        second = self._create_session(title='Batch 2')
+        SessionAsset.objects.create(
+            session=first, asset_type='proxy_mp4', object_key='stale.mp4', content_type='video/mp4',
+        )
+        payload = {'updates': [
+            {
+                'session_id': first.id,
+                'event_id': 'evt-1',
+                'status': 'ready',
+                'assets': [{'asset_type': 'proxy_mp4', 'object_key': 'processed/1/proxy.mp4', 'content_type': 'video/mp4'}],
+            },
+            {'session_id': second.id, 'event_id': 'evt-2', 'status': 'failed', 'processing_error': 'boom'},
+        ]}
+
+        res = self.client.post(
+            '/api/sessions/processing-update/', payload, format='json', HTTP_X_PROCESSING_TOKEN='callback-secret',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['applied']), 2)
+        self.assertEqual(first.assets.get().object_key, 'processed/1/proxy.mp4')
+        second.refresh_from_db()
+        self.assertEqual(second.processing_status, Session.STATUS_FAILED)
+
+        # A retried delivery must not clobber state changed since.
+        Session.objects.filter(id=second.id).update(processing_status=Session.STATUS_READY, processing_error='')
+        res = self.client.post(
+            '/api/sessions/processing-update/', payload, format='json', HTTP_X_PROCESSING_TOKEN='callback-secret',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['applied'], [])
+        self.assertEqual(sorted(res.data['duplicate_event_ids']), ['evt-1', 'evt-2'])
+        second.refresh_from_db()
+        self.assertEqual(second.processing_status, Session.STATUS_READY)
+
+    @override_settings(MEDIA_PROCESSING_CALLBACK_TOKEN='callback-secret')
+    def test_retried_callback_queues_derived_jobs_that_failed_before(self):
+        session = self._create_session(title='Retry')
+        payload = {'updates': [{
+            'session_id': session.id,
+            'event_id': 'evt-retry',
+            'status': 'ready',
+            'assets': [{'asset_type': 'proxy_mp4', 'object_key': 'processed/r/proxy.mp4', 'content_type': 'video/mp4'}],
+        }]}
+
+        with patch('videos.views.enqueue_keyframe_jobs', side_effect=RuntimeError('db hiccup')):
+            res = self.client.post(
+                '/api/sessions/processing-update/', payload, format='json', HTTP_X_PROCESSING_TOKEN='callback-secret',
+            )
+        self.assertEqual(res.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertFalse(ProcessingCallbackEvent.objects.exists())
+
+        res = self.client.post(
+            '/api/sessions/processing-update/', payload, format='json', HTTP_X_PROCESSING_TOKEN='callback-secret',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['duplicate_event_ids'], [])
+        self.assertTrue(MediaJob.objects.filter(session=session, kind=MediaJob.KIND_KEYFRAME_INDEX).exists())
+
+    @override_settings(MEDIA_PROCESSING_CALLBACK_TOKEN='callback-secret')
+    def test_batched_processing_update_rejects_bad_items_and_applies_the_rest(self):
+        first = self._create_session(title='Partial 1')
+        second = self._create_session(title='Partial 2')
+        deleted = self._create_session(title='Partial 3')
+        deleted_id = deleted.id
+        deleted.delete()
+        payload = {'updates': [
+            {'session_id': first.id, 'event_id': 'evt-a', 'status': 'failed', 'processing_error': 'boom'},
+            {'session_id': second.id, 'event_id': 'evt-b', 'status': 'ready', 'assets': []},
+            {'session_id': deleted_id, 'event_id': 'evt-c', 'status': 'failed'},
+            {'session_id': first.id, 'status': 'exploded'},
+        ]}
+
+        res = self.client.post(
+            '/api/sessions/processing-update/', payload, format='json', HTTP_X_PROCESSING_TOKEN='callback-secret',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['applied'], [{'id': first.id, 'processing_status': Session.STATUS_FAILED}])
+        self.assertEqual(res.data['rejected'], [
+            {'session_id': first.id, 'error': 'Invalid processing status'},
+            {'session_id': second.id, 'error': 'Ready status requires at least one proxy_mp4 asset'},
+            {'session_id': deleted_id, 'error': f'Unknown session_id {deleted_id}'},
+        ])
+        second.refresh_from_db()
+        self.assertEqual(second.processing_status, Session.STATUS_READY)
+        self.assertEqual(list(ProcessingCallbackEvent.objects.values_list('event_id', flat=True)), ['evt-a'])
+
     @override_settings(MEDIA_PROCESSING_CALLBACK_TOKEN='callback-secret')
     def test_processing_update_requires_auth_token_or_staff(self):
         session = self._create_session()
@@ -177,3 +272,84 @@ class V1VideoFeaturesTests(APITestCase):
             format='json',
         )
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(
+        AWS_STORAGE_BUCKET_NAME='',
+        AWS_MEDIA_CONVERT_ROLE_ARN='',
+        AWS_MEDIA_CONVERT_ENDPOINT_URL='',
+    )
+    def test_comment_reply_falls_back_to_original_as_proxy(self):
+        session = self._create_session(user=self.member)
+        self.client.force_authenticate(user=self.owner)
+
+        res = self.client.post(
+            f'/api/sessions/{session.id}/add_comment/',
+            {'text': 'Try this', 'video_reply': self._video_file('reply.webm')},
+            format='multipart',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        comment = Comment.objects.get(session=session)
+        self.assertEqual(comment.processing_status, Session.STATUS_READY)
+        payload = res.data['comments'][0]
+        self.assertEqual(payload['processing_status'], Session.STATUS_READY)
+        self.assertEqual(payload['assets'][0]['asset_type'], CommentAsset.TYPE_PROXY_MP4)
+
+    @override_settings(
+        AWS_STORAGE_BUCKET_NAME='test-bucket',
+        AWS_MEDIA_CONVERT_ROLE_ARN='arn:aws:iam::123:role/mc',
+        AWS_MEDIA_CONVERT_ENDPOINT_URL='https://mc.example.test',
+    )
+    def test_comment_reply_submits_fast_start_proxy_job(self):
+        session = self._create_session(user=self.member)
+        self.client.force_authenticate(user=self.owner)
+
+        with patch('videos.services.media_pipeline._mediaconvert_client') as client_factory:
+            client_factory.return_value.create_job.return_value = {'Job': {'Id': 'job-1'}}
+            res = self.client.post(
+                f'/api/sessions/{session.id}/add_comment/',
+                {'text': '', 'video_reply': self._video_file('reply.webm')},
+                format='multipart',
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        comment = Comment.objects.get(session=session)
+        self.assertEqual(comment.processing_status, Session.STATUS_PROCESSING)
+
+        request = client_factory.return_value.create_job.call_args.kwargs
+        self.assertEqual(request['UserMetadata']['comment_id'], str(comment.id))
+        groups = {g['Name']: g for g in request['Settings']['OutputGroups']}
+        proxy_container = groups['proxy-mp4']['Outputs'][0]['ContainerSettings']
+        self.assertEqual(proxy_container['Mp4Settings']['MoovPlacement'], 'PROGRESSIVE_DOWNLOAD')
+        poster_codec = groups['poster-capture']['Outputs'][0]['VideoDescription']['CodecSettings']
+        self.assertEqual(poster_codec['FrameCaptureSettings']['MaxCaptures'], 1)
+
+    @override_settings(MEDIA_PROCESSING_CALLBACK_TOKEN='callback-secret')
+    def test_comment_processing_update_stores_proxy_and_poster(self):
+        session = self._create_session(user=self.member)
+        comment = Comment.objects.create(
+            session=session,
+            user=self.owner,
+            text='',
+            video_reply=self._video_file('reply.webm'),
+            processing_status=Session.STATUS_PROCESSING,
+        )
+
+        res = self.client.post(
+            f'/api/sessions/{session.id}/comments/{comment.id}/processing-update/',
+            {
+                'status': 'ready',
+                'assets': [
+                    {'asset_type': 'proxy_mp4', 'object_key': f'processed/comments/{comment.id}/proxy/r.mp4'},
+                    {'asset_type': 'poster', 'object_key': f'processed/comments/{comment.id}/poster/r.jpg'},
+                    {'asset_type': 'hls_master', 'object_key': 'ignored.m3u8'},
+                ],
+            },
+            format='json',
+            HTTP_X_PROCESSING_TOKEN='callback-secret',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        comment.refresh_from_db()
+        self.assertEqual(comment.processing_status, Session.STATUS_READY)
+        self.assertEqual(
+            set(comment.assets.values_list('asset_type', flat=True)),
+            {CommentAsset.TYPE_PROXY_MP4, CommentAsset.TYPE_POSTER},
+        )
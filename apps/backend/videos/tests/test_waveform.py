@@ -0,0 +1,130 @@
+import io
+import shutil
+import tempfile
+import wave
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from videos.models import MediaJob, Session, SessionAsset, Space
+from videos.services import waveform
+from videos.services.waveform import build_waveform_peaks, compute_peaks, pack_peaks, unpack_peaks
+
+
+def _wav(samples, sample_rate=8000, channels=1):
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(np.asarray(samples, dtype='<i2').tobytes())
+    return buf.getvalue()
+
+
+class BytesReader:
+    def __init__(self, data):
+        self.data = data
+        self.size = len(data)
+
+    def read(self, offset, length):
+        return self.data[offset:offset + length]
+
+
+class WaveformPeakTests(TestCase):
+    def test_peaks_track_loud_and_quiet_sections(self):
+        quiet = np.zeros(8000)
+        hit = np.tile([32767, -32768], 4000)
+        sample_rate, levels = compute_peaks(BytesReader(_wav(np.concatenate([quiet, hit]))))
+
+        self.assertEqual(sample_rate, 8000)
+        spp, base = levels[0]
+        self.assertEqual(spp, waveform.BASE_SAMPLES_PER_PEAK)
+        self.assertEqual(len(base), int(np.ceil(16000 / spp)))
+        self.assertEqual(base.dtype, np.int8)
+        self.assertTrue((base[:31] == 0).all())
+        self.assertEqual(tuple(base[-2]), (-127, 127))
+
+    def test_levels_halve_until_small(self):
+        _, levels = compute_peaks(BytesReader(_wav(np.ones(256 * 1100))))
+        counts = [len(level) for _, level in levels]
+        self.assertEqual(counts, [1100, 550, 275, 138])
+        self.assertLessEqual(counts[-1], waveform.MIN_LEVEL_PEAKS)
+        self.assertEqual([spp for spp, _ in levels], [256, 512, 1024, 2048])
+
+    def test_stereo_is_downmixed_and_streamed_in_blocks(self):
+        stereo = np.column_stack([np.full(4096, 1000), np.full(4096, 3000)]).ravel()
+        original_block = waveform.READ_BLOCK_BYTES
+        waveform.READ_BLOCK_BYTES = 1024
+        try:
+            _, levels = compute_peaks(BytesReader(_wav(stereo, channels=2)))
+        finally:
+            waveform.READ_BLOCK_BYTES = original_block
+        self.assertEqual(len(levels[0][1]), 16)
+        self.assertTrue((levels[0][1] == round(2000 / 32768 * 127)).all())
+
+    def test_pack_roundtrip(self):
+        levels = [(256, np.array([[-5, 7], [0, 1], [-127, 127]], dtype=np.int8))]
+        sample_rate, unpacked = unpack_peaks(pack_peaks(8000, levels))
+        self.assertEqual(sample_rate, 8000)
+        self.assertEqual(unpacked[0][0], 256)
+        self.assertTrue((unpacked[0][1] == levels[0][1]).all())
+
+    def test_rejects_non_wav(self):
+        with self.assertRaises(ValueError):
+            compute_peaks(BytesReader(b'not a wav at all'))
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='', MEDIA_PROCESSING_CALLBACK_TOKEN='callback-secret')
+class WaveformAssetTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(MEDIA_ROOT=self.media_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        user = User.objects.create_user(username='waveform', password='pass1234')
+        space = Space.objects.create(name='Drums', owner=user)
+        self.session = Session.objects.create(
+            user=user, space=space, title='Groove', processing_status=Session.STATUS_PROCESSING,
+        )
+        self.audio_key = default_storage.save(
+            f'processed/sessions/{self.session.id}/audio/take_analysis.wav',
+            ContentFile(_wav(np.tile([1000, -1000], 8000))),
+        )
+
+    def test_build_stores_peaks_asset(self):
+        SessionAsset.objects.create(
+            session=self.session, asset_type=SessionAsset.TYPE_AUDIO_ANALYSIS, object_key=self.audio_key,
+        )
+        asset = build_waveform_peaks(self.session)
+        self.assertEqual(asset.object_key, f'processed/sessions/{self.session.id}/waveform/peaks.bin')
+        self.assertEqual(asset.metadata_json['sample_rate'], 8000)
+        self.assertEqual(asset.metadata_json['levels'][0]['samples_per_peak'], 256)
+        with default_storage.open(asset.object_key, 'rb') as fh:
+            _, levels = unpack_peaks(fh.read())
+        self.assertEqual(len(levels[0][1]), asset.metadata_json['levels'][0]['count'])
+
+    def test_ready_callback_with_audio_queues_waveform_job(self):
+        res = self.client.post(
+            f'/api/sessions/{self.session.id}/processing-update/',
+            {
+                'status': 'ready',
+                'assets': [
+                    {'asset_type': 'proxy_mp4', 'object_key': 'processed/proxy.mp4', 'content_type': 'video/mp4'},
+                    {'asset_type': 'audio_analysis', 'object_key': self.audio_key, 'content_type': 'audio/wav'},
+                ],
+            },
+            format='json',
+            HTTP_X_PROCESSING_TOKEN='callback-secret',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        kinds = set(MediaJob.objects.filter(session=self.session).values_list('kind', flat=True))
+        self.assertEqual(kinds, {
+            MediaJob.KIND_KEYFRAME_INDEX, MediaJob.KIND_WAVEFORM_PEAKS, MediaJob.KIND_CHAPTER_SUGGESTIONS,
+        })
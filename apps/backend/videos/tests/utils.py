@@ -0,0 +1,19 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+
+class TemporaryMediaRootMixin:
+    """Point MEDIA_ROOT at a throwaway directory so uploads never land in the source tree."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self._media_root_override = override_settings(MEDIA_ROOT=self.media_root)
+        self._media_root_override.enable()
+
+    def tearDown(self):
+        self._media_root_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().tearDown()
@@ -0,0 +1,97 @@
+import logging
+import uuid
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+from practica.metrics import record_upload
+
+from .services.storage_writers import open_object_writer
+
+logger = logging.getLogger(__name__)
+
+# Multipart form field -> storage prefix (the model field's upload_to).
+STREAMED_FIELDS = {
+    'video_file': 'sessions/',
+    'video_reply': 'comment_videos/',
+}
+
+
+class StoredUploadedFile(UploadedFile):
+    """An upload that is already in storage under `storage_key`; assign the key, not the file."""
+
+    def __init__(self, storage_key, name, size, content_type, fingerprint):
+        super().__init__(file=None, name=name, content_type=content_type, size=size)
+        self.storage_key = storage_key
+        self.fingerprint = fingerprint
+
+    def open(self, mode=None):
+        raise ValueError('Streamed uploads are read from storage, not from the request')
+
+
+class StreamingStorageUploadHandler(FileUploadHandler):
+    """
+    Write video fields straight to the storage backend (S3 multipart or the
+    local media directory) as the request body arrives, fingerprinting on the
+    way. Replaces the temp-file spool plus FileField copy. Other file fields
+    fall through to the next handler.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.writer = None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.writer = None
+        prefix = STREAMED_FIELDS.get(field_name)
+        if prefix is None or not str(content_type or '').startswith('video/'):
+            return
+        safe_name = str(file_name or 'video').replace('\\', '/').split('/')[-1] or 'video'
+        try:
+            self.writer = open_object_writer(f'{prefix}{uuid.uuid4().hex}-{safe_name}', content_type)
+        except (OSError, BotoCoreError, ClientError):
+            logger.exception('Could not open storage for streamed upload %s', field_name)
+            raise StopUpload(connection_reset=True)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.writer is None:
+            return raw_data
+        if start + len(raw_data) > int(getattr(settings, 'UPLOAD_MAX_BYTES', 2147483648)):
+            self._abort()
+            raise StopUpload(connection_reset=True)
+        try:
+            self.writer.write(raw_data)
+        except (OSError, BotoCoreError, ClientError):
+            logger.exception('Streamed upload write failed key=%s', self.writer.key)
+            self._abort()
+            raise StopUpload(connection_reset=True)
+        return None
+
+    def file_complete(self, file_size):
+        if self.writer is None:
+            return None
+        writer, self.writer = self.writer, None
+        try:
+            fingerprint = writer.close()
+        except (OSError, BotoCoreError, ClientError):
+            logger.exception('Could not finalize streamed upload key=%s', writer.key)
+            self._abort(writer)
+            raise StopUpload(connection_reset=True)
+        record_upload('streamed', file_size)
+        return StoredUploadedFile(writer.key, self.file_name, file_size, self.content_type, fingerprint)
+
+    def upload_interrupted(self):
+        self._abort()
+
+    def _abort(self, writer=None):
+        writer = writer or self.writer
+        self.writer = None
+        if writer is None:
+            return
+        try:
+            writer.abort()
+        except (OSError, BotoCoreError, ClientError):
+            logger.warning('Could not clean up interrupted upload key=%s', writer.key)
@@ -1,14 +1,18 @@
 import secrets
 import uuid
+from io import BytesIO
 import math
+import mimetypes
 import logging
+import os
 from datetime import timedelta
 from django.shortcuts import get_object_or_404
-from django.http import JsonResponse
-from django.db import connection, transaction
-from django.db.models import Q
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
 from django.utils import timezone
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.contrib.auth import authenticate
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
@@ -17,24 +21,50 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
-import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 
+from practica import metrics as prometheus
+from practica import profiling
+
 from .models import (
     Exercise, Session, Chapter, Comment, InviteCode, SessionLastSeen,
-    Tag, Space, SpaceMember, MultipartSessionUpload, ExerciseReferenceClip, SessionAsset,
+    Tag, Space, SpaceMember, MultipartSessionUpload, MultipartCommentUpload,
+    ExerciseReferenceClip, SessionAsset, CommentAsset, ResumableSessionUpload, MediaJob,
 )
 from .serializers import (
     UserSerializer, RegisterSerializer, SpaceSerializer,
     ExerciseSerializer, SessionSerializer, SessionListSerializer,
     ChapterSerializer, ProgressChapterSerializer, TagSerializer,
-    ExerciseReferenceClipSerializer,
+    ExerciseReferenceClipSerializer, CommentSerializer,
 )
-from .services.media_pipeline import enqueue_session_processing, apply_processing_update
-
-logger = logging.getLogger(__name__)
+from .services import health
+from .services.deletion import delete_comments, delete_sessions, delete_space
+from .services.hls import (
+    PLAYLIST_CONTENT_TYPE, manifest_token_valid, resolve_manifest_key, signed_playlist,
+)
+from .services.jobs import (
+    RATE_LIMITED_KINDS, dispatch_media_jobs, enqueue_comment_job, enqueue_keyframe_jobs, enqueue_session_job,
+    enqueue_waveform_jobs, enqueue_chapter_suggestion_jobs,
+)
+from .services.keyframes import snap_chapters
+from .services.local_media import (
+    RangeFile, clean_key, local_media_enabled, media_token_valid, parse_range, session_for_key,
+)
+from .services.media_pipeline import (
+    media_pipeline_enabled, apply_processing_updates,
+    apply_comment_processing_update,
+    multipart_fingerprint, composite_etag_matches, find_reusable_session, reuse_processed_media,
+)
+from .services.probe import probe_media
+from .services.resumable_uploads import (
+    OffsetMismatch, UploadBusy, append_chunk, discard_partial, finalize_upload,
+)
+from .services.signed_urls import signed_urls
+from .services.space_export import SpaceExport, export_filename
+from .services.storage_cleanup import _s3_client
+from .upload_handlers import StoredUploadedFile, StreamingStorageUploadHandler
 
 logger = logging.getLogger(__name__)
 
@@ -68,13 +98,6 @@ def _direct_uploads_enabled():
     return bool(getattr(settings, 'AWS_STORAGE_BUCKET_NAME', ''))
 
 
-def _s3_client():
-    return boto3.client(
-        's3',
-        region_name=getattr(settings, 'AWS_S3_REGION_NAME', None),
-    )
-
-
 def _recommended_part_size(size_bytes):
     min_part_size = 5 * 1024 * 1024
     max_parts = 10000
@@ -83,9 +106,9 @@ def _recommended_part_size(size_bytes):
     return part_size_mb * 1024 * 1024
 
 
-def _sanitize_filename(name):
-    safe = (name or 'session-video.mp4').strip().replace('\\', '/').split('/')[-1]
-    return safe or 'session-video.mp4'
+def _sanitize_filename(name, default='session-video.mp4'):
+    safe = (name or default).strip().replace('\\', '/').split('/')[-1]
+    return safe or default
 
 
 def _list_uploaded_parts(upload, client=None):
@@ -116,6 +139,153 @@ def _list_uploaded_parts(upload, client=None):
     return parts
 
 
+def _expire_if_stale(upload):
+    """Mark an open multipart upload expired once its window has passed."""
+    if upload.status == upload.STATUS_INITIATED and upload.expires_at < timezone.now():
+        upload.status = upload.STATUS_EXPIRED
+        upload.save(update_fields=['status'])
+        return True
+    return False
+
+
+def _parse_completed_parts(raw_parts):
+    """Validate a client part list. Returns (parts, error) with parts sorted for S3."""
+    if not isinstance(raw_parts, list) or not raw_parts:
+        return None, 'Parts are required'
+    parts = []
+    for part in raw_parts:
+        if not isinstance(part, dict):
+            return None, 'Invalid part payload'
+        try:
+            part_number = int(part.get('part_number'))
+        except (TypeError, ValueError):
+            return None, 'Invalid part number'
+        etag = str(part.get('etag', '')).strip()
+        if part_number <= 0 or not etag:
+            return None, 'Each part needs part_number and etag'
+        parts.append({'PartNumber': part_number, 'ETag': etag})
+    return sorted(parts, key=lambda p: p['PartNumber']), ''
+
+
+def _multipart_status_response(upload):
+    _expire_if_stale(upload)
+
+    part_size = _recommended_part_size(upload.size_bytes)
+    total_parts = math.ceil(upload.size_bytes / part_size)
+    uploaded_parts = []
+
+    if upload.status == upload.STATUS_INITIATED:
+        try:
+            uploaded_parts = _list_uploaded_parts(upload)
+        except ClientError as exc:
+            code = str(exc.response.get('Error', {}).get('Code', ''))
+            if code == 'NoSuchUpload':
+                upload.status = upload.STATUS_EXPIRED
+                upload.save(update_fields=['status'])
+                return Response({'error': 'Upload session no longer exists'}, status=status.HTTP_410_GONE)
+            return Response({'error': 'Could not fetch multipart upload status'}, status=status.HTTP_502_BAD_GATEWAY)
+        except BotoCoreError:
+            return Response({'error': 'Could not fetch multipart upload status'}, status=status.HTTP_502_BAD_GATEWAY)
+
+    return Response({
+        'multipart_upload_id': upload.id,
+        'status': upload.status,
+        'expires_at': upload.expires_at,
+        'size_bytes': upload.size_bytes,
+        'part_size': part_size,
+        'total_parts': total_parts,
+        'uploaded_parts': uploaded_parts,
+    })
+
+
+def _sign_part_response(upload, part_number):
+    if upload.status != upload.STATUS_INITIATED:
+        return Response({'error': 'Upload is not open'}, status=status.HTTP_400_BAD_REQUEST)
+    if _expire_if_stale(upload):
+        return Response({'error': 'Upload has expired'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        signed_url = _s3_client().generate_presigned_url(
+            ClientMethod='upload_part',
+            Params={
+                'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+                'Key': upload.s3_key,
+                'UploadId': upload.s3_upload_id,
+                'PartNumber': part_number,
+            },
+            ExpiresIn=3600,
+            HttpMethod='PUT',
+        )
+    except (BotoCoreError, ClientError):
+        return Response({'error': 'Could not sign upload part'}, status=status.HTTP_502_BAD_GATEWAY)
+
+    return Response({'signed_url': signed_url})
+
+
+def _abort_multipart_response(upload):
+    if upload.status != upload.STATUS_INITIATED:
+        return Response({'status': upload.status})
+
+    try:
+        _s3_client().abort_multipart_upload(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=upload.s3_key,
+            UploadId=upload.s3_upload_id,
+        )
+    except (BotoCoreError, ClientError):
+        # Treat as best effort; upload can still be marked aborted locally.
+        pass
+
+    upload.status = upload.STATUS_ABORTED
+    upload.save(update_fields=['status'])
+    return Response({'status': 'aborted'})
+
+
+def _parse_upload_size(raw_size):
+    """Returns (size_bytes, error) for a client-declared upload size."""
+    try:
+        size_bytes = int(raw_size or 0)
+    except (TypeError, ValueError):
+        return None, 'Invalid file size'
+    if size_bytes <= 0:
+        return None, 'Invalid file size'
+    max_bytes = int(getattr(settings, 'UPLOAD_MAX_BYTES', 2147483648))
+    if size_bytes > max_bytes:
+        return None, 'File exceeds max upload size (2GB)'
+    return size_bytes, ''
+
+
+def _resumable_response(upload, status_code=status.HTTP_200_OK, data=None):
+    """Upload state in the body and as tus-style Upload-Offset/Upload-Length headers."""
+    res = Response(data if data is not None else {
+        'resumable_upload_id': upload.id,
+        'status': upload.status,
+        'offset': upload.offset,
+        'size_bytes': upload.size_bytes,
+        'expires_at': upload.expires_at,
+    }, status=status_code)
+    res['Upload-Offset'] = str(upload.offset)
+    res['Upload-Length'] = str(upload.size_bytes)
+    res['Cache-Control'] = 'no-store'
+    return res
+
+
+def _parse_comment_timestamp(raw_ts):
+    if raw_ts is not None and str(raw_ts).strip():
+        try:
+            return max(0, int(raw_ts))
+        except (ValueError, TypeError):
+            pass
+    return None
+
+
+def _delete_uploaded_object(key, client=None):
+    try:
+        (client or _s3_client()).delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+    except (BotoCoreError, ClientError):
+        logger.warning('Could not delete duplicate upload key=%s', key)
+
+
 def _parse_tag_names(raw_tags):
     if isinstance(raw_tags, str):
         return [t.strip() for t in raw_tags.split(',') if t.strip()]
@@ -159,34 +329,103 @@ def _can_modify_session(user, session):
     return can_edit_session(user, session)
 
 
+def _apply_media_probe(session):
+    """
+    Record the upload's container details and server-measured duration.
+    Returns False (and fails the session) when the file has no playable video.
+    """
+    info, error = probe_media(session.video_file.name)
+    if error:
+        session.processing_status = Session.STATUS_FAILED
+        session.processing_error = f'Unsupported video: {error}'
+        session.save(update_fields=['processing_status', 'processing_error', 'updated_at'])
+        return False
+    if info:
+        session.media_info = info
+        if info.get('duration_seconds'):
+            session.duration_seconds = int(round(info['duration_seconds']))
+        session.save(update_fields=['media_info', 'duration_seconds', 'updated_at'])
+    return True
+
+
 def _start_processing_pipeline(session):
     session.processing_status = Session.STATUS_PROCESSING
     session.processing_error = ''
     session.save(update_fields=['processing_status', 'processing_error', 'updated_at'])
 
-    queued, error, _job_id = enqueue_session_processing(session)
-    if queued:
+    if media_pipeline_enabled():
+        # Queued so bursts of uploads respect MediaConvert's rate limit; submit now if there is capacity.
+        enqueue_session_job(session)
+        _dispatch_media_jobs_now()
         return
 
     # Local/dev fallback: no MediaConvert configured. Keep UX usable.
-    if 'not configured' in error.lower():
-        SessionAsset.objects.get_or_create(
-            session=session,
-            asset_type=SessionAsset.TYPE_PROXY_MP4,
-            defaults={
-                'object_key': session.video_file.name,
-                'content_type': 'video/mp4',
-                'metadata_json': {'source': 'original'},
-            },
-        )
-        session.processing_status = Session.STATUS_READY
-        session.processing_error = ''
-    else:
-        session.processing_status = Session.STATUS_FAILED
-        session.processing_error = (error or 'Failed to enqueue media processing')[:2000]
+    SessionAsset.objects.get_or_create(
+        session=session,
+        asset_type=SessionAsset.TYPE_PROXY_MP4,
+        defaults={
+            'object_key': session.video_file.name,
+            'content_type': 'video/mp4',
+            'metadata_json': {'source': 'original'},
+        },
+    )
+    session.processing_status = Session.STATUS_READY
+    session.processing_error = ''
     session.save(update_fields=['processing_status', 'processing_error', 'updated_at'])
 
 
+def _start_comment_processing(comment):
+    comment.processing_status = Session.STATUS_PROCESSING
+    comment.processing_error = ''
+    comment.save(update_fields=['processing_status', 'processing_error'])
+
+    if media_pipeline_enabled():
+        enqueue_comment_job(comment)
+        _dispatch_media_jobs_now()
+        return
+
+    # Local/dev fallback: serve the original reply video as its own proxy.
+    CommentAsset.objects.get_or_create(
+        comment=comment,
+        asset_type=CommentAsset.TYPE_PROXY_MP4,
+        defaults={
+            'object_key': comment.video_reply.name,
+            'content_type': 'video/mp4',
+            'metadata_json': {'source': 'original'},
+        },
+    )
+    comment.processing_status = Session.STATUS_READY
+    comment.processing_error = ''
+    comment.save(update_fields=['processing_status', 'processing_error'])
+
+
+def _dispatch_media_jobs_now():
+    try:
+        dispatch_media_jobs(
+            limit=int(getattr(settings, 'MEDIA_JOB_INLINE_DISPATCH_LIMIT', 2)),
+            kinds=RATE_LIMITED_KINDS,
+        )
+    except Exception:
+        # The run_media_jobs worker picks up anything left queued.
+        logger.exception('Inline media job dispatch failed')
+
+
+def _queue_derived_assets(sessions):
+    """Sessions that just became ready get keyframe, waveform and chapter analysis from the job worker."""
+    ready = [session for session in sessions if session.processing_status == Session.STATUS_READY]
+    if not ready:
+        return
+    enqueue_keyframe_jobs(ready)
+    with_audio = set(
+        SessionAsset.objects.filter(session__in=ready, asset_type=SessionAsset.TYPE_AUDIO_ANALYSIS)
+        .values_list('session_id', flat=True)
+    )
+    if with_audio:
+        audio_sessions = [session for session in ready if session.id in with_audio]
+        enqueue_waveform_jobs(audio_sessions)
+        enqueue_chapter_suggestion_jobs(audio_sessions)
+
+
 def _processing_callback_authorized(request):
     shared_token = (getattr(settings, 'MEDIA_PROCESSING_CALLBACK_TOKEN', '') or '').strip()
     if shared_token:
@@ -269,7 +508,7 @@ def client_error_view(request):
 @permission_classes([IsAuthenticated])
 def tag_list(request):
     q = request.query_params.get('q', '').strip()
-    tags = Tag.objects.all()
+    tags = Tag.objects.annotate(num_sessions=Count('sessions')).order_by('name')
     if q:
         tags = tags.filter(name__icontains=q)
     return Response(TagSerializer(tags[:20], many=True).data)
@@ -288,9 +527,12 @@ class SpaceViewSet(viewsets.ModelViewSet):
         owned = Space.objects.filter(owner=user)
         following_ids = SpaceMember.objects.filter(user=user).values_list('space_id', flat=True)
         following = Space.objects.filter(id__in=following_ids)
-        return (owned | following).distinct().select_related('main_session').prefetch_related(
-            'members', 'members__user', 'members__user__profile'
-        )
+        # Members join their user/profile in the prefetch itself: a busy space
+        # has hundreds of members, too many ids for a follow-up IN lookup.
+        members = Prefetch('members', queryset=SpaceMember.objects.select_related('user', 'user__profile'))
+        return (owned | following).distinct().select_related('main_session').prefetch_related(members).annotate(
+            num_sessions=Count('sessions', distinct=True)
+        ).order_by('name')
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
@@ -310,7 +552,7 @@ class SpaceViewSet(viewsets.ModelViewSet):
 
     def perform_destroy(self, instance):
         self._ensure_space_owner(instance)
-        instance.delete()
+        delete_space(instance)
 
     @action(detail=True, methods=['post'])
     def invite(self, request, pk=None):
@@ -352,6 +594,17 @@ class SpaceViewSet(viewsets.ModelViewSet):
         space.save(update_fields=['main_session'])
         return Response(SpaceSerializer(space, context={'request': request}).data)
 
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """Stream a ZIP of the space: metadata JSON plus original videos and reply clips."""
+        space = self.get_object()
+        if space.owner_id != request.user.id:
+            return Response({'error': 'Only the space owner can export'}, status=status.HTTP_403_FORBIDDEN)
+        response = StreamingHttpResponse(SpaceExport(space), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(space)}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
 
 @csrf_exempt
 @api_view(['POST'])
@@ -512,8 +765,8 @@ class SessionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         qs = _visible_sessions_qs(self.request.user).prefetch_related(
             'chapters', 'chapters__exercise',
-            'comments', 'comments__user', 'comments__user__profile',
-            'last_seen_by', 'tags', 'assets',
+            'comments', 'comments__user', 'comments__user__profile', 'comments__assets',
+            'last_seen_by', 'tags', 'assets', 'chapter_suggestions',
         ).select_related('user', 'user__profile', 'space', 'space__main_session')
 
         space_id = self.request.query_params.get('space')
@@ -536,12 +789,41 @@ class SessionViewSet(viewsets.ModelViewSet):
             return SessionListSerializer
         return SessionSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        session = self.get_object()
+        serializer = self.get_serializer(session)
+        # The detail payload carries every asset and comment reply; sign them all in one cache round trip.
+        serializer.context['signed_urls'] = signed_urls(serializer.media_keys(session))
+        return Response(serializer.data)
+
+    def initialize_request(self, request, *args, **kwargs):
+        drf_request = super().initialize_request(request, *args, **kwargs)
+        if self.action in ('create', 'add_comment'):
+            # Must be in place before anything (auth's CSRF check included) parses the body.
+            request.upload_handlers = [StreamingStorageUploadHandler(request), *request.upload_handlers]
+        return drf_request
+
     def perform_create(self, serializer):
         space_id = self.request.data.get('space')
         space = _resolve_space_for_create(self.request.user, space_id)
-        session = serializer.save(user=self.request.user, space=space)
+        video = serializer.validated_data.get('video_file')
+        if not isinstance(video, StoredUploadedFile):
+            session = serializer.save(user=self.request.user, space=space)
+            _attach_tags_to_session(session, self.request.data.get('tags', ''))
+            _start_processing_pipeline(session)
+            return
+
+        session = serializer.save(
+            user=self.request.user, space=space,
+            video_file=video.storage_key, content_fingerprint=video.fingerprint,
+        )
         _attach_tags_to_session(session, self.request.data.get('tags', ''))
-        _start_processing_pipeline(session)
+        source = find_reusable_session(video.fingerprint, exclude_id=session.id)
+        if source:
+            reuse_processed_media(session, source)
+            default_storage.delete(video.storage_key)
+        elif _apply_media_probe(session):
+            _start_processing_pipeline(session)
 
     def perform_update(self, serializer):
         if not can_edit_session(self.request.user, serializer.instance):
@@ -561,7 +843,7 @@ class SessionViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         if not can_edit_session(self.request.user, instance):
             raise PermissionDenied("You can only delete your own sessions.")
-        instance.delete()
+        delete_sessions([instance.pk])
 
     @action(detail=False, methods=['post'], url_path='multipart/initiate')
     def multipart_initiate(self, request):
@@ -572,16 +854,9 @@ class SessionViewSet(viewsets.ModelViewSet):
         if not title:
             return Response({'error': 'Title is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            size_bytes = int(request.data.get('size_bytes', 0))
-        except (TypeError, ValueError):
-            return Response({'error': 'Invalid file size'}, status=status.HTTP_400_BAD_REQUEST)
-        if size_bytes <= 0:
-            return Response({'error': 'Invalid file size'}, status=status.HTTP_400_BAD_REQUEST)
-
-        max_bytes = int(getattr(settings, 'UPLOAD_MAX_BYTES', 2147483648))
-        if size_bytes > max_bytes:
-            return Response({'error': 'File exceeds max upload size (2GB)'}, status=status.HTTP_400_BAD_REQUEST)
+        size_bytes, size_error = _parse_upload_size(request.data.get('size_bytes', 0))
+        if size_error:
+            return Response({'error': size_error}, status=status.HTTP_400_BAD_REQUEST)
 
         content_type = str(request.data.get('content_type', '')).strip().lower()
         if content_type and not content_type.startswith('video/'):
@@ -606,6 +881,27 @@ class SessionViewSet(viewsets.ModelViewSet):
         tags_csv = ','.join(_parse_tag_names(request.data.get('tags', [])))
         expires_at = timezone.now() + timedelta(hours=24)
 
+        # Same user re-posting a recording they already uploaded: skip the upload entirely.
+        client_fingerprint = str(request.data.get('content_fingerprint', '')).strip()[:128]
+        if client_fingerprint and not client_fingerprint.startswith(f"{size_bytes}:"):
+            client_fingerprint = ''
+        source = find_reusable_session(client_fingerprint, user=request.user)
+        if source:
+            session = Session.objects.create(
+                user=request.user,
+                space=space,
+                title=title,
+                description=str(request.data.get('description', '')).strip(),
+                video_file=source.video_file.name,
+                duration_seconds=duration_seconds,
+            )
+            _attach_tags_to_session(session, tags_csv)
+            reuse_processed_media(session, source)
+            return Response({
+                'deduplicated': True,
+                'session': SessionSerializer(session, context={'request': request}).data,
+            }, status=status.HTTP_201_CREATED)
+
         try:
             create_kwargs = {
                 'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
@@ -630,6 +926,7 @@ class SessionViewSet(viewsets.ModelViewSet):
             size_bytes=size_bytes,
             s3_key=key,
             s3_upload_id=resp['UploadId'],
+            client_fingerprint=client_fingerprint,
             expires_at=expires_at,
         )
 
@@ -651,36 +948,7 @@ class SessionViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Invalid multipart upload'}, status=status.HTTP_400_BAD_REQUEST)
 
         upload = get_object_or_404(MultipartSessionUpload, pk=upload_id, user=request.user)
-        if upload.status == MultipartSessionUpload.STATUS_INITIATED and upload.expires_at < timezone.now():
-            upload.status = MultipartSessionUpload.STATUS_EXPIRED
-            upload.save(update_fields=['status'])
-
-        part_size = _recommended_part_size(upload.size_bytes)
-        total_parts = math.ceil(upload.size_bytes / part_size)
-        uploaded_parts = []
-
-        if upload.status == MultipartSessionUpload.STATUS_INITIATED:
-            try:
-                uploaded_parts = _list_uploaded_parts(upload)
-            except ClientError as exc:
-                code = str(exc.response.get('Error', {}).get('Code', ''))
-                if code == 'NoSuchUpload':
-                    upload.status = MultipartSessionUpload.STATUS_EXPIRED
-                    upload.save(update_fields=['status'])
-                    return Response({'error': 'Upload session no longer exists'}, status=status.HTTP_410_GONE)
-                return Response({'error': 'Could not fetch multipart upload status'}, status=status.HTTP_502_BAD_GATEWAY)
-            except BotoCoreError:
-                return Response({'error': 'Could not fetch multipart upload status'}, status=status.HTTP_502_BAD_GATEWAY)
-
-        return Response({
-            'multipart_upload_id': upload.id,
-            'status': upload.status,
-            'expires_at': upload.expires_at,
-            'size_bytes': upload.size_bytes,
-            'part_size': part_size,
-            'total_parts': total_parts,
-            'uploaded_parts': uploaded_parts,
-        })
+        return _multipart_status_response(upload)
 
     @action(detail=False, methods=['post'], url_path='multipart/sign-part')
     def multipart_sign_part(self, request):
@@ -696,29 +964,7 @@ class SessionViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Part number must be greater than 0'}, status=status.HTTP_400_BAD_REQUEST)
 
         upload = get_object_or_404(MultipartSessionUpload, pk=upload_id, user=request.user)
-        if upload.status != MultipartSessionUpload.STATUS_INITIATED:
-            return Response({'error': 'Upload is not open'}, status=status.HTTP_400_BAD_REQUEST)
-        if upload.expires_at < timezone.now():
-            upload.status = MultipartSessionUpload.STATUS_EXPIRED
-            upload.save(update_fields=['status'])
-            return Response({'error': 'Upload has expired'}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            signed_url = _s3_client().generate_presigned_url(
-                ClientMethod='upload_part',
-                Params={
-                    'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
-                    'Key': upload.s3_key,
-                    'UploadId': upload.s3_upload_id,
-                    'PartNumber': part_number,
-                },
-                ExpiresIn=3600,
-                HttpMethod='PUT',
-            )
-        except (BotoCoreError, ClientError):
-            return Response({'error': 'Could not sign upload part'}, status=status.HTTP_502_BAD_GATEWAY)
-
-        return Response({'signed_url': signed_url})
+        return _sign_part_response(upload, part_number)
 
     @action(detail=False, methods=['post'], url_path='multipart/complete')
     def multipart_complete(self, request):
@@ -730,24 +976,9 @@ class SessionViewSet(viewsets.ModelViewSet):
         except (TypeError, ValueError):
             return Response({'error': 'Invalid multipart upload'}, status=status.HTTP_400_BAD_REQUEST)
 
-        raw_parts = request.data.get('parts', [])
-        if not isinstance(raw_parts, list) or not raw_parts:
-            return Response({'error': 'Parts are required'}, status=status.HTTP_400_BAD_REQUEST)
-
-        parts = []
-        for part in raw_parts:
-            if not isinstance(part, dict):
-                return Response({'error': 'Invalid part payload'}, status=status.HTTP_400_BAD_REQUEST)
-            try:
-                part_number = int(part.get('part_number'))
-            except (TypeError, ValueError):
-                return Response({'error': 'Invalid part number'}, status=status.HTTP_400_BAD_REQUEST)
-            etag = str(part.get('etag', '')).strip()
-            if part_number <= 0 or not etag:
-                return Response({'error': 'Each part needs part_number and etag'}, status=status.HTTP_400_BAD_REQUEST)
-            parts.append({'PartNumber': part_number, 'ETag': etag})
-
-        parts = sorted(parts, key=lambda p: p['PartNumber'])
+        parts, parts_error = _parse_completed_parts(request.data.get('parts', []))
+        if parts_error:
+            return Response({'error': parts_error}, status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
             upload = get_object_or_404(
@@ -757,13 +988,11 @@ class SessionViewSet(viewsets.ModelViewSet):
             )
             if upload.status != MultipartSessionUpload.STATUS_INITIATED:
                 return Response({'error': 'Upload is not open'}, status=status.HTTP_400_BAD_REQUEST)
-            if upload.expires_at < timezone.now():
-                upload.status = MultipartSessionUpload.STATUS_EXPIRED
-                upload.save(update_fields=['status'])
+            if _expire_if_stale(upload):
                 return Response({'error': 'Upload has expired'}, status=status.HTTP_400_BAD_REQUEST)
 
             try:
-                _s3_client().complete_multipart_upload(
+                completed = _s3_client().complete_multipart_upload(
                     Bucket=settings.AWS_STORAGE_BUCKET_NAME,
                     Key=upload.s3_key,
                     UploadId=upload.s3_upload_id,
@@ -772,6 +1001,14 @@ class SessionViewSet(viewsets.ModelViewSet):
             except (BotoCoreError, ClientError):
                 return Response({'error': 'Could not finalize multipart upload'}, status=status.HTTP_502_BAD_GATEWAY)
 
+            # S3 validated every part ETag on completion, so this fingerprint is server-verified.
+            fingerprint = multipart_fingerprint(upload.size_bytes, parts)
+            if not composite_etag_matches(fingerprint, (completed or {}).get('ETag')):
+                logger.warning('Composite ETag mismatch for multipart_upload_id=%s', upload.id)
+                fingerprint = ''
+            if upload.client_fingerprint and upload.client_fingerprint != fingerprint:
+                logger.info('Client fingerprint mismatch for multipart_upload_id=%s', upload.id)
+
             if upload.space_id and not can_post_to_space(request.user, upload.space):
                 return Response({'error': 'You can only post to spaces you belong to.'}, status=status.HTTP_403_FORBIDDEN)
 
@@ -782,15 +1019,23 @@ class SessionViewSet(viewsets.ModelViewSet):
                 description=upload.description,
                 video_file=upload.s3_key,
                 duration_seconds=upload.duration_seconds,
+                content_fingerprint=fingerprint,
             )
             _attach_tags_to_session(session, upload.tags_csv)
 
             upload.status = MultipartSessionUpload.STATUS_COMPLETED
             upload.completed_at = timezone.now()
             upload.session = session
-            upload.save(update_fields=['status', 'completed_at', 'session'])
+            upload.content_fingerprint = fingerprint
+            upload.save(update_fields=['status', 'completed_at', 'session', 'content_fingerprint'])
+        prometheus.record_upload('multipart', upload.size_bytes)
 
-        _start_processing_pipeline(session)
+        source = find_reusable_session(fingerprint, exclude_id=session.id)
+        if source:
+            reuse_processed_media(session, source)
+            _delete_uploaded_object(upload.s3_key)
+        elif _apply_media_probe(session):
+            _start_processing_pipeline(session)
 
         serializer = SessionSerializer(session, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -806,22 +1051,302 @@ class SessionViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Invalid multipart upload'}, status=status.HTTP_400_BAD_REQUEST)
 
         upload = get_object_or_404(MultipartSessionUpload, pk=upload_id, user=request.user)
-        if upload.status != MultipartSessionUpload.STATUS_INITIATED:
-            return Response({'status': upload.status})
+        return _abort_multipart_response(upload)
+
+    # Without S3, large files go through resumable chunked uploads to local storage.
+
+    @action(detail=False, methods=['post'], url_path='resumable')
+    def resumable_create(self, request):
+        if _direct_uploads_enabled():
+            return Response({'error': 'Use multipart direct uploads'}, status=status.HTTP_400_BAD_REQUEST)
+
+        title = str(request.data.get('title', '')).strip()
+        if not title:
+            return Response({'error': 'Title is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        size_bytes, size_error = _parse_upload_size(request.data.get('size_bytes', 0))
+        if size_error:
+            return Response({'error': size_error}, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type = str(request.data.get('content_type', '')).strip().lower()
+        if content_type and not content_type.startswith('video/'):
+            return Response({'error': 'Only video files allowed'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            _s3_client().abort_multipart_upload(
+            duration_seconds = request.data.get('duration_seconds')
+            duration_seconds = int(duration_seconds) if str(duration_seconds).strip() else None
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid duration'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            space = _resolve_space_for_create(request.user, request.data.get('space'))
+        except PermissionDenied as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_403_FORBIDDEN)
+
+        filename = _sanitize_filename(request.data.get('filename'))
+        upload = ResumableSessionUpload.objects.create(
+            user=request.user,
+            space=space,
+            title=title,
+            description=str(request.data.get('description', '')).strip(),
+            tags_csv=','.join(_parse_tag_names(request.data.get('tags', []))),
+            duration_seconds=duration_seconds,
+            original_filename=filename,
+            content_type=content_type,
+            size_bytes=size_bytes,
+            storage_key=f"sessions/{request.user.id}/{uuid.uuid4().hex}-{filename}",
+            expires_at=timezone.now() + timedelta(hours=24),
+        )
+        res = _resumable_response(upload, status.HTTP_201_CREATED)
+        res['Location'] = f'/api/sessions/resumable/{upload.id}/'
+        return res
+
+    @action(detail=False, methods=['get', 'patch', 'delete'], url_path=r'resumable/(?P<upload_id>[0-9]+)')
+    def resumable_detail(self, request, upload_id=None):
+        upload = get_object_or_404(ResumableSessionUpload, pk=upload_id, user=request.user)
+        if _expire_if_stale(upload):
+            discard_partial(upload)
+
+        if request.method in ('GET', 'HEAD'):  # HEAD is how clients find the resume offset
+            return _resumable_response(upload)
+
+        if upload.status != ResumableSessionUpload.STATUS_INITIATED:
+            return Response({'error': f'Upload is {upload.status}'}, status=status.HTTP_410_GONE)
+
+        if request.method == 'DELETE':
+            upload.status = ResumableSessionUpload.STATUS_ABORTED
+            upload.save(update_fields=['status', 'updated_at'])
+            discard_partial(upload)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return Response({'error': 'Upload-Offset and Content-Length are required'}, status=status.HTTP_400_BAD_REQUEST)
+        max_chunk = int(getattr(settings, 'RESUMABLE_UPLOAD_MAX_CHUNK_BYTES', 64 * 1024 * 1024))
+        if length > max_chunk:
+            return Response({'error': f'Chunks are limited to {max_chunk} bytes'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            append_chunk(upload, offset, request.stream or BytesIO(), length)
+        except OffsetMismatch as exc:
+            upload.offset = exc.offset
+            return _resumable_response(upload, status.HTTP_409_CONFLICT)
+        except UploadBusy as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_423_LOCKED)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if upload.offset < upload.size_bytes:
+            return _resumable_response(upload)
+        return self._complete_resumable(request, upload)
+
+    def _complete_resumable(self, request, upload):
+        with transaction.atomic():
+            upload = ResumableSessionUpload.objects.select_for_update().get(pk=upload.pk)
+            if upload.status != ResumableSessionUpload.STATUS_INITIATED:
+                return Response({'error': f'Upload is {upload.status}'}, status=status.HTTP_410_GONE)
+            if upload.space_id and not can_post_to_space(request.user, upload.space):
+                return Response({'error': 'You can only post to spaces you belong to.'}, status=status.HTTP_403_FORBIDDEN)
+
+            session = Session.objects.create(
+                user=request.user,
+                space=upload.space,
+                title=upload.title,
+                description=upload.description,
+                video_file=finalize_upload(upload),
+                duration_seconds=upload.duration_seconds,
+            )
+            _attach_tags_to_session(session, upload.tags_csv)
+
+            upload.status = ResumableSessionUpload.STATUS_COMPLETED
+            upload.completed_at = timezone.now()
+            upload.session = session
+            upload.save(update_fields=['status', 'completed_at', 'session', 'updated_at'])
+        prometheus.record_upload('resumable', upload.size_bytes)
+
+        if _apply_media_probe(session):
+            _start_processing_pipeline(session)
+        serializer = SessionSerializer(session, context={'request': request})
+        return _resumable_response(upload, status.HTTP_201_CREATED, serializer.data)
+
+    # Comment reply videos go straight to S3 too; the comment is created on completion.
+
+    def _comment_upload_for(self, request, session):
+        try:
+            upload_id = int(request.data.get('multipart_upload_id'))
+        except (TypeError, ValueError):
+            return None
+        return get_object_or_404(MultipartCommentUpload, pk=upload_id, user=request.user, session=session)
+
+    @action(detail=True, methods=['post'], url_path='comment-upload/initiate')
+    def comment_upload_initiate(self, request, pk=None):
+        if not _direct_uploads_enabled():
+            return Response({'error': 'Direct uploads are not configured'}, status=status.HTTP_400_BAD_REQUEST)
+        session = self.get_object()
+        if not _can_view_session(request.user, session):
+            return Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
+
+        size_bytes, size_error = _parse_upload_size(request.data.get('size_bytes', 0))
+        if size_error:
+            return Response({'error': size_error}, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type = str(request.data.get('content_type', '')).strip().lower()
+        if not content_type.startswith('video/'):
+            return Response({'error': 'Only video files allowed'}, status=status.HTTP_400_BAD_REQUEST)
+
+        filename = _sanitize_filename(request.data.get('filename'), default='comment-reply.webm')
+        key = f"comment_videos/{request.user.id}/{uuid.uuid4().hex}-{filename}"
+        part_size = _recommended_part_size(size_bytes)
+
+        try:
+            resp = _s3_client().create_multipart_upload(
                 Bucket=settings.AWS_STORAGE_BUCKET_NAME,
-                Key=upload.s3_key,
-                UploadId=upload.s3_upload_id,
+                Key=key,
+                ContentType=content_type,
             )
         except (BotoCoreError, ClientError):
-            # Treat as best effort; upload can still be marked aborted locally.
-            pass
+            return Response({'error': 'Could not start multipart upload'}, status=status.HTTP_502_BAD_GATEWAY)
 
-        upload.status = MultipartSessionUpload.STATUS_ABORTED
-        upload.save(update_fields=['status'])
-        return Response({'status': 'aborted'})
+        upload = MultipartCommentUpload.objects.create(
+            user=request.user,
+            session=session,
+            text=str(request.data.get('text', '')).strip(),
+            timestamp_seconds=_parse_comment_timestamp(request.data.get('timestamp_seconds')),
+            original_filename=filename,
+            content_type=content_type,
+            size_bytes=size_bytes,
+            s3_key=key,
+            s3_upload_id=resp['UploadId'],
+            expires_at=timezone.now() + timedelta(hours=24),
+        )
+
+        return Response({
+            'multipart_upload_id': upload.id,
+            'part_size': part_size,
+            'total_parts': math.ceil(size_bytes / part_size),
+            'expires_at': upload.expires_at,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path='comment-upload/status')
+    def comment_upload_status(self, request, pk=None):
+        if not _direct_uploads_enabled():
+            return Response({'error': 'Direct uploads are not configured'}, status=status.HTTP_400_BAD_REQUEST)
+        upload = self._comment_upload_for(request, self.get_object())
+        if upload is None:
+            return Response({'error': 'Invalid multipart upload'}, status=status.HTTP_400_BAD_REQUEST)
+        return _multipart_status_response(upload)
+
+    @action(detail=True, methods=['post'], url_path='comment-upload/sign-part')
+    def comment_upload_sign_part(self, request, pk=None):
+        if not _direct_uploads_enabled():
+            return Response({'error': 'Direct uploads are not configured'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            part_number = int(request.data.get('part_number'))
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid multipart upload or part number'}, status=status.HTTP_400_BAD_REQUEST)
+        if part_number <= 0:
+            return Response({'error': 'Part number must be greater than 0'}, status=status.HTTP_400_BAD_REQUEST)
+        upload = self._comment_upload_for(request, self.get_object())
+        if upload is None:
+            return Response({'error': 'Invalid multipart upload or part number'}, status=status.HTTP_400_BAD_REQUEST)
+        return _sign_part_response(upload, part_number)
+
+    @action(detail=True, methods=['post'], url_path='comment-upload/complete')
+    def comment_upload_complete(self, request, pk=None):
+        if not _direct_uploads_enabled():
+            return Response({'error': 'Direct uploads are not configured'}, status=status.HTTP_400_BAD_REQUEST)
+        session = self.get_object()
+        if not _can_view_session(request.user, session):
+            return Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            upload_id = int(request.data.get('multipart_upload_id'))
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid multipart upload'}, status=status.HTTP_400_BAD_REQUEST)
+
+        parts, parts_error = _parse_completed_parts(request.data.get('parts', []))
+        if parts_error:
+            return Response({'error': parts_error}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            upload = get_object_or_404(
+                MultipartCommentUpload.objects.select_for_update(),
+                pk=upload_id,
+                user=request.user,
+                session=session,
+            )
+            if upload.status != MultipartCommentUpload.STATUS_INITIATED:
+                return Response({'error': 'Upload is not open'}, status=status.HTTP_400_BAD_REQUEST)
+            if _expire_if_stale(upload):
+                return Response({'error': 'Upload has expired'}, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                _s3_client().complete_multipart_upload(
+                    Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                    Key=upload.s3_key,
+                    UploadId=upload.s3_upload_id,
+                    MultipartUpload={'Parts': parts},
+                )
+            except (BotoCoreError, ClientError):
+                return Response({'error': 'Could not finalize multipart upload'}, status=status.HTTP_502_BAD_GATEWAY)
+
+            comment = Comment.objects.create(
+                session=session, user=request.user,
+                timestamp_seconds=upload.timestamp_seconds, text=upload.text,
+                video_reply=upload.s3_key, legacy_text_only=False,
+            )
+
+            upload.status = MultipartCommentUpload.STATUS_COMPLETED
+            upload.completed_at = timezone.now()
+            upload.comment = comment
+            upload.save(update_fields=['status', 'completed_at', 'comment'])
+        prometheus.record_upload('multipart', upload.size_bytes)
+
+        _start_comment_processing(comment)
+        session.refresh_from_db()
+        return Response(SessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path='comment-upload/abort')
+    def comment_upload_abort(self, request, pk=None):
+        if not _direct_uploads_enabled():
+            return Response({'error': 'Direct uploads are not configured'}, status=status.HTTP_400_BAD_REQUEST)
+        upload = self._comment_upload_for(request, self.get_object())
+        if upload is None:
+            return Response({'error': 'Invalid multipart upload'}, status=status.HTTP_400_BAD_REQUEST)
+        return _abort_multipart_response(upload)
+
+    @action(detail=False, methods=['post'], url_path='processing-update', permission_classes=[AllowAny])
+    def processing_update_batch(self, request):
+        """Apply many MediaConvert callbacks at once: {"updates": [{session_id, status, assets, event_id}, ...]}."""
+        if not _processing_callback_authorized(request):
+            return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+
+        updates = request.data.get('updates')
+        if not isinstance(updates, list) or not updates:
+            return Response({'error': 'updates must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        max_batch = int(getattr(settings, 'MEDIA_PROCESSING_MAX_BATCH', 500))
+        if len(updates) > max_batch:
+            return Response({'error': f'At most {max_batch} updates per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Bad items come back in 'rejected' instead of failing the batch: the sender
+        # retries whole batches, so one bad item would otherwise block the rest for good.
+        # Derived jobs commit with the callback events: a retry of a batch whose
+        # jobs failed to queue must not be swallowed as a duplicate.
+        try:
+            with transaction.atomic():
+                applied, duplicates, rejected = apply_processing_updates(updates)
+                _queue_derived_assets(applied)
+        except Exception:
+            logger.exception('Failed batched processing update count=%s', len(updates))
+            return Response({'error': 'Could not apply processing update'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            'applied': [{'id': session.id, 'processing_status': session.processing_status} for session in applied],
+            'duplicate_event_ids': duplicates,
+            'rejected': rejected,
+        })
 
     @action(detail=True, methods=['post'], url_path='processing-update', permission_classes=[AllowAny])
     def processing_update(self, request, pk=None):
@@ -836,20 +1361,77 @@ class SessionViewSet(viewsets.ModelViewSet):
             return Response({'error': 'assets must be a list'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            apply_processing_update(
-                session=session,
-                status=next_status,
-                error=processing_error,
-                assets=assets,
-            )
+            with transaction.atomic():
+                applied, _duplicates, rejected = apply_processing_updates([{
+                    'session_id': session.id,
+                    'status': next_status,
+                    'processing_error': processing_error,
+                    'assets': assets,
+                    'event_id': request.data.get('event_id', ''),
+                }])
+                if rejected:
+                    raise ValueError(rejected[0]['error'])
+                _queue_derived_assets(applied)
         except ValueError as exc:
             return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception:
             logger.exception('Failed processing update for session_id=%s', session.id)
             return Response({'error': 'Could not apply processing update'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        session.refresh_from_db()
         return Response(SessionSerializer(session, context={'request': request}).data)
 
+    @action(
+        detail=True, methods=['post'], permission_classes=[AllowAny],
+        url_path='comments/(?P<comment_id>[0-9]+)/processing-update',
+    )
+    def comment_processing_update(self, request, pk=None, comment_id=None):
+        if not _processing_callback_authorized(request):
+            return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+
+        comment = get_object_or_404(Comment, pk=comment_id, session_id=pk)
+        assets = request.data.get('assets', [])
+        if not isinstance(assets, list):
+            return Response({'error': 'assets must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            apply_comment_processing_update(
+                comment=comment,
+                status=str(request.data.get('status', '')).strip().lower(),
+                error=str(request.data.get('processing_error', '')).strip(),
+                assets=assets,
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            logger.exception('Failed processing update for comment_id=%s', comment.id)
+            return Response({'error': 'Could not apply processing update'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response(CommentSerializer(comment, context={'request': request}).data)
+
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny], url_path=r'hls/(?P<manifest_path>.+\.m3u8)')
+    def hls_manifest(self, request, pk=None, manifest_path=None):
+        """Serve an HLS playlist with segment URIs signed; segments themselves stream from S3."""
+        session = get_object_or_404(Session, pk=pk)
+        token = request.query_params.get('token', '')
+        if not manifest_token_valid(token, session.id) and not _can_view_session(request.user, session):
+            return Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
+
+        master = session.assets.filter(asset_type=SessionAsset.TYPE_HLS_MASTER).first()
+        object_key = resolve_manifest_key(master.object_key, manifest_path) if master else ''
+        if not object_key:
+            return Response({'error': 'Playlist not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            body, max_age = signed_playlist(object_key, session.id, master.object_key)
+        except (OSError, UnicodeDecodeError, BotoCoreError, ClientError):
+            logger.warning('Could not load HLS playlist key=%s', object_key)
+            return Response({'error': 'Playlist not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        response = HttpResponse(body, content_type=PLAYLIST_CONTENT_TYPE)
+        response['Cache-Control'] = f'private, max-age={max_age}'
+        return response
+
     @action(detail=True, methods=['post'])
     def set_tags(self, request, pk=None):
         session = self.get_object()
@@ -898,7 +1480,7 @@ class SessionViewSet(viewsets.ModelViewSet):
             'end_seconds': end, 'notes': request.data.get('notes', ''),
         })
         if serializer.is_valid():
-            serializer.save()
+            snap_chapters(session, [serializer.save()])
             session.refresh_from_db()
             return Response(SessionSerializer(session).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -935,6 +1517,8 @@ class SessionViewSet(viewsets.ModelViewSet):
                 chapter.end_seconds = None
 
         chapter.save()
+        if 'timestamp_seconds' in request.data:
+            snap_chapters(session, [chapter])
         session.refresh_from_db()
         return Response(SessionSerializer(session).data)
 
@@ -954,22 +1538,19 @@ class SessionViewSet(viewsets.ModelViewSet):
         if not _can_view_session(request.user, session):
             return Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
         text = str(request.data.get('text', '')).strip()
-        ts = request.data.get('timestamp_seconds')
-        timestamp = None
-        if ts is not None and str(ts).strip():
-            try:
-                timestamp = max(0, int(ts))
-            except (ValueError, TypeError):
-                pass
+        timestamp = _parse_comment_timestamp(request.data.get('timestamp_seconds'))
         video_file = request.FILES.get('video_reply')
         if not video_file:
             return Response({'error': 'Comment video is required'}, status=status.HTTP_400_BAD_REQUEST)
         if video_file and not video_file.content_type.startswith('video/'):
             return Response({'error': 'Only video files allowed'}, status=status.HTTP_400_BAD_REQUEST)
-        Comment.objects.create(
+        if isinstance(video_file, StoredUploadedFile):
+            video_file = video_file.storage_key
+        comment = Comment.objects.create(
             session=session, user=request.user,
             timestamp_seconds=timestamp, text=text, video_reply=video_file, legacy_text_only=False,
         )
+        _start_comment_processing(comment)
         session.refresh_from_db()
         return Response(SessionSerializer(session).data, status=status.HTTP_201_CREATED)
 
@@ -990,7 +1571,7 @@ class SessionViewSet(viewsets.ModelViewSet):
         comment = get_object_or_404(Comment, pk=comment_id, session=session)
         if request.user != comment.user and not request.user.is_staff:
             return Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
-        comment.delete()
+        delete_comments([comment.pk])
         session.refresh_from_db()
         return Response(SessionSerializer(session).data)
 
@@ -1082,22 +1663,155 @@ def coach_metrics_summary(request):
     return Response(response)
 
 
+# ── Request profiles (staff) ────────────────────────────────────────
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_list(request):
+    """Profiles captured with X-Profile: 1, newest first."""
+    return Response({'results': profiling.list_profiles()})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_detail(request, profile_id):
+    profile = profiling.load_profile(profile_id)
+    if profile is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(profile)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_download(request, profile_id):
+    """The raw pstats dump, for snakeviz or `python -m pstats`."""
+    path = profiling.profile_path(profile_id, 'prof')
+    if path is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.prof',
+                        content_type='application/octet-stream')
+
+
+# ── Local media ─────────────────────────────────────────────────────
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def media_file(request, object_key):
+    """
+    Serve a file from local storage to the uploader or the session's space.
+    With MEDIA_ACCEL_REDIRECT set, the front proxy streams the bytes (and
+    handles Range); otherwise ranges are answered here via sendfile.
+    """
+    key = clean_key(object_key)
+    if not key or not local_media_enabled():
+        return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    token = request.query_params.get('token', '')
+    if not media_token_valid(token, key):
+        session = session_for_key(key)
+        if session is None or not _can_view_session(request.user, session):
+            return Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
+
+    path = default_storage.path(key)
+    if not os.path.isfile(path):
+        return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+    content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+
+    accel = getattr(settings, 'MEDIA_ACCEL_REDIRECT', '')
+    if accel:
+        response = HttpResponse(content_type=content_type)
+        if accel == 'x-sendfile':
+            response['X-Sendfile'] = path
+        else:
+            response['X-Accel-Redirect'] = f"{settings.MEDIA_ACCEL_PREFIX.rstrip('/')}/{key}"
+        response['Cache-Control'] = 'private, max-age=3600'
+        return response
+
+    size = os.path.getsize(path)
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
+    start, end = byte_range or (0, size - 1)
+    length = max(0, end - start + 1)
+
+    response = FileResponse(RangeFile(open(path, 'rb'), start, length), content_type=content_type)
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+
 # ── Health check ────────────────────────────────────────────────────
 
+HEALTH_LABELS = {health.OK: 'healthy', health.DEGRADED: 'degraded', health.FAILED: 'unhealthy'}
+
+
+def health_live(request):
+    """Liveness: the worker answers. Touches no dependency, so restarts never cascade from an outage."""
+    return JsonResponse({'status': 'alive'})
+
+
+def health_ready(request):
+    """Readiness: database and storage answer (cached probes). Backlog or cache trouble stays 200."""
+    overall, checks = health.check(health.CRITICAL)
+    ready = overall != health.FAILED
+    return JsonResponse(
+        {'status': 'ready' if ready else 'unavailable', 'checks': _health_checks_for(request, checks)},
+        status=200 if ready else 503,
+    )
+
+
+def _health_checks_for(request, checks):
+    # Failure details can name the bucket or database host; they are logged, and shown to operators only.
+    return checks if _metrics_authorized(request) else health.redacted(checks)
+
+
 def health_check(request):
+    """Every probe with its latency; 503 only when a critical one fails."""
+    overall, checks = health.check()
     health_status = {
-        'status': 'healthy',
+        'status': HEALTH_LABELS[overall],
         'timestamp': timezone.now().isoformat(),
-        'services': {},
+        'services': _health_checks_for(request, checks),
         'version': '3.0.0',
         'environment': 'development' if settings.DEBUG else 'production',
     }
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-        health_status['services']['database'] = 'healthy'
-    except Exception as e:
-        health_status['services']['database'] = f'unhealthy: {e}'
-        health_status['status'] = 'unhealthy'
-    status_code = 200 if health_status['status'] == 'healthy' else 503
+    status_code = 503 if overall == health.FAILED else 200
     return JsonResponse(health_status, status=status_code)
+
+
+def _metrics_authorized(request):
+    token = (getattr(settings, 'METRICS_TOKEN', '') or '').strip()
+    if token:
+        provided = str(request.headers.get('Authorization', '')).removeprefix('Bearer ').strip()
+        if provided and secrets.compare_digest(provided, token):
+            return True
+    return bool(request.user.is_authenticated and request.user.is_staff)
+
+
+def _queue_gauges():
+    queued = dict(
+        MediaJob.objects.filter(status=MediaJob.STATUS_QUEUED)
+        .order_by().values('kind').annotate(total=Count('id')).values_list('kind', 'total')
+    )
+    processing = Session.objects.filter(processing_status=Session.STATUS_PROCESSING).count()
+    return [
+        ('practica_media_jobs_queued', 'Media jobs waiting to be dispatched, by kind.',
+         [({'kind': kind}, queued.get(kind, 0)) for kind, _ in MediaJob.KIND_CHOICES]),
+        ('practica_sessions_processing', 'Sessions still being transcoded.', [({}, processing)]),
+    ]
+
+
+def metrics_view(request):
+    """Prometheus scrape target: Bearer METRICS_TOKEN, or a staff session."""
+    if not _metrics_authorized(request):
+        return JsonResponse({'error': 'Not authorized'}, status=401)
+    body = prometheus.render(prometheus.registry.collect(), _queue_gauges())
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
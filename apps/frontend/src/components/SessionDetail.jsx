@@ -1,8 +1,13 @@
 import React, { useState, useRef, useEffect } from 'react'
 import VideoRecorder from './VideoRecorder'
 import TagInput from './TagInput'
+import WaveformScrubber from './WaveformScrubber'
 import { useToast } from './Toast'
-import { fmtTime, fmtDate, videoUrl, parseTimeInput, fmtDuration, preferredSessionVideoUrl } from '../utils'
+import {
+  fmtTime, fmtDate, parseTimeInput, fmtDuration, preferredSessionVideoUrl,
+  createCommentReply, uploadErrorMessage, commentVideoUrl, commentPosterUrl, chapterSeekSeconds,
+  sessionWaveformUrl,
+} from '../utils'
 import { useConfirm } from './ConfirmDialog'
 
 function SessionDetail({ session: initialSession, exercises, spaces = [], token, user, onBack, onSessionUpdate, onOpenCompare }) {
@@ -118,6 +123,15 @@ function SessionDetail({ session: initialSession, exercises, spaces = [], token,
     setShowAddChapter(true)
   }
 
+  const openSuggestedChapter = (suggestion) => {
+    if (videoRef.current) videoRef.current.pause()
+    setChapterTimestamp(Math.floor(suggestion.start_seconds))
+    setChapterEndTime(Math.ceil(suggestion.end_seconds))
+    setChapterExercise('')
+    setChapterNotes(suggestion.tempo_bpm ? `~${Math.round(suggestion.tempo_bpm)} BPM` : '')
+    setShowAddChapter(true)
+  }
+
   const handleExerciseInput = (value) => {
     setChapterExercise(value)
     setSuggestions(value.length > 0
@@ -204,20 +218,21 @@ function SessionDetail({ session: initialSession, exercises, spaces = [], token,
     if (!commentVideoFile) return toast.error('Attach a video reply before sending')
     setSubmittingComment(true)
     try {
-      const fd = new FormData()
-      fd.append('text', commentText.trim())
-      if (commentAtTimestamp) fd.append('timestamp_seconds', Math.floor(currentTime))
-      if (commentVideoFile) fd.append('video_reply', commentVideoFile)
-
-      const res = await fetch(`/api/sessions/${session.id}/add_comment/`, { method: 'POST', body: fd, headers: authHeaders })
+      const res = await createCommentReply({
+        token,
+        sessionId: session.id,
+        payload: {
+          text: commentText.trim(),
+          timestamp_seconds: commentAtTimestamp ? Math.floor(currentTime) : null,
+        },
+        videoFile: commentVideoFile,
+      })
       if (res.ok) {
-        const data = await res.json()
-        setSession(data); onSessionUpdate(data)
+        setSession(res.data); onSessionUpdate(res.data)
         resetCommentForm()
         toast.success('Comment posted')
       } else {
-        const err = await res.json()
-        toast.error(err.error || 'Failed to add comment')
+        toast.error(uploadErrorMessage(res) || 'Failed to add comment')
       }
     } catch { toast.error('Error adding comment') }
     finally { setSubmittingComment(false) }
@@ -293,6 +308,10 @@ function SessionDetail({ session: initialSession, exercises, spaces = [], token,
   }
 
   const chapters = session.chapters || []
+  // Analysis-suggested segments that no chapter starts near yet.
+  const chapterSuggestions = (session.chapter_suggestions || []).filter(
+    s => !chapters.some(c => Math.abs(c.timestamp_seconds - s.start_seconds) < 3)
+  )
   const comments = session.comments || []
   const activeChapter = [...chapters].reverse().find(c => currentTime >= c.timestamp_seconds)
   const canEditSession = typeof session.can_edit === 'boolean'
@@ -424,6 +443,12 @@ function SessionDetail({ session: initialSession, exercises, spaces = [], token,
         {recoveringPlayback && (
           <p className="mt-1 text-xs text-gray-500">Refreshing secure video link...</p>
         )}
+        <WaveformScrubber
+          src={sessionWaveformUrl(session)}
+          currentTime={currentTime}
+          duration={videoRef.current?.duration || session.duration_seconds || 0}
+          onSeek={seekTo}
+        />
         {chapters.length > 0 && videoRef.current?.duration > 0 && (
           <div className="mt-1 h-1 bg-gray-100 rounded-full relative overflow-hidden">
             {chapters.map(ch => {
@@ -433,7 +458,7 @@ function SessionDetail({ session: initialSession, exercises, spaces = [], token,
                 <button
                   key={ch.id}
                   type="button"
-                  onClick={() => seekTo(ch.timestamp_seconds)}
+                  onClick={() => seekTo(chapterSeekSeconds(ch))}
                   className="absolute top-0 h-full bg-gray-400 hover:bg-gray-600 cursor-pointer rounded-full transition-colors"
                   style={{ left: `${left}%`, width: `${Math.max(width, 1)}%` }}
                   title={ch.exercise_name || ch.title}
@@ -475,6 +500,19 @@ function SessionDetail({ session: initialSession, exercises, spaces = [], token,
             )}
           </div>
 
+          {canEditSession && !showAddChapter && chapterSuggestions.length > 0 && (
+            <div className="mb-3 flex flex-wrap items-center gap-1.5" aria-label="Suggested chapters">
+              <span className="text-xs text-gray-400">Suggested</span>
+              {chapterSuggestions.map(suggestion => (
+                <button key={suggestion.id} onClick={() => openSuggestedChapter(suggestion)}
+                  className="text-xs px-2 py-1 rounded-full border border-dashed border-gray-300 text-gray-500 hover:border-gray-500 hover:text-gray-900 transition-colors">
+                  {fmtTime(Math.floor(suggestion.start_seconds))}–{fmtTime(Math.ceil(suggestion.end_seconds))}
+                  {suggestion.tempo_bpm ? ` · ${Math.round(suggestion.tempo_bpm)} BPM` : ''}
+                </button>
+              ))}
+            </div>
+          )}
+
           {showAddChapter && canEditSession && (
             <div className="mb-4 p-4 bg-gray-50 rounded-xl space-y-3">
               {/* Time range */}
@@ -603,8 +641,8 @@ function SessionDetail({ session: initialSession, exercises, spaces = [], token,
                 <div key={chapter.id}
                   role="button"
                   tabIndex={0}
-                  onClick={() => seekTo(chapter.timestamp_seconds)}
-                  onKeyDown={(e) => onRowKeyDown(e, () => seekTo(chapter.timestamp_seconds))}
+                  onClick={() => seekTo(chapterSeekSeconds(chapter))}
+                  onKeyDown={(e) => onRowKeyDown(e, () => seekTo(chapterSeekSeconds(chapter)))}
                   aria-label={`Jump to chapter ${chapter.exercise_name || chapter.title || 'Untitled'} at ${fmtTime(chapter.timestamp_seconds)}`}
                   className={`flex items-center gap-3 p-3 rounded-xl cursor-pointer transition-all group ${isActive ? 'bg-gray-100' : 'hover:bg-gray-50'}`}>
                   <div className="flex flex-col items-center flex-shrink-0 w-12">
@@ -819,11 +857,12 @@ function SessionDetail({ session: initialSession, exercises, spaces = [], token,
                       <div className="mt-3 max-w-sm">
                         <div className="rounded-xl overflow-hidden bg-gray-950 border border-gray-800">
                           <video
-                            src={videoUrl(comment.video_reply)}
+                            src={commentVideoUrl(comment)}
+                            poster={commentPosterUrl(comment) || undefined}
                             controls
                             playsInline
                             className="w-full"
-                            preload="metadata"
+                            preload={commentPosterUrl(comment) ? 'none' : 'metadata'}
                             onError={() => recoverPlaybackUrls({ silent: true })}
                           />
                         </div>
@@ -0,0 +1,67 @@
+import React, { useEffect, useRef, useState } from 'react'
+import { parseWaveformPeaks } from '../utils'
+
+// Renders precomputed min/max peaks; picks the coarsest level that still has a peak per pixel.
+function WaveformScrubber({ src, currentTime = 0, duration = 0, onSeek }) {
+  const canvasRef = useRef(null)
+  const [waveform, setWaveform] = useState(null)
+
+  useEffect(() => {
+    if (!src) { setWaveform(null); return }
+    let cancelled = false
+    fetch(src)
+      .then(res => (res.ok ? res.arrayBuffer() : null))
+      .then(buffer => { if (!cancelled) setWaveform(buffer ? parseWaveformPeaks(buffer) : null) })
+      .catch(() => { if (!cancelled) setWaveform(null) })
+    return () => { cancelled = true }
+  }, [src])
+
+  useEffect(() => {
+    const canvas = canvasRef.current
+    if (!canvas || !waveform?.levels.length) return
+    const width = canvas.clientWidth * (window.devicePixelRatio || 1)
+    const height = canvas.clientHeight * (window.devicePixelRatio || 1)
+    canvas.width = width
+    canvas.height = height
+    const level = [...waveform.levels].reverse().find(l => l.count >= width) || waveform.levels[0]
+    const ctx = canvas.getContext('2d')
+    ctx.clearRect(0, 0, width, height)
+    const progressX = duration > 0 ? (currentTime / duration) * width : 0
+    const mid = height / 2
+    for (let x = 0; x < width; x++) {
+      const start = Math.floor((x / width) * level.count)
+      const end = Math.max(start + 1, Math.floor(((x + 1) / width) * level.count))
+      let lo = 0
+      let hi = 0
+      for (let i = start; i < end && i < level.count; i++) {
+        lo = Math.min(lo, level.peaks[i * 2])
+        hi = Math.max(hi, level.peaks[i * 2 + 1])
+      }
+      ctx.fillStyle = x <= progressX ? '#374151' : '#d1d5db'
+      ctx.fillRect(x, mid - (hi / 127) * mid, 1, Math.max(1, ((hi - lo) / 127) * mid))
+    }
+  }, [waveform, currentTime, duration])
+
+  if (!waveform) return null
+
+  const handleClick = (e) => {
+    if (!onSeek || !(duration > 0)) return
+    const rect = e.currentTarget.getBoundingClientRect()
+    onSeek(((e.clientX - rect.left) / rect.width) * duration)
+  }
+
+  return (
+    <canvas
+      ref={canvasRef}
+      onClick={handleClick}
+      className="mt-1 w-full h-10 cursor-pointer"
+      role="slider"
+      aria-label="Audio waveform scrubber"
+      aria-valuemin={0}
+      aria-valuemax={Math.round(duration)}
+      aria-valuenow={Math.round(currentTime)}
+    />
+  )
+}
+
+export default WaveformScrubber
@@ -7,6 +7,7 @@ const MULTIPART_CONCURRENCY = 4
 const RETRY_BASE_DELAY_MS = 500
 const RETRY_MAX_DELAY_MS = 4000
 const MULTIPART_RESUME_PREFIX = 'practica.multipart.resume.v1'
+const RESUMABLE_CHUNK_BYTES = 8 * 1024 * 1024
 const RECORDER_MIME_CANDIDATES = [
   'video/webm;codecs=vp9',
   'video/webm;codecs=vp8',
@@ -38,6 +39,9 @@ export const preferredSessionVideoUrl = (session) => {
   return assetUrl(proxy) || videoUrl(session?.video_file)
 }
 
+// Chapters snapped to a proxy keyframe start decoding from a single range request.
+export const chapterSeekSeconds = (chapter) => chapter?.keyframe_seconds ?? chapter?.timestamp_seconds ?? 0
+
 export const sessionHlsUrl = (session) => {
   const hls = assetByType(session, 'hls_master')
   return assetUrl(hls)
@@ -48,11 +52,42 @@ export const sessionThumbVttUrl = (session) => {
   return assetUrl(vtt)
 }
 
+export const sessionWaveformUrl = (session) => assetUrl(assetByType(session, 'waveform_peaks'))
+
+// Decode the PKWF peaks asset: header, then per level (samplesPerPeak, count, int8 min/max pairs).
+export const parseWaveformPeaks = (buffer) => {
+  const view = new DataView(buffer)
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4))
+  if (magic !== 'PKWF' || view.getUint8(4) !== 1) return null
+  const sampleRate = view.getUint32(5, true)
+  const levelCount = view.getUint8(9)
+  const levels = []
+  let offset = 10
+  for (let i = 0; i < levelCount; i++) {
+    const samplesPerPeak = view.getUint32(offset, true)
+    const count = view.getUint32(offset + 4, true)
+    offset += 8
+    levels.push({ samplesPerPeak, count, peaks: new Int8Array(buffer, offset, count * 2) })
+    offset += count * 2
+  }
+  return { sampleRate, levels }
+}
+
 export const sessionThumbSpriteUrl = (session) => {
   const sprite = assetByType(session, 'thumb_sprite')
   return assetUrl(sprite)
 }
 
+export const commentVideoUrl = (comment) => {
+  const proxy = assetByType(comment, 'proxy_mp4')
+  return assetUrl(proxy) || videoUrl(comment?.video_reply)
+}
+
+export const commentPosterUrl = (comment) => {
+  const poster = assetByType(comment, 'poster')
+  return assetUrl(poster)
+}
+
 export const fmtTime = (s) => {
   const sec = Math.floor(s)
   const m = Math.floor(sec / 60)
@@ -365,9 +400,31 @@ const buildPartsPayload = (partsByNumber) =>
     .sort((a, b) => a[0] - b[0])
     .map(([partNumber, etag]) => ({ part_number: partNumber, etag }))
 
-const createSessionViaMultipart = async ({ token, payload, videoFile, onProgress }) => {
-  const fingerprint = multipartFingerprint({ payload, videoFile })
-  const storageKey = multipartResumeKey(fingerprint)
+const SESSION_MULTIPART_ENDPOINTS = {
+  initiate: '/api/sessions/multipart/initiate/',
+  status: '/api/sessions/multipart/status/',
+  signPart: '/api/sessions/multipart/sign-part/',
+  complete: '/api/sessions/multipart/complete/',
+}
+
+const commentMultipartEndpoints = (sessionId) => ({
+  initiate: `/api/sessions/${sessionId}/comment-upload/initiate/`,
+  status: `/api/sessions/${sessionId}/comment-upload/status/`,
+  signPart: `/api/sessions/${sessionId}/comment-upload/sign-part/`,
+  complete: `/api/sessions/${sessionId}/comment-upload/complete/`,
+})
+
+const createSessionViaMultipart = ({ token, payload, videoFile, onProgress }) =>
+  runMultipartUpload({
+    token,
+    endpoints: SESSION_MULTIPART_ENDPOINTS,
+    payload,
+    videoFile,
+    onProgress,
+    storageKey: multipartResumeKey(multipartFingerprint({ payload, videoFile })),
+  })
+
+const runMultipartUpload = async ({ token, endpoints, payload, videoFile, onProgress, storageKey }) => {
 
   let uploadId = null
   let partSize = null
@@ -377,7 +434,7 @@ const createSessionViaMultipart = async ({ token, payload, videoFile, onProgress
   const resumeRecord = readResumeRecord(storageKey)
   if (resumeRecord?.upload_id && Number(resumeRecord?.size_bytes) === Number(videoFile.size)) {
     const statusRes = await authedJsonPost({
-      url: '/api/sessions/multipart/status/',
+      url: endpoints.status,
       token,
       body: { multipart_upload_id: resumeRecord.upload_id },
     })
@@ -395,7 +452,7 @@ const createSessionViaMultipart = async ({ token, payload, videoFile, onProgress
 
   if (!uploadId) {
     const initRes = await authedJsonPost({
-      url: '/api/sessions/multipart/initiate/',
+      url: endpoints.initiate,
       token,
       body: {
         ...payload,
@@ -458,7 +515,7 @@ const createSessionViaMultipart = async ({ token, payload, videoFile, onProgress
 
     try {
       const signRes = await retry(() => authedJsonPost({
-        url: '/api/sessions/multipart/sign-part/',
+        url: endpoints.signPart,
         token,
         body: { multipart_upload_id: uploadId, part_number: partNumber },
       }))
@@ -505,7 +562,7 @@ const createSessionViaMultipart = async ({ token, payload, videoFile, onProgress
   }
 
   const completeRes = await authedJsonPost({
-    url: '/api/sessions/multipart/complete/',
+    url: endpoints.complete,
     token,
     body: {
       multipart_upload_id: uploadId,
@@ -523,11 +580,139 @@ const createSessionViaMultipart = async ({ token, payload, videoFile, onProgress
   return completeRes
 }
 
+const patchResumableChunk = ({ url, token, offset, blob, onProgress }) =>
+  new Promise((resolve, reject) => {
+    const xhr = new XMLHttpRequest()
+    xhr.open('PATCH', url)
+    if (token) xhr.setRequestHeader('Authorization', `Token ${token}`)
+    xhr.setRequestHeader('Upload-Offset', String(offset))
+    xhr.setRequestHeader('Content-Type', 'application/offset+octet-stream')
+    xhr.upload.onprogress = (event) => {
+      if (onProgress) onProgress(event.loaded)
+    }
+    xhr.onload = () => {
+      const text = xhr.responseText || ''
+      let data = null
+      if (text) {
+        try { data = JSON.parse(text) } catch { data = text }
+      }
+      resolve({
+        ok: xhr.status >= 200 && xhr.status < 300,
+        status: xhr.status,
+        data,
+        text,
+        offset: parseInt(xhr.getResponseHeader('Upload-Offset') || '', 10),
+      })
+    }
+    xhr.onerror = () => reject(new Error('Network error during resumable upload'))
+    xhr.onabort = () => reject(new Error('Resumable upload aborted'))
+    xhr.send(blob)
+  })
+
+const resumableOffset = async ({ url, token }) => {
+  const res = await fetch(url, {
+    method: 'HEAD',
+    headers: token ? { Authorization: `Token ${token}` } : {},
+  })
+  const offset = parseInt(res.headers.get('Upload-Offset') || '', 10)
+  return { ok: res.ok && Number.isFinite(offset), status: res.status, data: null, text: '', offset }
+}
+
+// Offset-based chunked upload to the server's own storage (deployments without S3).
+// Each PATCH appends at the committed offset; after a drop we HEAD for the offset and carry on.
+const createSessionViaResumable = async ({ token, payload, videoFile, onProgress }) => {
+  const storageKey = multipartResumeKey(`resumable|${multipartFingerprint({ payload, videoFile })}`)
+  let uploadUrl = null
+  let offset = 0
+
+  const resumeRecord = readResumeRecord(storageKey)
+  if (resumeRecord?.upload_id && Number(resumeRecord?.size_bytes) === Number(videoFile.size)) {
+    const url = `/api/sessions/resumable/${resumeRecord.upload_id}/`
+    const head = await resumableOffset({ url, token })
+    if (head.ok) {
+      uploadUrl = url
+      offset = head.offset
+    } else {
+      clearResumeRecord(storageKey)
+    }
+  }
+
+  if (!uploadUrl) {
+    const initRes = await authedJsonPost({
+      url: '/api/sessions/resumable/',
+      token,
+      body: {
+        ...payload,
+        filename: videoFile.name,
+        content_type: videoFile.type,
+        size_bytes: videoFile.size,
+      },
+    })
+    if (!initRes.ok) return initRes
+    uploadUrl = `/api/sessions/resumable/${initRes.data?.resumable_upload_id}/`
+    writeResumeRecord(storageKey, {
+      upload_id: initRes.data?.resumable_upload_id,
+      size_bytes: videoFile.size,
+      filename: videoFile.name,
+      last_modified: videoFile.lastModified || 0,
+    })
+  }
+
+  const reportProgress = (done) => {
+    if (!onProgress) return
+    const percent = Math.max(done > 0 ? 1 : 0, Math.min(99, Math.round((done / videoFile.size) * 100)))
+    onProgress(percent, done, videoFile.size)
+  }
+
+  let failures = 0
+  while (true) {
+    const chunkStart = offset
+    const blob = videoFile.slice(chunkStart, Math.min(chunkStart + RESUMABLE_CHUNK_BYTES, videoFile.size))
+    reportProgress(chunkStart)
+    let res
+    try {
+      res = await patchResumableChunk({
+        url: uploadUrl,
+        token,
+        offset: chunkStart,
+        blob,
+        onProgress: (loaded) => reportProgress(chunkStart + loaded),
+      })
+    } catch (err) {
+      failures += 1
+      if (failures >= MAX_PART_RETRIES) throw err
+      await sleep(Math.min(RETRY_MAX_DELAY_MS, RETRY_BASE_DELAY_MS * (2 ** (failures - 1))))
+      const head = await resumableOffset({ url: uploadUrl, token })
+      if (!head.ok) return head
+      offset = head.offset
+      continue
+    }
+
+    if (res.status === 409 && Number.isFinite(res.offset)) {
+      offset = res.offset
+      continue
+    }
+    if (!res.ok) {
+      if ([400, 404, 410].includes(res.status)) clearResumeRecord(storageKey)
+      return res
+    }
+    failures = 0
+    if (res.status === 201) {
+      clearResumeRecord(storageKey)
+      if (onProgress) onProgress(100, videoFile.size, videoFile.size)
+      return res
+    }
+    offset = res.offset
+  }
+}
+
 export const createSessionUpload = async ({ token, payload, videoFile, onProgress }) => {
   try {
     if (videoFile && videoFile.size >= MULTIPART_THRESHOLD_BYTES) {
       const multipartRes = await createSessionViaMultipart({ token, payload, videoFile, onProgress })
       if (multipartRes.ok || ![400, 404, 405].includes(multipartRes.status)) return multipartRes
+      const resumableRes = await createSessionViaResumable({ token, payload, videoFile, onProgress })
+      if (resumableRes.ok || ![400, 404, 405].includes(resumableRes.status)) return resumableRes
     }
 
     const fd = new FormData()
@@ -550,6 +735,35 @@ export const createSessionUpload = async ({ token, payload, videoFile, onProgres
   }
 }
 
+export const createCommentReply = async ({ token, sessionId, payload, videoFile, onProgress }) => {
+  try {
+    const multipartRes = await runMultipartUpload({
+      token,
+      endpoints: commentMultipartEndpoints(sessionId),
+      payload,
+      videoFile,
+      onProgress,
+      storageKey: multipartResumeKey(`comment|${sessionId}|${multipartFingerprint({ payload, videoFile })}`),
+    })
+    if (multipartRes.ok || ![400, 404, 405].includes(multipartRes.status)) return multipartRes
+
+    const fd = new FormData()
+    fd.append('text', payload.text || '')
+    if (payload.timestamp_seconds !== undefined && payload.timestamp_seconds !== null) {
+      fd.append('timestamp_seconds', payload.timestamp_seconds)
+    }
+    fd.append('video_reply', videoFile)
+    return uploadFormData({ url: `/api/sessions/${sessionId}/add_comment/`, formData: fd, token, onProgress })
+  } catch {
+    return {
+      ok: false,
+      status: 0,
+      data: { error: 'Network interrupted during upload. Please retry.' },
+      text: '',
+    }
+  }
+}
+
 export const uploadErrorMessage = (res) => {
   if (!res) return 'Upload failed'
   if (res.status === 0) return 'Network interrupted during upload. Please retry.'
@@ -103,6 +103,12 @@ PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin
 0 * * * * root cd /opt/practica && if docker compose version >/dev/null 2>&1; then docker compose -f docker-compose.prod.yml exec -T backend python /app/apps/backend/manage.py build_coach_metrics --days 35; elif command -v docker-compose >/dev/null 2>&1; then docker-compose -f docker-compose.prod.yml exec -T backend python /app/apps/backend/manage.py build_coach_metrics --days 35; fi >> /var/log/practica-coach-metrics.log 2>&1
 CRON
 chmod 0644 /etc/cron.d/practica-coach-metrics
+cat > /etc/cron.d/practica-media-gc <<CRON
+SHELL=/bin/bash
+PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin
+30 3 * * * root cd /opt/practica && if docker compose version >/dev/null 2>&1; then docker compose -f docker-compose.prod.yml exec -T backend python /app/apps/backend/manage.py collect_orphaned_media --grace-hours 48; elif command -v docker-compose >/dev/null 2>&1; then docker-compose -f docker-compose.prod.yml exec -T backend python /app/apps/backend/manage.py collect_orphaned_media --grace-hours 48; fi >> /var/log/practica-media-gc.log 2>&1
+CRON
+chmod 0644 /etc/cron.d/practica-media-gc
 systemctl reload cron || service cron reload || true
 
 # Apply upload-safe nginx defaults globally (http context).
@@ -125,6 +131,14 @@ if [ "$backend_ok" != "1" ]; then
   exit 1
 fi
 
+# The media job worker (run_media_jobs) is the only thing that drains queued
+# MediaConvert retries, bulk-import backfill, derived assets and storage cleanup.
+if ! compose -f docker-compose.prod.yml ps worker 2>/dev/null | grep -q ' Up'; then
+  echo 'Media job worker is not running' >&2
+  compose -f docker-compose.prod.yml logs --tail=200 worker || true
+  exit 1
+fi
+
 POST_COUNTS=$(count_records)
 POST_USERS=$(extract_metric users "$POST_COUNTS")
 POST_SESSIONS=$(extract_metric sessions "$POST_COUNTS")
@@ -155,7 +169,7 @@ if [ "$public_ok" != "1" ]; then
 fi
 
 DEPLOYED_SHA=$(git rev-parse --short HEAD 2>/dev/null || echo unknown)
-echo "DEPLOY_SUMMARY ref=$REF sha=$DEPLOYED_SHA backend_health=pass public_health=pass"
+echo "DEPLOY_SUMMARY ref=$REF sha=$DEPLOYED_SHA backend_health=pass public_health=pass worker=running"
 EOS
 )
 